@@ -0,0 +1,41 @@
+"""Runs PyFRAP performance benchmarks on synthetic FRAP data.
+
+See :py:mod:`pyfrp.modules.pyfrp_benchmark_module` for details. No microscope data is needed.
+
+Run as follows:
+
+python runBenchmarks.py outputFolder --sizes 128 256 512
+
+and compare two runs via
+
+python runBenchmarks.py outputFolder --compare old.json new.json
+
+"""
+
+# Import modules
+import sys
+import argparse
+from pyfrp.modules import pyfrp_benchmark_module
+
+# Create parser
+parser = argparse.ArgumentParser(description='PyFRAP benchmarks on synthetic data.')
+
+parser.add_argument('out',help='Output folder for synthetic data and results.')
+parser.add_argument('--sizes', dest='sizes',type=int,nargs='+',help='Image resolutions in px.',default=[128,256,512])
+parser.add_argument('--geometries', dest='geometries',nargs='+',choices=pyfrp_benchmark_module.geometryNames,help='Reference geometries.',default=pyfrp_benchmark_module.geometryNames)
+parser.add_argument('--benchmarks', dest='benchmarks',nargs='+',choices=pyfrp_benchmark_module.benchmarkNames,help='Benchmarks to run.',default=pyfrp_benchmark_module.benchmarkNames)
+parser.add_argument('--volSizes', dest='volSizes',type=float,nargs='+',help='Mesh element sizes in px.',default=[20.,10.])
+parser.add_argument('--frames', dest='nFrames',type=int,help='Number of frames of synthetic data.',default=30)
+parser.add_argument('--repeats', dest='repeats',type=int,help='Number of repeats per benchmark.',default=3)
+parser.add_argument('--compare', dest='compare',nargs=2,metavar=('OLD','NEW'),help='Compare two result files instead of running benchmarks.',default=None)
+
+args = parser.parse_args()
+
+if args.compare!=None:
+	pyfrp_benchmark_module.compareBenchmarks(args.compare[0],args.compare[1])
+	sys.exit(0)
+
+fn,results=pyfrp_benchmark_module.runBenchmarks(args.out,sizes=args.sizes,geometries=args.geometries,benchmarks=args.benchmarks,
+					       volSizes=args.volSizes,nFrames=args.nFrames,repeats=args.repeats)
+
+print "Results written to", fn
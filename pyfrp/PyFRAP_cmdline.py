@@ -1,74 +1,66 @@
-import sys
-import argparse
+"""PyFRAP command line.
 
+Runs :py:meth:`pyfrp.subclasses.pyfrp_embryo.embryo.quickAnalysis` headless over all datasets
+listed in a manifest file, see :py:mod:`pyfrp.modules.pyfrp_batch_module`. For example
 
-# Create parser
-parser = argparse.ArgumentParser(description='PyFRAP command line.')
+	python PyFRAP_cmdline.py datasets.txt results/ --template template.emb --processes 4 --max-mem 4000
 
-parser.add_argument('-f','--fIn', dest='fIn',action='append',help='Input file names. Can be either embryo files or paths to image data. Note that all inputs should be of the same type.')
+Running the same command again resumes an interrupted batch.
 
-# Options for project creation
+"""
 
-# Options for image analysis
-parser.add_argument('-G','--gaussian', dest='gaussian', action='const_store',help='Perform gaussian blur. Specified as tuple flag,sigma',default="0,5")
-parser.add_argument('-M','--median', dest='median', action='const_store',help='Perform median filter. Specified as tuple flag,radius',default="0,2")
-parser.add_argument('-F','--flatten', dest='flatten', action='const_store',help='Perform flattening. Specified as tuple flag,pathToFlattenData',default="0,")
-parser.add_argument('-B','--bkgd', dest='bkgd', action='const_store',help='Perform background subtraction. Specified as tuple flag,pathToBkgdData',default="0,")
-parser.add_argument('-N','--norm', dest='norm', action='const_store',help='Perform normalization. Specified as tuple flag,pathToPreData',default="0,")
+import sys
+import argparse
 
-# Options for meshing
+from pyfrp.modules import pyfrp_batch_module
 
+def buildParser():
 
+	"""Returns argument parser of PyFRAP command line."""
 
-# Options for simulations
-parser.add_argument('--IC', dest='IC', action='const_store',help='Choose initial conditions',default=4)
-parser.add_argument('-t','--tsteps', dest='tsteps', action='const_store',help='Number of simulations timesteps',default=3000)
-parser.add_argument('-s','--stepping', dest='stepping', action='const_store',help='Time stepping (0=linear,1=log)',default=1)
-parser.add_argument('--IC', dest='IC', action='const_store',help='Choose initial conditions',default=4)
+	# Create parser
+	parser = argparse.ArgumentParser(description='PyFRAP command line. Runs quickAnalysis on all datasets listed in a manifest.')
 
-# Options for fitting
+	parser.add_argument('manifest',help='Manifest file. One dataset per line, given as path[,name[,ftype]]. Paths can be embryo files or folders with microscopy data.')
+	parser.add_argument('out',help='Output folder for analyzed embryos, journal and results.csv.')
 
+	# Options for project creation
+	parser.add_argument('-T','--template', dest='template',help='Embryo file used as template for geometry, ROIs, simulation and fits of data folders.',default=None)
+	parser.add_argument('--ftype', dest='ftype',help='Default microscopy file type of data folders.',default='lsm')
+	parser.add_argument('--channel', dest='nChannel',type=int,help='Channel of microscopy data.',default=0)
+	parser.add_argument('--ext', dest='ext',choices=['.pyfrp','.emb'],help='Format of saved embryos.',default='.pyfrp')
 
+	# Options for batch
+	parser.add_argument('-p','--processes', dest='processes',type=int,help='Number of worker processes.',default=1)
+	parser.add_argument('--max-mem', dest='maxMem',type=float,help='Memory limit per worker in MB.',default=None)
+	parser.add_argument('--timers', dest='timers',action='store_true',help='Write detailed timings of each dataset to <name>_timers.json.')
 
+	# Options for analysis
+	parser.add_argument('--maxDExpPx', dest='maxDExpPx',type=float,help='Maximum expected diffusion coefficient in px^2/s, used for simulation time stepping.',default=None)
+	parser.add_argument('--timeScale', dest='timeScale',choices=['lin','log'],help='Time scaling of simulation.',default='log')
+	parser.add_argument('--bkgdName', dest='bkgdName',help='Name of ROI used for background computation.',default='Bleached Square')
+	parser.add_argument('--normName', dest='normName',help='Name of ROI used for norming computation.',default='Slice')
+	parser.add_argument('--skip', dest='skip',action='append',choices=['idxs','analysis','simulation','pin','fit'],help='Skip stage of analysis. Can be given multiple times.',default=[])
 
+	return parser
 
+def main(argv=None):
 
+	"""Runs PyFRAP command line."""
 
+	args = buildParser().parse_args(argv)
 
-args = parser.parse_args()
+	analysisKwargs={'maxDExpPx':args.maxDExpPx,'timeScale':args.timeScale,'bkgdName':args.bkgdName,'normName':args.normName}
+	for stage in pyfrp_batch_module.stageNames:
+		analysisKwargs['run'+stage[0].upper()+stage[1:]]=stage not in args.skip
 
+	records=pyfrp_batch_module.runBatch(args.manifest,args.out,template=args.template,processes=args.processes,maxMem=args.maxMem,
+				    ext=args.ext,ftype=args.ftype,nChannel=args.nChannel,analysisKwargs=analysisKwargs,timers=args.timers)
 
-print args
+	failed=[r for r in records.values() if r['status']!='done']
 
-# Choose what kind of data is given and what to do with it.
-#inputTypes=[]
-#for inp in args.fIn:
-	#if os.path.isdir(inp):
-		#fns=os.listdir(inp)
-		
-		
-		
-		#for f in fns:
-			#if os.path.isdir(os.path.join(inp,f)):
-				#pass
-			#else:
-				#path,ext=os.path.splitext(inp)
-				
-				#if ext in ['.czi','.lsm','.tif','']
-				
-				
-	#else:
-		#path,ext=os.path.splitext(inp)
-		
-		#if ext=='.emb':
-			#inputTypes.append('embryo')
-		#elif ext=='.mol':
-			#inputTypes.append('molecule')
-		#else:
-			#printWarning("Unknown input type " + inp)
-			
-			
-		
-		
+	return int(len(failed)>0)
 
+if __name__ == '__main__':
 
+	sys.exit(main())
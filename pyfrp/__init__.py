@@ -4,7 +4,6 @@
 PyFRAP: A Python based FRAP analysis tool box
 """
 
-import os
 import sys
 import platform
 
@@ -25,19 +24,16 @@ from . import subclasses
 
 #PyFRAP GUI classes
 
-#Only import if not RTD or not selected. RTD is currently having problems 
-#with importing GUI classes. Will need to have fix for this 
-#at some point
+#The GUI pulls in PyQt4, VTK and all dialogs, so it is only imported once 
+#main is called. This keeps headless scripts and worker processes fast.
 
-if os.environ.get('READTHEDOCS', None) == 'True':
-	pass
-else:
-	#from . import gui
-	from .gui.pyfrp_app import main
+def main():
 	
+	"""Starts PyFRAP GUI, see :py:func:`pyfrp.gui.pyfrp_app.main`."""
 	
+	from .gui.pyfrp_app import main as guiMain
+	return guiMain()
 		
-	
 __version__ = '1.1'
 __author__ = u"Alexander Blaessle"
 __license__ = "GNU GPL v3"
\ No newline at end of file
@@ -203,6 +203,7 @@ class ROImanager(QtGui.QDialog):
 			printWarning('Unknown ROI Type' + typ)
 	
 		self.openDialog(self.embryo.ROIs[-1],typ)
+		self.updateDataVecs([self.embryo.ROIs[-1]])
 		
 		self.updateROIList()
 		
@@ -210,9 +211,17 @@ class ROImanager(QtGui.QDialog):
 		typ=self.currROI.getType()
 	
 		self.openDialog(self.currROI,typ)
+		self.updateDataVecs([self.currROI])
 		
 		self.updateROIList()
 	
+	def updateDataVecs(self,ROIs):
+		
+		"""Reads out data of edited ROIs from processed images kept by last analysis, if there are any."""
+		
+		if self.embryo.analysis!=None and self.embryo.analysis.hasProcessedStack():
+			self.embryo.analysis.extractROIs(ROIs=ROIs)
+	
 	def openDialog(self,ROI,typ):
 		if typ=='slice':
 			ret=sliceROIDialog(ROI,self).exec_()
@@ -241,6 +250,7 @@ class ROImanager(QtGui.QDialog):
 		if len(self.currROI.findIncluded())>0:
 			printWarning("ROI " + self.currROI.name + " is used in custom ROI. This might lead to problems." )
 		self.embryo.ROIs.remove(self.currROI)
+		self.updateDataVecs([])
 		self.updateROIList()
 	
 	def computeIdxs(self):
@@ -1888,7 +1898,10 @@ class indexThread(pyfrp_gui_basics.pyfrpThread):
 		#self.prog_signal.connect(self.print_prog)
 			
 	def runTask(self,debug=False):
-		self.embryo.computeROIIdxs(signal=self.progressSignal,debug=True)
+		
+		#Index ROIs serially, forking from a thread of the running Qt application is unsafe. 
+		#Progress is emitted after each ROI
+		self.embryo.computeROIIdxs(signal=self.progressSignal,debug=True,processes=1)
 
 #===================================================================================================================================
 #Dialogs for wizard selection
@@ -169,6 +169,7 @@ class fitSettingsDialog(pyfrp_gui_basics.basicSettingsDialog):
 		self.comboMeth.addItem("brute")
 		self.comboMeth.addItem("BFGS")
 		self.comboMeth.addItem("CG")
+		self.comboMeth.addItem("differential evolution")
 		
 		self.initComboMeth()
 		
@@ -41,6 +41,7 @@ import pyfrp_gui_basics
 from pyfrp.modules.pyfrp_term_module import *
 from pyfrp.modules import pyfrp_img_module
 from pyfrp.modules import pyfrp_misc_module
+from pyfrp.modules import pyfrp_sim_module
 
 #Numpy/Scipy
 import numpy as np
@@ -75,6 +76,7 @@ class simulationSettingsDialog(pyfrp_gui_basics.basicSettingsDialog):
 		self.lblTimeScale = QtGui.QLabel("Time Scaling:", self)
 		
 		self.lblTEnd = QtGui.QLabel("TEnd:", self) 
+		self.lblSolver = QtGui.QLabel("Solver:", self)
 		
 		#LineEdits
 		self.qleD = QtGui.QLineEdit(str(self.simulation.D))
@@ -112,11 +114,18 @@ class simulationSettingsDialog(pyfrp_gui_basics.basicSettingsDialog):
 		self.comboTS.addItem("Linear")
 		self.comboTS.addItem("Logarithmic")
 		
+		self.comboSolver = QtGui.QComboBox(self)
+		for solver in pyfrp_sim_module.solverNames:
+			self.comboSolver.addItem(solver)
+		self.comboSolver.addItem("Auto")
+		
 		self.initComboIC()
 		self.initComboTS()
+		self.initComboSolver()
 		
 		self.comboIC.activated[str].connect(self.setICMode)   
 		self.comboTS.activated[str].connect(self.setTS)   
+		self.comboSolver.activated[str].connect(self.setSolver)   
 		
 		#Layout
 		self.grid.addWidget(self.lblD,1,1)
@@ -139,6 +148,8 @@ class simulationSettingsDialog(pyfrp_gui_basics.basicSettingsDialog):
 		
 		self.grid.addWidget(self.lblICmode,1,5)
 		self.grid.addWidget(self.comboIC,1,6)
+		self.grid.addWidget(self.lblSolver,2,5)
+		self.grid.addWidget(self.comboSolver,2,6)
 		
 		
 		
@@ -171,6 +182,20 @@ class simulationSettingsDialog(pyfrp_gui_basics.basicSettingsDialog):
 	def initComboIC(self):
 		self.comboIC.setCurrentIndex(self.simulation.ICmode-1)
 			
+	def setSolver(self,text):
+		text=str(text)
+		if text=="Auto":
+			self.simulation.setAutoSolver(True)
+		else:
+			self.simulation.setAutoSolver(False)
+			self.simulation.setSolver(text)
+	
+	def initComboSolver(self):
+		if self.simulation.getAutoSolver():
+			self.comboSolver.setCurrentIndex(self.comboSolver.findText("Auto"))
+		else:
+			self.comboSolver.setCurrentIndex(self.comboSolver.findText(self.simulation.getSolver()))
+			
 	def initComboTS(self):
 		if self.simulation.isLogTimeScale():
 			self.comboTS.setCurrentIndex(1)
@@ -18,8 +18,13 @@ if platform.system() in ["Darwin"]:
 	matplotlib.use('qt4agg')
 
 #Basic PyFRAP modules
+from . import pyfrp_lazy_module
 from . import pyfrp_term_module
+from . import pyfrp_timer_module
+from . import pyfrp_container_module
 from . import pyfrp_IO_module 
+from . import pyfrp_batch_module
+from . import pyfrp_benchmark_module
 from . import pyfrp_misc_module
 from . import pyfrp_plot_module
 from . import pyfrp_vtk_module
@@ -31,6 +36,7 @@ from . import pyfrp_gmsh_module
 from . import pyfrp_gmsh_IO_module
 from . import pyfrp_sim_module
 from . import pyfrp_integration_module
+from . import pyfrp_meshquality_module
 from . import pyfrp_idx_module
 from . import pyfrp_geometry_module
 from . import pyfrp_gmsh_geometry
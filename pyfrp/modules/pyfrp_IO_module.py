@@ -40,9 +40,14 @@ import sys
 import os
 import csv
 import shutil
+import base64
+
+#Numpy
+import numpy as np
 
 from pyfrp.modules import pyfrp_misc_module
 from pyfrp.modules import pyfrp_gmsh_IO_module
+from pyfrp.modules import pyfrp_container_module
 from pyfrp.modules.pyfrp_term_module import *
 
 #===========================================================================================================================================================================
@@ -102,48 +107,89 @@ def loadFromPickle(fn):
         
         return loadedFile
 
-def loadMolecule(fn,update=True):
+def loadMolecule(fn,update=True,exclude=[]):
 	
-	"""Loads molecule object from pickle file
+	"""Loads molecule object from pickle or container file
 	and brings it up-to-date.
 	
+	Container files are upgraded via their schema version, see :py:mod:`pyfrp.modules.pyfrp_container_module`,
+	and then updated the same way as pickle files.
+	
 	Args:
 		fn (str): Filename.	
 	
 	Keyword Args: 
 		update (bool): Update to current version.
+		exclude (list): Patterns of attributes not to load from container file, see :py:func:`pyfrp.modules.pyfrp_container_module.loadContainer`.
 	
 	Returns: 
 		pyfrp.subclasses.pyfrp_molecule: Molecule file.
 	
 	"""
 	
+	if pyfrp_container_module.isContainer(fn):
+		return pyfrp_container_module.loadContainer(fn,exclude=exclude,update=update)
+	
 	mol=loadFromPickle(fn)
 	if update:
-		mol.update_version()
+		mol.updateVersion()
 	return mol
 
-def loadEmbryo(fn,update=True):
+def loadEmbryo(fn,update=True,exclude=[]):
 	
-	"""Loads embryo object from pickle file
+	"""Loads embryo object from pickle or container file
 	and brings it up-to-date.
 	
+	Container files are upgraded via their schema version, see :py:mod:`pyfrp.modules.pyfrp_container_module`,
+	and then updated the same way as pickle files.
+	
 	Args:
 		fn (str): Filename.	
 	
 	Keyword Args: 
 		update (bool): Update to current version.
+		exclude (list): Patterns of attributes not to load from container file, see :py:func:`pyfrp.modules.pyfrp_container_module.loadContainer`.
 	
 	Returns: 
 		pyfrp.subclasses.pyfrp_embryo: Embryo file.
 	
 	"""
 	
+	if pyfrp_container_module.isContainer(fn):
+		return pyfrp_container_module.loadContainer(fn,exclude=exclude,update=update)
+	
 	emb=loadFromPickle(fn)
 	if update:
-		emb.update_version()
+		emb.updateVersion()
 	return emb
 
+def convertPickleToContainer(fn,fnOut=None,compress=False):
+	
+	"""Converts pickled PyFRAP object into container file.
+	
+	Brings pickled object up-to-date via its ``updateVersion`` method before saving it.
+	
+	Args:
+		fn (str): Filename of pickle file.
+	
+	Keyword Args: 
+		fnOut (str): Output filename. If not given, replaces extension of ``fn`` with ``.pyfrp``.
+		compress (bool): Deflate arrays.
+	
+	Returns: 
+		str: Output filename.
+	
+	"""
+	
+	if fnOut==None:
+		fnOut=os.path.splitext(fn)[0]+".pyfrp"
+	
+	obj=loadFromPickle(fn)
+	if hasattr(obj,'updateVersion'):
+		obj.updateVersion()
+	
+	return pyfrp_container_module.saveContainer(obj,fnOut,compress=compress)
+
 def cleanUp():
 	"""Calls garbage collector to clean up.
 	"""
@@ -358,3 +404,279 @@ def readCSV(fn,hasHeader=True,delimiter=',',dtype=str):
 	return header,rows	
 	
 
+
+def getVTKCellType(nVert):
+	
+	"""Returns VTK cell type ID for simplicial cells with ``nVert`` vertices.
+	
+	Args:
+		nVert (int): Number of vertices per cell.
+	
+	Returns:
+		int: VTK cell type (5 for triangles, 10 for tetrahedra).
+	
+	"""
+	
+	cellTypes={3:5,4:10}
+	
+	if nVert not in cellTypes.keys():
+		printError("Cells with "+str(nVert)+" vertices are not supported.")
+		return None
+		
+	return cellTypes[nVert]
+	
+def meshToArrays(mesh):
+	
+	"""Extracts point and connectivity arrays from a FiPy mesh.
+	
+	2D meshes get padded with ``z=0``. 
+	
+	Args:
+		mesh (fipy.GmshImporter3D): Some Fipy mesh object.
+	
+	Returns:
+		tuple: Tuple containing:
+		
+			* points (numpy.ndarray): Point coordinates of shape ``(nVertices,3)``.
+			* cells (numpy.ndarray): Cell connectivity of shape ``(nCells,nVert)``.
+	
+	"""
+	
+	coords=np.asarray(mesh.vertexCoords,dtype=np.float64)
+	
+	points=np.zeros((coords.shape[1],3),dtype=np.float64)
+	points[:,:coords.shape[0]]=coords.T
+	
+	cells=np.asarray(mesh._getOrderedCellVertexIDs()).T
+	
+	return points,np.ascontiguousarray(cells,dtype=np.int64)
+
+def encodeVTUDataArray(arr):
+	
+	"""Encodes array as base64 binary block used in VTK XML files.
+	
+	Block is prefixed by a ``UInt32`` header containing the number of bytes.
+	
+	Args:
+		arr (numpy.ndarray): Some array.
+		
+	Returns:
+		str: Encoded array.
+	
+	"""
+	
+	data=np.ascontiguousarray(arr).tostring()
+	header=np.array([len(data)],dtype='<u4').tostring()
+	
+	return base64.b64encode(header+data)
+
+def writeVTUDataArray(f,arr,name,vtkType,nComp=1):
+	
+	"""Writes single binary ``DataArray`` element to an open .vtu file.
+	
+	Args:
+		f (file): Open file handle.
+		arr (numpy.ndarray): Array to write.
+		name (str): Name of array.
+		vtkType (str): VTK type name, for example ``Float64``.
+	
+	Keyword Args:
+		nComp (int): Number of components.
+	
+	"""
+	
+	f.write('<DataArray type="%s" Name="%s" NumberOfComponents="%d" format="binary">\n' %(vtkType,name,nComp))
+	f.write(encodeVTUDataArray(arr))
+	f.write('\n</DataArray>\n')
+
+def writeVTUFile(fn,points,cells,cellData={},pointData={}):
+	
+	"""Writes unstructured grid into VTK XML (.vtu) file.
+	
+	All arrays are written as binary blocks directly from their buffers, no per-element
+	operations are performed. Data arrays are written as ``Float64``.
+	
+	Args:
+		fn (str): Output filepath.
+		points (numpy.ndarray): Point coordinates of shape ``(nVertices,3)``.
+		cells (numpy.ndarray): Cell connectivity of shape ``(nCells,nVert)``.
+	
+	Keyword Args:
+		cellData (dict): Dictionary of cell data arrays, keys are names. 
+		pointData (dict): Dictionary of point data arrays, keys are names. 
+	
+	Returns:
+		str: Output filepath.
+	
+	"""
+	
+	nCells,nVert=cells.shape
+	
+	offsets=np.arange(1,nCells+1,dtype='<i8')*nVert
+	types=np.empty(nCells,dtype=np.uint8)
+	types.fill(getVTKCellType(nVert))
+	
+	with open(fn,'wb') as f:
+		
+		f.write('<?xml version="1.0"?>\n')
+		f.write('<VTKFile type="UnstructuredGrid" version="0.1" byte_order="LittleEndian" header_type="UInt32">\n')
+		f.write('<UnstructuredGrid>\n')
+		f.write('<Piece NumberOfPoints="%d" NumberOfCells="%d">\n' %(points.shape[0],nCells))
+		
+		f.write('<Points>\n')
+		writeVTUDataArray(f,points.astype('<f8'),"Points","Float64",nComp=3)
+		f.write('</Points>\n')
+		
+		f.write('<Cells>\n')
+		writeVTUDataArray(f,cells.astype('<i8'),"connectivity","Int64")
+		writeVTUDataArray(f,offsets,"offsets","Int64")
+		writeVTUDataArray(f,types,"types","UInt8")
+		f.write('</Cells>\n')
+		
+		if len(pointData)>0:
+			f.write('<PointData>\n')
+			for name in sorted(pointData.keys()):
+				writeVTUDataArray(f,np.asarray(pointData[name],dtype='<f8'),name,"Float64")
+			f.write('</PointData>\n')
+		
+		if len(cellData)>0:
+			f.write('<CellData Scalars="%s">\n' %sorted(cellData.keys())[0])
+			for name in sorted(cellData.keys()):
+				writeVTUDataArray(f,np.asarray(cellData[name],dtype='<f8'),name,"Float64")
+			f.write('</CellData>\n')
+		
+		f.write('</Piece>\n')
+		f.write('</UnstructuredGrid>\n')
+		f.write('</VTKFile>\n')
+		
+	return fn
+
+def writeLegacyVTKFile(fn,points,cells,cellData={}):
+	
+	"""Writes unstructured grid into legacy binary .vtk file.
+	
+	Legacy .vtk files can be read by ``vtk.vtkUnstructuredGridReader``, 
+	see also :py:func:`pyfrp.modules.pyfrp_vtk_module.importVTKMeshFile`.
+	
+	Args:
+		fn (str): Output filepath.
+		points (numpy.ndarray): Point coordinates of shape ``(nVertices,3)``.
+		cells (numpy.ndarray): Cell connectivity of shape ``(nCells,nVert)``.
+	
+	Keyword Args:
+		cellData (dict): Dictionary of cell data arrays, keys are names. 
+	
+	Returns:
+		str: Output filepath.
+	
+	"""
+	
+	nCells,nVert=cells.shape
+	
+	#Legacy format expects big endian and a leading vertex count per cell
+	cellArr=np.empty((nCells,nVert+1),dtype='>i4')
+	cellArr[:,0]=nVert
+	cellArr[:,1:]=cells
+	
+	types=np.empty(nCells,dtype='>i4')
+	types.fill(getVTKCellType(nVert))
+	
+	with open(fn,'wb') as f:
+		
+		f.write('# vtk DataFile Version 3.0\n')
+		f.write('PyFRAP mesh\n')
+		f.write('BINARY\n')
+		f.write('DATASET UNSTRUCTURED_GRID\n')
+		
+		f.write('POINTS %d double\n' %points.shape[0])
+		f.write(points.astype('>f8').tostring())
+		
+		f.write('\nCELLS %d %d\n' %(nCells,cellArr.size))
+		f.write(cellArr.tostring())
+		
+		f.write('\nCELL_TYPES %d\n' %nCells)
+		f.write(types.tostring())
+		
+		if len(cellData)>0:
+			f.write('\nCELL_DATA %d\n' %nCells)
+			for name in sorted(cellData.keys()):
+				f.write('SCALARS %s double 1\nLOOKUP_TABLE default\n' %name)
+				f.write(np.asarray(cellData[name],dtype='>f8').tostring())
+				f.write('\n')
+		
+	return fn
+
+def writePVDFile(fn,fnVTUs,times):
+	
+	"""Writes ParaView collection (.pvd) file indexing a time series of .vtu files.
+	
+	.. note:: Paths to .vtu files are written relative to the location of ``fn``.
+	
+	Args:
+		fn (str): Output filepath.
+		fnVTUs (list): List of .vtu files.
+		times (list): Timepoints of .vtu files.
+		
+	Returns:
+		str: Output filepath.
+	
+	"""
+	
+	folder=os.path.dirname(os.path.abspath(fn))
+	
+	with open(fn,'wb') as f:
+		f.write('<?xml version="1.0"?>\n')
+		f.write('<VTKFile type="Collection" version="0.1" byte_order="LittleEndian">\n')
+		f.write('<Collection>\n')
+		for t,fnVTU in zip(times,fnVTUs):
+			f.write('<DataSet timestep="%r" group="" part="0" file="%s"/>\n' %(float(t),os.path.relpath(os.path.abspath(fnVTU),folder)))
+		f.write('</Collection>\n')
+		f.write('</VTKFile>\n')
+	
+	return fn
+
+def getVTKSeriesFn(fnBase,i,n):
+	
+	"""Returns filepath of ``i``-th .vtu file of a time series with ``n`` files.
+	
+	Args:
+		fnBase (str): Basename of time series, for example ``out/sim``.
+		i (int): Index of file.
+		n (int): Total number of files.
+	
+	Returns:
+		str: Filepath.
+	
+	"""
+	
+	return fnBase+"_t"+str(i).zfill(len(str(n)))+".vtu"
+	
+def writeVTKTimeSeries(fnBase,points,cells,vals,times,name="concentration"):
+	
+	"""Writes time series of cell values into one .vtu file per timepoint plus a .pvd index.
+	
+	``vals`` can be any iterable, for example a generator, so values are written one
+	at a time and never need to be kept in memory together.
+	
+	Args:
+		fnBase (str): Basename of time series, files are called ``fnBase_t*.vtu`` and ``fnBase.pvd``.
+		points (numpy.ndarray): Point coordinates of shape ``(nVertices,3)``.
+		cells (numpy.ndarray): Cell connectivity of shape ``(nCells,nVert)``.
+		vals (list): Iterable of cell value arrays.
+		times (list): Timepoints.
+	
+	Keyword Args:
+		name (str): Name of data array.
+	
+	Returns:
+		str: Path to .pvd file.
+	
+	"""
+	
+	fnVTUs=[]
+	for i,val in enumerate(vals):
+		fnVTU=getVTKSeriesFn(fnBase,i,len(times))
+		writeVTUFile(fnVTU,points,cells,cellData={name:val})
+		fnVTUs.append(fnVTU)
+	
+	return writePVDFile(fnBase+".pvd",fnVTUs,times[:len(fnVTUs)])
@@ -0,0 +1,463 @@
+#=====================================================================================================================================
+#Copyright
+#=====================================================================================================================================
+
+#Copyright (C) 2014 Alexander Blaessle, Patrick Mueller and the Friedrich Miescher Laboratory of the Max Planck Society
+#This software is distributed under the terms of the GNU General Public License.
+
+#This file is part of PyFRAP.
+
+#PyFRAP is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+#===========================================================================================================================================================================
+#Module Description
+#===========================================================================================================================================================================
+
+"""Batch module for PyFRAP toolbox. 
+
+Runs :py:meth:`pyfrp.subclasses.pyfrp_embryo.embryo.quickAnalysis` headless over a list of datasets, 
+given as a manifest file. Each line of the manifest is of the form
+
+	path[,name[,ftype]]
+	
+where ``path`` is either a saved embryo file (``.emb`` or ``.pyfrp``) or a folder with microscopy data. 
+Folders are turned into embryos with :py:func:`pyfrp.modules.pyfrp_misc_module.buildEmbryoWizard`, 
+and geometry, ROIs, simulation and fit settings are then copied from a template embryo. 
+Empty lines and lines starting with ``#`` are ignored.
+
+Each dataset is analyzed in its own worker process (workers are replaced after every dataset, 
+so memory is given back to the system) and optionally with a memory and time limit per worker. 
+Every finished dataset is appended to a journal file, so an interrupted batch can simply be restarted 
+and will skip all datasets that are already done. Timings and fit results are written to a csv file.
+
+"""
+
+#===========================================================================================================================================================================
+#Importing necessary modules
+#===========================================================================================================================================================================
+
+#PyFRAP modules
+from pyfrp_term_module import *
+import pyfrp_IO_module
+import pyfrp_misc_module
+import pyfrp_timer_module
+
+#Misc
+import os
+import time
+import json
+import traceback
+import multiprocessing
+
+#===========================================================================================================================================================================
+#Module Functions
+#===========================================================================================================================================================================
+
+stageNames=['idxs','analysis','simulation','pin','fit']
+"""Stages of :py:meth:`pyfrp.subclasses.pyfrp_embryo.embryo.quickAnalysis` that are timed."""
+
+fitResultNames=['DOptMu','prodOpt','degrOpt','Rsq']
+"""Fit attributes written to results table."""
+
+def readManifest(fn,ftype='lsm'):
+	
+	"""Reads batch manifest file.
+	
+	See module description for the manifest format.
+	
+	Args:
+		fn (str): Path to manifest.
+		
+	Keyword Args:
+		ftype (str): Default microscopy file type of data folders.
+		
+	Returns:
+		list: List of job dictionaries with keys ``input``, ``name``, ``ftype`` and ``isFolder``.
+	
+	"""
+	
+	jobs=[]
+	folder=os.path.dirname(os.path.abspath(fn))
+	
+	with open(fn,'r') as f:
+		for line in f:
+			
+			line=line.strip()
+			if len(line)==0 or line.startswith('#'):
+				continue
+			
+			entries=[e.strip() for e in line.split(',')]
+			
+			# Relative paths are relative to manifest
+			path=os.path.normpath(os.path.join(folder,os.path.expanduser(entries[0])))
+			
+			if len(entries)>1 and len(entries[1])>0:
+				name=entries[1]
+			else:
+				name=os.path.splitext(os.path.basename(path.rstrip(os.sep)))[0]
+			
+			if len(entries)>2 and len(entries[2])>0:
+				jobFtype=entries[2]
+			else:
+				jobFtype=ftype
+				
+			jobs.append({'input':path,'name':name,'ftype':jobFtype,'isFolder':os.path.isdir(path)})
+	
+	return jobs
+
+def readJournal(fn):
+	
+	"""Reads batch journal.
+	
+	The journal contains one JSON record per line. If a dataset appears more than once,
+	the last record is returned. Incomplete lines (for example from a killed run) are ignored.
+	
+	Args:
+		fn (str): Path to journal.
+		
+	Returns:
+		dict: Records, keyed by input path.
+	
+	"""
+	
+	records={}
+	
+	if not os.path.isfile(fn):
+		return records
+	
+	with open(fn,'r') as f:
+		for line in f:
+			try:
+				record=json.loads(line)
+			except ValueError:
+				continue
+			records[record['input']]=record
+	
+	return records
+
+def appendToJournal(fn,record):
+	
+	"""Appends record to batch journal.
+	
+	Record is flushed to disk right away, so that it survives if the batch is interrupted.
+	
+	Args:
+		fn (str): Path to journal.
+		record (dict): Record.
+	
+	"""
+	
+	with open(fn,'a') as f:
+		f.write(json.dumps(record,sort_keys=True)+'\n')
+		f.flush()
+		os.fsync(f.fileno())
+
+def getPendingJobs(jobs,records):
+	
+	"""Returns all jobs that do not have a successful record in the journal.
+	
+	Args:
+		jobs (list): List of job dictionaries, see :py:func:`readManifest`.
+		records (dict): Journal records, see :py:func:`readJournal`.
+		
+	Returns:
+		list: Pending jobs.
+		
+	"""
+	
+	return [job for job in jobs if records.get(job['input'],{}).get('status')!='done']
+
+def setMemoryLimit(maxMem):
+	
+	"""Limits address space of current process.
+	
+	Used as initializer of batch worker processes. Analyses exceeding the limit
+	fail with a ``MemoryError``, which is recorded in the journal.
+	
+	.. note:: Only available on Unix systems.
+	
+	Args:
+		maxMem (float): Memory limit in MB. Does nothing if ``None``.
+		
+	"""
+	
+	if maxMem==None:
+		return
+	
+	try:
+		import resource
+	except ImportError:
+		printWarning("Memory limits are not supported on this system. Will run without limit.")
+		return
+	
+	nBytes=int(maxMem*1024**2)
+	resource.setrlimit(resource.RLIMIT_AS,(nBytes,nBytes))
+
+def getEmbryo(job,options):
+	
+	"""Loads or builds embryo for batch job.
+	
+	Embryo files are loaded via :py:func:`pyfrp.modules.pyfrp_IO_module.loadEmbryo`. 
+	Data folders are sorted via :py:func:`pyfrp.modules.pyfrp_misc_module.buildEmbryoWizard`, afterwards 
+	the template embryo given in ``options['template']`` is copied and pointed to the new data.
+	
+	Args:
+		job (dict): Job dictionary.
+		options (dict): Batch options.
+		
+	Returns:
+		pyfrp.subclasses.pyfrp_embryo.embryo: Embryo object.
+	
+	"""
+	
+	if not job['isFolder']:
+		emb=pyfrp_IO_module.loadEmbryo(job['input'])
+		emb.setName(job['name'])
+		return emb
+	
+	emb=pyfrp_misc_module.buildEmbryoWizard(job['input'],job['ftype'],job['name'],nChannel=options.get('nChannel',0))
+	if emb==-1:
+		raise IOError("Could not build embryo from "+job['input']+".")
+	
+	if options.get('template')==None:
+		return emb
+	
+	template=pyfrp_IO_module.loadEmbryo(options['template'])
+	template.setName(job['name'])
+	template.setDataFolder(emb.getDataFolder())
+	template.analysis.setFnPre(emb.analysis.getFnPre())
+	
+	return template
+
+def newRecord(job):
+	
+	"""Returns journal record of batch job that has not finished yet.
+	
+	Args:
+		job (dict): Job dictionary.
+		
+	Returns:
+		dict: Journal record with status ``'failed'``.
+		
+	"""
+	
+	return {'input':job['input'],'name':job['name'],'status':'failed','fnOut':'','error':'','timings':{},'fits':[]}
+
+def runBatchJob(args):
+	
+	"""Runs analysis of a single batch job.
+	
+	Never raises, errors are returned in the record instead so that they 
+	end up in the journal.
+	
+	Args:
+		args (tuple): Tuple ``(job,options)``, see :py:func:`runBatch`.
+		
+	Returns:
+		dict: Journal record.
+		
+	"""
+	
+	job,options=args
+	
+	record=newRecord(job)
+	
+	if options.get('timers',False):
+		pyfrp_timer_module.reset()
+		pyfrp_timer_module.enable()
+	
+	startTime=time.time()
+	
+	try:
+		emb=getEmbryo(job,options)
+		record['timings']['load']=time.time()-startTime
+		
+		record['timings'].update(emb.quickAnalysis(**options.get('analysisKwargs',{})))
+		
+		for fit in emb.fits:
+			record['fits'].append(dict([('name',fit.name)]+[(key,getattr(fit,key)) for key in fitResultNames]))
+		
+		saveTime=time.time()
+		fnOut=os.path.join(options['fnOut'],job['name']+options.get('ext','.pyfrp'))
+		record['fnOut']=emb.save(fnOut,copyMeshFiles=False)
+		record['timings']['save']=time.time()-saveTime
+		
+		record['status']='done'
+		
+	except (Exception,MemoryError):
+		record['error']=traceback.format_exc()
+	
+	record['timings']['total']=time.time()-startTime
+	
+	if options.get('timers',False):
+		pyfrp_timer_module.disable()
+		record['fnTimers']=pyfrp_timer_module.exportJSON(os.path.join(options['fnOut'],job['name']+'_timers.json'))
+	
+	return record
+
+def writeBatchResults(fn,jobs,records):
+	
+	"""Writes timings and fit results of batch to csv file.
+	
+	Writes one row per fit and embryo, embryos without fits or with failed analysis get a single row.
+	
+	Args:
+		fn (str): Path to csv file.
+		jobs (list): List of job dictionaries, gives order of rows.
+		records (dict): Journal records.
+	
+	Returns:
+		tuple: Tuple containing:
+			
+			* header (list): Header of table.
+			* table (list): Table as a list of rows.
+	
+	"""
+	
+	timeNames=['load']+stageNames+['save','total']
+	header=['input','name','status','fnOut']+['t_'+name for name in timeNames]+['fit']+fitResultNames+['error']
+	
+	table=[]
+	for job in jobs:
+		
+		record=records.get(job['input'])
+		if record==None:
+			table.append([job['input'],job['name'],'pending']+['']*(len(header)-3))
+			continue
+		
+		row=[record['input'],record['name'],record['status'],record['fnOut']]
+		row=row+[record['timings'].get(name,'') for name in timeNames]
+		
+		# Only keep last line of traceback in table
+		error=record['error'].strip().split('\n')[-1] if len(record['error'])>0 else ''
+		
+		fits=record['fits'] if len(record['fits'])>0 else [{'name':''}]
+		for fit in fits:
+			table.append(row+[fit['name']]+[fit.get(key,'') for key in fitResultNames]+[error])
+		
+	return pyfrp_IO_module.writeTableToCSV(table,header,fn)
+
+def runBatch(fnManifest,fnOut,template=None,processes=1,maxMem=None,timeout=None,ext='.pyfrp',ftype='lsm',nChannel=0,analysisKwargs={},timers=False,debug=True):
+	
+	"""Runs :py:meth:`pyfrp.subclasses.pyfrp_embryo.embryo.quickAnalysis` on all datasets listed in manifest.
+	
+	Results are saved in ``fnOut``:
+	
+		* ``<name><ext>``: Analyzed embryo for each dataset.
+		* ``journal.jsonl``: Journal of all finished datasets, see :py:func:`readJournal`.
+		* ``results.csv``: Timings and fit results, see :py:func:`writeBatchResults`.
+		* ``<name>_timers.json``: Detailed timings of each dataset if ``timers=True``, see :py:func:`pyfrp.modules.pyfrp_timer_module.exportJSON`.
+		
+	If the batch is run again with the same ``fnOut``, datasets that are marked as done in 
+	the journal are skipped, failed datasets are retried.
+	
+	Each worker process only analyzes a single dataset before it is replaced, 
+	so that memory does not accumulate over the batch.
+	
+	If a dataset does not finish within ``timeout`` seconds, for example because its worker hangs or
+	was killed by the system, it is recorded as failed. All workers are then terminated and the 
+	remaining datasets are analyzed by a new pool.
+	
+	.. note:: Without ``timeout``, a dataset whose worker is killed blocks the batch forever.
+	
+	Args:
+		fnManifest (str): Path to manifest file.
+		fnOut (str): Output folder.
+		
+	Keyword Args:
+		template (str): Path to template embryo file, needed for data folders.
+		processes (int): Number of worker processes.
+		maxMem (float): Memory limit per worker in MB.
+		timeout (float): Time limit per dataset in seconds.
+		ext (str): Extension of saved embryo files, ``.pyfrp`` (container) or ``.emb`` (pickle).
+		ftype (str): Default microscopy file type of data folders.
+		nChannel (int): Channel of microscopy data.
+		analysisKwargs (dict): Keyword arguments passed to :py:meth:`pyfrp.subclasses.pyfrp_embryo.embryo.quickAnalysis`.
+		timers (bool): Record detailed timings via :py:mod:`pyfrp.modules.pyfrp_timer_module`.
+		debug (bool): Print progress.
+		
+	Returns:
+		dict: Journal records of all datasets in manifest, keyed by input path.
+	
+	"""
+	
+	fnOut=os.path.abspath(fnOut)
+	if not os.path.isdir(fnOut):
+		os.makedirs(fnOut)
+	
+	fnJournal=os.path.join(fnOut,'journal.jsonl')
+	fnResults=os.path.join(fnOut,'results.csv')
+	
+	jobs=readManifest(fnManifest,ftype=ftype)
+	records=readJournal(fnJournal)
+	pending=getPendingJobs(jobs,records)
+	
+	if template!=None:
+		template=os.path.abspath(template)
+	
+	options={'fnOut':fnOut,'template':template,'ext':ext,'nChannel':nChannel,'analysisKwargs':analysisKwargs,'timers':timers}
+	
+	if debug:
+		print "Batch: "+str(len(jobs))+" datasets, "+str(len(jobs)-len(pending))+" already done."
+	
+	queue=list(pending)
+	count=0
+	
+	try:
+		while len(queue)>0:
+			
+			pool=multiprocessing.Pool(processes=processes,initializer=setMemoryLimit,initargs=(maxMem,),maxtasksperchild=1)
+			results=[(job,pool.apply_async(runBatchJob,((job,options),))) for job in queue]
+			
+			queue=[]
+			terminated=False
+			
+			for job,result in results:
+				
+				# Datasets that were still pending when the pool was terminated are rerun in a new pool
+				if terminated and not result.ready():
+					queue.append(job)
+					continue
+				
+				try:
+					record=result.get(timeout)
+				except multiprocessing.TimeoutError:
+					record=newRecord(job)
+					record['error']="TimeoutError: Dataset did not finish within "+str(timeout)+" s."
+					pool.terminate()
+					terminated=True
+				
+				count=count+1
+				appendToJournal(fnJournal,record)
+				records[record['input']]=record
+				
+				if debug:
+					if record['status']=='done':
+						print "Batch: "+record['name']+" done in "+str(round(record['timings']['total'],1))+" s ("+str(count)+"/"+str(len(pending))+")."
+					else:
+						printWarning("Batch: "+record['name']+" failed ("+str(count)+"/"+str(len(pending))+"): "+record['error'].strip().split('\n')[-1])
+			
+			if not terminated:
+				pool.close()
+			pool.join()
+		
+	except KeyboardInterrupt:
+		pool.terminate()
+		pool.join()
+		printWarning("Batch interrupted. Run again with the same output folder to resume.")
+	finally:
+		writeBatchResults(fnResults,jobs,records)
+	
+	return records
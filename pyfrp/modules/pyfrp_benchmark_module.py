@@ -0,0 +1,802 @@
+#=====================================================================================================================================
+#Copyright
+#=====================================================================================================================================
+
+#Copyright (C) 2014 Alexander Blaessle, Patrick Mueller and the Friedrich Miescher Laboratory of the Max Planck Society
+#This software is distributed under the terms of the GNU General Public License.
+
+#This file is part of PyFRAP.
+
+#PyFRAP is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+#===========================================================================================================================================================================
+#Module Description
+#===========================================================================================================================================================================
+
+"""Benchmark module for PyFRAP toolbox. 
+
+Times the hot paths of a FRAP analysis on synthetic data, so that no microscope data is needed:
+
+	* ``analysis``: Image analysis via :py:func:`pyfrp.modules.pyfrp_img_module.analyzeDataset`.
+	* ``idxs``: ROI indexing via :py:meth:`pyfrp.subclasses.pyfrp_embryo.embryo.computeROIIdxs`.
+	* ``simStep``: Single solver step of :py:func:`pyfrp.modules.pyfrp_sim_module.simulateReactDiff` (needs Gmsh and FiPy).
+	* ``objective``: Single evaluation of :py:func:`pyfrp.modules.pyfrp_fit_module.FRAPObjFunc`.
+	* ``fit``: Complete fit via :py:func:`pyfrp.modules.pyfrp_fit_module.FRAPFitting`.
+	* ``pixelFit``: Complete fit comparing images pixel by pixel, see :py:func:`pyfrp.modules.pyfrp_fit_module.FRAPPixelObjFunc`.
+	* ``solvers``: Linear solvers of :py:data:`pyfrp.modules.pyfrp_sim_module.solverNames` on the simulation mesh, see :py:func:`compareSolvers` (needs Gmsh and FiPy).
+
+Synthetic datasets are generated by :py:func:`genSyntheticDataset`. The initial bleach pattern is created with 
+:py:func:`pyfrp.modules.pyfrp_img_module.genFakeIC` or :py:func:`pyfrp.modules.pyfrp_img_module.genFakeSigmoidIC`
+and recovers by free diffusion with known diffusion coefficient, that is each frame is the initial pattern convolved 
+with a Gaussian kernel of width :math:`\\sqrt{2Dt}`. The same analytic solution is used as simulation if FiPy is not 
+available, so fitting benchmarks also report how well the known diffusion coefficient is recovered.
+
+Each benchmark is run for several image sizes and, where the geometry matters, for the reference geometries 
+cylinder, ball and dome. Results are written to JSON and csv files by :py:func:`runBenchmarks` and can be compared
+between runs with :py:func:`compareBenchmarks`.
+
+"""
+
+#===========================================================================================================================================================================
+#Importing necessary modules
+#===========================================================================================================================================================================
+
+#Numpy/Scipy
+import numpy as np
+import scipy.sparse as sparse
+
+#PyFRAP modules
+from pyfrp_term_module import *
+import pyfrp_img_module
+import pyfrp_fit_module
+import pyfrp_timer_module
+import pyfrp_IO_module
+import pyfrp_sim_module
+
+#Image processing (imported on first use)
+import pyfrp_lazy_module
+ndi=pyfrp_lazy_module.lazyImport('scipy.ndimage')
+
+#Misc
+import os
+import time
+import json
+import platform
+import traceback
+
+#===========================================================================================================================================================================
+#Module Variables
+#===========================================================================================================================================================================
+
+benchmarkNames=['analysis','idxs','simStep','objective','fit','pixelFit','solvers']
+"""Available benchmarks."""
+
+geometryNames=['cylinder','ball','dome']
+"""Available reference geometries."""
+
+resultKeys=['benchmark','geometry','size','status','repeats','mean','min','max','note']
+"""Columns of benchmark results."""
+
+#===========================================================================================================================================================================
+#Module Functions
+#===========================================================================================================================================================================
+
+def genDiffusedImg(IC,D,t):
+	
+	"""Returns image after free diffusion of ``IC`` for time ``t``.
+	
+	Args:
+		IC (numpy.ndarray): Initial image.
+		D (float): Diffusion coefficient in px^2/s.
+		t (float): Time in s.
+		
+	Returns:
+		numpy.ndarray: Diffused image.
+	
+	"""
+	
+	if t<=0:
+		return IC.copy()
+	return ndi.gaussian_filter(IC,np.sqrt(2*D*t),mode='nearest')
+
+def genSyntheticDataset(fnOut,res=256,nFrames=30,frameInterval=5.,D=None,valIn=0.2,valOut=1.,sideLengthFactor=0.3,radiusFactor=0.45,sigmoid=False,noise=0.01,maxVal=4000,seed=0):
+	
+	"""Generates synthetic FRAP dataset with known diffusion coefficient.
+	
+	Writes recovery images to ``fnOut/recover/`` and a prebleach image to ``fnOut/pre/``. The bleach pattern is a 
+	square (or sigmoid profile if ``sigmoid=True``) inside a circular slice of radius ``radiusFactor*res``; outside the
+	slice images are zero. Gaussian noise with standard deviation ``noise*valOut`` is added.
+	
+	Args:
+		fnOut (str): Output folder.
+		
+	Keyword Args:
+		res (int): Image resolution in px.
+		nFrames (int): Number of recovery frames.
+		frameInterval (float): Time between frames in s.
+		D (float): Diffusion coefficient in px^2/s. If not given, is chosen such that the diffusion length 
+			:math:`\\sqrt{2Dt}` at the last frame equals the side length of the bleached square.
+		valIn (float): Concentration inside bleached region.
+		valOut (float): Concentration outside bleached region.
+		sideLengthFactor (float): Side length of bleached square relative to ``res``.
+		radiusFactor (float): Radius of slice relative to ``res``.
+		sigmoid (bool): Use sigmoid bleach profile.
+		noise (float): Relative noise level.
+		maxVal (int): Image value corresponding to concentration 1.
+		seed (int): Seed of noise.
+	
+	Returns:
+		dict: Dataset parameters, containing the keys of all arguments plus ``fnRecover``, ``fnPre``, ``center``, 
+		``radius``, ``sideLength``, ``offset`` and ``IC``.
+	
+	"""
+	
+	center=[res/2.,res/2.]
+	radius=radiusFactor*res
+	sideLength=sideLengthFactor*res
+	offset=[center[0]-sideLength/2.,center[1]-sideLength/2.]
+	
+	if D==None:
+		D=sideLength**2/(2*frameInterval*max(nFrames-1,1))
+	
+	dataset={'fnOut':fnOut,'res':res,'nFrames':nFrames,'frameInterval':frameInterval,'D':D,'valIn':valIn,'valOut':valOut,
+	  'sigmoid':sigmoid,'noise':noise,'maxVal':maxVal,'seed':seed}
+	
+	#Bleach pattern on infinite plane, cut to slice afterwards
+	if sigmoid:
+		IC=pyfrp_img_module.genFakeSigmoidIC(res,valIn,valOut,sideLength/2.,0.2,2*res,center)
+	else:
+		IC=pyfrp_img_module.genFakeIC(res,valIn,valOut,offset,sideLength,2*res,center)
+	
+	X,Y=pyfrp_img_module.getPxCoordinates((res,res))
+	outside=pyfrp_img_module.computeRadii(X,Y,center)>radius
+	
+	fnRecover=os.path.join(fnOut,'recover')
+	fnPre=os.path.join(fnOut,'pre')
+	for fn in [fnRecover,fnPre]:
+		if not os.path.isdir(fn):
+			os.makedirs(fn)
+	
+	state=np.random.RandomState(seed)
+	nDigits=len(str(nFrames))
+	
+	for i in range(nFrames):
+		img=genDiffusedImg(IC,D,i*frameInterval)
+		img=img+noise*valOut*state.randn(res,res)
+		img[outside]=0.
+		pyfrp_img_module.saveImg(maxVal*np.clip(img,0,None),os.path.join(fnRecover,'recover_t'+str(i).zfill(nDigits)+'.tif'),scale=False)
+	
+	pre=valOut*np.ones((res,res))+noise*valOut*state.randn(res,res)
+	pre[outside]=0.
+	pyfrp_img_module.saveImg(maxVal*np.clip(pre,0,None),os.path.join(fnPre,'pre.tif'),scale=False)
+	
+	dataset.update({'fnRecover':fnRecover,'fnPre':fnPre,'center':center,'radius':radius,'sideLength':sideLength,'offset':offset,'IC':IC})
+	
+	return dataset
+
+def buildBenchmarkEmbryo(dataset,geometry='cylinder'):
+	
+	"""Creates embryo for synthetic dataset.
+	
+	Sets up data, reference geometry, default ROIs, analysis, simulation and a fit of 
+	the bleached square and slice ROIs, as done in ``examples/scripting/simpleAnalysis.py``.
+	
+	Args:
+		dataset (dict): Dataset parameters, see :py:func:`genSyntheticDataset`.
+		
+	Keyword Args:
+		geometry (str): Reference geometry, one of :py:data:`geometryNames`.
+		
+	Returns:
+		pyfrp.subclasses.pyfrp_embryo.embryo: Embryo.
+	
+	"""
+	
+	from pyfrp.subclasses import pyfrp_embryo
+	
+	emb=pyfrp_embryo.embryo("benchmark_"+geometry+"_"+str(dataset['res']))
+	
+	emb.setDataResPx(dataset['res'])
+	emb.setDataResMu(dataset['res'])
+	emb.setFrameInterval(dataset['frameInterval'])
+	emb.setSideLengthBleachedMu(dataset['sideLength']*emb.convFact)
+	emb.setDataFolder(dataset['fnRecover']+'/')
+	
+	center=dataset['center']
+	radius=dataset['radius']
+	
+	#Write .geo file into output folder, so templates in pyfrp/meshfiles stay untouched
+	fnGeo=os.path.join(dataset['fnOut'],geometry+'.geo')
+	
+	if geometry=='cylinder':
+		emb.setGeometry2Cylinder(center,radius,2*emb.sliceDepthPx,fnGeo=fnGeo)
+	elif geometry=='ball':
+		emb.setGeometry2Ball(center,radius,fnGeo=fnGeo)
+	elif geometry=='dome':
+		emb.setGeometry2ZebraFishDomeStage(center,radius,fnGeo=fnGeo)
+	else:
+		printError("Unknown geometry "+geometry+". Will use cylinder.")
+		emb.setGeometry2Cylinder(center,radius,2*emb.sliceDepthPx,fnGeo=os.path.join(dataset['fnOut'],'cylinder.geo'))
+	
+	emb.genDefaultROIs(center,radius)
+	
+	analysis=emb.newAnalysis()
+	analysis.setFnPre(dataset['fnPre']+'/')
+	
+	emb.newSimulation()
+	emb.simulation.setD(dataset['D'])
+	
+	fit=emb.newFit('benchmark')
+	fit.addROIByName('Bleached Square')
+	fit.addROIByName('Slice')
+	fit.setOptMeth('Constrained Nelder-Mead')
+	fit.setFitPinned(True)
+	fit.setX0D(dataset['D']/2.)
+	
+	return emb
+
+def setAnalyticSimulation(emb,dataset,steps=200,maxDExpPx=None,saveVals=False):
+	
+	"""Fills simulation vectors of all ROIs with the analytic free diffusion solution.
+	
+	Replaces :py:meth:`pyfrp.subclasses.pyfrp_simulation.simulation.run` if FiPy is not available.
+	As in a real simulation, concentrations are in units of the data images. Needs image indices of ROIs.
+	
+	If ``saveVals=True``, also stores the flattened images in ``simulation.vals``, so they can be 
+	fitted pixel by pixel, see :py:func:`benchPixelFit`.
+	
+	Args:
+		emb (pyfrp.subclasses.pyfrp_embryo.embryo): Embryo.
+		dataset (dict): Dataset parameters, see :py:func:`genSyntheticDataset`.
+	
+	Keyword Args:
+		steps (int): Number of simulation time steps.
+		maxDExpPx (float): Maximum expected diffusion coefficient, see :py:meth:`pyfrp.subclasses.pyfrp_simulation.simulation.getOptTvecSim`.
+			Defaults to ten times the diffusion coefficient of the dataset.
+		saveVals (bool): Store images in ``simulation.vals``.
+	
+	Returns:
+		pyfrp.subclasses.pyfrp_embryo.embryo: Embryo.
+	
+	"""
+	
+	if maxDExpPx==None:
+		maxDExpPx=10*dataset['D']
+	
+	sim=emb.simulation
+	sim.setTimesteps(steps)
+	sim.getOptTvecSim(maxDExpPx)
+	sim.toLogTimeScale()
+	
+	for r in emb.ROIs:
+		r.resetSimVec()
+	sim.vals=[]
+	
+	for t in sim.tvecSim:
+		img=dataset['maxVal']*genDiffusedImg(dataset['IC'],sim.D,t)
+		for r in emb.ROIs:
+			r.simVec.append(pyfrp_img_module.meanConc(r.imgIdxX,r.imgIdxY,img))
+		if saveVals:
+			sim.vals.append(img.flatten().astype('float32'))
+	
+	return emb
+
+def timeCall(func,args=(),kwargs={},repeats=3,setup=None):
+	
+	"""Times function call.
+	
+	Args:
+		func (function): Function to time.
+		
+	Keyword Args:
+		args (tuple): Arguments of function.
+		kwargs (dict): Keyword arguments of function.
+		repeats (int): Number of repeats.
+		setup (function): Function called before each repeat, not timed.
+	
+	Returns:
+		tuple: Tuple containing:
+		
+			* times (list): Wall times in s.
+			* result: Return value of last call.
+	
+	"""
+	
+	times=[]
+	for i in range(repeats):
+		if setup!=None:
+			setup()
+		start=time.time()
+		result=func(*args,**kwargs)
+		times.append(time.time()-start)
+	
+	return times,result
+
+def makeResult(benchmark,geometry,size,times,status='ok',note=''):
+	
+	"""Returns benchmark result as dictionary with keys :py:data:`resultKeys`."""
+	
+	if len(times)==0:
+		return {'benchmark':benchmark,'geometry':geometry,'size':size,'status':status,'repeats':0,'mean':'','min':'','max':'','note':note}
+	return {'benchmark':benchmark,'geometry':geometry,'size':size,'status':status,'repeats':len(times),
+	 'mean':float(np.mean(times)),'min':float(np.min(times)),'max':float(np.max(times)),'note':note}
+
+def benchAnalysis(emb,repeats=3):
+	
+	"""Times image analysis of embryo.
+	
+	Returns:
+		list: Benchmark results.
+	
+	"""
+	
+	times,result=timeCall(emb.analysis.run,kwargs={'showProgress':False},repeats=repeats)
+	return [makeResult('analysis','-',emb.dataResPx,times,note=str(emb.nFrames)+' frames')]
+
+def benchROIIdxs(emb,geometry,volSizePx=None,repeats=3):
+	
+	"""Times ROI indexing of embryo.
+	
+	If ``volSizePx`` is given and Gmsh/FiPy are available, generates mesh first, so that 
+	mesh indices are computed as well.
+	
+	Returns:
+		list: Benchmark results.
+	
+	"""
+	
+	note='image indices only'
+	
+	if volSizePx!=None:
+		try:
+			emb.simulation.mesh.setVolSizePx(volSizePx,remesh=False)
+			emb.simulation.mesh.genMesh()
+			note='mesh volSizePx='+str(volSizePx)
+		except Exception:
+			emb.simulation.mesh.mesh=None
+			note='image indices only, meshing failed: '+getLastErrorLine()
+	
+	times,result=timeCall(emb.computeROIIdxs,kwargs={'debug':False},repeats=repeats)
+	return [makeResult('idxs',geometry,emb.dataResPx,times,note=note)]
+
+def benchSimStep(emb,geometry,volSizePx,steps=50):
+	
+	"""Times solver steps of simulation.
+	
+	Uses :py:mod:`pyfrp.modules.pyfrp_timer_module` to time each step separately.
+	
+	Returns:
+		list: Benchmark results.
+	
+	"""
+	
+	try:
+		if emb.simulation.mesh.mesh==None or emb.simulation.mesh.volSizePx!=volSizePx:
+			emb.simulation.mesh.setVolSizePx(volSizePx,remesh=False)
+			emb.simulation.mesh.genMesh()
+			emb.computeROIIdxs(debug=False)
+		
+		emb.simulation.setTimesteps(steps)
+		emb.simulation.setTEnd(emb.tEnd)
+		
+		pyfrp_timer_module.reset()
+		pyfrp_timer_module.enable()
+		try:
+			emb.simulation.run(showProgress=False)
+		finally:
+			pyfrp_timer_module.disable()
+		
+		times=[]
+		stats=pyfrp_timer_module.spanStats.get('sim.step')
+		if stats!=None:
+			times=[stats[1]/stats[0],stats[3],stats[4]]
+		
+		nCells=emb.simulation.mesh.mesh.numberOfCells
+		
+	except Exception:
+		return [makeResult('simStep',geometry,volSizePx,[],status='skipped',note=getLastErrorLine())]
+	
+	# Report mean/min/max over steps
+	result=makeResult('simStep',geometry,volSizePx,times,note=str(nCells)+' cells')
+	result['repeats']=steps-1
+	
+	return [result]
+
+def getSparseBytes(M):
+	
+	"""Returns memory used by sparse matrix in bytes."""
+	
+	M=M.tocsr()
+	return M.data.nbytes+M.indices.nbytes+M.indptr.nbytes
+
+def compareSolvers(L,cvs,c0,tvec,D,prod=0.,degr=0.,solvers=pyfrp_sim_module.solverNames,tolerance=1E-10,iterations=1000):
+	
+	"""Compares linear solvers on the implicit Euler steps of a simulation.
+	
+	All solvers work on the assembled system of :py:func:`pyfrp.modules.pyfrp_sim_module.solveCGStep`:
+	
+		* ``LU``: Sparse LU factorization of each step.
+		* ``PCG``: Conjugate gradients without preconditioner.
+		* ``AMG``: Conjugate gradients with AMG preconditioner, see :py:func:`pyfrp.modules.pyfrp_sim_module.getAMGHierarchy`.
+		  Hierarchies are built once per bin of step sizes, their setup time is included.
+	
+	Memory is the size of the LU factors, the system matrix or the system matrix plus all AMG levels, respectively.
+	Error is the maximum deviation of the final solution from the LU one.
+	
+	Args:
+		L (scipy.sparse.csr_matrix): Diffusion matrix, see :py:func:`pyfrp.modules.pyfrp_sim_module.getDiffusionMatrix`.
+		cvs (numpy.ndarray): Cell volumes.
+		c0 (numpy.ndarray): Initial condition.
+		tvec (numpy.ndarray): Time vector.
+		D (float): Diffusion coefficient.
+	
+	Keyword Args:
+		prod (float): Production rate.
+		degr (float): Degradation rate.
+		solvers (list): Solvers to compare.
+		tolerance (float): Relative residual tolerance of iterative solvers.
+		iterations (int): Maximum number of iterations per step of iterative solvers.
+	
+	Returns:
+		dict: Dictionary with keys ``time``, ``iterations``, ``memory`` (in bytes), ``error`` and ``converged`` per solver.
+	
+	"""
+	
+	stats={}
+	final={}
+	
+	for solver in solvers:
+		
+		c=np.array(c0,dtype=float)
+		nIter=0
+		memory=0
+		converged=True
+		hierarchies={}
+		
+		start=time.time()
+		for i in range(len(tvec)-1):
+			dt=tvec[i+1]-tvec[i]
+			
+			if solver=="LU":
+				A=(D*L+sparse.diags(cvs/dt,0)).tocsc()
+				lu=pyfrp_sim_module.spla.splu(A)
+				c=lu.solve(cvs*(c/dt+prod-degr*c))
+				nIter=nIter+1
+				memory=max(memory,getSparseBytes(lu.L)+getSparseBytes(lu.U))
+			
+			else:
+				M=None
+				if solver=="AMG" and D>0:
+					key=pyfrp_sim_module.getAMGShiftKey(1./(D*dt))
+					if key not in hierarchies:
+						hierarchies[key]=pyfrp_sim_module.buildAMGHierarchy(L,cvs,10**(key/2.))
+					M=hierarchies[key].aspreconditioner(cycle='V')
+				
+				c,n,info=pyfrp_sim_module.solveCGStep(L,cvs,c,dt,D,prod,degr,tolerance=tolerance,iterations=iterations,M=M)
+				nIter=nIter+n
+				converged=converged and info==0
+				
+				memory=max(memory,getSparseBytes(L))
+				if M!=None:
+					memory=max(memory,getSparseBytes(L)+sum([sum([getSparseBytes(getattr(level,op)) for op in ['A','P','R'] if hasattr(level,op)]) 
+						 for level in hierarchies[key].levels]))
+		
+		stats[solver]={'time':time.time()-start,'iterations':nIter,'memory':memory,'converged':converged}
+		final[solver]=c
+	
+	ref=final["LU"] if "LU" in final else None
+	for solver in solvers:
+		stats[solver]['error']=float(np.abs(final[solver]-ref).max()) if ref is not None else np.nan
+	
+	return stats
+
+def benchSolvers(emb,geometry,volSizePx,steps=50):
+	
+	"""Compares linear solvers on the simulation mesh of embryo, see :py:func:`compareSolvers`.
+	
+	Returns:
+		list: Benchmark results, one per solver.
+	
+	"""
+	
+	try:
+		if emb.simulation.mesh.mesh==None or emb.simulation.mesh.volSizePx!=volSizePx:
+			emb.simulation.mesh.setVolSizePx(volSizePx,remesh=False)
+			emb.simulation.mesh.genMesh()
+			emb.computeROIIdxs(debug=False)
+		
+		emb.simulation.setTimesteps(steps)
+		emb.simulation.setTEnd(emb.tEnd)
+		
+		mesh=emb.simulation.mesh.mesh
+		phi=pyfrp_sim_module.fipy.CellVariable(mesh=mesh,value=0.)
+		c0=np.asarray(pyfrp_sim_module.applyICs(phi,emb.simulation).value,dtype=float)
+		L,cvs=pyfrp_sim_module.getMeshOperators(mesh)
+		
+	except Exception:
+		return [makeResult('solvers',geometry,volSizePx,[],status='skipped',note=getLastErrorLine())]
+	
+	solvers=list(pyfrp_sim_module.solverNames)
+	try:
+		pyfrp_sim_module.pyamg.smoothed_aggregation_solver
+	except ImportError:
+		solvers.remove("AMG")
+	
+	stats=compareSolvers(L,cvs,c0,emb.simulation.tvecSim,emb.simulation.D,prod=emb.simulation.prod,degr=emb.simulation.degr,
+		      solvers=solvers,tolerance=emb.simulation.tolerance,iterations=emb.simulation.iterations)
+	
+	results=[]
+	for solver in solvers:
+		result=makeResult('solver'+solver,geometry,volSizePx,[stats[solver]['time']],status='ok' if stats[solver]['converged'] else 'failed',
+		    note='%d cells, %d iterations, %.1f MB, error %.2e' %(len(cvs),stats[solver]['iterations'],stats[solver]['memory']/1E6,stats[solver]['error']))
+		results.append(result)
+	
+	return results
+
+def benchObjective(emb,nEvals=50):
+	
+	"""Times evaluations of the fit objective function at diffusion coefficients around the simulation's one.
+	
+	Returns:
+		list: Benchmark results.
+	
+	"""
+	
+	fit=emb.fits[0]
+	pyfrp_fit_module.iterations=0
+	
+	Ds=np.linspace(0.5,2.,nEvals)*emb.simulation.D
+	
+	times=[]
+	for D in Ds:
+		x=[D]+list(fit.getX0()[1:])
+		start=time.time()
+		pyfrp_fit_module.FRAPObjFunc(x,fit,False,None,False)
+		times.append(time.time()-start)
+	
+	return [makeResult('objective','-',emb.dataResPx,times)]
+
+def benchFit(emb,dataset,repeats=1):
+	
+	"""Times complete fit and reports error of fitted diffusion coefficient.
+	
+	Returns:
+		list: Benchmark results.
+	
+	"""
+	
+	fit=emb.fits[0]
+	
+	times,result=timeCall(fit.run,repeats=repeats)
+	
+	relErr=abs(fit.DOptPx-dataset['D'])/dataset['D']
+	
+	return [makeResult('fit','-',emb.dataResPx,times,note='D='+str(round(fit.DOptPx,3))+' (true '+str(dataset['D'])+', rel. error '+str(round(relErr,3))+')')]
+
+def benchPixelFit(emb,dataset,repeats=1,pixelBin=2,roiName='Bleached Square'):
+	
+	"""Times complete pixel by pixel fit and reports error of fitted diffusion coefficient.
+	
+	Needs analytic simulation with saved images, see :py:func:`setAnalyticSimulation`. Since these 
+	are images already, they are projected with the identity instead of a mesh projection.
+	
+	.. note:: The slice ROI reaches slightly beyond the radius at which synthetic images are cut to zero,
+	   so fitting its pixels biases the diffusion coefficient. Thus the bleached square is fitted by default.
+	
+	Keyword Args:
+		pixelBin (int): Size of pixel blocks, see :py:meth:`pyfrp.subclasses.pyfrp_fit.fit.setPixelBin`.
+		roiName (str): Name of ROI whose pixels are fitted.
+	
+	Returns:
+		list: Benchmark results.
+	
+	"""
+	
+	fit=emb.fits[0]
+	fit.setFitMode('pixel')
+	fit.setPixelBin(pixelBin)
+	fit.setPixelROI(emb.getROIByName(roiName))
+	
+	try:
+		res=emb.dataResPx
+		pyfrp_fit_module.pixelProblems[fit]=pyfrp_fit_module.buildPixelProblem(fit,P=sparse.identity(res**2,format='csr'))
+		nBlocks=pyfrp_fit_module.pixelProblems[fit]['A'].shape[0]
+		
+		times,result=timeCall(fit.run,repeats=repeats)
+	finally:
+		fit.setFitMode('ROI')
+	
+	relErr=abs(fit.DOptPx-dataset['D'])/dataset['D']
+	
+	return [makeResult('pixelFit','-',emb.dataResPx,times,note='D='+str(round(fit.DOptPx,3))+' (true '+str(dataset['D'])+', rel. error '+str(round(relErr,3))+'), '+str(nBlocks)+' blocks')]
+
+def getLastErrorLine():
+	
+	"""Returns last line of current exception's traceback."""
+	
+	return traceback.format_exc().strip().split('\n')[-1]
+
+def getEnvironment():
+	
+	"""Returns dictionary describing machine and package versions, stored with benchmark results."""
+	
+	import scipy
+	import pyfrp
+	
+	env={'python':platform.python_version(),'platform':platform.platform(),'processor':platform.processor(),
+	  'numpy':np.__version__,'scipy':scipy.__version__,'pyfrp':pyfrp.__version__,'commit':''}
+	
+	try:
+		import subprocess
+		fnRepo=os.path.dirname(os.path.dirname(os.path.abspath(pyfrp.__file__)))
+		env['commit']=subprocess.check_output(['git','rev-parse','HEAD'],cwd=fnRepo,stderr=subprocess.STDOUT).strip()
+	except Exception:
+		pass
+	
+	return env
+
+def runBenchmarks(fnOut,sizes=[128,256,512],geometries=geometryNames,benchmarks=benchmarkNames,volSizes=[20.,10.],nFrames=30,
+		  repeats=3,nEvals=50,simSteps=50,D=None,debug=True):
+	
+	"""Runs benchmark suite.
+	
+	For each image size, generates a synthetic dataset in ``fnOut/data/``, then runs the selected benchmarks.
+	Analysis, objective and fit benchmarks do not depend on geometry and are only run with the first geometry.
+	Results are written to ``fnOut/benchmark_<date>.json`` together with :py:func:`getEnvironment`, and to a 
+	csv file of the same name.
+	
+	Args:
+		fnOut (str): Output folder.
+	
+	Keyword Args:
+		sizes (list): Image resolutions in px.
+		geometries (list): Reference geometries.
+		benchmarks (list): Benchmarks to run, see :py:data:`benchmarkNames`.
+		volSizes (list): Mesh element sizes in px for simulation benchmark. The first one is also used for ROI indexing.
+		nFrames (int): Number of frames of synthetic datasets.
+		repeats (int): Number of repeats per benchmark.
+		nEvals (int): Number of objective function evaluations.
+		simSteps (int): Number of simulation steps.
+		D (float): Diffusion coefficient of synthetic datasets in px^2/s, see :py:func:`genSyntheticDataset`.
+		debug (bool): Print results.
+		
+	Returns:
+		tuple: Tuple containing:
+		
+			* fnJSON (str): Path to JSON results.
+			* results (list): List of result dictionaries.
+	
+	"""
+	
+	if not os.path.isdir(fnOut):
+		os.makedirs(fnOut)
+	
+	results=[]
+	
+	def addResults(res):
+		for r in res:
+			results.append(r)
+			if debug:
+				print "%-10s %-10s %8s %-8s %12s %s" %(r['benchmark'],r['geometry'],r['size'],r['status'],
+					('%.5f' %r['mean']) if r['status']=='ok' else '',r['note'])
+	
+	for size in sizes:
+		
+		dataset=genSyntheticDataset(os.path.join(fnOut,'data','res'+str(size)),res=size,nFrames=nFrames,D=D)
+		
+		for i,geometry in enumerate(geometries):
+			
+			emb=buildBenchmarkEmbryo(dataset,geometry=geometry)
+			
+			if 'idxs' in benchmarks:
+				addResults(benchROIIdxs(emb,geometry,volSizePx=volSizes[0] if len(volSizes)>0 else None,repeats=repeats))
+			else:
+				emb.computeROIIdxs(debug=False)
+				
+			if i==0:
+				
+				fitting=[b for b in ['objective','fit','pixelFit'] if b in benchmarks]
+				
+				if 'analysis' in benchmarks or len(fitting)>0:
+					res=benchAnalysis(emb,repeats=repeats)
+					if 'analysis' in benchmarks:
+						addResults(res)
+				
+				if len(fitting)>0:
+					setAnalyticSimulation(emb,dataset,saveVals='pixelFit' in benchmarks)
+					emb.pinAllROIs(*emb.computeIdealFRAPPinVals(),debug=False)
+				
+				if 'objective' in benchmarks:
+					addResults(benchObjective(emb,nEvals=nEvals))
+				if 'fit' in benchmarks:
+					addResults(benchFit(emb,dataset))
+				if 'pixelFit' in benchmarks:
+					addResults(benchPixelFit(emb,dataset))
+			
+			# Simulation benchmark only depends on mesh, so only run once
+			if 'simStep' in benchmarks and size==sizes[0]:
+				for volSize in volSizes:
+					addResults(benchSimStep(emb,geometry,volSize,steps=simSteps))
+			if 'solvers' in benchmarks and size==sizes[0]:
+				for volSize in volSizes:
+					addResults(benchSolvers(emb,geometry,volSize,steps=simSteps))
+	
+	fnBase=os.path.join(fnOut,'benchmark_'+time.strftime('%Y%m%d_%H%M%S'))
+	
+	with open(fnBase+'.json','w') as f:
+		json.dump({'environment':getEnvironment(),'results':results},f,indent=1,sort_keys=True)
+	
+	pyfrp_IO_module.writeTableToCSV([[r[key] for key in resultKeys] for r in results],resultKeys,fnBase+'.csv')
+	
+	return fnBase+'.json',results
+
+def loadBenchmarks(fn):
+	
+	"""Loads benchmark results written by :py:func:`runBenchmarks`.
+	
+	Args:
+		fn (str): Path to JSON file.
+	
+	Returns:
+		tuple: Tuple containing:
+		
+			* environment (dict): Environment of run.
+			* results (list): List of result dictionaries.
+	
+	"""
+	
+	with open(fn,'r') as f:
+		data=json.load(f)
+	
+	return data['environment'],data['results']
+
+def compareBenchmarks(fnOld,fnNew,debug=True):
+	
+	"""Compares two benchmark runs.
+	
+	Matches results by benchmark, geometry and size and computes speedup as ratio of mean times old/new.
+	
+	Args:
+		fnOld (str): Path to JSON results of reference run.
+		fnNew (str): Path to JSON results of new run.
+	
+	Keyword Args:
+		debug (bool): Print comparison.
+	
+	Returns:
+		list: List of tuples ``(benchmark,geometry,size,meanOld,meanNew,speedup)``.
+	
+	"""
+	
+	envOld,resultsOld=loadBenchmarks(fnOld)
+	envNew,resultsNew=loadBenchmarks(fnNew)
+	
+	getKey=lambda r: (r['benchmark'],r['geometry'],r['size'])
+	old=dict([(getKey(r),r) for r in resultsOld if r['status']=='ok'])
+	
+	comparison=[]
+	for r in resultsNew:
+		if r['status']!='ok' or getKey(r) not in old:
+			continue
+		meanOld=old[getKey(r)]['mean']
+		comparison.append(getKey(r)+(meanOld,r['mean'],meanOld/r['mean']))
+	
+	if debug:
+		print "Comparing "+envOld['commit'][:8]+" (old) with "+envNew['commit'][:8]+" (new)."
+		print "%-10s %-10s %8s %12s %12s %8s" %('benchmark','geometry','size','old [s]','new [s]','speedup')
+		for c in comparison:
+			print "%-10s %-10s %8s %12.5f %12.5f %8.2f" %c
+	
+	return comparison
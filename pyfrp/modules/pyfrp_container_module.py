@@ -0,0 +1,565 @@
+#=====================================================================================================================================
+#Copyright
+#=====================================================================================================================================
+
+#Copyright (C) 2014 Alexander Blaessle, Patrick Mueller and the Friedrich Miescher Laboratory of the Max Planck Society
+#This software is distributed under the terms of the GNU General Public License.
+
+#This file is part of PyFRAP.
+
+#PyFRAP is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+#===========================================================================================================================================================================
+#Module Description
+#===========================================================================================================================================================================
+
+"""Container module for PyFRAP toolbox.
+
+Saves PyFRAP objects (molecules, embryos, ...) into a versioned container file instead of a single pickle.
+A container is a zip archive (the same layout as a numpy ``.npz`` file) holding
+
+	* ``meta.json``: The object tree. Each object is a section ``{"__class__": ..., "__attrs__": {...}}``,
+	  scalars, strings, lists and dicts are stored directly.
+	* ``arrays/*.npy``: One file per array attribute, referenced from ``meta.json`` by ``{"__array__": name}``.
+
+Objects that appear more than once (for example ``ROI.embryo``) are stored once and referenced 
+via ``{"__ref__": path}``. Attributes that cannot be stored, such as FiPy meshes or solution variables,
+are set to ``None`` and have to be regenerated after loading, see :py:meth:`pyfrp.subclasses.pyfrp_mesh.mesh.importMeshFromFile`.
+
+Since the object tree is plain JSON, containers can be read partially:
+
+>>> meta=pyfrp_container_module.readContainerMeta("mol.pyfrp")
+>>> pyfrp_container_module.readContainerValue("mol.pyfrp","root.DOptMu")
+
+and heavy arrays can be skipped when loading:
+
+>>> mol=pyfrp_container_module.loadContainer("mol.pyfrp",exclude=pyfrp_container_module.getResultsExclude())
+
+Each container records its schema version. When the format changes, :py:data:`schemaVersion` is increased and 
+an upgrade function is added to :py:data:`schemaUpgrades`, which transforms the JSON tree of the previous version.
+Upgrades are applied by :py:func:`upgradeContainerMeta` when loading.
+
+Attributes that have only been added to a class, but are not yet known to the container, do not need a schema upgrade. 
+As for pickle files, :py:func:`loadContainer` brings the loaded object up-to-date via its ``updateVersion`` method.
+
+"""
+
+#===========================================================================================================================================================================
+#Importing necessary modules
+#===========================================================================================================================================================================
+
+#Numpy
+import numpy as np
+
+#Misc
+import sys
+import io
+import json
+import zipfile
+import fnmatch
+import importlib
+import types
+
+#===========================================================================================================================================================================
+#Module Variables
+#===========================================================================================================================================================================
+
+#Current schema version
+schemaVersion=1
+
+#Functions upgrading the JSON tree from schema version i to i+1
+schemaUpgrades={}
+
+#Lists with at least that many numbers are stored as arrays
+minListArraySize=32
+
+#===========================================================================================================================================================================
+#Module Functions
+#===========================================================================================================================================================================
+
+def getResultsExclude():
+	
+	"""Returns exclude patterns that skip meshes, simulation snapshots and checkpoints and index arrays.
+	
+	Loading with these patterns gives fit results and ROI time series only, 
+	see :py:func:`loadContainer`.
+	
+	Returns:
+		list: List of patterns.
+	
+	"""
+	
+	return ['*.vals','*.ICimg','*.IC','*.checkpoint*','*.imgIdx*','*.extImgIdx*','*.meshIdx','*.imgMask','*.extMask','*.mesh.quality','*.geometry.bt']
+
+def saveContainer(obj,fn,compress=False):
+	
+	"""Saves PyFRAP object into container file.
+	
+	Args:
+		obj (object): Object to be saved, for example a molecule or an embryo.
+		fn (str): Output filename.
+	
+	Keyword Args:
+		compress (bool): Deflate arrays.
+	
+	Returns:
+		str: Output filename.
+	
+	"""
+	
+	arrays={}
+	skipped=[]
+	
+	root=encodeNode(obj,'root',{},arrays,skipped)
+	
+	meta={}
+	meta['format']='pyfrp-container'
+	meta['schema']=schemaVersion
+	meta['pyfrpVersion']=getPyFRAPVersion()
+	meta['root']=root
+	meta['arrays']=dict([(name,{'shape':list(arr.shape),'dtype':arr.dtype.str}) for name,arr in arrays.items()])
+	meta['skipped']=skipped
+	
+	compression=zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+	
+	with zipfile.ZipFile(fn,'w',compression,allowZip64=True) as zf:
+		zf.writestr('meta.json',json.dumps(meta,sort_keys=True))
+		for name in sorted(arrays.keys()):
+			buf=io.BytesIO()
+			np.lib.format.write_array(buf,arrays[name],allow_pickle=False)
+			zf.writestr(name,buf.getvalue())
+	
+	return fn
+
+def isContainer(fn):
+	
+	"""Returns ``True`` if ``fn`` is a container file."""
+	
+	if not zipfile.is_zipfile(fn):
+		return False
+	
+	with zipfile.ZipFile(fn,'r') as zf:
+		return 'meta.json' in zf.namelist()
+
+def readContainerMeta(fn,upgrade=True):
+	
+	"""Reads object tree of container without loading any array.
+	
+	Args:
+		fn (str): Container filename.
+	
+	Keyword Args:
+		upgrade (bool): Upgrade tree to current schema version.
+	
+	Returns:
+		dict: Container meta data.
+	
+	"""
+	
+	with zipfile.ZipFile(fn,'r') as zf:
+		meta=json.loads(zf.read('meta.json').decode('utf-8'))
+	
+	if upgrade:
+		meta=upgradeContainerMeta(meta)
+		
+	return meta
+
+def readContainerArray(fn,name):
+	
+	"""Reads a single array from container.
+	
+	Args:
+		fn (str): Container filename.
+		name (str): Name of array, as given in ``{"__array__": name}``.
+	
+	Returns:
+		numpy.ndarray: Array.
+	
+	"""
+	
+	with zipfile.ZipFile(fn,'r') as zf:
+		return readArray(zf,name)
+
+def readContainerValue(fn,path):
+	
+	"""Reads a single value from container, without building any objects.
+	
+	Example:
+	
+	>>> readContainerValue("mol.pyfrp","root.embryos.0.fits.0.DOptMu")
+	
+	.. note:: If the value is an object section, returns its JSON dictionary.
+	
+	Args:
+		fn (str): Container filename.
+		path (str): Dotted path of value, starting with ``root``.
+	
+	Returns:
+		object: Value.
+	
+	"""
+	
+	meta=readContainerMeta(fn)
+	node=getNodeByPath(meta['root'],path)
+	
+	if isinstance(node,dict) and '__array__' in node:
+		return decodeArray(node,readContainerArray(fn,node['__array__']))
+	
+	return node
+
+def getNodeByPath(root,path):
+	
+	"""Returns node of object tree at dotted ``path``.
+	
+	Args:
+		root (dict): Root node.
+		path (str): Dotted path, starting with ``root``.
+	
+	Returns:
+		object: Node.
+	
+	"""
+	
+	node=root
+	for key in path.split('.')[1:]:
+		if isinstance(node,dict) and '__attrs__' in node:
+			node=node['__attrs__']
+		if isinstance(node,dict) and '__tuple__' in node:
+			node=node['__tuple__']
+		if isinstance(node,list):
+			node=node[int(key)]
+		else:
+			node=node[key]
+	return node
+
+def loadContainer(fn,exclude=[],update=True):
+	
+	"""Loads PyFRAP object from container file.
+	
+	Attributes whose dotted path, for example ``root.embryos.0.simulation.vals``, matches one of
+	the patterns in ``exclude`` are not read and set to ``None``. Arrays are only read from disk
+	if they are needed.
+	
+	If ``update`` is selected and the loaded object has an ``updateVersion`` method, for example
+	molecules and embryos, adds attributes missing in the container with their default values.
+	
+	Args:
+		fn (str): Container filename.
+		
+	Keyword Args:
+		exclude (list): List of ``fnmatch`` patterns, see also :py:func:`getResultsExclude`.
+		update (bool): Update loaded object to current version.
+	
+	Returns:
+		object: Loaded object.
+	
+	"""
+	
+	meta=readContainerMeta(fn)
+	
+	with zipfile.ZipFile(fn,'r') as zf:
+		obj=decodeNode(meta['root'],'root',{},zf,exclude)
+	
+	if update and hasattr(obj,'updateVersion'):
+		obj.updateVersion()
+	
+	return obj
+
+def upgradeContainerMeta(meta):
+	
+	"""Upgrades container meta data to current schema version.
+	
+	Applies all functions in :py:data:`schemaUpgrades` from the container's schema version on.
+	
+	Args:
+		meta (dict): Container meta data.
+	
+	Returns:
+		dict: Upgraded meta data.
+	
+	"""
+	
+	if meta.get('format')!='pyfrp-container':
+		raise IOError("File is not a PyFRAP container.")
+	
+	if meta['schema']>schemaVersion:
+		raise IOError("Container has schema version "+str(meta['schema'])+", but this version of PyFRAP only supports up to "+str(schemaVersion)+".")
+	
+	while meta['schema']<schemaVersion:
+		meta=schemaUpgrades[meta['schema']](meta)
+		meta['schema']=meta['schema']+1
+	
+	return meta
+
+def setDefaultAttr(node,className,attr,val):
+	
+	"""Sets attribute of all object sections of a given class in object tree if it is missing.
+	
+	Helper for schema upgrade functions, for example
+	
+	>>> def upgradeSchema1(meta):
+	>>> 	setDefaultAttr(meta['root'],'pyfrp.subclasses.pyfrp_embryo.embryo','newAttr',0)
+	>>> 	return meta
+	>>> schemaUpgrades[1]=upgradeSchema1
+	
+	Args:
+		node (object): Node of object tree.
+		className (str): Full class name.
+		attr (str): Attribute name.
+		val (object): JSON value of attribute.
+	
+	Returns:
+		object: Updated node.
+	
+	"""
+	
+	if isinstance(node,dict):
+		if node.get('__class__')==className:
+			node['__attrs__'].setdefault(attr,val)
+		for child in node.values():
+			setDefaultAttr(child,className,attr,val)
+	elif isinstance(node,list):
+		for child in node:
+			setDefaultAttr(child,className,attr,val)
+	
+	return node
+
+def getPyFRAPVersion():
+	
+	"""Returns PyFRAP version string."""
+	
+	try:
+		from pyfrp import __version__
+		return __version__
+	except ImportError:
+		return ""
+
+def getClassName(obj):
+	
+	"""Returns full class name of a PyFRAP object, ``None`` if object is no PyFRAP object.
+	
+	.. note:: Objects loaded from pickle files might have classes registered under the bare module name,
+	   for example ``pyfrp_embryo.embryo``. These are mapped to ``pyfrp.subclasses.pyfrp_embryo.embryo``.
+	
+	"""
+	
+	if not hasattr(obj,'__class__') or not hasattr(obj,'__dict__') or isinstance(obj,types.ModuleType):
+		return None
+	
+	cls=obj.__class__
+	module=cls.__module__
+	
+	if module.startswith('pyfrp_'):
+		for package in ['pyfrp.subclasses.','pyfrp.modules.']:
+			if package+module in sys.modules:
+				module=package+module
+				break
+	
+	if not module.startswith('pyfrp.') or module.startswith('pyfrp.gui'):
+		return None
+	
+	return module+'.'+cls.__name__
+
+def getClass(className):
+	
+	"""Returns class from full class name."""
+	
+	module,name=className.rsplit('.',1)
+	
+	if not module.startswith('pyfrp.'):
+		raise IOError("Refusing to load non-PyFRAP class "+className+".")
+	
+	return getattr(importlib.import_module(module),name)
+
+def newInstance(cls):
+	
+	"""Creates instance of ``cls`` without calling its ``__init__``."""
+	
+	if isinstance(cls,type):
+		return cls.__new__(cls)
+	
+	#Old-style classes
+	return types.InstanceType(cls)
+
+def isNumberList(val):
+	
+	"""Returns ``True`` if ``val`` is a list of numbers (or of numeric arrays) long enough to be stored as array."""
+	
+	if len(val)<minListArraySize:
+		return False
+	
+	try:
+		arr=np.asarray(val)
+	except ValueError:
+		return False
+	
+	return arr.dtype.kind in 'biuf'
+
+def encodeNode(val,path,memo,arrays,skipped):
+	
+	"""Encodes value into JSON node.
+	
+	Arrays are added to ``arrays``, paths of attributes that cannot be encoded to ``skipped``.
+	
+	Args:
+		val (object): Value.
+		path (str): Dotted path of value.
+		memo (dict): Dictionary mapping ``id`` of already encoded objects to their path.
+		arrays (dict): Dictionary of arrays.
+		skipped (list): List of skipped paths.
+		
+	Returns:
+		object: JSON node.
+	
+	"""
+	
+	#Simple types
+	if val is None or isinstance(val,(bool,int,long,float,basestring)):
+		return val
+	
+	if isinstance(val,np.generic) and val.dtype.kind in 'biufSU':
+		return val.item()
+	
+	#Arrays
+	if isinstance(val,np.ndarray) and val.dtype.kind in 'biufcU':
+		return encodeArray(val,path,arrays,'array')
+	
+	if isinstance(val,list) and isNumberList(val):
+		if len(val)>0 and isinstance(val[0],np.ndarray):
+			return encodeArray(np.asarray(val),path,arrays,'arraylist')
+		return encodeArray(np.asarray(val),path,arrays,'list')
+	
+	#Containers
+	if isinstance(val,(list,np.ndarray)):
+		return [encodeNode(v,path+'.'+str(i),memo,arrays,skipped) for i,v in enumerate(val)]
+	
+	if isinstance(val,tuple):
+		return {'__tuple__':[encodeNode(v,path+'.'+str(i),memo,arrays,skipped) for i,v in enumerate(val)]}
+	
+	if isinstance(val,dict):
+		if all([isinstance(k,basestring) and not k.startswith('__') for k in val.keys()]):
+			return dict([(k,encodeNode(v,path+'.'+k,memo,arrays,skipped)) for k,v in sorted(val.items())])
+		return {'__dict__':[[encodeNode(k,path,memo,arrays,skipped),encodeNode(v,path+'.'+str(i),memo,arrays,skipped)] for i,(k,v) in enumerate(val.items())]}
+	
+	#PyFRAP objects
+	className=getClassName(val)
+	if className!=None:
+		
+		if id(val) in memo:
+			return {'__ref__':memo[id(val)]}
+		memo[id(val)]=path
+		
+		attrs={}
+		for attr in sorted(vars(val).keys()):
+			attrs[attr]=encodeNode(vars(val)[attr],path+'.'+attr,memo,arrays,skipped)
+		
+		return {'__class__':className,'__attrs__':attrs}
+	
+	#Everything else cannot be stored
+	skipped.append(path)
+	return None
+
+def encodeArray(arr,path,arrays,kind):
+	
+	"""Adds array to ``arrays`` and returns reference node."""
+	
+	name='arrays/'+path+'.npy'
+	arrays[name]=np.ascontiguousarray(arr)
+	return {'__array__':name,'__kind__':kind}
+
+def decodeArray(node,arr):
+	
+	"""Converts array back into the type it was saved from."""
+	
+	if node.get('__kind__')=='list':
+		return arr.tolist()
+	if node.get('__kind__')=='arraylist':
+		return list(arr)
+	return arr
+
+def readArray(zf,name):
+	
+	"""Reads array ``name`` from opened container ``zf``."""
+	
+	return np.lib.format.read_array(io.BytesIO(zf.read(name)),allow_pickle=False)
+
+def toStr(val):
+	
+	"""Converts unicode strings returned by ``json`` back to ``str`` where possible."""
+	
+	if isinstance(val,unicode):
+		try:
+			return str(val)
+		except UnicodeEncodeError:
+			return val
+	return val
+
+def isExcluded(path,exclude):
+	
+	"""Returns ``True`` if ``path`` matches any of the patterns in ``exclude``."""
+	
+	for pattern in exclude:
+		if fnmatch.fnmatchcase(path,pattern):
+			return True
+	return False
+
+def decodeNode(node,path,memo,zf,exclude):
+	
+	"""Decodes JSON node into value.
+	
+	Args:
+		node (object): JSON node.
+		path (str): Dotted path of node.
+		memo (dict): Dictionary mapping paths to already decoded objects.
+		zf (zipfile.ZipFile): Opened container.
+		exclude (list): List of exclude patterns.
+		
+	Returns:
+		object: Value.
+	
+	"""
+	
+	if isExcluded(path,exclude):
+		return None
+	
+	if isinstance(node,list):
+		return [decodeNode(v,path+'.'+str(i),memo,zf,exclude) for i,v in enumerate(node)]
+	
+	if not isinstance(node,dict):
+		return toStr(node)
+	
+	if '__array__' in node:
+		return decodeArray(node,readArray(zf,node['__array__']))
+	
+	if '__ref__' in node:
+		return memo.get(node['__ref__'],None)
+	
+	if '__tuple__' in node:
+		return tuple([decodeNode(v,path+'.'+str(i),memo,zf,exclude) for i,v in enumerate(node['__tuple__'])])
+	
+	if '__dict__' in node:
+		return dict([(decodeNode(k,path,memo,zf,exclude),decodeNode(v,path+'.'+str(i),memo,zf,exclude)) for i,(k,v) in enumerate(node['__dict__'])])
+	
+	if '__class__' in node:
+		
+		obj=newInstance(getClass(node['__class__']))
+		memo[path]=obj
+		
+		for attr in sorted(node['__attrs__'].keys()):
+			setattr(obj,toStr(attr),decodeNode(node['__attrs__'][attr],path+'.'+attr,memo,zf,exclude))
+			
+		return obj
+	
+	return dict([(toStr(k),decodeNode(v,path+'.'+k,memo,zf,exclude)) for k,v in sorted(node.items())])
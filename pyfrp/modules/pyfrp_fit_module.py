@@ -38,23 +38,42 @@
 
 #Misc
 import sys
+import weakref
+import hashlib
+from collections import OrderedDict
 
 #Numpy/Scipy
 import numpy as np
-from fipy import *
 from scipy import interpolate
 import scipy.optimize as sciopt
+import scipy.sparse as sparse
 
 #PyFRAP
+import pyfrp_img_module
 import pyfrp_stats_module
 import pyfrp_plot_module 
 import pyfrp_optimization_module 
+import pyfrp_timer_module
 
 from pyfrp_term_module import *
 
 
-#matplotlib
-import matplotlib.pyplot as plt
+#matplotlib (imported on first use)
+import pyfrp_lazy_module
+plt=pyfrp_lazy_module.lazyImport('matplotlib.pyplot')
+
+#===========================================================================================================================================================================
+#Module Variables
+#===========================================================================================================================================================================
+
+fitModes=['ROI','pixel']
+"""Available fit modes, see :py:func:`getObjFunc`."""
+
+pixelProblems=weakref.WeakKeyDictionary()
+"""Pixel fitting problems by fit, see :py:func:`getPixelProblem`."""
+
+objCaches=weakref.WeakKeyDictionary()
+"""Objective function caches by fit, see :py:func:`getObjCache`."""
 
 #===========================================================================================================================================================================
 #Module Functions
@@ -63,6 +82,7 @@ import matplotlib.pyplot as plt
 #---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 #Fits scaling solution to data
 
+@pyfrp_timer_module.timed('fit.run')
 def FRAPFitting(fit,debug=False,ax=None):
 	
 	"""Main fitting function.
@@ -95,20 +115,33 @@ def FRAPFitting(fit,debug=False,ax=None):
 	#Calling optimization algorithms
 	#------------------------------------------------------------------------------------------------------------------------------------------------------------------
 	
+	#Objective function depending on fit mode
+	objFunc=getObjFunc(fit)
+	
+	if fit.fitMode=='pixel':
+		if getPixelStack(fit) is None:
+			return fit
+		if getPixelProblem(fit) is None:
+			printError("Cannot fit pixel by pixel, need simulation run with saveSim.")
+			return fit
+	
 	#Calling optimizers
 	if fit.optMeth=='brute':
-		res=optimize.brute(FRAPObjFunc, bnds,args=(fit,debug,ax,False), full_output=bool(debug),finish=optimize.fmin)
+		res=sciopt.brute(objFunc, bnds,args=(fit,debug,ax,False), full_output=True,finish=sciopt.fmin)
 		
 	elif fit.optMeth=='Constrained Nelder-Mead':
 		LBs, UBs = pyfrp_optimization_module.buildBoundLists(fit)
 		x0=pyfrp_optimization_module.transformX0(x0,LBs,UBs)
 		res=sciopt.fmin(pyfrp_optimization_module.constrObjFunc,x0,args=(fit,debug,ax,False),ftol=fit.optTol,maxiter=fit.maxfun,disp=bool(debug),full_output=True)
 	
+	elif fit.optMeth=='differential evolution':
+		res=pyfrp_optimization_module.runDifferentialEvolution(fit,debug=debug)
+	
 	elif fit.optMeth=='Anneal':
 		random.seed(555)
-		res=sciopt.minimize(FRAPObjFunc, x0,args=(fit,debug,ax,False), method='Anneal')
+		res=sciopt.minimize(objFunc, x0,args=(fit,debug,ax,False), method='Anneal')
 	else:
-		res=sciopt.minimize(FRAPObjFunc,x0,args=(fit,debug,ax,False),method=fit.optMeth,tol=fit.optTol,options={'maxiter': fit.maxfun, 'disp': bool(debug)})
+		res=sciopt.minimize(objFunc,x0,args=(fit,debug,ax,False),method=fit.optMeth,tol=fit.optTol,options={'maxiter': fit.maxfun, 'disp': bool(debug)})
 	
 	#------------------------------------------------------------------------------------------------------------------------------------------------------------------
 	#Run for one last time to get final fit
@@ -117,13 +150,13 @@ def FRAPFitting(fit,debug=False,ax=None):
 	if fit.optMeth=='Constrained Nelder-Mead':
 		LBs, UBs = pyfrp_optimization_module.buildBoundLists(fit)
 		resNew=pyfrp_optimization_module.xTransform(res[0],LBs,UBs)
-		fit=FRAPObjFunc(resNew,fit,debug,ax,True)
+		fit=objFunc(resNew,fit,debug,ax,True)
 		
 	elif fit.optMeth=='brute':
-		fit=FRAPObjFunc(res[0],fit,debug,ax,True)
+		fit=objFunc(res[0],fit,debug,ax,True)
 		
 	else:	
-		fit=FRAPObjFunc(res.x,fit,debug,ax,True)
+		fit=objFunc(res.x,fit,debug,ax,True)
 	
 	#------------------------------------------------------------------------------------------------------------------------------------------------------------------
 	#Saving results in fit object
@@ -541,6 +574,7 @@ def equalize(dataVecs,simVecs,equFacts,fromVecs=False):
 		
 	return equSimVecs,equFacts
 	
+@pyfrp_timer_module.timed('fit.objective')
 def FRAPObjFunc(x,fit,debug,ax,returnFit):
 	
 	"""Objective function for fitting FRAP experiments.
@@ -573,6 +607,7 @@ def FRAPObjFunc(x,fit,debug,ax,returnFit):
 
 	#Check if any variable is negative
 	if not checkInput(x,iterations,fit):
+		pyfrp_timer_module.count('fit.objective.rejected')
 		return 2*fit.SSD
 	
 	#Assign Input Values
@@ -589,6 +624,7 @@ def FRAPObjFunc(x,fit,debug,ax,returnFit):
 	try:
 		fit,tvecScaled,tvecData,scaledSimVecs,dataVecs = scaleROIs(fit,Dnew)
 	except ValueError:
+		pyfrp_timer_module.count('fit.objective.scalingFailed')
 		if debug:
 			printWarning("Scaling failed with Dnew = " + str(Dnew))
 		
@@ -646,6 +682,534 @@ def FRAPObjFunc(x,fit,debug,ax,returnFit):
 	else:
 		return SSD
 
+def getObjFunc(fit):
+	
+	"""Returns objective function matching ``fit.fitMode``.
+	
+	If ``fit.memoize`` is set, the objective function is wrapped by :py:func:`getMemoObjFunc`.
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit): Fit object.
+	
+	Returns:
+		function: :py:func:`FRAPPixelObjFunc` if ``fit.fitMode=='pixel'``, :py:func:`FRAPObjFunc` otherwise.
+	
+	"""
+	
+	if fit.fitMode=='pixel':
+		objFunc=FRAPPixelObjFunc
+	else:
+		objFunc=FRAPObjFunc
+	
+	if getattr(fit,'memoize',False):
+		return getMemoObjFunc(objFunc)
+	return objFunc
+
+def newObjCache(maxSize=10000):
+	
+	"""Returns empty objective function cache.
+	
+	Keyword Args:
+		maxSize (int): Maximum number of entries.
+	
+	Returns:
+		dict: Cache with keys ``entries``, ``maxSize``, ``hits`` and ``misses``.
+	
+	"""
+	
+	return {"entries":OrderedDict(),"maxSize":maxSize,"hits":0,"misses":0}
+
+def lookupObjCache(cache,key):
+	
+	"""Looks up key in objective function cache and counts hit or miss.
+	
+	Marks entry as recently used.
+	
+	Args:
+		cache (dict): Cache, see :py:func:`newObjCache`.
+		key (tuple): Key.
+	
+	Returns:
+		float: Cached value, ``None`` if not cached.
+	
+	"""
+	
+	if key not in cache['entries']:
+		cache['misses']=cache['misses']+1
+		return None
+	
+	val=cache['entries'].pop(key)
+	cache['entries'][key]=val
+	cache['hits']=cache['hits']+1
+	
+	return val
+
+def storeObjCache(cache,key,val):
+	
+	"""Stores value in objective function cache, evicting least recently used entries beyond ``cache['maxSize']``.
+	
+	Args:
+		cache (dict): Cache, see :py:func:`newObjCache`.
+		key (tuple): Key.
+		val (float): Value.
+	
+	"""
+	
+	cache['entries'][key]=val
+	while len(cache['entries'])>cache['maxSize']:
+		cache['entries'].popitem(last=False)
+
+def quantizeX(x,digits=10):
+	
+	"""Rounds parameter vector to ``digits`` significant digits, so that near-identical vectors share a cache entry.
+	
+	Args:
+		x (list): Input vector of objective function.
+	
+	Keyword Args:
+		digits (int): Number of significant digits.
+	
+	Returns:
+		tuple: Rounded vector.
+	
+	"""
+	
+	return tuple([float('%.*g' %(digits,v)) for v in x])
+
+def getFitFingerprint(fit):
+	
+	"""Returns fingerprint of everything the objective function depends on besides the parameter vector.
+	
+	That is the fit options, data and simulation vectors of ``ROIsFitted`` and the time vectors. In pixel 
+	fit mode, also the pixel options and the first and last saved simulation solution. Of ``fit.x0``, only
+	production and degradation rates that are not fitted enter the fingerprint, since all other entries are 
+	only initial guesses. Hence restarts from different initial guesses share cached values.
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit): Fit object.
+	
+	Returns:
+		str: Fingerprint.
+	
+	"""
+	
+	sim=fit.embryo.simulation
+	
+	h=hashlib.md5(str([fit.fitMode,fit.fitPinned,fit.fitCutOffT,fit.cutOffT,fit.equOn,fit.fitProd,fit.fitDegr,
+		    None if fit.fitProd else fit.x0[1],None if fit.fitDegr else fit.x0[2],
+		    fit.kineticTimeScale,sim.D,[r.name for r in fit.ROIsFitted]]))
+	
+	h.update(np.asarray(fit.embryo.tvecData,dtype=float).tostring())
+	h.update(np.asarray(sim.tvecSim,dtype=float).tostring())
+	
+	for r in fit.ROIsFitted:
+		if fit.fitPinned:
+			vecs=[r.dataVecPinned,r.simVecPinned]
+		else:
+			vecs=[r.dataVec,r.simVec]
+		for vec in vecs:
+			h.update(np.asarray(vec,dtype=float).tostring())
+	
+	if fit.fitMode=='pixel':
+		r=fit.getPixelROI()
+		h.update(str([fit.pixelBin,None if r==None else r.name,len(sim.vals)]))
+		if len(sim.vals)>0:
+			h.update(np.asarray(sim.vals[0],dtype=float).tostring())
+			h.update(np.asarray(sim.vals[-1],dtype=float).tostring())
+	
+	return h.hexdigest()
+
+def getObjCache(fit):
+	
+	"""Returns objective function cache of fit.
+	
+	If ``fit.memoPersist`` is set, the cache is stored in ``fit.objCache`` and thus saved with the fit.
+	Otherwise, it only lives in :py:data:`objCaches` for the current session.
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit): Fit object.
+	
+	Returns:
+		dict: Cache, see :py:func:`newObjCache`.
+	
+	"""
+	
+	maxSize=getattr(fit,'memoSize',10000)
+	
+	if getattr(fit,'memoPersist',False):
+		if getattr(fit,'objCache',None)==None:
+			fit.objCache=objCaches.pop(fit,None) or newObjCache(maxSize=maxSize)
+		cache=fit.objCache
+	else:
+		if fit not in objCaches:
+			objCaches[fit]=newObjCache(maxSize=maxSize)
+		cache=objCaches[fit]
+	
+	cache['maxSize']=maxSize
+	
+	return cache
+
+def getMemoObjFunc(objFunc):
+	
+	"""Returns memoized version of objective function.
+	
+	Values are cached per fit, see :py:func:`getObjCache`, keyed by the parameter vector rounded by 
+	:py:func:`quantizeX` to ``fit.memoDigits`` significant digits and the fingerprint of :py:func:`getFitFingerprint`.
+	Calls with ``returnFit`` or ``debug`` set and rejected parameter vectors are never cached, since they have 
+	side effects on the fit.
+	
+	Cached calls count as function calls and set ``fit.SSD`` to the cached value.
+	
+	.. note:: Cached calls do not update ``fit.fittedVecs``, ``fit.dataVecsFitted`` and ``fit.equFacts``. They
+	   are set by the final call with ``returnFit=True`` of :py:func:`FRAPFitting`.
+	
+	Args:
+		objFunc (function): Objective function, :py:func:`FRAPObjFunc` or :py:func:`FRAPPixelObjFunc`.
+	
+	Returns:
+		function: Memoized objective function with the same signature.
+	
+	"""
+	
+	def memoObjFunc(x,fit,debug,ax,returnFit):
+		
+		if returnFit or debug or min(x)<0:
+			return objFunc(x,fit,debug,ax,returnFit)
+		
+		cache=getObjCache(fit)
+		key=(objFunc.__name__,getFitFingerprint(fit))+quantizeX(x,digits=getattr(fit,'memoDigits',10))
+		
+		SSD=lookupObjCache(cache,key)
+		if SSD is None:
+			SSD=objFunc(x,fit,debug,ax,returnFit)
+			storeObjCache(cache,key,SSD)
+		else:
+			pyfrp_timer_module.count('fit.objective.cached')
+			
+			global iterations
+			iterations=iterations+1
+			fit.SSD=SSD
+		
+		return SSD
+	
+	memoObjFunc.__name__=objFunc.__name__
+	
+	return memoObjFunc
+
+def getPixelProblemKey(fit):
+	
+	"""Returns key describing everything a pixel fitting problem depends on, see :py:func:`getPixelProblem`.
+	
+	That is the resolution, binning and cut-off options, a hash of the pixel and mesh indices of 
+	``fit.getPixelROI()``, and a hash of the vertex coordinates of the mesh and of the time vectors.
+	Hence the problem is rebuilt if the ROI indices were recomputed or the simulation was rerun on another mesh,
+	even if the underlying arrays were changed in place.
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit): Fit object.
+	
+	Returns:
+		tuple: Key.
+	
+	"""
+	
+	emb=fit.embryo
+	sim=emb.simulation
+	r=fit.getPixelROI()
+	
+	h=hashlib.md5()
+	if r!=None:
+		for idx in [r.imgIdxX,r.imgIdxY,r.meshIdx]:
+			h.update(np.asarray(idx,dtype=int).tostring())
+			
+	mesh=getattr(sim.mesh,'mesh',None) if sim.mesh!=None else None
+	if mesh!=None:
+		h.update(np.asarray(mesh.vertexCoords,dtype=float).tostring())
+	
+	h.update(np.asarray(sim.tvecSim,dtype=float).tostring())
+	h.update(np.asarray(emb.tvecData,dtype=float).tostring())
+	
+	return (emb.dataResPx,fit.pixelBin,fit.fitCutOffT,fit.cutOffT,len(sim.vals),h.hexdigest())
+
+def buildPixelProblem(fit,P=None,outside=None):
+	
+	"""Builds pixel fitting problem for fit.
+	
+	Selects all pixels of ``fit.getPixelROI()`` inside the image that are covered by the simulation, and 
+	groups them into ``fit.pixelBin`` x ``fit.pixelBin`` blocks. Then builds 
+	
+		* ``A``: Sparse matrix mapping simulation snapshots, as saved in ``simulation.vals``, onto block averages.
+		* ``B``: Sparse matrix mapping selected pixels of a data image onto block averages.
+	
+	If ``P`` is not given, the mesh projection of :py:meth:`pyfrp.subclasses.pyfrp_mesh.mesh.getImgProjection` 
+	is used, so projecting snapshots is a single sparse product per time point.
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit): Fit object.
+	
+	Keyword Args:
+		P (scipy.sparse.csr_matrix): Matrix projecting snapshots onto flattened images.
+		outside (numpy.ndarray): Boolean array of pixels not covered by ``P``.
+	
+	Returns:
+		dict: Pixel fitting problem, or None if simulation was not saved.
+	
+	"""
+	
+	emb=fit.embryo
+	sim=emb.simulation
+	res=emb.dataResPx
+	r=fit.getPixelROI()
+	
+	if r==None or len(sim.vals)==0 or len(sim.vals)!=len(sim.tvecSim):
+		return None
+	
+	if P is None and getattr(sim,'checkpoint',None)!=None and sim.checkpoint['params'].get('axisymmetric',False):
+		printWarning("Pixel fitting of axisymmetric simulations is not supported.")
+		return None
+	
+	#Projection of snapshots onto image
+	if P is None:
+		P,outside=sim.mesh.getImgProjection(res,idx=r.meshIdx)
+		if P is None:
+			return None
+		
+		#Columns of P refer to meshIdx, let them refer to all cells instead
+		P=P.tocoo()
+		P=sparse.csr_matrix((P.data,(P.row,np.asarray(r.meshIdx,dtype=int)[P.col])),shape=(P.shape[0],len(sim.vals[0])))
+		
+	if outside is None:
+		outside=np.zeros(P.shape[0],dtype=bool)
+	
+	#Pixels of ROI covered by simulation
+	idxX=np.asarray(r.imgIdxX,dtype=int)
+	idxY=np.asarray(r.imgIdxY,dtype=int)
+	flat=idxX*res+idxY
+	inside=~outside[flat]
+	idxX,idxY,flat=idxX[inside],idxY[inside],flat[inside]
+	
+	#Block averages
+	nBlocksY=int(np.ceil(res/float(fit.pixelBin)))
+	blocks,blockIdx=np.unique((idxX//fit.pixelBin)*nBlocksY+idxY//fit.pixelBin,return_inverse=True)
+	counts=np.bincount(blockIdx).astype(float)
+	B=sparse.csr_matrix((1./counts[blockIdx],(blockIdx,np.arange(len(flat)))),shape=(len(blocks),len(flat)))
+	
+	#Data frames to fit
+	tvecData=np.asarray(emb.tvecData,dtype=float)
+	if fit.fitCutOffT:
+		tvecData=tvecData[:getTvecCutIndex(tvecData,fit.cutOffT)]
+	
+	return {'A':B.dot(P[flat]).tocsr(),'B':B,'idxX':idxX,'idxY':idxY,'tvecData':tvecData,'key':getPixelProblemKey(fit)}
+
+def getPixelStack(fit,rerun=True):
+	
+	"""Returns processed images used for fitting pixel by pixel.
+	
+	Processed images only live in the in-session cache of :py:func:`pyfrp.modules.pyfrp_img_module.getProcessedStack`.
+	They are not saved with the embryo, and are dropped if the analysis settings change or if other analyses 
+	need the space. If they are missing and ``rerun`` is selected, reruns the analysis of the embryo to restore them.
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit): Fit object.
+	
+	Keyword Args:
+		rerun (bool): Rerun analysis if processed images are missing.
+	
+	Returns:
+		numpy.ndarray: Processed stack, or None if it is not available.
+	
+	"""
+	
+	emb=fit.embryo
+	if emb.analysis==None:
+		printError("Cannot fit pixel by pixel, embryo "+emb.name+" has no analysis.")
+		return None
+	
+	stack=pyfrp_img_module.getProcessedStack(emb.analysis)
+	if stack is None and rerun:
+		printWarning("Processed images of embryo "+emb.name+" are not cached, since they are not saved with the embryo or were dropped from the cache. Will rerun analysis.")
+		emb.analysis.run(showProgress=False)
+		stack=pyfrp_img_module.getProcessedStack(emb.analysis)
+	
+	if stack is None:
+		printError("Cannot fit pixel by pixel, processed images of embryo "+emb.name+" are not cached. Rerun the analysis, the images need to fit into pyfrp_img_module.maxCacheMB="+str(pyfrp_img_module.maxCacheMB)+" MB.")
+	
+	return stack
+
+def getPixelProblem(fit):
+	
+	"""Returns pixel fitting problem of fit, see :py:func:`buildPixelProblem`.
+	
+	Problems are kept in :py:data:`pixelProblems` and rebuilt if their key changed, see :py:func:`getPixelProblemKey`. 
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit): Fit object.
+	
+	Returns:
+		dict: Pixel fitting problem, or None if simulation was not saved or there are no processed images.
+	
+	"""
+	
+	if fit.embryo.analysis==None or not fit.embryo.analysis.hasProcessedStack():
+		return None
+	
+	problem=pixelProblems.get(fit)
+	if problem==None or problem['key']!=getPixelProblemKey(fit):
+		problem=buildPixelProblem(fit)
+		if problem==None:
+			return None
+		pixelProblems[fit]=problem
+	
+	return problem
+
+def computePixelSSD(problem,stack,vals,tvecScaled,prod,degr,chunk=10):
+	
+	"""Computes SSD between simulated and measured images pixel by pixel.
+	
+	Data frames are processed in chunks of ``chunk`` frames. For each chunk, only the snapshots 
+	bracketing the frames in scaled time are projected onto the pixel blocks, interpolated linearly in time,
+	and compared to the block averages of the data frames. Thus neither all simulated nor all measured 
+	images of the selected pixels are held in memory at once.
+	
+	Args:
+		problem (dict): Pixel fitting problem, see :py:func:`buildPixelProblem`.
+		stack (numpy.ndarray): Processed data images.
+		vals (list): Simulation snapshots.
+		tvecScaled (numpy.ndarray): Scaled time vector of snapshots.
+		prod (float): Production rate.
+		degr (float): Degredation rate.
+	
+	Keyword Args:
+		chunk (int): Number of frames per chunk.
+	
+	Returns:
+		tuple: Tuple containing:
+		
+			* SSD (float): SSD over all blocks and frames.
+			* ssdByFrame (numpy.ndarray): SSD per frame.
+	
+	Raises:
+		ValueError: If data time points lie outside of scaled time vector.
+	
+	"""
+	
+	tvecData=problem['tvecData']
+	if len(tvecData)>0 and (tvecData[0]<tvecScaled[0] or tvecData[-1]>tvecScaled[-1]):
+		raise ValueError("Data time points outside of scaled simulation time.")
+	
+	A=problem['A']
+	B=problem['B']
+	chunk=max(int(chunk),1)
+	
+	#Bracketing snapshots and interpolation weights
+	k=np.clip(np.searchsorted(tvecScaled,tvecData,side='right')-1,0,len(tvecScaled)-2)
+	w=(tvecData-tvecScaled[k])/(tvecScaled[k+1]-tvecScaled[k])
+	
+	ssdByFrame=np.zeros(len(tvecData))
+	
+	for start in range(0,len(tvecData),chunk):
+		frames=np.arange(start,min(start+chunk,len(tvecData)))
+		
+		#Project needed snapshots
+		needed,inv=np.unique(np.concatenate([k[frames],k[frames]+1]),return_inverse=True)
+		proj=A.dot(np.asarray([vals[i] for i in needed],dtype=float).T).T
+		lo,hi=inv[:len(frames)],inv[len(frames):]
+		simChunk=(1-w[frames,None])*proj[lo]+w[frames,None]*proj[hi]
+		
+		#Add Kinetics
+		simChunk=addKineticsToSolution([simChunk.T],tvecData[frames],prod,degr)[0].T
+		
+		#Block averages of data
+		dataChunk=B.dot(stack[frames[0]:frames[-1]+1][:,problem['idxX'],problem['idxY']].T.astype(float)).T
+		
+		ssdByFrame[frames]=((simChunk-dataChunk)**2).sum(axis=1)
+	
+	return ssdByFrame.sum(),ssdByFrame
+
+@pyfrp_timer_module.timed('fit.objective')
+def FRAPPixelObjFunc(x,fit,debug,ax,returnFit):
+	
+	"""Objective function for fitting FRAP experiments pixel by pixel.
+	
+	Same as :py:func:`FRAPObjFunc`, but compares simulated and measured images over all pixels of 
+	``fit.getPixelROI()`` instead of ROI averages, see :py:func:`computePixelSSD`. Needs the processed 
+	images cached by the analysis and a simulation run with ``saveSim`` enabled.
+	
+	Pixels are compared unpinned and without equalization. If ``returnFit==True``, will also 
+	fill ``fittedVecs`` of ``ROIsFitted`` with the fitted ROI averages.
+	     
+	Args:
+		x (list): Input vector, consiting of [D,(prod),(degr)].
+		fit (pyfrp.subclasses.pyfrp_fit): Fit object.
+		debug (bool): Display debugging output.
+		ax (matplotlib.axes): Axes to display plots in.
+		returnFit (bool): Return fit instead of SSD.
+	
+	Returns:
+		 float: SSD of fit. Except ``returnFit==True``, then will return fit itself. 
+
+	"""
+	
+	#Counting function calls
+	global iterations
+	iterations=iterations+1
+
+	#Check if any variable is negative
+	if not checkInput(x,iterations,fit):
+		pyfrp_timer_module.count('fit.objective.rejected')
+		return 2*fit.SSD
+	
+	#Assign Input Values
+	Dnew,prod,degr,equFacts = assignInputVariables(x,fit)
+
+	#Rescaling degr and prod
+	prod,degr = downscaleKinetics(prod,degr,fit.kineticTimeScale)
+	
+	if debug:
+		print "------------------------------------------"
+		print "Dnew=",Dnew, "prod=", prod, "degr=", degr
+	
+	problem=getPixelProblem(fit)
+	stack=pyfrp_img_module.getProcessedStack(fit.embryo.analysis)
+	if problem==None or stack is None:
+		printError("No pixel fitting problem for fit "+fit.name+".")
+		return fit if returnFit else 100000000
+	
+	sim=fit.embryo.simulation
+	tvecScaled=scaleTime(np.asarray(sim.tvecSim),sim.D,Dnew)
+	
+	try:
+		SSD,ssdByFrame=computePixelSSD(problem,stack,sim.vals,tvecScaled,prod,degr,chunk=fit.pixelChunk)
+	except ValueError:
+		pyfrp_timer_module.count('fit.objective.scalingFailed')
+		if debug:
+			printWarning("Scaling failed with Dnew = " + str(Dnew))
+		
+		if returnFit:
+			return fit
+		else:	
+			return 100000000
+	
+	fit.SSD=SSD
+	
+	if not returnFit:
+		return SSD
+	
+	#Fitted ROI averages for plotting and statistics
+	fit.fittedVecs=[]
+	fit.dataVecsFitted=[]
+	fit.tvecFit=problem['tvecData']
+	if len(fit.ROIsFitted)>0:
+		try:
+			fit,tvecScaled,tvecData,scaledSimVecs,dataVecs = scaleROIs(fit,Dnew)
+			fit.fittedVecs=addKineticsToSolution(scaledSimVecs,tvecData,prod,degr)
+			fit.dataVecsFitted=dataVecs
+			fit.tvecFit=tvecData
+		except ValueError:
+			pass
+	
+	return fit
+
 def computePinVals(vec,useMin=False,useMax=False,bkgdVal=None,debug=False):
 	
 	"""Computes pinning values of vector.
@@ -857,7 +1421,7 @@ def computeLikelihoodProfile(xOpt,fit,idx,steps=100,epsPerc=0.1,debug=False):
 		x=list(xOpt)
 		x[idx]=xv
 		
-		SSDs.append(FRAPObjFunc(x,fit,debug,None,False))
+		SSDs.append(getObjFunc(fit)(x,fit,debug,None,False))
 	
 	return xvary, SSDs
 	
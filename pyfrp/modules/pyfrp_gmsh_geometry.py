@@ -65,8 +65,9 @@ import pyfrp_geometry_module
 import pyfrp_IO_module
 import pyfrp_vtk_module
 
-#Matplotlib
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+#Matplotlib (imported on first use)
+import pyfrp_lazy_module
+art3d=pyfrp_lazy_module.lazyImport('mpl_toolkits.mplot3d.art3d')
 
 import copy as cpy
 
@@ -4809,7 +4810,7 @@ class ruledSurface(gmshElement):
 		coordsNew.append(list(coords))	
 		
 		#Add collection
-		coll=Poly3DCollection(coordsNew,alpha=alpha)
+		coll=art3d.Poly3DCollection(coordsNew,alpha=alpha)
 		coll.set_facecolor(color)
 		ax.add_collection3d(coll)
 		
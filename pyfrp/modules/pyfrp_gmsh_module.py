@@ -391,6 +391,53 @@ def runGmsh(fn,fnOut=None,debug=False,redirect=False,fnStout=None,fnSterr=None,v
 	
 	return fnOut
 
+def runGmshConcurrent(fns,fnOuts,processes=None,debug=False,volSizeMax=None,dim=3):
+	
+	"""Runs Gmsh on multiple .geo files concurrently.
+	
+	Since Gmsh runs as a seperate process, files are meshed from a pool of threads, see :py:func:`runGmsh`.
+	Meshes are first written into a temporary file next to ``fnOut`` and only moved to ``fnOut`` once 
+	Gmsh has finished, so that existing mesh files are always complete.
+	
+	Args:
+		fns (list): List of .geo filepaths.
+		fnOuts (list): List of output filepaths.
+		
+	Keyword Args:
+		processes (int): Number of Gmsh processes run at the same time. Defaults to number of CPUs.
+		debug (bool): Print debugging messages.
+		volSizeMax (float): Maximum allowed mesh element size.
+		dim (int): Dimension of mesh.
+		
+	Returns:
+		list: List of paths to mesh files.
+		
+	""" 
+	
+	from multiprocessing.pool import ThreadPool
+	
+	def run(job):
+		fn,fnOut=job
+		fnTemp=fnOut.replace('.msh','_tmp.msh')
+		runGmsh(fn,fnOut=fnTemp,debug=debug,volSizeMax=volSizeMax,dim=dim)
+		if os.path.isfile(fnTemp):
+			shutil.move(fnTemp,fnOut)
+		else:
+			printWarning("Gmsh did not create mesh for "+fn+".")
+		return pyfrp_misc_module.fixPath(fnOut)
+	
+	if len(fns)==0:
+		return []
+		
+	pool=ThreadPool(processes)
+	try:
+		fnOuts=pool.map(run,zip(fns,fnOuts))
+	finally:
+		pool.close()
+		pool.join()
+		
+	return fnOuts
+
 def getGmshBin(fnPath=None):
 	
 	"""Returns path to Gmsh binary defined in *path* file.	
@@ -50,14 +50,16 @@ of *check* functions that help to figure out if a list of coordinates is inside
 #numpy/Scipy
 import numpy as np
 
-#Plotting
-from matplotlib import cm
-import matplotlib.pyplot as plt
-import matplotlib.patches as ptc
+#Plotting (imported on first use)
+import pyfrp_lazy_module
+cm=pyfrp_lazy_module.lazyImport('matplotlib.cm')
+plt=pyfrp_lazy_module.lazyImport('matplotlib.pyplot')
+ptc=pyfrp_lazy_module.lazyImport('matplotlib.patches')
 
 #Misc
 import os, os.path
 import sys
+import time
 
 #Only import scipy functions if environment is not RTD
 if os.environ.get('READTHEDOCS', None) != 'True':
@@ -68,6 +70,20 @@ if os.environ.get('READTHEDOCS', None) != 'True':
 #PyFRAP modules
 import pyfrp_misc_module as pyfrp_misc
 import pyfrp_plot_module as pyfrp_plt
+from pyfrp_term_module import *
+
+#===========================================================================================================================================================================
+#Module variables
+#===========================================================================================================================================================================
+
+#Cached pixel grids, keyed by resolution
+pxGridCache={}
+
+#ROI attributes filled by ROI.computeIdxs
+idxAttributes=['imgIdxX','imgIdxY','imgMask','extImgIdxX','extImgIdxY','extMask','numExt','meshIdx']
+
+#Embryo shared with forked indexing workers
+sharedEmbryo=None
 
 #===========================================================================================================================================================================
 #Module Functions
@@ -93,30 +109,18 @@ def getCircleIdxImg(center,radius,res,debug=False):
 
 	"""
 		
-	#Empty index vectors
-	ind_circ_x=[]
-	ind_circ_y=[]
-	
-	if debug:
-		ind_slice_debug=np.zeros((res,res))
+	#Check all pixels at once
+	X,Y=getPxGrid(res)
+	inside=checkInsideCircle(Y+1,X+1,center,radius)
 	
-	#Go through all pixels
-	for i in range(int(res)):
-		for j in range(int(res)):
-			
-			#Check if in circle
-			if checkInsideCircle(i+1,j+1,center,radius):
-				ind_circ_x.append(i)
-				ind_circ_y.append(j)
-				if debug:
-					ind_circ_debug[i,j]=1
+	ind_circ_x,ind_circ_y=np.nonzero(inside)
 	
 	if debug:
 		#Create figure
-		fig,axes = pyfrp_plt.make_subplot([1,1],titles=["Circle"],sup="getCircleIdxImg debugging output")
-		axes[0].contourf(ind_circ_debug)
+		fig,axes = pyfrp_plt.makeSubplot([1,1],titles=["Circle"],sup="getCircleIdxImg debugging output")
+		axes[0].contourf(inside)
 		
-	return ind_circ_x,ind_circ_y
+	return list(ind_circ_x),list(ind_circ_y)
 
 def getRectangleIdxImg(offset,sidelengthX,sidelengthY,res,debug=False):
 	
@@ -587,47 +591,48 @@ def checkInsidePolyVec(x,y,poly):
 	except TypeError:
 		return checkInsidePoly(x,y,poly)
 	
-	vec=[]
-	for i in range(len(x)):
-		vec.append(checkInsidePoly(x[i],y[i],poly))
-	     
-	return vec
+	return list(checkInsidePoly(x,y,poly))
 
 def checkInsidePoly(x,y,poly):
 	
 	"""Checks if coordinate (x,y) is inside polyogn.
 	
-	Adapted from http://www.ariel.com.au/a/python-point-int-poly.html.
+	Adapted from http://www.ariel.com.au/a/python-point-int-poly.html. Casts a ray
+	for all coordinates at once, looping only over the edges of the polygon.
 	
 	.. note:: If ``x`` and ``y`` are ``float``, will return ``bool``, otherwise
 	   ``numpy.ndarray`` of booleans.
 	      
 	Args:
 		poly (list): List of (x,y)-coordinates of corners.
-		x (float): x-coordinate.
-		y (float): y-coordinate.
+		x (numpy.ndarray): Array of x-coordinates.
+		y (numpy.ndarray): Array of y-coordinates.
 			
 	Returns:
 		bool: True if inside, otherwise False.
 			
 	"""
 	
+	scalar=np.isscalar(x) and np.isscalar(y)
+	x=np.asarray(x,dtype=float)
+	y=np.asarray(y,dtype=float)
+	
 	n = len(poly)
-	inside =False
-		
+	inside=np.zeros(np.broadcast(x,y).shape,dtype=bool)
 	
 	p1x,p1y = poly[0]
 	for i in range(n+1):
 		p2x,p2y = poly[i % n]
-		if y > min(p1y,p2y):
-			if y <= max(p1y,p2y):
-				if x <= max(p1x,p2x):
-					if p1y != p2y:
-						xinters = (y-p1y)*(p2x-p1x)/(p2y-p1y)+p1x
-					if p1x == p2x or x <= xinters:
-						inside = not inside
+		if p1y!=p2y:
+			cross=(y>min(p1y,p2y)) & (y<=max(p1y,p2y)) & (x<=max(p1x,p2x))
+			if p1x!=p2x:
+				xinters = (y-p1y)*(p2x-p1x)/float(p2y-p1y)+p1x
+				cross=cross & (x<=xinters)
+			inside=inside ^ cross
 		p1x,p1y = p2x,p2y
 	
+	if scalar:
+		return bool(inside)
 	return inside
 
 def checkQuad(x,y,res):
@@ -818,9 +823,7 @@ def mask2ind(mask,res):
 	mask=mask.astype(bool)
 
 	#idx grid
-	x=np.arange(res)
-	y=np.arange(res)	
-	X,Y=np.meshgrid(x,y)
+	X,Y=getPxGrid(res)
 
 	#Slice idx grid
 	idxX_new=X[mask].flatten().astype(int)
@@ -828,6 +831,34 @@ def mask2ind(mask,res):
 	
 	return idxX_new, idxY_new
 
+def getPxGrid(res):
+	
+	"""Returns pixel index grid of an image of resolution ``res``.
+	
+	Grids are cached per resolution and returned read-only, so they can be shared
+	between ROIs and worker processes without copying.
+	
+	Args:
+		res (int): Resolution of image (e.g. 512).
+	
+	Returns:
+		tuple: Tuple containing:
+		
+			* X (numpy.ndarray): Grid of x-indices.
+			* Y (numpy.ndarray): Grid of y-indices.
+			
+	"""
+	
+	res=int(res)
+	
+	if res not in pxGridCache:
+		X,Y=np.meshgrid(np.arange(res),np.arange(res))
+		X.flags.writeable=False
+		Y.flags.writeable=False
+		pxGridCache[res]=(X,Y)
+		
+	return pxGridCache[res]
+
 def getExtendedPixelsSquare(offset,sidelength,res,debug=False):
 	
 	"""Finds theoretical pixels that could be filled up with rim
@@ -849,21 +880,12 @@ def getExtendedPixelsSquare(offset,sidelength,res,debug=False):
 			
 	"""
 	
-	indX=[]
-	indY=[]
-	
 	x=np.arange(np.floor(offset[0]),np.ceil(offset[0]+sidelength))
 	y=np.arange(np.floor(offset[1]),np.ceil(offset[1]+sidelength))
 	
-	for i in x:
-		for j in y:
-			if not checkInsideImg(i,j,res):
-				indX.append(i)
-				indY.append(j)
+	X,Y=getOutsideImgPixels(x,y,res)
 				
-	return indX,indY
-
-
+	return X.tolist(),Y.tolist()
 
 def getExtendedPixelsRectangle(offset,sidelengthX,sidelengthY,res,debug=False):
 	
@@ -887,19 +909,13 @@ def getExtendedPixelsRectangle(offset,sidelengthX,sidelengthY,res,debug=False):
 			
 	"""
 	
-	x=np.arange(np.floor(offset[1]),np.ceil(offset[0]+sidelengthX))
+	x=np.arange(np.floor(offset[0]),np.ceil(offset[0]+sidelengthX))
 	y=np.arange(np.floor(offset[1]),np.ceil(offset[1]+sidelengthY))
 	
-	indX=[]
-	indY=[]
+	X,Y=getOutsideImgPixels(x,y,res)
+	inside=checkInsideRectangle(X,Y,offset,sidelengthX,sidelengthY)
 	
-	for i in x:
-		for j in y:
-			if not checkInsideImg(i,j,res) and checkInsideRectangle(i,j,offset,sidelengthX,sidelengthY):
-				indX.append(i)
-				indY.append(j)
-				
-	return indX,indY
+	return X[inside].tolist(),Y[inside].tolist()
 
 def getExtendedPixelsCircle(center,radius,res,debug=False):
 	
@@ -925,16 +941,10 @@ def getExtendedPixelsCircle(center,radius,res,debug=False):
 	x=np.arange(np.ceil(center[0]-radius),np.floor(center[0]+radius))
 	y=np.arange(np.ceil(center[1]-radius),np.floor(center[1]+radius))
 	
-	indX=[]
-	indY=[]
+	X,Y=getOutsideImgPixels(x,y,res)
+	inside=checkInsideCircle(X,Y,center,radius)
 	
-	for i in x:
-		for j in y:
-			if not checkInsideImg(i,j,res) and checkInsideCircle(i,j,center,radius):
-				indX.append(i)
-				indY.append(j)
-				
-	return indX,indY
+	return X[inside].tolist(),Y[inside].tolist()
 
 def getExtendedPixelsPolygon(corners,res,debug=False):
 	
@@ -966,17 +976,10 @@ def getExtendedPixelsPolygon(corners,res,debug=False):
 	x=np.arange(np.floor(xmin),np.ceil(xmax))
 	y=np.arange(np.floor(ymin),np.ceil(ymax))
 	
+	X,Y=getOutsideImgPixels(x,y,res)
+	inside=checkInsidePoly(X,Y,corners)
 	
-	indX=[]
-	indY=[]
-	
-	for i in x:
-		for j in y:
-			if not checkInsideImg(i,j,res) and checkPolygon(i,j,corners):
-				indX.append(i)
-				indY.append(j)
-				
-	return indX,indY
+	return X[inside].tolist(),Y[inside].tolist()
 
 def getCommonExtendedPixels(ROIs,res,debug=False,procedures=None):
 	
@@ -1007,27 +1010,60 @@ def getCommonExtendedPixels(ROIs,res,debug=False,procedures=None):
 	x=np.arange(np.floor(xExtend[0]),np.ceil(xExtend[1]))
 	y=np.arange(np.floor(yExtend[0]),np.ceil(yExtend[1]))
 	
-	indX=[]
-	indY=[]
-	
 	if procedures==None:
 		procedures=np.ones(np.shape(ROIs))
 	
-	for i in x:
-		for j in y:
-			if not checkInsideImg(i,j,res):
-				b=True
-				for k,r in enumerate(ROIs):
-					if 1+procedures[k]:
-						b=b and r.checkXYInside(i,j)
-					else:					
-						b=b and not r.checkXYInside(i,j)
-						
-				if b:
-					indX.append(i)
-					indY.append(j)
+	#Only check pixels outside of image
+	X,Y=getOutsideImgPixels(x,y,res)
 	
-	return indX,indY
+	inside=np.ones(X.shape,dtype=bool)
+	for k,r in enumerate(ROIs):
+		if 1+procedures[k]:
+			inside=inside & np.asarray(r.checkXYInside(X,Y),dtype=bool)
+		else:
+			inside=inside & ~np.asarray(r.checkXYInside(X,Y),dtype=bool)
+	
+	return X[inside].tolist(),Y[inside].tolist()
+
+def getOutsideImgPixels(x,y,res):
+	
+	"""Returns all pixels of the grid spanned by ``x`` and ``y`` that lie outside of the image.
+	
+	That is, all pixels for which :py:func:`checkInsideImg` is ``False``. Only builds the ring of 
+	pixels around the image instead of the full grid. Pixels are ordered by x-index first, 
+	then by y-index.
+	
+	Args:
+		x (numpy.ndarray): x-coordinates of grid.
+		y (numpy.ndarray): y-coordinates of grid.
+		res (int): Resolution of image (e.g. 512).
+	
+	Returns:
+		tuple: Tuple containing:
+		
+			* X (numpy.ndarray): x-coordinates of pixels.
+			* Y (numpy.ndarray): y-coordinates of pixels.
+			
+	"""
+	
+	x=np.asarray(x,dtype=float)
+	y=np.asarray(y,dtype=float)
+	
+	xInside=np.asarray(checkInsideImg(x,0.5*res,res),dtype=bool)
+	yInside=np.asarray(checkInsideImg(0.5*res,y,res),dtype=bool)
+	
+	#Columns completely outside of image
+	XOut,YOut=np.meshgrid(x[~xInside],y,indexing='ij')
+	
+	#Columns inside image, but rows outside
+	XIn,YIn=np.meshgrid(x[xInside],y[~yInside],indexing='ij')
+	
+	X=np.concatenate([XOut.flatten(),XIn.flatten()])
+	Y=np.concatenate([YOut.flatten(),YIn.flatten()])
+	
+	order=np.lexsort((Y,X))
+	
+	return X[order],Y[order]
 
 def getCommonXYExtend(ROIs,debug=False):
 	
@@ -1086,6 +1122,71 @@ def remRepeatedImgIdxs(idxX,idxY,debug=False):
 	idxX,idxY=pyfrp_misc.unzipLists(idx)
 	return idxX,idxY
 
+def getProjectionMatrix(x,y,X,Y,method='linear'):
+	
+	"""Returns sparse matrix projecting values at scattered points ``(x,y)`` onto points ``(X,Y)``.
+	
+	Multiplying the matrix with a vector of values gives the same result as 
+	``scipy.interpolate.griddata((x,y),vals,(X,Y),method=method)``, but the triangulation
+	is only computed once. Supported methods are:
+	
+		* ``linear``: Barycentric weights of the Delaunay triangle containing each point.
+		* ``nearest``: Weight 1 for nearest point.
+	
+	Args:
+		x (numpy.ndarray): x-coordinates of scattered points.
+		y (numpy.ndarray): y-coordinates of scattered points.
+		X (numpy.ndarray): x-coordinates of points to interpolate at.
+		Y (numpy.ndarray): y-coordinates of points to interpolate at.
+		
+	Keyword Args:
+		method (str): Interpolation method.
+		
+	Returns:
+		tuple: Tuple containing:
+		
+			* P (scipy.sparse.csr_matrix): Projection matrix of shape ``(X.size,len(x))``.
+			* outside (numpy.ndarray): Boolean array of points outside of convex hull of ``(x,y)``, 
+			  which are ``nan`` in ``griddata``.
+			  
+		Returns ``(None,None)`` if method is not supported.
+	
+	"""
+	
+	from scipy import sparse
+	
+	pts=np.vstack([np.asarray(x,dtype=float),np.asarray(y,dtype=float)]).T
+	xi=np.vstack([np.asarray(X,dtype=float).ravel(),np.asarray(Y,dtype=float).ravel()]).T
+	
+	if method=='linear':
+		
+		tri=Delaunay(pts)
+		simplex=tri.find_simplex(xi)
+		inside=simplex>=0
+		
+		#Barycentric coordinates
+		T=tri.transform[simplex[inside]]
+		b=np.einsum('ijk,ik->ij',T[:,:2,:],xi[inside]-T[:,2,:])
+		weights=np.hstack([b,1-b.sum(axis=1)[:,None]])
+		
+		rows=np.repeat(np.nonzero(inside)[0],3)
+		cols=tri.simplices[simplex[inside]].ravel()
+		weights=weights.ravel()
+		
+	elif method=='nearest':
+		
+		dist,cols=cKDTree(pts).query(xi)
+		inside=np.ones(len(xi),dtype=bool)
+		rows=np.arange(len(xi))
+		weights=np.ones(len(xi))
+		
+	else:
+		return None,None
+	
+	P=sparse.csr_matrix((weights,(rows,cols)),shape=(len(xi),len(pts)))
+	
+	return P,~inside
+	
 def maskMeshByDistance(x,y,d,grid):
 	
 	"""Filters all (x,y) coordinates that are more than d 
@@ -1299,12 +1400,164 @@ def getCenterOfMass(xs,axis=0,masses=None):
 	
 	return (masses*xs.T).T.sum(axis=axis)/float(xs.shape[axis])
 
-			
+def getROIIdxSchedule(embryo):
+	
+	"""Splits ROIs of embryo into the stages in which they can be indexed.
+	
+	The master ROI has to be indexed first since all other ROIs are matched with it. Custom ROIs
+	are combined from other ROIs and thus are indexed last. All remaining ROIs are independent
+	of each other and can be indexed concurrently.
+	
+	Args:
+		embryo (pyfrp.subclasses.pyfrp_embryo.embryo): Embryo object.
+	
+	Returns:
+		list: List of stages, each a list of indices in ``embryo.ROIs``.
+	
+	"""
+	
+	masterIdx=embryo.getMasterROIIdx()
+	
+	master=[]
+	independent=[]
+	custom=[]
+	
+	for i,r in enumerate(embryo.ROIs):
+		if i==masterIdx:
+			master.append(i)
+		elif r.getType()=='custom':
+			custom.append(i)
+		else:
+			independent.append(i)
+	
+	return [master,independent,custom]
 
+def computeROIIdxWorker(i):
+	
+	"""Computes indices of i-th ROI of :py:data:`sharedEmbryo`.
+	
+	Runs inside a forked worker process of :py:func:`computeROIIdxsConcurrent`, 
+	hence only returns the indices instead of altering the ROI.
+	
+	Args:
+		i (int): Index of ROI in ``sharedEmbryo.ROIs``.
+	
+	Returns:
+		tuple: Tuple containing:
+		
+			* i (int): Index of ROI.
+			* idxs (dict): Dictionary of computed index attributes.
+			* t (float): Time spent indexing.
+	
+	"""
+	
+	r=sharedEmbryo.ROIs[i]
+	
+	start=time.time()
+	r.computeIdxs()
+	
+	return i,getROIIdxAttributes(r),time.time()-start
 
+def getROIIdxAttributes(r):
+	
+	"""Returns dictionary of all index attributes of ROI listed in :py:data:`idxAttributes`.
+	
+	Args:
+		r (pyfrp.subclasses.pyfrp_ROI.ROI): ROI.
+	
+	Returns:
+		dict: Index attributes.
+	
+	"""
+	
+	return dict([(name,getattr(r,name)) for name in idxAttributes if hasattr(r,name)])
 
-				
-				
+def computeROIIdxsConcurrent(embryo,processes=None,signal=None,debug=False):
+	
+	"""Computes image, extended and mesh indices of all ROIs of embryo, indexing 
+	independent ROIs in parallel.
+	
+	ROIs are indexed in the stages returned by :py:func:`getROIIdxSchedule`. The master ROI is indexed first
+	in the current process. Then all other non-custom ROIs are distributed over a pool of ``processes`` 
+	worker processes. Workers are forked after the master ROI, the mesh cell centers and the pixel grid
+	have been computed, so these are shared read-only instead of being recomputed or pickled. 
+	Custom ROIs are indexed last.
+	
+	If ``processes<=1``, forking is not available or this is a daemonic process, such as a worker of 
+	:py:func:`pyfrp.modules.pyfrp_batch_module.runBatch`, indexes all ROIs serially in the same order.
+	
+	Args:
+		embryo (pyfrp.subclasses.pyfrp_embryo.embryo): Embryo object.
+	
+	Keyword Args:
+		processes (int): Number of worker processes. Defaults to number of CPUs.
+		signal (PyQt4.QtCore.pyqtSignal): PyQT signal to send progress to GUI.
+		debug (bool): Print indexing time of each ROI.
+	
+	Returns:
+		list: Updated list of ROIs.
+	
+	"""
+	
+	global sharedEmbryo
+	
+	import multiprocessing
+	
+	if processes==None:
+		processes=multiprocessing.cpu_count()
+	
+	if processes>1 and sys.platform.startswith('win'):
+		printWarning("Concurrent ROI indexing requires fork, will index ROIs serially.")
+		processes=1
+	
+	#Daemonic processes are not allowed to have children
+	if multiprocessing.current_process().daemon:
+		processes=1
+		
+	master,independent,custom=getROIIdxSchedule(embryo)
+	
+	nROIs=len(embryo.ROIs)
+	nDone=[0]
+	
+	def finished(r,t):
+		nDone[0]=nDone[0]+1
+		if debug:
+			print r.name, t
+		if signal:
+			signal.emit(int(100.*nDone[0]/float(nROIs)))
+			
+	def computeSerial(idxs):
+		for i in idxs:
+			start=time.time()
+			embryo.ROIs[i].computeIdxs()
+			finished(embryo.ROIs[i],time.time()-start)
+	
+	computeSerial(master)
+	
+	if processes>1 and len(independent)>1:
+		
+		#Fill shared caches before forking
+		getPxGrid(embryo.dataResPx)
+		if embryo.simulation!=None:
+			embryo.simulation.mesh.getCellCenters()
+		
+		sharedEmbryo=embryo
+		pool=multiprocessing.Pool(processes=min(processes,len(independent)))
+		try:
+			for i,idxs,t in pool.imap_unordered(computeROIIdxWorker,independent):
+				for name,val in idxs.items():
+					setattr(embryo.ROIs[i],name,val)
+				finished(embryo.ROIs[i],t)
+			pool.close()
+		except:
+			pool.terminate()
+			raise
+		finally:
+			pool.join()
+			sharedEmbryo=None
+	else:
+		computeSerial(independent)
 	
+	computeSerial(custom)
 	
-	
\ No newline at end of file
+	return embryo.ROIs
@@ -43,49 +43,54 @@ image manipulation and reading functions used by PyFRAP. Mainly focuses on:
 #numpy
 import numpy as np
 
-#Plotting
-from matplotlib import cm
-import matplotlib.pyplot as plt
-import matplotlib.patches as ptc
+#Plotting (imported on first use)
+import pyfrp_lazy_module
+cm=pyfrp_lazy_module.lazyImport('matplotlib.cm')
+plt=pyfrp_lazy_module.lazyImport('matplotlib.pyplot')
+ptc=pyfrp_lazy_module.lazyImport('matplotlib.patches')
 
 #Misc
 import sys
 import time
 import os
 import platform
+import weakref
 
-#Bioformats
+#Bioformats (imported on first use)
 #import javabridge
-import bioformats
+bioformats=pyfrp_lazy_module.lazyImport('bioformats')
 
 #PyFRAP modules
 import pyfrp_misc_module
 import pyfrp_plot_module
 import pyfrp_idx_module
+import pyfrp_timer_module
 from pyfrp_term_module import *
 
-#Image processing
-import skimage
-import skimage.morphology
-import skimage.io
-#skimageVersion=skimage.__version__
-try:
-	if int(skimage.__version__.split('.')[1])<11:
-		import skimage.filter as skifilt
-	else:
-		import skimage.filters  as skifilt
-except:
-	import skimage.filters as skifilt
-try:	
-	import scipy.signal as spsig
-except:
-	printWarning("Cannot import scipy.signal. Will not be able to do spsig.gaussian")
-
-                    
+#Image processing (imported on first use, skimage<0.11 names filters filter)
+skimage=pyfrp_lazy_module.lazyImport('skimage')
+skifilt=pyfrp_lazy_module.lazyImport('skimage.filters',fallbacks=['skimage.filter'])
+spsig=pyfrp_lazy_module.lazyImport('scipy.signal')
+ndi=pyfrp_lazy_module.lazyImport('scipy.ndimage')
+
+#===========================================================================================================================================================================
+#Module Variables
+#===========================================================================================================================================================================
+
+maxCacheMB=1024.
+"""Memory budget in MB for processed stacks kept by :py:func:`analyzeDataset`, see :py:func:`extractROIConcs`. Set to 0 to disable caching."""
+
+cacheDtype='float32'
+"""Data type of cached processed stacks."""
+
+processedCache=weakref.WeakKeyDictionary()
+"""Processed stacks by analysis object. Entries are dropped together with their analysis and are never saved."""
+
 #===========================================================================================================================================================================
 #Module Functions
 #===========================================================================================================================================================================
 
+@pyfrp_timer_module.timed('analysis.run')
 def analyzeDataset(analysis,signal=None,embCount=None,debug=False,debugAll=False,showProgress=True):
 	
 	"""Main dataset analysis function doing the following steps.
@@ -95,6 +100,10 @@ def analyzeDataset(analysis,signal=None,embCount=None,debug=False,debugAll=False
 	* Loops through images, processing images and computing mean concentraions per ROI.
 	* Showing final debugging plots if selected.
 	
+	.. note:: Frames of a data stack that cannot be read are skipped. Their timepoints are removed from 
+	   ``embryo.tvecData``, so that data vectors, processed stack and ``tvecData`` stay aligned, 
+	   see :py:meth:`pyfrp.subclasses.pyfrp_embryo.embryo.updateTimeDimensions`.
+	
 	Args:
 		analysis (pyfrp.subclasses.pyfrp_analysis):  Object containing all necessary information for analysis.
 		
@@ -143,13 +152,13 @@ def analyzeDataset(analysis,signal=None,embCount=None,debug=False,debugAll=False
 	#Loop through images and compute concentrations
 	#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 	
-	for i in range(len(analysis.embryo.fileList)):
-		
-		#Compose filename
-		fnImg=str(analysis.embryo.getDataFolder()+'/'+analysis.embryo.getFileList()[i])
-			
-		#Reading in image
-		img=loadImg(fnImg,analysis.embryo.dataEnc)
+	nImgs=analysis.embryo.getNDataImgs()
+	
+	#Processed frames are kept for re-extraction of single ROIs
+	clearProcessedCache(analysis)
+	stack=None
+	
+	for i,img in enumerate(pyfrp_timer_module.timedIter('img.load',analysis.embryo.iterDataImgs())):
 		
 		#Check if skimage reads in image as 2D array, if not grab channel of image with maximum range
 		if len(np.shape(img))>2:
@@ -160,18 +169,29 @@ def analyzeDataset(analysis,signal=None,embCount=None,debug=False,debugAll=False
 		#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 		#Process Image
-		img = processImg(img,analysis.process,flatteningMask,bkgdMask,preMask,analysis.dataOffset,debug=debugAll)
+		with pyfrp_timer_module.span('img.process'):
+			img = processImg(img,analysis.process,flatteningMask,bkgdMask,preMask,analysis.dataOffset,debug=debugAll)
+		
+		if i==0:
+			stack=allocProcessedStack(nImgs,np.shape(img))
+		if stack is not None:
+			if i<len(stack):
+				stack[i]=img
+			else:
+				stack=None
 		
 		#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 		#Compute concentrations
 		#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 		
-		#Get rim concentrations
-		concRim=getRimConc(analysis.embryo.ROIs,img,debug=debugAll)
+		with pyfrp_timer_module.span('analysis.roiConc'):
 			
-		#Get concentrations in all ROIs
-		for r in analysis.embryo.ROIs:
-			r.dataVec.append(meanExtConc(r.imgIdxX,r.imgIdxY,img,concRim,r.numExt,analysis.addRimImg,debug=debugAll))
+			#Get rim concentrations
+			concRim=getRimConc(analysis.embryo.ROIs,img,debug=debugAll)
+				
+			#Get concentrations in all ROIs
+			for r in analysis.embryo.ROIs:
+				r.dataVec.append(meanExtConc(r.imgIdxX,r.imgIdxY,img,concRim,r.numExt,analysis.addRimImg,debug=debugAll))
 		
 		#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 		#Save first image and its concRim for simulation
@@ -192,7 +212,7 @@ def analyzeDataset(analysis,signal=None,embCount=None,debug=False,debugAll=False
 		#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 		
 		if showProgress:
-			currPerc=int(100*i/float(len(analysis.embryo.fileList)))
+			currPerc=int(100*i/float(nImgs))
 			
 			if signal==None:
 				sys.stdout.write("\r%d%%" %currPerc)  
@@ -203,6 +223,16 @@ def analyzeDataset(analysis,signal=None,embCount=None,debug=False,debugAll=False
 				else:
 					signal.emit(currPerc,embCount)
 	print
+	
+	if stack is not None:
+		storeProcessedStack(analysis,stack[:i+1])
+	
+	#Drop timepoints of frames of data stack that were skipped
+	if analysis.embryo.usesDataStack():
+		analysis.embryo.updateTimeDimensions(simUpdate=False)
+		if len(analysis.embryo.getCorruptFrames())>0:
+			printWarning("Skipped corrupt frames "+str(analysis.embryo.getCorruptFrames())+" of "+analysis.embryo.fnDataStack+". Removed their timepoints from tvecData.")
+		
 	#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 	#Final debugging plots
 	#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -224,6 +254,202 @@ def analyzeDataset(analysis,signal=None,embCount=None,debug=False,debugAll=False
 	
 	return analysis
 
+def getProcessedCacheKey(analysis):
+	
+	"""Returns key describing everything a processed stack depends on.
+	
+	That is the processing options, data offset, data files and the files used for masks. If
+	the key of an analysis changes, its cached processed stack is invalid.
+	
+	Args:
+		analysis (pyfrp.subclasses.pyfrp_analysis.analysis): Analysis object.
+		
+	Returns:
+		tuple: Key.
+	
+	"""
+	
+	emb=analysis.embryo
+	
+	return (repr(sorted(analysis.process.items())),analysis.dataOffset,
+		emb.fnDatafolder,tuple(emb.fileList),emb.dataEnc,
+		getattr(emb,'fnDataStack',''),getattr(emb,'dataSeries',0),getattr(emb,'dataChannel',0),getattr(emb,'dataZ',0),
+		analysis.fnPreimage,analysis.nPre,analysis.fnFlatten,analysis.nFlatten,analysis.fnBkgd,analysis.nBkgd)
+
+def getProcessedCacheSize():
+	
+	"""Returns memory used by all cached processed stacks in bytes."""
+	
+	return sum([entry['stack'].nbytes for entry in processedCache.values()])
+
+def allocProcessedStack(nFrames,shape):
+	
+	"""Allocates array for processed stack if it fits into :py:data:`maxCacheMB`.
+	
+	Args:
+		nFrames (int): Number of frames.
+		shape (tuple): Shape of a single frame.
+	
+	Returns:
+		numpy.ndarray: Array of shape ``(nFrames,)+shape``, or None if caching is disabled or the stack is too large.
+	
+	"""
+	
+	nBytes=nFrames*np.prod(shape)*np.dtype(cacheDtype).itemsize
+	
+	if nFrames==0 or nBytes>maxCacheMB*1024**2:
+		return None
+	
+	return np.empty((nFrames,)+tuple(shape),dtype=cacheDtype)
+
+def storeProcessedStack(analysis,stack):
+	
+	"""Stores processed stack of analysis in cache.
+	
+	Evicts the least recently used stacks of other analyses until all of them fit into :py:data:`maxCacheMB`.
+	
+	Args:
+		analysis (pyfrp.subclasses.pyfrp_analysis.analysis): Analysis object.
+		stack (numpy.ndarray): Processed stack.
+	
+	"""
+	
+	clearProcessedCache(analysis)
+	
+	budget=maxCacheMB*1024**2-stack.nbytes
+	entries=sorted(processedCache.items(),key=lambda item: item[1]['used'])
+	while len(entries)>0 and getProcessedCacheSize()>budget:
+		del processedCache[entries.pop(0)[0]]
+	
+	processedCache[analysis]={'key':getProcessedCacheKey(analysis),'stack':stack,'rimKey':getRimKey(analysis.embryo.ROIs),'used':time.time()}
+
+def getProcessedStack(analysis):
+	
+	"""Returns cached processed stack of analysis.
+	
+	Drops the stack if it does not match the current analysis settings any more, see :py:func:`getProcessedCacheKey`.
+	
+	Args:
+		analysis (pyfrp.subclasses.pyfrp_analysis.analysis): Analysis object.
+	
+	Returns:
+		numpy.ndarray: Processed stack, or None if there is no valid stack.
+	
+	"""
+	
+	entry=processedCache.get(analysis)
+	if entry==None:
+		return None
+	
+	if entry['key']!=getProcessedCacheKey(analysis):
+		clearProcessedCache(analysis)
+		return None
+	
+	entry['used']=time.time()
+	return entry['stack']
+
+def clearProcessedCache(analysis=None):
+	
+	"""Removes cached processed stack of analysis, or all stacks if ``analysis=None``."""
+	
+	if analysis==None:
+		processedCache.clear()
+	elif analysis in processedCache:
+		del processedCache[analysis]
+	
+def getRimIdxs(ROIs):
+	
+	"""Returns unique image indices of all ROIs that have *useForRim* flag on, see also :py:func:`getRimConc`.
+	
+	Args:
+		ROIs (list): List of pyfrp.subclasses.pyfrp_ROI objects.
+	
+	Returns:
+		tuple: Tuple containing:
+		
+			* idxX (numpy.ndarray): x-indices.
+			* idxY (numpy.ndarray): y-indices.
+	
+	"""
+	
+	idxX=[]
+	idxY=[]
+	for r in ROIs:
+		if r.useForRim:
+			idxX=idxX+list(r.imgIdxX)
+			idxY=idxY+list(r.imgIdxY)
+	
+	idxs=sorted(set(zip(idxX,idxY)))
+	
+	return np.array([i[0] for i in idxs],dtype=int),np.array([i[1] for i in idxs],dtype=int)
+
+def getRimKey(ROIs):
+	
+	"""Returns hashable description of rim pixels of ROIs, see :py:func:`getRimIdxs`."""
+	
+	rimIdxX,rimIdxY=getRimIdxs(ROIs)
+	return (tuple(rimIdxX),tuple(rimIdxY))
+
+def extractROIConcs(analysis,ROIs=None,debug=False):
+	
+	"""Fills ``dataVec`` of ROIs from cached processed stack of analysis, without reading and processing images again.
+	
+	Gives the same concentrations as :py:func:`analyzeDataset` (up to the precision of :py:data:`cacheDtype`), including 
+	rim concentrations for extended pixels. If the set of rim pixels changed since the last extraction, all ROIs
+	are updated.
+	
+	Args:
+		analysis (pyfrp.subclasses.pyfrp_analysis.analysis): Analysis object.
+		
+	Keyword Args:
+		ROIs (list): ROIs to update. Updates all ROIs of embryo if not given.
+		debug (bool): Print debugging messages.
+	
+	Returns:
+		list: Updated ROIs, or None if there is no valid cached stack.
+	
+	"""
+	
+	stack=getProcessedStack(analysis)
+	if stack is None:
+		if debug:
+			printNote("No valid processed stack cached for embryo "+analysis.embryo.name+".")
+		return None
+	
+	allROIs=analysis.embryo.ROIs
+	if ROIs==None:
+		ROIs=allROIs
+	
+	#Rim concentration per frame
+	rimIdxX,rimIdxY=getRimIdxs(allROIs)
+	concRims=stack[:,rimIdxX,rimIdxY].mean(axis=1,dtype='float64')
+	
+	entry=processedCache[analysis]
+	rimKey=(tuple(rimIdxX),tuple(rimIdxY))
+	if entry['rimKey']!=rimKey and analysis.addRimImg:
+		if debug:
+			printNote("Rim pixels changed, will update all ROIs.")
+		ROIs=allROIs
+	entry['rimKey']=rimKey
+	
+	for r in ROIs:
+		
+		idxX=np.asarray(r.imgIdxX,dtype=int)
+		idxY=np.asarray(r.imgIdxY,dtype=int)
+		
+		concSum=stack[:,idxX,idxY].sum(axis=1,dtype='float64')
+		concNum=len(idxX)
+		
+		if analysis.addRimImg:
+			concSum=concSum+r.numExt*concRims
+			concNum=concNum+r.numExt
+		
+		r.dataVec=(concSum/float(concNum)).tolist()
+	
+	analysis.concRim=concRims[0]
+	
+	return ROIs
+	
 def convSkio2NP(img):
 	
 	"""Returns mean concentration over given indices. 
@@ -943,6 +1169,177 @@ def substractBkgd(img,bkgd,substractMean=True,nonNeg=True):
 	
 	return img
 
+def flipQuadStack(stack,out=None):
+	
+	"""Adds all four quadrants of each frame of a stack onto its first quadrant and normalizes.
+	
+	Same as :py:func:`flipQuad`, but for stacks of shape ``(nFrames,res,res)``.
+	
+	Args:
+		stack (numpy.ndarray): Input stack.
+		
+	Keyword Args:
+		out (numpy.ndarray): Array of shape ``(nFrames,res/2,res/2)`` to write result into.
+	
+	Returns:
+		numpy.ndarray: Flipped stack.
+	"""
+	
+	h=stack.shape[1]/2
+	
+	if out is None:
+		out=np.empty((stack.shape[0],h,h))
+	
+	np.add(stack[:,:h,h:],stack[:,:h,h-1::-1],out=out)
+	out+=stack[:,:h-1:-1,h:]
+	out+=stack[:,:h-1:-1,h-1::-1]
+	out*=0.25
+	
+	return out
+
+def unflipQuadStack(stack,out=None):
+	
+	"""Mirrors first quadrant of each frame of a stack into all four quadrants.
+	
+	Same as :py:func:`unflipQuad`, but for stacks of shape ``(nFrames,res/2,res/2)``.
+	
+	Args:
+		stack (numpy.ndarray): Input stack.
+		
+	Keyword Args:
+		out (numpy.ndarray): Array of shape ``(nFrames,res,res)`` to write result into.
+	
+	Returns:
+		numpy.ndarray: Unflipped stack.
+	"""
+	
+	h=stack.shape[1]
+	
+	if out is None:
+		out=np.empty((stack.shape[0],2*h,2*h))
+	
+	out[:,:h,h:]=stack
+	out[:,h:,h:]=stack[:,::-1,:]
+	out[:,:h,:h]=stack[:,:,::-1]
+	out[:,h:,:h]=stack[:,::-1,::-1]
+	
+	return out
+
+def processImgStack(stack,processDic,flatteningMask,bkgdMask,preMask,dataOffset=1.,dtype='float64',chunkSize=None,out=None):
+
+	"""Applies image processing to a whole stack of images.
+	
+	Performs the same steps as :py:func:`processImg` on a stack of shape ``(nFrames,res,res)``,
+	but on all frames at once:
+	
+	* Median and gaussian filters are applied via ``scipy.ndimage`` along the two spatial axes only. 
+	  They give the same results as ``scipy.signal.medfilt`` and ``skimage.filters.gaussian``.
+	* Flattening, background substraction and norming are done in-place, norming mask is computed once.
+	* Quadrant reduction writes directly into the output array.
+	
+	All work is done in two preallocated buffers of ``chunkSize`` frames, so memory usage is 
+	bounded by the output array plus two chunks. With ``dtype='float32'`` memory usage is halved.
+	
+	Args:
+		stack (numpy.ndarray): Input stack.
+		processDic (dict): Dictionary defining what to do. See also pyfrp.subclasses.pyfrp_analysis .
+		flatteningMask (np.ndarray): Flattening mask that will be used if flattening is selected.
+		bkgdMask (numpy.ndarray): Background mask that will be used if background substraction is selected.
+		preMask (numpy.ndarray): Preimage mask that will be used if norming is selected.
+		
+	Keyword Args:
+		dataOffset (float): Offset used for norming.
+		dtype (str): Datatype used for processing and output.
+		chunkSize (int): Number of frames processed at once. Processes all frames at once if ``None``.
+		out (numpy.ndarray): Array to write output into.
+	
+	Returns:
+		numpy.ndarray: Processed stack.
+	"""
+	
+	nFrames=stack.shape[0]
+	res=stack.shape[1:]
+	
+	if chunkSize==None:
+		chunkSize=nFrames
+	chunkSize=max(min(chunkSize,nFrames),1)
+	
+	if out is None:
+		out=np.empty(stack.shape,dtype=dtype)
+	
+	quad='quad' in processDic.keys()
+	flipBefore=quad and 'flipBeforeProcess' in processDic.keys()
+	median='median' in processDic.keys()
+	gaussian='gaussian' in processDic.keys() and 'norm' not in processDic.keys()
+	
+	#Masks are only converted once
+	if 'flatten' in processDic.keys():
+		flatteningMask=np.asarray(flatteningMask,dtype=dtype)
+	if 'norm' in processDic.keys():
+		normDenom=np.asarray(preMask,dtype=dtype)+dataOffset
+	
+	#Preallocate buffers, frames are only half the size if flipped first
+	if flipBefore:
+		shape=(chunkSize,res[0]/2,res[1]/2)
+	else:
+		shape=(chunkSize,)+res
+	buf=np.empty(shape,dtype=dtype)
+	tmp=np.empty(shape,dtype=dtype) if median or gaussian else None
+	half=np.empty((chunkSize,res[0]/2,res[1]/2),dtype=dtype) if quad and not flipBefore else None
+	
+	for i in range(0,nFrames,chunkSize):
+		
+		n=min(chunkSize,nFrames-i)
+		
+		a=buf[:n]
+		b=tmp[:n] if tmp is not None else None
+		
+		#Flip image in case of quad_red and flip_before_process
+		if flipBefore:
+			flipQuadStack(stack[i:i+n],out=a)
+		else:
+			a[...]=stack[i:i+n]
+		
+		#Apply median filter for denoising (zero-padded as scipy.signal.medfilt)
+		if median:
+			k=int(processDic['median'])
+			with pyfrp_timer_module.span('img.process.median'):
+				ndi.median_filter(a,size=(1,k,k),mode='constant',cval=0.,output=b)
+			a,b=b,a
+		
+		#Apply gaussian blur to smooth out image (same boundaries as skimage)
+		if gaussian:
+			sigma=processDic['gaussian']
+			with pyfrp_timer_module.span('img.process.gaussian'):
+				ndi.gaussian_filter(a,sigma=(0,sigma,sigma),mode='nearest',output=b)
+			a,b=b,a
+		
+		#Flatten img
+		if 'flatten' in processDic.keys():
+			with pyfrp_timer_module.span('img.process.flatten'):
+				a*=flatteningMask
+		
+		#Background substraction, only makes sure image stays non-negative
+		if 'bkgd' in processDic.keys():
+			with pyfrp_timer_module.span('img.process.bkgd'):
+				np.putmask(a,a<0,1.)
+		
+		#Normalize by pre image
+		if 'norm' in processDic.keys():
+			with pyfrp_timer_module.span('img.process.norm'):
+				a+=dataOffset
+				a/=normDenom
+		
+		#Quad reduction
+		if flipBefore:
+			unflipQuadStack(a,out=out[i:i+n])
+		elif quad:
+			unflipQuadStack(flipQuadStack(a,out=half[:n]),out=out[i:i+n])
+		else:
+			out[i:i+n]=a
+	
+	return out
+
 def processImg(img,processDic,flatteningMask,bkgdMask,preMask,dataOffset=1.,axes=None,debug=False):
 
 	"""Main image processing function containing the following steps:
@@ -953,6 +1350,8 @@ def processImg(img,processDic,flatteningMask,bkgdMask,preMask,dataOffset=1.,axes
 	* Norming.
 	* Background substraction.
 	* Flattening.
+	
+	Single-frame version of :py:func:`processImgStack`.
 		
 	Args:
 		img (numpy.ndarray): Input image.
@@ -972,40 +1371,7 @@ def processImg(img,processDic,flatteningMask,bkgdMask,preMask,dataOffset=1.,axes
 	"""
 	
 	
-	#Flip image in case of quad_red and flip_before_process
-	if 'quad' in processDic.keys():
-		if 'flipBeforeProcess' in processDic.keys():
-			img=flipQuad(img,debug=debug)
-	
-	#Apply median filter for denoising
-	if 'median' in processDic.keys():
-		img = medianFilter(img,radius=processDic['median'],debug=debug)
-	
-	#Apply gaussian blur to smooth out image
-	if 'gaussian' in processDic.keys() and 'norm' not in processDic.keys():
-		img = gaussianFilter(img,sigma=processDic['gaussian'],debug=debug)
-	
-	#Flatten img
-	if 'flatten' in processDic.keys():
-		img = flattenImg(img,flatteningMask)
-	
-	#Background Substraction
-	if 'bkgd' in processDic.keys():
-		img = substractBkgd(img,bkgdMask,substractMean=False)
-	
-	#Normalize by pre image
-	if 'norm' in processDic.keys():
-		img = normImg(img,preMask,dataOffset=dataOffset,debug=debug)
-	
-	#Quad reduction
-	if 'quad' in processDic.keys():
-		if 'flipBeforeProcess' in processDic.keys():
-			#Flip image back in case of quad_red and flip_before_process (Need to unflip so that indices found by get_ind_regions still fit with image size)
-			img=unflipQuad(img,debug=debug)
-		else:	
-			#Flip and unflip image again to average over first quadrant (Need to unflip so that indices found by get_ind_regions still fit with image size)
-			img=flipQuad(img,debug=debug)
-			img=unflipQuad(img,debug=debug)	
+	img=processImgStack(np.asarray(img)[np.newaxis],processDic,flatteningMask,bkgdMask,preMask,dataOffset=dataOffset)[0]
 	
 	if debug or axes!=None:
 		
@@ -1068,11 +1434,35 @@ def imgHist(img,binMin=0,binMax=65535,nbins=256,binSize=1,binsFit=True,fixSize=F
 	
 	return bins,hist,w
 
+def fixedThreshMask(img,thresh,smaller=False):
+	
+	"""Returns boolean mask of pixels greater (or smaller) than thresh.
+	
+	Works for single images as well as whole image stacks.
+	
+	Args:
+		img (numpy.ndarray): Image or image stack.
+		thresh (float): Threshold used.
+		
+	Keyword Args:
+		smaller (bool): Mask pixels smaller instead of greater than thresh.
+		
+	Returns:
+		numpy.ndarray: Boolean mask.
+	"""
+	
+	if smaller:
+		return img<thresh
+	else:
+		return img>thresh
+	
 def fixedThresh(img,thresh,smaller=False,fill=np.nan):
 	
 	"""Apply fixed threshold to image and fill pixels with values 
 	greater than thresh with fill value .
-		
+	
+	See also :py:func:`fixedThreshMask`.
+	
 	Args:
 		img (numpy.ndarray): Image for thresholding.
 		thresh (float): Threshold used.
@@ -1089,14 +1479,12 @@ def fixedThresh(img,thresh,smaller=False,fill=np.nan):
 			* indY (numpy.ndarray): y-indices of pixels that where thresholded. 
 	"""
 	
-	#Find pixels greater than thresh 
-	if smaller:
-		indX,indY=np.where(img<thresh)
-	else:
-		indX,indY=np.where(img>thresh)
+	mask=fixedThreshMask(img,thresh,smaller=smaller)
 	
 	#fill with value
-	img[indX,indY]=fill
+	img[mask]=fill
+	
+	indX,indY=np.nonzero(mask)
 	
 	return img,indX,indY
 
@@ -1281,124 +1669,237 @@ def getMeanIntensitiesImgs(fnFolder,fileList,dataEnc):
 		
 	return meanIntensities	
 
-def radialImgHist(img,center,maxR=None,nbins=10):
+def getPxCoordinates(shape):
 	
-	"""Computes radial histogram of image from center.
+	"""Returns x/y-coordinates of all pixels of an image.
 	
-	Args:
-		img (numpy.ndarray): Image to be profiled
-		center (list): Center of image.
+	.. note:: Follows the convention used when interpolating images onto meshes, 
+	   that is ``x`` is the column and ``y`` the row index of a pixel.
 	
-	Keyword Args:
-		nbins (int): Number of bins of histogram.
-		maxR (float): Maximum radius considered.
+	Args:
+		shape (tuple): Shape of image.
 		
 	Returns:
 		tuple: Tuple containing:
 
-			* bins (numpy.ndarray): Bin vector.
-			* binsMid (numpy.ndarray): Array of midpoints of bins.
-			* histY (numpy.ndarray): Array of number of items per bin.
-			* binY (numpy.ndarray): Array of average value per bin.
-		
+			* x (numpy.ndarray): x-coordinates, same shape as image.
+			* y (numpy.ndarray): y-coordinates, same shape as image.
+	
 	"""
 	
-	# Put image in 1D array
-	z=img.flatten()
-
-	# Get coordinates of pixels
-	res=img.shape[0]
-	X,Y=np.meshgrid(np.arange(res),np.arange(res))
-	x=X.flatten()
-	y=Y.flatten()
+	x,y=np.meshgrid(np.arange(shape[1]),np.arange(shape[0]))
+	return x,y
 
-	# Compute radii
-	c=np.array([np.complex(xc,yc) for xc,yc in zip(x,y)])
-	centerC=np.complex(center[0],center[1])
-	r=np.abs(c-centerC)
+def computeRadii(x,y,center):
 	
-	# Get maximum radis if not given
-	if maxR==None:
-		maxR=max(r)+1E-10
+	"""Computes distances of points to center.
 	
-	# Create bin vector
-	bins=np.linspace(0,maxR,nbins+1)
-
-	# Empty list for result
-	histY=[]
-	binY=[]
-
-	# Compute binY
-	for i in range(len(bins)-1):
-		ind=np.where((bins[i]<=r) * (r<bins[i+1]))[0]
-		histY.append(np.nansum(ind))
-		binY.append(np.nanmean(z[ind]))
-				
-	# Bin centers
-	binMid=bins[:-1]+np.diff(bins)
+	Works for both pixel coordinates (see :py:func:`getPxCoordinates`) and 
+	mesh cell centers.
 	
-	return bins,binMid,histY,binY
-				
-def radialImgHist2(img,center,nbins=10,byMean=True,maxR=None):
+	Args:
+		x (numpy.ndarray): x-coordinates.
+		y (numpy.ndarray): y-coordinates.
+		center (list): Center.
+		
+	Returns:
+		numpy.ndarray: Array of radii.
 	
-	"""Computes radial histogram of image from center.
+	"""
 	
-	This is an old version of :py:func`pyfrp.modules.pyfrp_img_module.radialImgHist`. If you are looking
-	for performance, you might prefer the new version.
+	return np.hypot(np.asarray(x,dtype=float)-center[0],np.asarray(y,dtype=float)-center[1])
+
+def computeBinIdx(x,bins):
 	
-	Args:
-		img (numpy.ndarray): Image to be profiled
-		center (list): Center of image.
+	"""Computes integer bin labels of values.
 	
-	Keyword Args:
-		nbins (int): Number of bins of histogram.
-		byMean (bool): Norm bins by number of items in bin.
-		maxR (float): Maximum radius considered.
+	Bins are half-open ``[bins[i],bins[i+1])``, except for the last bin which also 
+	contains its right edge. Values outside of ``bins`` get label ``len(bins)-1``, 
+	so they can be dropped after counting with ``np.bincount``.
+	
+	Args:
+		x (numpy.ndarray): Values.
+		bins (numpy.ndarray): Bin edges.
 		
 	Returns:
-		tuple: Tuple containing:
-
-			* bins (numpy.ndarray): Bin vector.
-			* binsMid (numpy.ndarray): Array of midpoints of bins.
-			* histY (numpy.ndarray): Array of number of items per bin.
+		numpy.ndarray: Bin labels.
+	
+	"""
+	
+	x=np.asarray(x)
+	nbins=len(bins)-1
+	
+	idx=np.searchsorted(bins,x,side='right')-1
+	idx[x==bins[-1]]=nbins-1
+	idx[(idx<0)|(idx>=nbins)]=nbins
+	
+	return idx
+
+def binnedMean(x,vals,bins):
+	
+	"""Computes mean of values in each bin along ``x``.
+	
+	Uses integer bin labels (see :py:func:`computeBinIdx`) and ``np.bincount``, so
+	there is no loop over bins. ``vals`` can either be a single array of the same size
+	as ``x``, or a batch of arrays of shape ``(nFrames,len(x))``. ``nan`` values are ignored.
+	
+	Args:
+		x (numpy.ndarray): Values used for binning.
+		vals (numpy.ndarray): Values to be averaged.
+		bins (numpy.ndarray): Bin edges.
+		
+	Returns:
+		tuple: Tuple containing:
+
+			* histY (numpy.ndarray): Array of number of items per bin.
+			* binY (numpy.ndarray): Array of average value per bin, ``nan`` if bin is empty.
+		
+	"""
+	
+	x=np.asarray(x)
+	vals=np.asarray(vals,dtype=float)
+	batch=vals.shape!=x.shape
+	x=x.ravel()
+	vals=vals.reshape(-1,x.size)
+	
+	nbins=len(bins)-1
+	nFrames=vals.shape[0]
+	
+	#Bin labels, offset for each frame so a single bincount does all frames
+	idx=computeBinIdx(x,bins)
+	labels=(idx+(nbins+1)*np.arange(nFrames)[:,None]).ravel()
+	
+	#Ignore nan values
+	valid=np.isfinite(vals).ravel()
+	
+	histY=np.bincount(idx,minlength=nbins+1)[:nbins]
+	sums=np.bincount(labels,weights=np.where(valid,vals.ravel(),0.),minlength=nFrames*(nbins+1)).reshape(nFrames,nbins+1)[:,:nbins]
+	counts=np.bincount(labels,weights=valid,minlength=nFrames*(nbins+1)).reshape(nFrames,nbins+1)[:,:nbins]
+	
+	with np.errstate(divide='ignore',invalid='ignore'):
+		binY=sums/counts
+	
+	if not batch:
+		binY=binY[0]
+	
+	return histY,binY
+
+def radialHist(x,y,vals,center,maxR=None,nbins=10):
+	
+	"""Computes radial histogram of values at coordinates ``x``, ``y`` from center.
+	
+	This is the radial binning used by :py:func:`radialImgHist`, but works on any
+	set of points, for example mesh cell centers:
+	
+	>>> x,y,z=emb.simulation.mesh.getCellCenters()
+	>>> bins,binsMid,histY,binY=pyfrp_img_module.radialHist(x,y,emb.simulation.IC.value,emb.geometry.getCenter())
+	
+	Args:
+		x (numpy.ndarray): x-coordinates.
+		y (numpy.ndarray): y-coordinates.
+		vals (numpy.ndarray): Values, either of same shape as ``x`` or of shape ``(nFrames,x.size)``.
+		center (list): Center.
+	
+	Keyword Args:
+		nbins (int): Number of bins of histogram.
+		maxR (float): Maximum radius considered.
+		
+	Returns:
+		tuple: Tuple containing:
+
+			* bins (numpy.ndarray): Bin vector.
+			* binsMid (numpy.ndarray): Array of midpoints of bins.
+			* histY (numpy.ndarray): Array of number of items per bin.
 			* binY (numpy.ndarray): Array of average value per bin.
 		
 	"""
 	
-	#Get resolution
-	res=img.shape[0]
+	r=computeRadii(x,y,center)
 	
-	#Compute max distance from corners
+	# Get maximum radius if not given
 	if maxR==None:
-		maxR=max(dist(center,[0,0]),dist(center,[res,res]))
+		maxR=r.max()+1E-10
 	
-	#Create vector with bins
+	# Create bin vector
 	bins=np.linspace(0,maxR,nbins+1)
+	binsMid=0.5*(bins[1:]+bins[:-1])
+	
+	histY,binY=binnedMean(r,vals,bins)
+	
+	return bins,binsMid,histY,binY
+
+def radialImgHist(img,center,maxR=None,nbins=10):
+	
+	"""Computes radial histogram of image from center.
+	
+	If ``img`` is a stack of shape ``(nFrames,res,res)``, all frames are binned at 
+	once and ``binY`` has shape ``(nFrames,nbins)``.
+	
+	See also :py:func:`radialHist`.
+	
+	Args:
+		img (numpy.ndarray): Image to be profiled
+		center (list): Center of image.
+	
+	Keyword Args:
+		nbins (int): Number of bins of histogram.
+		maxR (float): Maximum radius considered.
+		
+	Returns:
+		tuple: Tuple containing:
+
+			* bins (numpy.ndarray): Bin vector.
+			* binsMid (numpy.ndarray): Array of midpoints of bins.
+			* histY (numpy.ndarray): Array of number of items per bin.
+			* binY (numpy.ndarray): Array of average value per bin.
+		
+	"""
+	
+	img=np.asarray(img)
+	x,y=getPxCoordinates(img.shape[-2:])
 	
-	#Create result vectors
-	histY=np.zeros(nbins)
-	binY=np.zeros(nbins)
+	if img.ndim>2:
+		img=img.reshape(img.shape[0],-1)
 	
-	for i in range(res):
-		for j in range(res):
-			for k in range(nbins):
-				d=dist([i,j],center)
+	return radialHist(x,y,img,center,maxR=maxR,nbins=nbins)
 				
-				if k==0:
-					if bins[k]<=d and d<=bins[k+1]:
-						binY[k]=binY[k]+img[i,j]
-						histY[k]=histY[k]+1
-						break
-				else:
-					if bins[k]<d and d<=bins[k+1]:
-						binY[k]=binY[k]+img[i,j]
-						histY[k]=histY[k]+1
-						break
+def radialImgHist2(img,center,nbins=10,byMean=True,maxR=None):
+	
+	"""Computes radial histogram of image from center.
+	
+	This is an old version of :py:func`pyfrp.modules.pyfrp_img_module.radialImgHist`, using
+	row indices as x-coordinates. It now wraps :py:func:`radialImgHist`.
+	
+	Args:
+		img (numpy.ndarray): Image to be profiled
+		center (list): Center of image.
+	
+	Keyword Args:
+		nbins (int): Number of bins of histogram.
+		byMean (bool): Norm bins by number of items in bin.
+		maxR (float): Maximum radius considered.
+		
+	Returns:
+		tuple: Tuple containing:
+
+			* bins (numpy.ndarray): Bin vector.
+			* binsMid (numpy.ndarray): Array of midpoints of bins.
+			* histY (numpy.ndarray): Array of number of items per bin.
+			* binY (numpy.ndarray): Array of average value per bin.
 		
-	if byMean:
-		binY=binY/histY
+	"""
+	
+	#Get resolution
+	res=img.shape[0]
 	
-	binsMid = [(bins[j+1] + bins[j])/2. for j in range(len(bins)-1)]
+	#Compute max distance from corners
+	if maxR==None:
+		maxR=max(dist(center,[0,0]),dist(center,[res,res]))
+	
+	bins,binsMid,histY,binY=radialImgHist(np.asarray(img).T,center,nbins=nbins,maxR=maxR)
+	
+	if not byMean:
+		binY=np.nan_to_num(binY*histY)
 	
 	return bins,binsMid,histY,binY
 
@@ -1551,24 +2052,15 @@ def computeRadialProfile(img,center):
 			* v (numpy.ndarray): Array of corresponding image values.
 	"""
 	
-	#Empty lists
-	r=[]
-	v=[]
-	
-	#Get resolution
-	res=img.shape[0]
-	
-	#Compute radial profile
-	for i in range(res):
-		for j in range(res):
-			r.append(dist([i,j],center))
-			v.append(img[i,j])
+	#Compute radii, x being the row index here
+	x,y=getPxCoordinates(img.shape)
+	r=computeRadii(y,x,center).ravel()
+	v=np.asarray(img).ravel()
 	
 	#Sort according to radius
-	s=sorted(zip(r, v), key=lambda r:r[0])
-	s=np.asarray(s)
-	r=s[:,0]		
-	v=s[:,1]
+	s=np.argsort(r,kind='mergesort')
+	r=r[s]
+	v=v[s]
 	
 	return r,v
 
@@ -1691,11 +2183,155 @@ def findMinOffset(fnFolder,fileList,dataEnc,oldOffset=None,defaultAdd=1.,debug=F
 
 	return abs(minVal)+defaultAdd
 
+def computeOtsuThreshFromHist(hist,axis=-1):
+	
+	"""Computes Otsu's optimal threshold bin from histogram(s).
+	
+	Vectorized version of the between-class variance maximization in Fiji's Otsu algorithm,
+	using cumulative sums over the histogram instead of a loop over bins. Like Fiji, 
+	endpoints are excluded and ties are resolved by taking the largest bin.
+	
+	See also http://imagej.nih.gov/ij/source/ij/process/AutoThresholder.java.
+	
+	Args:
+		hist (numpy.ndarray): Histogram or array of histograms.
+		
+	Keyword Args:
+		axis (int): Axis along which histograms are given.
+		
+	Returns:
+		numpy.ndarray: Index of optimal threshold bin (per histogram).
+	
+	"""
+	
+	hist=np.moveaxis(np.asarray(hist,dtype=np.float64),axis,-1)
+	L=hist.shape[-1]
+	
+	k=np.arange(L)
+	
+	#Total histogram intensity and number of data points
+	S=(k*hist).sum(axis=-1)[...,None]
+	N=hist.sum(axis=-1)[...,None]
+	
+	#Cumulative intensity and number of data points for each possible threshold
+	Sk=np.cumsum(k*hist,axis=-1)[...,1:L-1]
+	N1=np.cumsum(hist,axis=-1)[...,1:L-1]
+	
+	#Between-class variance
+	denom=N1*(N-N1)
+	num=(N1/N)*S-Sk
+	
+	with np.errstate(divide='ignore',invalid='ignore'):
+		BCV=np.where(denom!=0,num*num/denom,0.)
+	
+	#Last maximum, as Fiji uses BCV >= BCVmax
+	kStar=BCV.shape[-1]-1-np.argmax(BCV[...,::-1],axis=-1)
+	
+	return kStar+1
+
+def computeOtsuThresh(img,nbins=256):
+	
+	"""Computes Otsu's optimal threshold of an image.
+	
+	See also :py:func:`computeOtsuThreshFromHist`.
+	
+	Args:
+		img (numpy.ndarray): Image.
+	
+	Keyword Args:
+		nbins (int): Number of histogram bins.
+	
+	Returns:
+		float: Optimal threshold.
+	
+	"""
+	
+	data,binEdges=np.histogram(img,bins=nbins)
+	binWidth=np.diff(binEdges)[0]
+	
+	return binEdges[0]+computeOtsuThreshFromHist(data)*binWidth
+
+def computeOtsuThreshStack(stack,nbins=256):
+	
+	"""Computes Otsu's optimal threshold for each image of a stack.
+	
+	Histograms of all frames are computed in a single ``np.bincount`` call, with bins
+	spanning the range of each frame individually, just as in :py:func:`computeOtsuThresh`.
+	
+	Args:
+		stack (numpy.ndarray): Image stack of shape ``(T,H,W)``.
+	
+	Keyword Args:
+		nbins (int): Number of histogram bins.
+	
+	Returns:
+		numpy.ndarray: Optimal threshold per frame.
+	
+	"""
+	
+	stack=np.asarray(stack)
+	T=stack.shape[0]
+	flat=stack.reshape(T,-1)
+	
+	minVals=flat.min(axis=1).astype(np.float64)
+	maxVals=flat.max(axis=1).astype(np.float64)
+	
+	#Same convention as np.histogram for constant images
+	same=maxVals==minVals
+	minVals[same]=minVals[same]-0.5
+	maxVals[same]=maxVals[same]+0.5
+	
+	binWidths=(maxVals-minVals)/nbins
+	
+	#Bin labels of all pixels, offset by frame
+	labels=((flat-minVals[:,None])/binWidths[:,None]).astype(np.int64)
+	np.clip(labels,0,nbins-1,out=labels)
+	labels+=(np.arange(T)*nbins)[:,None]
+	
+	hists=np.bincount(labels.ravel(),minlength=T*nbins).reshape(T,nbins)
+	
+	return minVals+computeOtsuThreshFromHist(hists)*binWidths
+
+def otsuMask(img,thresh=None,nbins=256):
+	
+	"""Returns boolean mask of all pixels above Otsu's threshold.
+	
+	Works for single images and stacks of shape ``(T,H,W)``. For stacks, 
+	thresholds are computed per frame via :py:func:`computeOtsuThreshStack`.
+	
+	Args:
+		img (numpy.ndarray): Image or image stack.
+	
+	Keyword Args:
+		thresh (float): Precomputed threshold(s).
+		nbins (int): Number of histogram bins.
+	
+	Returns:
+		tuple: Tuple containing:
+		
+			* mask (numpy.ndarray): Boolean mask.
+			* thresh (float): Used threshold(s).
+	
+	"""
+	
+	img=np.asarray(img)
+	
+	if img.ndim==3:
+		if thresh is None:
+			thresh=computeOtsuThreshStack(img,nbins=nbins)
+		return img>np.asarray(thresh)[:,None,None],thresh
+	
+	if thresh is None:
+		thresh=computeOtsuThresh(img,nbins=nbins)
+	
+	return img>thresh,thresh
+
 def otsuImageJ(img,maxVal,minVal,debug=False):
 	
 	"""Python implementation of Fiji's Otsu algorithm. 
 	
-	See also http://imagej.nih.gov/ij/source/ij/process/AutoThresholder.java.
+	See also http://imagej.nih.gov/ij/source/ij/process/AutoThresholder.java, 
+	:py:func:`computeOtsuThresh` and :py:func:`otsuMask`.
 
 	Args:
 		img (numpy.ndarray): Image as 2D-array.
@@ -1712,79 +2348,26 @@ def otsuImageJ(img,maxVal,minVal,debug=False):
 			* binImg (np.ndarray): Binary image
 	"""
 	
-	#Initialize values
-	#L = img.max()
 	L = 256
-	S = 0 
-	N = 0
-	
-	#Compute histogram
-	data,binEdges=np.histogram(img,bins=L)
-	binWidth=np.diff(binEdges)[0]
 	
 	#Debugging plot for histogram
 	if debug:
-		binVec=arange(L)
+		data,binEdges=np.histogram(img,bins=L)
 		fig=plt.figure()
 		fig.show()
 		ax=fig.add_subplot(121)
-		ax.bar(binVec,data)
+		ax.bar(np.arange(L),data)
 		plt.draw()
-			
-	for k in range(L):
-		#Total histogram intensity
-		S = S+ k * data[k]
-		#Total number of data points
-		N = N + data[k]		
-	
-	#Temporary variables
-	Sk = 0
-	BCV = 0
-	BCVmax=0
-	kStar = 0
-	
-	#The entry for zero intensity
-	N1 = data[0] 
-	
-	#Look at each possible threshold value,
-	#calculate the between-class variance, and decide if it's a max
-	for k in range (1,L-1): 
-		#No need to check endpoints k = 0 or k = L-1
-		Sk = Sk + k * data[k]
-		N1 = N1 + data[k]
-
-		#The float casting here is to avoid compiler warning about loss of precision and
-		#will prevent overflow in the case of large saturated images
-		denom = float(N1 * (N - N1)) 
-
-		if denom != 0:
-			#Float here is to avoid loss of precision when dividing
-			num = ( float(N1) / float(N) ) * S - Sk 
-			BCV = (num * num) / denom
-		
-		else:
-			BCV = 0
-
-		if BCV >= BCVmax: 
-			#Assign the best threshold found so far
-			BCVmax = BCV
-			kStar = k
 	
-	kStar=binEdges[0]+kStar*binWidth
+	mask,kStar=otsuMask(img,nbins=L)
 	
 	#Now manipulate the image
-	binImg=np.zeros(np.shape(img))
-	for i in range(np.shape(img)[0]):
-		for j in range(np.shape(img)[1]):
-			if img[i,j]<=kStar:
-				binImg[i,j]=minVal
-			else:				
-				binImg[i,j]=maxVal
+	binImg=np.where(mask,float(maxVal),float(minVal))
 	
 	if debug:
 		print "Optimal threshold = ", kStar
-		print "#Pixels above threshold = ", sum(binImg)/float(maxVal)
-		print "#Pixels below threshold = ", np.shape(img)[0]**2-sum(binImg)/float(maxVal)
+		print "#Pixels above threshold = ", mask.sum()
+		print "#Pixels below threshold = ", mask.size-mask.sum()
 		
 		ax2=fig.add_subplot(122)
 		ax2.contourf(binImg)
@@ -1793,6 +2376,28 @@ def otsuImageJ(img,maxVal,minVal,debug=False):
 			
 	return kStar,binImg	
 
+def otsuImageJStack(stack,maxVal,minVal):
+	
+	"""Applies Fiji's Otsu algorithm to each frame of an image stack.
+	
+	See also :py:func:`otsuImageJ` and :py:func:`computeOtsuThreshStack`.
+	
+	Args:
+		stack (numpy.ndarray): Image stack of shape ``(T,H,W)``.
+		maxVal (int): Value assigned to pixels above threshold.
+		minVal (int): Value assigned to pixels below threshold.
+		
+	Returns:
+		tuple: Tuple containing:
+		
+			* kStars (numpy.ndarray): Optimal threshold per frame.
+			* binImgs (np.ndarray): Binary image stack.
+	"""
+	
+	mask,kStars=otsuMask(stack)
+	
+	return kStars,np.where(mask,float(maxVal),float(minVal))
+
 def extractMicroscope(folder,ftype,fijiBin=None,macroPath=None,debug=False,batch=True):
 	
 	"""Converts all microscopy files of type ftype in folder to files using Fiji.
@@ -1899,6 +2504,10 @@ def readBioFormats(fn,debug=True,series=0,channel='all'):
 	
 	"""Reads bioformats image file.
 	
+	Only reads the requested series and channels. Corrupt planes are detected
+	while reading and replaced by planes filled with ``NaN``, so that z- and t-indices 
+	of all other planes are preserved.
+	
 	.. note:: ``series='all'`` returns all datasets.
 	
 	.. note:: ``channel='all'`` returns all channels.
@@ -1920,10 +2529,14 @@ def readBioFormats(fn,debug=True,series=0,channel='all'):
 	
 	"""
 	
-	#javabridge.start_vm(class_path=bioformats.JARS)
-	
 	meta=readBioFormatsMeta(fn)
 	
+	#Only loop through requested series
+	if series=='all':
+		seriesIdxs=range(meta.image_count)
+	else:
+		seriesIdxs=[series]
+	
 	#Empty list to put datasets in	
 	images=[]
 	fnsLoaded=[]
@@ -1931,31 +2544,26 @@ def readBioFormats(fn,debug=True,series=0,channel='all'):
 	#Open with reader class
 	with bioformats.ImageReader(fn) as reader:
 		
-		#Loop through all images
-		for i in range(meta.image_count):
+		for i in seriesIdxs:
 			
-			channels=[]
+			if channel=='all':
+				channelIdxs=range(meta.image(i).Pixels.SizeC)
+			else:
+				channelIdxs=[channel]
 			
-			#Check if there is a corrupt zstack for this particular dataset
-			problematicStacks=checkProblematicStacks(reader,meta,i,debug=debug)
+			channels=[]
 			
-			#Loop through all channels
-			for j in range(meta.image(i).Pixels.SizeC):
+			for j in channelIdxs:
 				
 				zStacks=[]
 				
-				#Loop through all zStacks
 				for k in range(meta.image(i).Pixels.SizeZ):
-					
 					for t in range(meta.image(i).Pixels.SizeT):
-					
-						#Check if corrupted
-						if k not in problematicStacks:
-							img=reader.read(series=i, c=j, z=k,t=t, rescale=False)
-							zStacks.append(img)
-					
-				#Append to channels
-				channels.append(zStacks)
+						
+						#Keep placeholder if plane is corrupted
+						zStacks.append(readBioFormatsPlane(reader,i,j,k,t,debug=debug))
+				
+				channels.append(fillCorruptPlanes(zStacks))
 			
 			#Append to list of datasets and converts it to numpy array
 			images.append(np.asarray(channels))
@@ -1963,17 +2571,68 @@ def readBioFormats(fn,debug=True,series=0,channel='all'):
 	
 	# Select correct series
 	if series!='all':
-		images=images[series]
+		images=images[0]
 	
 	# Select correct channel
 	if channel!='all':
-		images=images[channel]
-		
-	#Kill java VM
-	#javabridge.kill_vm()
+		if series=='all':
+			images=[img[0] for img in images]
+		else:
+			images=images[0]
 	
 	return images,meta,fnsLoaded
 
+def fillCorruptPlanes(planes):
+	
+	"""Replaces placeholders of corrupt planes by planes filled with ``NaN``.
+	
+	If there are corrupt planes, all planes are converted to float.
+	
+	Args:
+		planes (list): List of planes, ``None`` for corrupt planes.
+		
+	Returns:
+		list: List of planes.
+	
+	"""
+	
+	readable=[img for img in planes if img is not None]
+	if len(readable)==len(planes) or len(readable)==0:
+		return planes
+	
+	placeholder=np.nan*np.ones(np.shape(readable[0]))
+	
+	return [placeholder if img is None else img.astype(float) for img in planes]
+
+def readBioFormatsPlane(reader,series,c,z,t,debug=True):
+	
+	"""Reads a single plane via a bioformats reader.
+	
+	If the plane is corrupt and cannot be read, returns ``None``.
+	
+	Args:
+		reader (bioformats.reader): A reader object.
+		series (int): Index of series.
+		c (int): Index of channel.
+		z (int): Index of zstack.
+		t (int): Index of timepoint.
+		
+	Keyword Args:
+		debug (bool): Print debugging messages.
+	
+	Returns:
+		numpy.ndarray: Plane.
+	
+	"""
+	
+	try:
+		return reader.read(series=series, c=c, z=z, t=t, rescale=False)
+	except:
+		if debug:
+			printWarning("Loading failed.")
+			print "Cannot load plane of series ", series, " channel = ", c, " zStack = ", z, " t = ", t
+		return None
+
 def checkProblematicStacks(reader,meta,imageIdx,debug=True):
 	
 	"""Finds stacks that are somehow corrupted.
@@ -1981,6 +2640,9 @@ def checkProblematicStacks(reader,meta,imageIdx,debug=True):
 	Does this by trying to read them via ``bioformats.reader.read``, and in case of 
 	exceptions just adds them to a list of problematic stacks.
 	
+	.. note:: :py:func:`readBioFormats` and :py:func:`iterStack` detect corrupt planes 
+	   while reading, so there is no need to call this function beforehand.
+	
 	Args:
 		reader (bioformats.reader): A reader object.
 		meta (OMEXML): Bioformats meta data object.
@@ -1999,23 +2661,341 @@ def checkProblematicStacks(reader,meta,imageIdx,debug=True):
 	#Loop through all channels and zstacks
 	for j in range(meta.image(imageIdx).Pixels.SizeC):
 		for k in range(meta.image(imageIdx).Pixels.SizeZ):
-			try:
-				img=reader.read(series=imageIdx, c=j, z=k, rescale=False)
-			except:
-				if debug:
-					printWarning("Loading failed.")
-					print "Cannot load Image ", imageIdx,"/",meta.image_count
-					print "channel = ",j, "/",meta.image(imageIdx).Pixels.SizeC
-					print "zStack = ",k,"/",meta.image(imageIdx).Pixels.SizeZ
+			if readBioFormatsPlane(reader,imageIdx,j,k,0,debug=debug) is None:
 				problematicStacks.append(k)
 	
 	return list(np.unique(problematicStacks)) 
 	
+def importTifffile():
+	
+	"""Imports *tifffile*.
+	
+	Falls back to the version shipped with *scikit-image* if *tifffile* is 
+	not installed.
+	
+	Returns:
+		module: tifffile module.
+	
+	"""
+	
+	try:
+		import tifffile
+	except ImportError:
+		from skimage.external import tifffile
+	return tifffile
+
+def getStackBackend(fn):
+	
+	"""Returns backend used to read image stack.
+	
+	TIFF based formats (.tif, .tiff, .lsm) are read via *tifffile*, which does not 
+	need a Java VM. Everything else is read via *bioformats*.
+	
+	Args:
+		fn (str): Path to file.
+		
+	Returns:
+		str: Backend (``tiff`` or ``bioformats``).
+	
+	"""
+	
+	if os.path.splitext(fn)[-1].lower() in ['.tif','.tiff','.lsm']:
+		return 'tiff'
+	return 'bioformats'
+
+def getFrameAxis(axes,shape):
+	
+	"""Returns index of the axis of a tiff series along which frames are ordered.
+	
+	Takes ``T`` if it is present and has more than one entry, otherwise the first 
+	axis that is neither a channel (``C``, ``S``) nor spatial (``Y``, ``X``) axis.
+	
+	Args:
+		axes (str): Axes of series, for example ``TZCYX``.
+		shape (tuple): Shape of series.
+	
+	Returns:
+		int: Index of frame axis, ``None`` if series is a single plane.
+	
+	"""
+	
+	if 'T' in axes and shape[axes.index('T')]>1:
+		return axes.index('T')
+	
+	for i,(ax,n) in enumerate(zip(axes,shape)):
+		if ax not in 'CSYX' and n>1:
+			return i
+	
+	return None
+	
+def getStackInfo(fn,series=0,backend=None):
+	
+	"""Returns size information of a stack without reading any image data.
+	
+	Args:
+		fn (str): Path to file.
+		
+	Keyword Args:
+		series (int): Image series to be used. 
+		backend (str): Backend, see :py:func:`getStackBackend`.
+	
+	Returns:
+		dict: Dictionary with keys ``nFrames``, ``nChannels``, ``nZ`` and ``res``.
+	
+	"""
+	
+	if backend==None:
+		backend=getStackBackend(fn)
+	
+	if backend=='tiff':
+		
+		tifffile=importTifffile()
+		
+		with tifffile.TiffFile(fn) as tif:
+			axes=tif.series[series].axes
+			shape=tif.series[series].shape
+		
+		frameAxis=getFrameAxis(axes,shape)
+		
+		#Size of first axis of each type, frame axis excluded
+		size={}
+		for i,(ax,n) in enumerate(zip(axes,shape)):
+			if i!=frameAxis:
+				size.setdefault(ax,n)
+		
+		info={}
+		info['nFrames']=shape[frameAxis] if frameAxis!=None else 1
+		info['nChannels']=size.get('C',size.get('S',1))
+		info['nZ']=size.get('Z',1)
+		info['res']=[size['Y'],size['X']]
+	
+	else:
+		
+		pixels=readBioFormatsMeta(fn).image(series).Pixels
+		
+		info={}
+		if pixels.SizeT>1:
+			info['nFrames']=pixels.SizeT
+			info['nZ']=pixels.SizeZ
+		else:
+			info['nFrames']=pixels.SizeZ
+			info['nZ']=1
+		info['nChannels']=pixels.SizeC
+		info['res']=[pixels.SizeY,pixels.SizeX]
+		
+	return info
+
+def iterTiffStack(fn,series=0,channel=0,z=0,frames=None,corrupt=None,debug=False):
+	
+	"""Lazily reads frames of a TIFF based stack (.tif, .tiff, .lsm).
+	
+	Only planes of the requested series, channel and z-slice are read. If the series is
+	memory-mappable, frames are sliced out of a memory-mapped array, otherwise single 
+	pages are decoded one at a time. 
+	
+	Frames that cannot be read are skipped and their index appended to ``corrupt``.
+	Callers need to drop the timepoints of these frames, otherwise frames and timepoints 
+	are shifted after the first skipped frame.
+	
+	Args:
+		fn (str): Path to file.
+		
+	Keyword Args:
+		series (int): Image series to be used. 
+		channel (int): Channel to extract.
+		z (int): z-slice to extract.
+		frames (list): Indices of frames to read. Reads all if ``None``.
+		corrupt (list): List that corrupt frame indices get appended to.
+		debug (bool): Print debugging messages.
+		
+	Returns:
+		generator: Generator yielding frames as ``numpy.ndarray``.
+	
+	"""
+	
+	tifffile=importTifffile()
+	
+	with tifffile.TiffFile(fn) as tif:
+		
+		s=tif.series[series]
+		axes,shape=s.axes,s.shape
+		frameAxis=getFrameAxis(axes,shape)
+		
+		nFrames=shape[frameAxis] if frameAxis!=None else 1
+		if frames==None:
+			frames=range(nFrames)
+		
+		#Try to memory map series
+		try:
+			arr=tifffile.memmap(fn,series=series,mode='r')
+		except Exception:
+			arr=None
+		
+		#Pages of series, only usable if there is one page per plane
+		pages=list(s.pages)
+		pageNdim=len(pages[0].shape)
+		outerShape=shape[:len(shape)-pageNdim]
+		pagesUsable=(int(np.prod(outerShape))==len(pages))
+		
+		if arr is None and not pagesUsable:
+			if debug:
+				printWarning("Series of "+fn+" is neither memory-mappable nor stored page-wise. Will need to read full series.")
+			arr=s.asarray()
+		
+		for i in frames:
+			
+			#Build index for each axis
+			idx=[]
+			for j,ax in enumerate(axes):
+				if j==frameAxis:
+					idx.append(i)
+				elif ax in 'YX':
+					idx.append(slice(None))
+				elif ax in 'CS':
+					idx.append(channel)
+				elif ax=='Z':
+					idx.append(z)
+				else:
+					idx.append(0)
+			
+			try:
+				if arr is not None:
+					img=np.array(arr[tuple(idx)])
+				else:
+					nOuter=len(outerShape)
+					pageIdx=np.ravel_multi_index(idx[:nOuter],outerShape) if nOuter>0 else 0
+					img=pages[pageIdx].asarray()[tuple(idx[nOuter:])]
+			except Exception:
+				if debug:
+					printWarning("Cannot load frame "+str(i)+" of "+fn+". Will skip it.")
+				if corrupt!=None:
+					corrupt.append(i)
+				continue
+			
+			yield img
+			
+		del arr
+
+def iterBioFormats(fn,series=0,channel=0,z=0,frames=None,corrupt=None,debug=False):
+	
+	"""Lazily reads frames of a bioformats file.
+	
+	Only planes of the requested series, channel and z-slice are read. If the series only has
+	a single timepoint, frames are taken along z.
+	
+	Frames that cannot be read are skipped and their index appended to ``corrupt``.
+	Callers need to drop the timepoints of these frames, otherwise frames and timepoints 
+	are shifted after the first skipped frame.
+	
+	Args:
+		fn (str): Path to file.
+		
+	Keyword Args:
+		series (int): Image series to be used. 
+		channel (int): Channel to extract.
+		z (int): z-slice to extract.
+		frames (list): Indices of frames to read. Reads all if ``None``.
+		corrupt (list): List that corrupt frame indices get appended to.
+		debug (bool): Print debugging messages.
+		
+	Returns:
+		generator: Generator yielding frames as ``numpy.ndarray``.
+	
+	"""
+	
+	pixels=readBioFormatsMeta(fn).image(series).Pixels
+	alongT=pixels.SizeT>1
+	
+	if frames==None:
+		frames=range(pixels.SizeT if alongT else pixels.SizeZ)
+	
+	with bioformats.ImageReader(fn) as reader:
+		
+		for i in frames:
+			
+			if alongT:
+				img=readBioFormatsPlane(reader,series,channel,z,i,debug=debug)
+			else:
+				img=readBioFormatsPlane(reader,series,channel,i,0,debug=debug)
+				
+			if img is None:
+				if corrupt!=None:
+					corrupt.append(i)
+				continue
+			
+			yield img
+			
+def iterStack(fn,series=0,channel=0,z=0,frames=None,corrupt=None,backend=None,debug=False):
+	
+	"""Lazily reads frames of a microscopy stack.
+	
+	Dispatches to :py:func:`iterTiffStack` or :py:func:`iterBioFormats`, see also 
+	:py:func:`getStackBackend`.
+	
+	Example:
+	
+	>>> corrupt=[]
+	>>> for img in iterStack("recover.lsm",channel=1,corrupt=corrupt):
+	>>> 	print img.mean()
+	
+	Args:
+		fn (str): Path to file.
+		
+	Keyword Args:
+		series (int): Image series to be used. 
+		channel (int): Channel to extract.
+		z (int): z-slice to extract.
+		frames (list): Indices of frames to read. Reads all if ``None``.
+		corrupt (list): List that corrupt frame indices get appended to.
+		backend (str): Backend, see :py:func:`getStackBackend`.
+		debug (bool): Print debugging messages.
+		
+	Returns:
+		generator: Generator yielding frames as ``numpy.ndarray``.
+	
+	"""
+	
+	if backend==None:
+		backend=getStackBackend(fn)
+	
+	if backend=='tiff':
+		return iterTiffStack(fn,series=series,channel=channel,z=z,frames=frames,corrupt=corrupt,debug=debug)
+	else:
+		return iterBioFormats(fn,series=series,channel=channel,z=z,frames=frames,corrupt=corrupt,debug=debug)
+	
+def readStackFrame(fn,idx,series=0,channel=0,z=0,backend=None):
+	
+	"""Reads a single frame of a microscopy stack.
+	
+	See also :py:func:`iterStack`.
+	
+	Args:
+		fn (str): Path to file.
+		idx (int): Index of frame.
+		
+	Keyword Args:
+		series (int): Image series to be used. 
+		channel (int): Channel to extract.
+		z (int): z-slice to extract.
+		backend (str): Backend, see :py:func:`getStackBackend`.
+		
+	Returns:
+		numpy.ndarray: Frame.
+	
+	"""
+	
+	for img in iterStack(fn,series=series,channel=channel,z=z,frames=[idx],backend=backend):
+		return img
+	
+	raise IOError("Cannot read frame "+str(idx)+" of "+fn)
 
 def extractBioFormats(fn,fnOut,debug=True,series=0,channel='all',enc="uint16",scale=True,maxVal=None,outputformat='tif'):
 	
 	"""Reads bioformats image file.
 	
+	If ``series`` and ``channel`` are given, planes are read one at a time via :py:func:`iterStack`
+	and written right away.
+	
 	.. note:: ``series='all'`` returns all datasets.
 	
 	.. note:: ``channel='all'`` returns all channels.
@@ -2042,18 +3022,19 @@ def extractBioFormats(fn,fnOut,debug=True,series=0,channel='all',enc="uint16",sc
 	"""
 	
 	# Read files
-	#try:
-	images,meta,fnsLoaded=readBioFormats(fn,debug=debug,series=series,channel=channel)
-	#except:
-		#printError('Was not able to extract images in file '+fn)
-		#return -1
+	if series!='all' and channel!='all':
+		nImgs=getStackInfo(fn,series=series,backend='bioformats')['nFrames']
+		images=iterStack(fn,series=series,channel=channel,backend='bioformats',debug=debug)
+	else:
+		images,meta,fnsLoaded=readBioFormats(fn,debug=debug,series=series,channel=channel)
+		nImgs=len(images)
 	
 	# Save to images
 	try:
 		for j,img in enumerate(images):
 			
 			# Build output filename
-			enum="_t"+(len(str(len(images)))-len(str(j)))*"0"+str(j)
+			enum="_t"+(len(str(nImgs))-len(str(j)))*"0"+str(j)
 			fnImg=fnOut+os.path.splitext(os.path.basename(fn))[0]+enum+'.'+outputformat
 			
 			# Write image
@@ -0,0 +1,157 @@
+#=====================================================================================================================================
+#Copyright
+#=====================================================================================================================================
+
+#Copyright (C) 2014 Alexander Blaessle, Patrick Mueller and the Friedrich Miescher Laboratory of the Max Planck Society
+#This software is distributed under the terms of the GNU General Public License.
+
+#This file is part of PyFRAP.
+
+#PyFRAP is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+#===========================================================================================================================================================================
+#Module Description
+#===========================================================================================================================================================================
+
+"""Lazy import module for PyFRAP toolbox.
+
+Heavy dependencies such as FiPy, VTK, scikit-image, bioformats, matplotlib or PyQt4 take up most of 
+the time needed to ``import pyfrp``. Modules therefore do not import them directly, but bind a 
+placeholder returned by :py:func:`lazyImport`, for example
+
+>>> plt=pyfrp_lazy_module.lazyImport('matplotlib.pyplot')
+
+The actual module is only imported when one of its attributes is accessed for the first time.
+Submodules that have not been imported yet are imported on access, so
+
+>>> skimage=pyfrp_lazy_module.lazyImport('skimage')
+>>> skimage.io.imread(fn)
+
+works as expected.
+
+"""
+
+#===========================================================================================================================================================================
+#Importing necessary modules
+#===========================================================================================================================================================================
+
+import importlib
+import sys
+
+#===========================================================================================================================================================================
+#Module Functions
+#===========================================================================================================================================================================
+
+class lazyModule(object):
+	
+	"""Placeholder for a module that is imported on first attribute access.
+	
+	Args:
+		name (str): Name of module.
+	
+	Keyword Args:
+		fallbacks (list): Names of modules that are tried if importing ``name`` fails.
+	
+	"""
+	
+	def __init__(self,name,fallbacks=[]):
+		
+		object.__setattr__(self,'_lazyName',name)
+		object.__setattr__(self,'_lazyFallbacks',list(fallbacks))
+		object.__setattr__(self,'_lazyModule',None)
+		
+	def load(self):
+		
+		"""Imports module if not imported yet.
+		
+		Returns:
+			module: Imported module.
+		
+		"""
+		
+		if self._lazyModule is None:
+			
+			for i,name in enumerate([self._lazyName]+self._lazyFallbacks):
+				try:
+					module=importlib.import_module(name)
+					break
+				except ImportError:
+					if i==len(self._lazyFallbacks):
+						raise
+			
+			object.__setattr__(self,'_lazyModule',module)
+			
+		return self._lazyModule
+	
+	def isLoaded(self):
+		
+		"""Returns ``True`` if module has already been imported."""
+		
+		return self._lazyModule is not None
+	
+	def __getattr__(self,attr):
+		
+		module=self.load()
+		
+		try:
+			return getattr(module,attr)
+		except AttributeError:
+			if attr.startswith('__'):
+				raise
+			
+		#Attribute might be a submodule that has not been imported yet
+		try:
+			return importlib.import_module(module.__name__+'.'+attr)
+		except ImportError:
+			raise AttributeError("'module' object has no attribute '"+attr+"'")
+	
+	def __setattr__(self,attr,val):
+		setattr(self.load(),attr,val)
+		
+	def __dir__(self):
+		return dir(self.load())
+	
+	def __repr__(self):
+		if self.isLoaded():
+			return "<lazy "+repr(self._lazyModule)[1:]
+		return "<lazy module '"+self._lazyName+"' (not loaded)>"
+
+def lazyImport(name,fallbacks=[]):
+	
+	"""Returns placeholder for module ``name`` that is imported on first use.
+	
+	If the module has already been imported, returns the module itself.
+	
+	Args:
+		name (str): Name of module, for example ``matplotlib.pyplot``.
+	
+	Keyword Args:
+		fallbacks (list): Names of modules that are tried if importing ``name`` fails.
+	
+	Returns:
+		pyfrp.modules.pyfrp_lazy_module.lazyModule: Placeholder.
+	
+	"""
+	
+	if name in sys.modules and sys.modules[name] is not None:
+		return sys.modules[name]
+	
+	return lazyModule(name,fallbacks=fallbacks)
+
+def isLoaded(name):
+	
+	"""Returns ``True`` if module ``name`` has been imported."""
+	
+	return name in sys.modules and sys.modules[name] is not None
@@ -0,0 +1,568 @@
+#=====================================================================================================================================
+#Copyright
+#=====================================================================================================================================
+
+#Copyright (C) 2014 Alexander Blaessle, Patrick Mueller and the Friedrich Miescher Laboratory of the Max Planck Society
+#This software is distributed under the terms of the GNU General Public License.
+
+#This file is part of PyFRAP.
+
+#PyFRAP is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#===========================================================================================================================================================================
+#Module Description
+#===========================================================================================================================================================================
+
+"""Mesh quality module for PyFRAP toolbox.
+
+Computes mesh statistics such as edge lengths, cell volumes, aspect ratios and dihedral angles
+for simplicial meshes (triangles and tetrahedra). All functions work directly on the
+connectivity arrays of a mesh, that is
+
+	* ``vertexCoords``: Array of shape ``(dim,nVertices)`` containing the vertex coordinates.
+	* ``cellVertexIDs``: Array of shape ``(dim+1,nCells)`` containing the vertex indices of each cell.
+
+and evaluate all cells in a single vectorized pass. See also :py:func:`pyfrp.subclasses.pyfrp_mesh.mesh.getQuality`.
+
+Also contains the search for refinement parameters reaching a required number of nodes, 
+see :py:func:`searchRefinement`.
+
+"""
+
+#===========================================================================================================================================================================
+#Importing necessary modules
+#===========================================================================================================================================================================
+
+#Numpy
+import numpy as np
+
+#Misc
+import itertools
+import math
+
+#===========================================================================================================================================================================
+#Module Functions
+#===========================================================================================================================================================================
+
+def getEdgePairs(nVert):
+
+	"""Returns all vertex pairs forming the edges of a simplex with ``nVert`` vertices.
+
+	Edges are ordered such that edges starting at the base point ``0`` come first, that is
+	for a tetrahedron ``[(0,1),(0,2),(0,3),(1,2),(1,3),(2,3)]``.
+
+	Args:
+		nVert (int): Number of vertices per cell.
+
+	Returns:
+		list: List of vertex index pairs.
+
+	"""
+
+	return list(itertools.combinations(range(nVert),2))
+
+def getCellVertexCoords(vertexCoords,cellVertexIDs):
+
+	"""Returns coordinates of all cell vertices.
+
+	Args:
+		vertexCoords (numpy.ndarray): Vertex coordinates of shape ``(dim,nVertices)``.
+		cellVertexIDs (numpy.ndarray): Cell connectivity of shape ``(nVert,nCells)``.
+
+	Returns:
+		numpy.ndarray: Array of shape ``(nVert,nCells,dim)``.
+
+	"""
+
+	vertexCoords=np.asarray(vertexCoords,dtype=float)
+	cellVertexIDs=np.asarray(cellVertexIDs,dtype=int)
+
+	return vertexCoords.T[cellVertexIDs]
+
+def computeEdgeLengths(vertexCoords,cellVertexIDs):
+
+	"""Computes lengths of all edges of all cells.
+
+	Edges are ordered as returned by :py:func:`getEdgePairs`.
+
+	Args:
+		vertexCoords (numpy.ndarray): Vertex coordinates of shape ``(dim,nVertices)``.
+		cellVertexIDs (numpy.ndarray): Cell connectivity of shape ``(nVert,nCells)``.
+
+	Returns:
+		numpy.ndarray: Array of shape ``(nEdges,nCells)``.
+
+	"""
+
+	pts=getCellVertexCoords(vertexCoords,cellVertexIDs)
+	pairs=getEdgePairs(pts.shape[0])
+
+	i,j=np.array(pairs).T
+
+	return np.sqrt(((pts[j]-pts[i])**2).sum(axis=-1))
+
+def computeCellVolumes(vertexCoords,cellVertexIDs):
+
+	r"""Computes volumes (or areas for triangles) of all cells.
+
+	Volume of a simplex is given by
+
+	.. math:: V = \frac{|\det(E)|}{d!},
+
+	where :math:`E` is the matrix of edge vectors starting at the base point and :math:`d` the dimension.
+
+	Args:
+		vertexCoords (numpy.ndarray): Vertex coordinates of shape ``(dim,nVertices)``.
+		cellVertexIDs (numpy.ndarray): Cell connectivity of shape ``(nVert,nCells)``.
+
+	Returns:
+		numpy.ndarray: Cell volumes.
+
+	"""
+
+	pts=getCellVertexCoords(vertexCoords,cellVertexIDs)
+
+	E=np.swapaxes(pts[1:]-pts[0],0,1)
+	d=E.shape[1]
+
+	if E.shape[2]!=d:
+
+		#Lower dimensional simplex embedded in higher dimension, use Gram determinant
+		G=np.einsum('cik,cjk->cij',E,E)
+		return np.sqrt(np.abs(np.linalg.det(G)))/math.factorial(d)
+
+	return np.abs(np.linalg.det(E))/math.factorial(d)
+
+def computeFacetMeasures(vertexCoords,cellVertexIDs):
+
+	"""Computes measures of all facets of all cells.
+
+	For tetrahedra, these are the face areas, for triangles the edge lengths.
+	Facet ``k`` is the facet opposite of vertex ``k``.
+
+	Args:
+		vertexCoords (numpy.ndarray): Vertex coordinates of shape ``(dim,nVertices)``.
+		cellVertexIDs (numpy.ndarray): Cell connectivity of shape ``(nVert,nCells)``.
+
+	Returns:
+		numpy.ndarray: Array of shape ``(nVert,nCells)``.
+
+	"""
+
+	cellVertexIDs=np.asarray(cellVertexIDs,dtype=int)
+	nVert=cellVertexIDs.shape[0]
+
+	measures=[]
+	for k in range(nVert):
+		facet=[i for i in range(nVert) if i!=k]
+		measures.append(computeCellVolumes(vertexCoords,cellVertexIDs[facet]))
+
+	return np.array(measures)
+
+def computeAspectRatios(vertexCoords,cellVertexIDs,volumes=None,edgeLengths=None):
+
+	r"""Computes normalized aspect ratios of all cells.
+
+	The aspect ratio is defined as the ratio between longest edge and inradius,
+	normalized such that a regular simplex has aspect ratio 1:
+
+	.. math:: q = \frac{l_{\mathrm{max}}}{c_d r_{\mathrm{in}}},
+
+	where :math:`r_{\mathrm{in}}=d V/\sum_k A_k` and :math:`c_3=2\sqrt{6}`, :math:`c_2=2\sqrt{3}`.
+	Degenerate cells have aspect ratio ``inf``.
+
+	Args:
+		vertexCoords (numpy.ndarray): Vertex coordinates of shape ``(dim,nVertices)``.
+		cellVertexIDs (numpy.ndarray): Cell connectivity of shape ``(nVert,nCells)``.
+
+	Keyword Args:
+		volumes (numpy.ndarray): Precomputed cell volumes.
+		edgeLengths (numpy.ndarray): Precomputed edge lengths.
+
+	Returns:
+		numpy.ndarray: Aspect ratios.
+
+	"""
+
+	if volumes is None:
+		volumes=computeCellVolumes(vertexCoords,cellVertexIDs)
+	if edgeLengths is None:
+		edgeLengths=computeEdgeLengths(vertexCoords,cellVertexIDs)
+
+	d=np.asarray(cellVertexIDs).shape[0]-1
+	facets=computeFacetMeasures(vertexCoords,cellVertexIDs).sum(axis=0)
+
+	with np.errstate(divide='ignore',invalid='ignore'):
+		rIn=d*volumes/facets
+		q=edgeLengths.max(axis=0)/(2*np.sqrt(d*(d+1)/2.)*rIn)
+
+	q[~np.isfinite(q)]=np.inf
+
+	return q
+
+def computeDihedralAngles(vertexCoords,cellVertexIDs,degrees=True):
+
+	"""Computes all six dihedral angles of all tetrahedra.
+
+	Angles are ordered by edges as returned by :py:func:`getEdgePairs`, that is,
+	angle ``i`` is the angle between the two faces sharing edge ``i``.
+
+	.. note:: Only works for tetrahedral meshes.
+
+	Args:
+		vertexCoords (numpy.ndarray): Vertex coordinates of shape ``(3,nVertices)``.
+		cellVertexIDs (numpy.ndarray): Cell connectivity of shape ``(4,nCells)``.
+
+	Keyword Args:
+		degrees (bool): Return angles in degrees instead of radians.
+
+	Returns:
+		numpy.ndarray: Array of shape ``(6,nCells)``.
+
+	"""
+
+	pts=getCellVertexCoords(vertexCoords,cellVertexIDs)
+
+	if pts.shape[0]!=4:
+		raise ValueError("computeDihedralAngles only works for tetrahedra, got cells with %d vertices."%pts.shape[0])
+
+	#Outward normals of faces opposite of each vertex
+	normals=[]
+	for k in range(4):
+		a,b,c=[pts[i] for i in range(4) if i!=k]
+		n=np.cross(b-a,c-a)
+		sign=np.sign((n*(pts[k]-a)).sum(axis=-1))
+		normals.append(-sign[:,None]*n)
+	normals=np.array(normals)
+
+	norms=np.sqrt((normals**2).sum(axis=-1))
+
+	angles=[]
+	for i,j in getEdgePairs(4):
+
+		#Edge (i,j) is shared by the faces opposite of the two remaining vertices
+		k,l=[m for m in range(4) if m not in (i,j)]
+
+		with np.errstate(divide='ignore',invalid='ignore'):
+			cosAngle=-(normals[k]*normals[l]).sum(axis=-1)/(norms[k]*norms[l])
+
+		angles.append(np.arccos(np.clip(cosAngle,-1.,1.)))
+
+	angles=np.array(angles)
+
+	if degrees:
+		angles=np.degrees(angles)
+
+	return angles
+
+def computeVolumeHistogram(volumes,bins=100):
+
+	"""Computes histogram of cell volumes.
+
+	Args:
+		volumes (numpy.ndarray): Cell volumes.
+
+	Keyword Args:
+		bins (int): Number of bins.
+
+	Returns:
+		tuple: Tuple containing:
+
+			* counts (numpy.ndarray): Number of cells per bin.
+			* binEdges (numpy.ndarray): Bin edges.
+
+	"""
+
+	return np.histogram(volumes,bins=bins)
+
+def computeBinnedAverage(x,y,bins=100):
+
+	"""Averages ``y`` in equally spaced bins along ``x``.
+
+	Vectorized replacement of sorting and :py:func:`pyfrp.modules.pyfrp_misc_module.simpleHist`.
+	Empty bins are returned as ``nan``.
+
+	Args:
+		x (numpy.ndarray): Coordinates used for binning.
+		y (numpy.ndarray): Values to be averaged.
+
+	Keyword Args:
+		bins (int): Number of bins.
+
+	Returns:
+		tuple: Tuple containing:
+
+			* xBin (numpy.ndarray): Center of bins
+			* yBin (numpy.ndarray): Average value in each bin.
+
+	"""
+
+	x=np.asarray(x,dtype=float)
+	y=np.asarray(y,dtype=float)
+
+	counts,binEdges=np.histogram(x,bins=bins)
+	sums,binEdges=np.histogram(x,bins=binEdges,weights=y)
+
+	with np.errstate(divide='ignore',invalid='ignore'):
+		yBin=sums/counts
+
+	xBin=0.5*(binEdges[1:]+binEdges[:-1])
+
+	return xBin,yBin
+
+def computeLocalDensity(idx,volumes):
+
+	r"""Computes local mesh density of a set of cells.
+
+	Local density is defined by
+
+	.. math:: \rho=N/\sum_{i} V_i,
+
+	where :math:`N` is the number of cells in ``idx`` and :math:`V_i` their volumes.
+
+	Args:
+		idx (list): List of cell indices.
+		volumes (numpy.ndarray): Cell volumes of whole mesh.
+
+	Returns:
+		float: Local density.
+
+	"""
+
+	if len(idx)==0:
+		return 0.
+
+	return len(idx)/float(np.asarray(volumes)[idx].sum())
+
+def computeMeshQuality(vertexCoords,cellVertexIDs,bins=100):
+
+	"""Computes all mesh quality measures in one pass.
+
+	Returned dictionary contains:
+
+		* ``volumes``: Cell volumes, see :py:func:`computeCellVolumes`.
+		* ``edgeLengths``: Edge lengths, see :py:func:`computeEdgeLengths`.
+		* ``aspectRatios``: Aspect ratios, see :py:func:`computeAspectRatios`.
+		* ``dihedralAngles``: Dihedral angles in degrees, see :py:func:`computeDihedralAngles`.
+		  ``None`` for 2D meshes.
+		* ``volumeHist``: Volume histogram, see :py:func:`computeVolumeHistogram`.
+
+	Args:
+		vertexCoords (numpy.ndarray): Vertex coordinates of shape ``(dim,nVertices)``.
+		cellVertexIDs (numpy.ndarray): Cell connectivity of shape ``(nVert,nCells)``.
+
+	Keyword Args:
+		bins (int): Number of bins used for volume histogram.
+
+	Returns:
+		dict: Quality measures.
+
+	"""
+
+	quality={}
+
+	quality['volumes']=computeCellVolumes(vertexCoords,cellVertexIDs)
+	quality['edgeLengths']=computeEdgeLengths(vertexCoords,cellVertexIDs)
+	quality['aspectRatios']=computeAspectRatios(vertexCoords,cellVertexIDs,volumes=quality['volumes'],edgeLengths=quality['edgeLengths'])
+
+	if np.asarray(cellVertexIDs).shape[0]==4:
+		quality['dihedralAngles']=computeDihedralAngles(vertexCoords,cellVertexIDs)
+	else:
+		quality['dihedralAngles']=None
+
+	quality['volumeHist']=computeVolumeHistogram(quality['volumes'],bins=bins)
+
+	return quality
+
+def fitNodePowerLaw(factors,nNodes,kDefault=3.,kMin=0.5):
+
+	r"""Fits power law of number of nodes versus refinement factor.
+
+	Fits
+
+	.. math:: n=e^a f^k
+
+	in log-log space. If there is only a single distinct factor, uses exponent ``kDefault``, 
+	usually the dimension of the mesh.
+
+	Args:
+		factors (list): Refinement factors.
+		nNodes (list): Number of nodes for each factor.
+
+	Keyword Args:
+		kDefault (float): Exponent used if it cannot be fitted.
+		kMin (float): Minimum exponent.
+
+	Returns:
+		tuple: Tuple containing:
+
+			* k (float): Exponent.
+			* a (float): Logarithm of prefactor.
+
+	"""
+
+	f=np.asarray(factors,dtype=float)
+	n=np.asarray(nNodes,dtype=float)
+
+	if len(np.unique(f))>1:
+		k,a=np.polyfit(np.log(f),np.log(n),1)
+		k=max(k,kMin)
+	else:
+		k=float(kDefault)
+		a=np.log(n[0])-k*np.log(f[0])
+
+	return k,a
+
+def predictRefinementFactor(factors,nNodes,nTarget,kDefault=3.,maxJump=4.):
+
+	"""Predicts refinement factor reaching ``nTarget`` nodes, see :py:func:`fitNodePowerLaw`.
+
+	The prediction is clipped to ``maxJump`` times the range of ``factors``.
+
+	Args:
+		factors (list): Refinement factors.
+		nNodes (list): Number of nodes for each factor.
+		nTarget (float): Targeted number of nodes.
+
+	Keyword Args:
+		kDefault (float): Exponent used if it cannot be fitted.
+		maxJump (float): Maximum factor by which prediction exceeds range of ``factors``.
+
+	Returns:
+		tuple: Tuple containing:
+
+			* factor (float): Predicted factor.
+			* k (float): Fitted exponent.
+
+	"""
+
+	k,a=fitNodePowerLaw(factors,nNodes,kDefault=kDefault)
+
+	factor=np.clip(np.exp((np.log(nTarget)-a)/k),min(factors)/maxJump,max(factors)*maxJump)
+
+	return factor,k
+
+def selectRefinementCandidate(history,nNodesReq,nNodesMax):
+
+	"""Selects candidate meeting node requirement with fewest nodes in total.
+
+	Each candidate in ``history`` is a list ``[factor,addZ,nNodes,nNodesTotal,data]``, 
+	see :py:func:`searchRefinement`.
+
+	Args:
+		history (list): List of candidates.
+		nNodesReq (int): Required number of nodes.
+		nNodesMax (float): Maximum number of nodes.
+
+	Returns:
+		list: Selected candidate, ``None`` if no candidate meets requirement.
+
+	"""
+
+	valid=[h for h in history if nNodesReq<=h[2]<=nNodesMax]
+
+	if len(valid)==0:
+		return None
+
+	return min(valid,key=lambda h:h[3])
+
+def searchRefinement(evalCandidates,nNodes,nNodesReq,nNodesMax=np.inf,factor=3.,addZ=15.,zIncrement=1.,
+		     nCandidates=3,maxIter=10,spread=1.25,kDefault=3.,debug=False):
+
+	"""Searches refinement factor and box extension reaching a required number of nodes.
+
+	In each step, ``nCandidates`` factors spread around ``factor`` are evaluated at once via ``evalCandidates``.
+	Then
+
+		* If a candidate has between ``nNodesReq`` and ``nNodesMax`` nodes, stops and returns the one with the 
+		  fewest nodes in total, see :py:func:`selectRefinementCandidate`.
+		* If no candidate has more than ``nNodes`` nodes, increases ``addZ`` by ``zIncrement``, doubling the 
+		  increment every time this happens.
+		* Otherwise, jumps to the factor predicted by a power law fitted to all candidates with the current ``addZ``,
+		  see :py:func:`predictRefinementFactor`. The search aims for a bit more than ``nNodesReq`` nodes, but 
+		  stays below ``nNodesMax``.
+
+	If the requirement is not met within ``maxIter`` steps, returns the candidate with the most nodes below ``nNodesMax``
+	that still adds nodes.
+
+	``evalCandidates(factors,addZ)`` needs to return a list of tuples ``(nNodes,nNodesTotal,data)`` for the given factors,
+	where ``data`` is anything needed to later use the candidate, for example its mesh file.
+
+	Args:
+		evalCandidates (function): Function evaluating candidates.
+		nNodes (int): Current number of nodes.
+		nNodesReq (int): Required number of nodes.
+
+	Keyword Args:
+		nNodesMax (float): Maximum number of nodes.
+		factor (float): Initial refinement factor.
+		addZ (float): Initial box extension.
+		zIncrement (float): Initial increment of ``addZ``.
+		nCandidates (int): Number of candidates per step.
+		maxIter (int): Maximum number of steps.
+		spread (float): Ratio between factors of neighboring candidates.
+		kDefault (float): Exponent used if power law cannot be fitted.
+		debug (bool): Print debugging messages.
+
+	Returns:
+		tuple: Tuple containing:
+
+			* best (list): Selected candidate ``[factor,addZ,nNodes,nNodesTotal,data]``, ``None`` if no candidate adds nodes.
+			* met (bool): ``True`` if ``best`` meets the requirement.
+			* history (list): All evaluated candidates.
+
+	"""
+
+	nTarget=min(1.1*nNodesReq,np.sqrt(nNodesReq*nNodesMax))
+
+	history=[]
+	nStalls=0
+
+	for i in range(maxIter):
+
+		#Evaluate candidates around current factor
+		factors=[max(factor*spread**(j-(nCandidates-1)/2.),1.) for j in range(nCandidates)]
+		results=evalCandidates(factors,addZ)
+
+		for f,(nNodesNew,nNodesTotal,data) in zip(factors,results):
+			history.append([f,addZ,nNodesNew,nNodesTotal,data])
+
+			if debug:
+				print "Iteration ", i, ": addZ = ", addZ, " factor = ", f, " nodes = ", nNodesNew, " total nodes = ", nNodesTotal
+
+		#Check if requirement is met
+		best=selectRefinementCandidate(history,nNodesReq,nNodesMax)
+		if best!=None:
+			return best,True,history
+
+		#If box does not contain nodes to refine from, extend it
+		if max([r[0] for r in results])<=nNodes:
+			addZ=addZ+zIncrement*2**nStalls
+			nStalls=nStalls+1
+			if debug:
+				print "Refinement did not add nodes, will increase addZ to ", addZ, ". \n"
+			continue
+
+		#Predict factor from candidates with current addZ
+		current=[h for h in history if h[1]==addZ and h[2]>nNodes]
+		factor,k=predictRefinementFactor([h[0] for h in current],[h[2] for h in current],nTarget,kDefault=kDefault)
+
+		if debug:
+			print "Fitted exponent k = ", k, ", will try factor ", factor, ". \n"
+
+	below=[h for h in history if nNodes<h[2]<=nNodesMax]
+	if len(below)==0:
+		return None,False,history
+
+	return max(below,key=lambda h:h[2]),False,history
@@ -1093,6 +1093,31 @@ def simpleHist(x,y,bins):
 def getMeshfilesDir():
 	return 	getModulesDir().replace("modules","meshfiles")
 
+def getGeoTemplate(name,fnGeo=None):
+	
+	"""Returns path to .geo file used by a geometry.
+	
+	By default, geometries write their parameters directly into the template ``name`` 
+	in ``pyfrp/meshfiles/``. If ``fnGeo`` is given, the template is copied to ``fnGeo`` 
+	instead, so the template stays untouched.
+	
+	Args:
+		name (str): Filename of template, for example ``cylinder.geo``.
+		
+	Keyword Args:
+		fnGeo (str): Path the template is copied to.
+	
+	Returns:
+		str: Path to .geo file.
+	
+	"""
+	
+	if fnGeo==None:
+		return getMeshfilesDir()+name
+	
+	shutil.copy(getMeshfilesDir()+name,fnGeo)
+	return fnGeo
+
 def getSubclassesDir():
 	return getModulesDir().replace("modules","subclasses")
 	
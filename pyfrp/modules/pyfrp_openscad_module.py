@@ -46,9 +46,6 @@ import pyfrp_idx_module
 import pyfrp_geometry_module
 import pyfrp_IO_module
 
-#Matplotlib
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-
 #OS
 import os
 		
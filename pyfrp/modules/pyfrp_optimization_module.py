@@ -26,8 +26,9 @@
 
 """Optimization module for PyFRAP toolbox.
 
-Currently contains all functions necessary to transform a constrained FRAP optimization problem into
-a unconstrained one, making it suitable to Nelder-Mead optimization algorithm. 
+Contains all functions necessary to transform a constrained FRAP optimization problem into
+a unconstrained one, making it suitable to Nelder-Mead optimization algorithm, and a differential
+evolution global optimizer evaluating whole generations at once, see :py:func:`differentialEvolution`.
 
 """
 
@@ -37,12 +38,24 @@ a unconstrained one, making it suitable to Nelder-Mead optimization algorithm.
 
 #Numpy/Scipy
 import numpy as np
+import scipy.optimize as sciopt
+
+#Misc
+import multiprocessing
 
 #PyFRAP
 import pyfrp_fit_module 
+import pyfrp_stats_module
 
 from pyfrp_term_module import *
 
+#===========================================================================================================================================================================
+#Module Variables
+#===========================================================================================================================================================================
+
+poolProblem=None
+"""Arguments of problem evaluated by worker processes, see :py:func:`setPoolProblem`."""
+
 #===========================================================================================================================================================================
 #Module Functions
 #===========================================================================================================================================================================
@@ -52,8 +65,8 @@ def constrObjFunc(x,fit,debug,ax,returnFit):
 	"""Objective function when using Constrained Nelder-Mead.
 	
 	Calls :py:func:`pyfrp.modules.pyfrp_optimization_module.xTransform` to transform x into
-	constrained version, then uses :py:func:`pyfrp.modules.pyfrp_fit_module.FRAPObjFunc` to 
-	find SSD.
+	constrained version, then uses the objective function returned by 
+	:py:func:`pyfrp.modules.pyfrp_fit_module.getObjFunc` to find SSD.
 	
 	Args:
 		x (list): Input vector, consiting of [D,(prod),(degr)].
@@ -71,7 +84,7 @@ def constrObjFunc(x,fit,debug,ax,returnFit):
 	
 	x=xTransform(x,LBs,UBs)
 
-	ssd=pyfrp_fit_module.FRAPObjFunc(x,fit,debug,ax,returnFit)
+	ssd=pyfrp_fit_module.getObjFunc(fit)(x,fit,debug,ax,returnFit)
 	
 	return ssd
 
@@ -222,4 +235,213 @@ def buildBoundLists(fit):
 	LBs=[fit.LBD]+int(fit.fitProd)*[fit.LBProd]+int(fit.fitDegr)*[fit.LBDegr]+len(fit.ROIsFitted)*[fit.LBEqu]
 	UBs=[fit.UBD]+int(fit.fitProd)*[fit.UBProd]+int(fit.fitDegr)*[fit.UBDegr]+len(fit.ROIsFitted)*[fit.UBEqu]
 	
-	return LBs,UBs
\ No newline at end of file
+	return LBs,UBs
+
+def differentialEvolution(evalPop,bounds,popSize=15,maxiter=100,F=0.8,CR=0.9,tol=1E-6,seed=None,debug=False):
+	
+	"""Minimizes function within bounds by differential evolution (DE/rand/1/bin).
+	
+	The initial population is drawn by latin hypercube sampling. In each generation, all trial
+	vectors are passed to ``evalPop`` at once, so that they can be evaluated vectorized or in parallel.
+	Trial vectors are clipped to the bounds. Stops when the standard deviation of the population's values
+	is below ``tol`` times the absolute value of their mean.
+	
+	Args:
+		evalPop (function): Function mapping array of shape ``(n,len(bounds))`` to array of ``n`` values.
+		bounds (list): List of ``(LB,UB)`` tuples.
+	
+	Keyword Args:
+		popSize (int): Population size per parameter.
+		maxiter (int): Maximum number of generations.
+		F (float): Mutation factor.
+		CR (float): Crossover probability.
+		tol (float): Relative convergence tolerance.
+		seed (int): Seed of random number generator.
+		debug (bool): Print best value of each generation.
+	
+	Returns:
+		scipy.optimize.OptimizeResult: Result with ``x``, ``fun``, ``nit``, ``nfev``, ``success`` and 
+		the final ``population`` and ``population_energies``.
+	
+	"""
+	
+	rng=np.random.RandomState(seed)
+	
+	LB=np.array([b[0] for b in bounds],dtype=float)
+	UB=np.array([b[1] for b in bounds],dtype=float)
+	d=len(bounds)
+	n=max(popSize*d,4)
+	
+	#Latin hypercube sampling
+	strata=(np.array([rng.permutation(n) for i in range(d)]).T+rng.rand(n,d))/n
+	pop=LB+strata*(UB-LB)
+	
+	vals=np.asarray(evalPop(pop),dtype=float)
+	nfev=n
+	
+	success=False
+	for it in range(maxiter):
+		
+		#Pick three distinct partners different from each member
+		partners=np.array([rng.choice(np.delete(np.arange(n),i),3,replace=False) for i in range(n)])
+		mutants=pop[partners[:,0]]+F*(pop[partners[:,1]]-pop[partners[:,2]])
+		mutants=np.clip(mutants,LB,UB)
+		
+		cross=rng.rand(n,d)<CR
+		cross[np.arange(n),rng.randint(d,size=n)]=True
+		trials=np.where(cross,mutants,pop)
+		
+		trialVals=np.asarray(evalPop(trials),dtype=float)
+		nfev=nfev+n
+		
+		better=trialVals<=vals
+		pop[better]=trials[better]
+		vals[better]=trialVals[better]
+		
+		if debug:
+			print "Generation", it+1, "best", vals.min()
+		
+		if np.std(vals)<=tol*abs(np.mean(vals)):
+			success=True
+			break
+	
+	best=np.argmin(vals)
+	
+	return sciopt.OptimizeResult(x=pop[best].copy(),fun=vals[best],nit=it+1 if maxiter>0 else 0,nfev=nfev,success=success,
+			     population=pop,population_energies=vals)
+
+def setPoolProblem(*problem):
+	
+	"""Sets problem evaluated by worker process, used as initializer of pools returned by :py:func:`getProblemPool`.
+	
+	Stores all arguments as a tuple in :py:data:`poolProblem`, from which the function mapped over the pool reads them.
+	
+	"""
+	
+	global poolProblem
+	poolProblem=problem
+
+def getProblemPool(processes,*problem):
+	
+	"""Returns pool of worker processes that all hold the same problem.
+	
+	The problem is passed once to each worker when it starts, see :py:func:`setPoolProblem`,
+	so only parameter vectors and results are sent for each evaluation. Used by :py:func:`runDifferentialEvolution`
+	and :py:func:`pyfrp.modules.pyfrp_stats_module.computeFitPosterior`.
+	
+	Args:
+		processes (int): Number of worker processes.
+		problem (tuple): Arguments stored in :py:data:`poolProblem` of each worker.
+	
+	Returns:
+		multiprocessing.Pool: Worker pool.
+	
+	"""
+	
+	return multiprocessing.Pool(processes=processes,initializer=setPoolProblem,initargs=problem)
+
+def evalPoolSSD(X):
+	
+	"""Evaluates SSDs of parameter vectors ``X`` for :py:data:`poolProblem` in worker process.
+	
+	See :py:func:`pyfrp.modules.pyfrp_stats_module.computeSSDBatch`. Invalid parameter vectors get the 
+	same penalty as in :py:func:`pyfrp.modules.pyfrp_fit_module.FRAPObjFunc`.
+	
+	"""
+	
+	SSD=pyfrp_stats_module.computeSSDBatch(poolProblem[0],X)
+	SSD[np.isinf(SSD)]=100000000
+	
+	return SSD
+
+def getPopObjFunc(fit,pool=None):
+	
+	"""Returns function evaluating objective function of fit for a whole population.
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit): Fit object.
+	
+	Keyword Args:
+		pool (multiprocessing.Pool): Worker pool holding the likelihood problem, see :py:func:`getProblemPool`. If given, the population 
+			is split into one chunk per process. If ``None``, evaluates serially.
+	
+	Returns:
+		function: Function mapping array of parameter vectors to array of SSDs.
+	
+	"""
+	
+	objFunc=pyfrp_fit_module.getObjFunc(fit)
+	processes=getattr(fit,'optProcesses',1)
+	
+	def evalPop(pop):
+		if pool==None:
+			return np.array([objFunc(x,fit,False,None,False) for x in pop])
+		return np.concatenate(pool.map(evalPoolSSD,np.array_split(pop,processes)))
+	
+	return evalPop
+
+def runDifferentialEvolution(fit,polish=True,debug=False):
+	
+	"""Fits by differential evolution, see :py:func:`differentialEvolution`.
+	
+	Searches within the bounds of :py:meth:`pyfrp.subclasses.pyfrp_fit.fit.getBounds` for all parameters 
+	of :py:meth:`pyfrp.subclasses.pyfrp_fit.fit.getX0`. The number of generations is chosen such that at most 
+	``fit.maxfun`` evaluations are performed, and stops early if the population converged within ``fit.DETol``.
+	If ``fit.optProcesses>1`` and ``fit.fitMode=='ROI'``, each generation is evaluated on a pool of worker processes. 
+	Workers only receive the likelihood problem of :py:func:`pyfrp.modules.pyfrp_stats_module.getLikelihoodProblem`, 
+	not the fit itself.
+	
+	If ``polish=True``, the best member is refined by constrained Nelder-Mead, see :py:func:`constrObjFunc`, using 
+	the evaluations left of ``fit.maxfun``.
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit): Fit object.
+	
+	Keyword Args:
+		polish (bool): Refine result locally.
+		debug (bool): Print progress.
+	
+	Returns:
+		scipy.optimize.OptimizeResult: Result.
+	
+	"""
+	
+	bounds=list(fit.getBounds())[:len(fit.getX0())]
+	
+	#LB(D)=0 leads to singularities when scaling tvec
+	bounds[0]=(max(bounds[0][0],1E-10),bounds[0][1])
+	
+	popSize=getattr(fit,'popSize',15)
+	processes=getattr(fit,'optProcesses',1)
+	
+	n=max(popSize*len(bounds),4)
+	maxiter=max(fit.maxfun/n-1,1)
+	
+	pool=None
+	if processes>1:
+		if fit.fitMode=='ROI':
+			pool=getProblemPool(processes,pyfrp_stats_module.getLikelihoodProblem(fit))
+		else:
+			printWarning("Parallel differential evolution is only supported in fit mode ROI. Will evaluate serially.")
+	
+	try:
+		res=differentialEvolution(getPopObjFunc(fit,pool=pool),bounds,popSize=popSize,maxiter=maxiter,tol=getattr(fit,'DETol',0.01),
+			    seed=getattr(fit,'optSeed',None),debug=debug)
+	finally:
+		if pool!=None:
+			pool.close()
+			pool.join()
+	
+	remaining=fit.maxfun-res.nfev
+	if polish and remaining>0:
+		LBs, UBs = buildBoundLists(fit)
+		x0=transformX0(res.x,LBs,UBs)
+		xOpt,fun,nit,nfev,flag=sciopt.fmin(constrObjFunc,x0,args=(fit,False,None,False),ftol=fit.optTol,maxiter=remaining,maxfun=remaining,
+				   disp=False,full_output=True)
+		
+		res.nfev=res.nfev+nfev
+		if fun<res.fun:
+			res.x=xTransform(xOpt,LBs,UBs)
+			res.fun=fun
+	
+	return res
@@ -38,11 +38,12 @@ Contains functions and classes that are often used by PyFRAP toolbox and simplif
 import numpy as np
 import scipy.interpolate
 
-#Plotting
-from mpl_toolkits.mplot3d import Axes3D
-from matplotlib import cm
-import matplotlib.pyplot as plt
-import matplotlib.patches as ptc
+#Plotting (imported on first use)
+import pyfrp_lazy_module
+cm=pyfrp_lazy_module.lazyImport('matplotlib.cm')
+plt=pyfrp_lazy_module.lazyImport('matplotlib.pyplot')
+ptc=pyfrp_lazy_module.lazyImport('matplotlib.patches')
+mplot3d=pyfrp_lazy_module.lazyImport('mpl_toolkits.mplot3d')
 
 #Misc
 import sys
@@ -468,6 +469,10 @@ def makeSubplot(size,titles=None,tight=False,sup=None,proj=None,fig=None,show=Tr
 	if proj==None:
 		proj=n_ax*[None]
 	
+	#Loading mplot3d registers 3d projection
+	if '3d' in proj:
+		mplot3d.Axes3D
+	
 	#Creating figure
 	if fig==None:
 		fig=plt.figure()
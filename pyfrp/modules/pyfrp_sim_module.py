@@ -36,32 +36,56 @@
 #Improting necessary modules
 #===========================================================================================================================================================================
 
-#PDE Toolbox
-from fipy import *
+#PDE Toolbox (imported on first use)
+import pyfrp_lazy_module
+fipy=pyfrp_lazy_module.lazyImport('fipy')
+
+#Algebraic multigrid (optional, imported on first use)
+pyamg=pyfrp_lazy_module.lazyImport('pyamg')
 
 #Numpy/Scipy
 import numpy as np
 import scipy.interpolate as interp 
 import scipy.ndimage.interpolation as ndi
+import scipy.sparse as sparse
+import scipy.sparse.linalg as spla
 
 #matplotlib
-import matplotlib.pyplot as plt
+plt=pyfrp_lazy_module.lazyImport('matplotlib.pyplot')
 
 #Misc
 import time
 import sys
+import weakref
 
 #PyFRAP Modules
 import pyfrp_plot_module 
 import pyfrp_integration_module
 import pyfrp_misc_module
+import pyfrp_IO_module
 from pyfrp_term_module import *
 import pyfrp_idx_module
+import pyfrp_img_module
+import pyfrp_timer_module
+
+#===========================================================================================================================================================================
+#Module Variables
+#===========================================================================================================================================================================
+
+solverNames=["LU","PCG","AMG"]
+"""Available solvers, see :py:func:`getSolver`."""
+
+calibrationTolerances=[1E-4,1E-6,1E-8,1E-10]
+"""Solver tolerances tried by :py:func:`calibrateSolver`."""
+
+meshOperators=weakref.WeakKeyDictionary()
+"""Diffusion matrix, cell volumes and AMG hierarchies of FiPy meshes, see :py:func:`getMeshOperators`."""
 
 #===========================================================================================================================================================================
 #Module Functions
 #===========================================================================================================================================================================
 
+@pyfrp_timer_module.timed('sim.run')
 def simulateReactDiff(simulation,signal=None,embCount=None,showProgress=True,debug=False):
 	
 	r"""Simulates reaction diffusion equation goverining FRAP experiment.
@@ -79,6 +103,10 @@ def simulateReactDiff(simulation,signal=None,embCount=None,showProgress=True,deb
 		
 		* Applies initial conditions defined in ``simulation.ICmode``.
 		* Simulates FRAP experimment.
+		* Writes checkpoint of final state, see :py:func:`writeCheckpoint`.
+	
+	If :py:func:`useAxisymmetric` is True, solves the equivalent problem in (r,z) instead, 
+	see :py:func:`simulateReactDiffAxisymmetric`.
 	
 	Args: 
 		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
@@ -93,10 +121,10 @@ def simulateReactDiff(simulation,signal=None,embCount=None,showProgress=True,deb
 		pyfrp.subclasses.pyfrp_simulation.simulation: Updated simulation object.
 	"""
 	
-
-	#Stepping and timescale
-	timeStepDuration = simulation.tvecSim[1]-simulation.tvecSim[0]
+	if useAxisymmetric(simulation,debug=debug):
+		return simulateReactDiffAxisymmetric(simulation,signal=signal,embCount=embCount,showProgress=showProgress,debug=debug)
 	
+
 	#Reset simulation vecs
 	for r in simulation.embryo.ROIs:
 		r.resetSimVec()
@@ -136,30 +164,17 @@ def simulateReactDiff(simulation,signal=None,embCount=None,showProgress=True,deb
 	
 	#Create solution variable
 	
-	phi = CellVariable(name = "solution variable",mesh = simulation.mesh.mesh,value = 0.) 
+	phi = fipy.CellVariable(name = "solution variable",mesh = simulation.mesh.mesh,value = 0.) 
 	
 
 	#Apply initial conditions
-	if simulation.ICmode==0:
-		phi = applyROIBasedICs(phi,simulation)
-		
-	elif simulation.ICmode==1:
-		phi = applyRadialICs(phi,simulation,debug=debug)
-	
-	elif simulation.ICmode==2:
-		phi=applyImperfectICs(phi,simulation,simulation.embryo.geometry.getCenter(),100.,simulation.embryo.sliceHeightPx)
-		
-	elif simulation.ICmode==3:
-		phi=applyInterpolatedICs(phi,simulation,debug=False)
-		
-	elif simulation.ICmode==4:
-		phi=applyIdealICs(phi,simulation,bleachedROI=simulation.bleachedROI,valOut=simulation.valOut)
+	phi=applyICs(phi,simulation,debug=debug)
 		
 	#Remember ICs
 	simulation.IC=np.asarray(phi.value).copy()
 	
 	#Defining Type of equation
-	eq = TransientTerm() == DiffusionTerm(coeff=simulation.D)+simulation.prod-simulation.degr*phi
+	eq = getReactDiffEq(simulation,phi)
 
 	#Defining BCs
 	#Note: BCs are Neumann boundaries by default 
@@ -174,243 +189,1618 @@ def simulateReactDiff(simulation,signal=None,embCount=None,showProgress=True,deb
 	if simulation.saveSim:
 		vals.append(np.asarray(phi.value).copy())
 	
+	#Stream solution into .vtu time series if necessary
+	fnVTKSeries=getattr(simulation,'fnVTKSeries',"")
+	if fnVTKSeries!="":
+		points,cells=pyfrp_IO_module.meshToArrays(simulation.mesh.mesh)
+		fnVTUs=[pyfrp_IO_module.writeVTUFile(pyfrp_IO_module.getVTKSeriesFn(fnVTKSeries,0,simulation.stepsSim),points,cells,cellData={"concentration":np.asarray(phi.value)})]
+	
 	#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 	#Solving PDE
 	#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 	
-	#Keeping track of time
-	startTimeSim=time.clock()
+	#Write each step into .vtu time series
+	def writeVTU(step,phi):
+		fnVTUs.append(pyfrp_IO_module.writeVTUFile(pyfrp_IO_module.getVTKSeriesFn(fnVTKSeries,step,simulation.stepsSim),points,cells,cellData={"concentration":np.asarray(phi.value)}))
 	
-	avgTime=0
-	stepTime=0
+	solveReactDiff(simulation,phi,eq,vals=vals if simulation.saveSim else None,signal=signal,embCount=embCount,showProgress=showProgress,
+				 onStep=writeVTU if fnVTKSeries!="" else None,useAMG=True)
 	
-	#Choose solver
-	if simulation.solver=="LU":
-		mySolver = LinearLUSolver(iterations=simulation.iterations, tolerance=simulation.tolerance)
-	elif simulation.solver=="PCG":
-		mySolver = LinearPCGSolver(tolerance=simulation.tolerance,iterations=simulation.iterations)
-
-	for step in range(simulation.stepsSim-1):
-		
-		#Compute timestep duration 
-		timeStepDuration=simulation.tvecSim[step+1]-simulation.tvecSim[step]
-		
-		#Solve PDE in this Step
-		stepStart=time.clock()
-		eq.solve(var=phi,dt=timeStepDuration,solver=mySolver)
-		stepTime=stepTime+(time.clock()-stepStart)
-				
-		#Compute concentration
-		avgStart=time.clock()
-		
-		for r in simulation.embryo.ROIs:
-			r.getSimConc(phi,append=True)
-		
-		avgTime=avgTime+(time.clock()-avgStart)
-		
-		#Save simulation array if necessary
-		if simulation.saveSim:
-			vals.append(np.asarray(phi.value).copy())
-		
-		#Print Progress
-		if showProgress:
-			currPerc=int(100*step/float(simulation.stepsSim))
-			
-			if signal==None:
-				sys.stdout.write("\r%d%%" %currPerc)  
-				sys.stdout.flush()
-			else:	
-				if embCount==None:
-					signal.emit(currPerc)
-				else:
-					signal.emit(currPerc,embCount)
-			
-
-	print "Step time: ", stepTime, " in %:", stepTime/(time.clock()-startTimeSim)*100
-	print "Avg time: ", avgTime, " in %:", avgTime/(time.clock()-startTimeSim)*100
-	print "Simulation done after", time.clock()-startTimeTotal
+	if debug:
+		print "Simulation done after", time.clock()-startTimeTotal
 	
 	#Save to simulation object only
 	if simulation.saveSim:
 		simulation.vals=list(vals)
 	
+	#Write index of .vtu time series
+	if fnVTKSeries!="":
+		pyfrp_IO_module.writePVDFile(fnVTKSeries+".pvd",fnVTUs,simulation.tvecSim)
+	
+	#Keep final state to allow continuing simulation
+	writeCheckpoint(simulation,phi)
+	
 	return simulation
 
-def rerunReactDiff(simulation,signal=None,embCount=None,showProgress=True,debug=False):
+def applyICs(phi,simulation,debug=False):
 	
-	"""Reruns simulation by extracting values from ``simulation.vals``.
-	
-	Performs the following steps:
-		
-		* Resets ``simVecs`` of all ROIs.
-		* Extracts values per ROI from ``simulation.vals``.
+	"""Applies initial conditions defined in ``simulation.ICmode``.
 	
-	.. note:: Only works if simulation has been run before with ``saveSim`` enabled.
+	See also :py:meth:`pyfrp.subclasses.pyfrp_simulation.simulation.setICMode`.
 	
 	Args: 
+		phi (fipy.CellVariable): PDE solution variable.
 		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
 	
 	Keyword Args:
-		signal (PyQt4.QtCore.pyqtSignal): PyQT signal to send progress to GUI.
-		embCount (int): Counter of counter process if multiple datasets are analyzed. 
-		debug (bool): Print final debugging messages and show debugging plots.
-		showProgress (bool): Show simulation progress. 
+		debug (bool): Print debugging messages.
 		
 	Returns: 
-		pyfrp.subclasses.pyfrp_simulation.simulation: Updated simulation object.
+		fipy.CellVariable: Updated solution variable.
 	"""
 	
-	#Check if can be rerun
-	if len(simulation.vals)==0:
-		printWarning("Values have not been saved for this simulation. Turn on saveSim to do that. Won't do anything for now.")
-		return simulation
+	with pyfrp_timer_module.span('sim.ICs'):
+		if simulation.ICmode==0:
+			phi = applyROIBasedICs(phi,simulation)
+			
+		elif simulation.ICmode==1:
+			phi = applyRadialICs(phi,simulation,debug=debug)
+		
+		elif simulation.ICmode==2:
+			phi=applyImperfectICs(phi,simulation,simulation.embryo.geometry.getCenter(),100.,simulation.embryo.sliceHeightPx)
+			
+		elif simulation.ICmode==3:
+			phi=applyInterpolatedICs(phi,simulation,debug=False)
+			
+		elif simulation.ICmode==4:
+			phi=applyIdealICs(phi,simulation,bleachedROI=simulation.bleachedROI,valOut=simulation.valOut)
 	
-	#Reset simulation vecs
-	for r in simulation.embryo.ROIs:
-		r.resetSimVec()
+	return phi
+
+def getBatchKey(simulation):
 	
-	#Loop through vals
-	for i,val in enumerate(simulation.vals):
-		for r in simulation.embryo.ROIs:
-			r.getSimConc(val,append=True)
+	"""Returns key of simulation, such that simulations with the same key can be run together by :py:func:`simulateReactDiffBatch`.
+	
+	Key consists of mesh file, number of cells, time vector and PDE parameters.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
 		
-		#Print Progress
-		if showProgress:
-			currPerc=int(100*i/float(len(simulation.vals)))
-			
-			if signal==None:
-				sys.stdout.write("\r%d%%" %currPerc)  
-				sys.stdout.flush()
-			else:	
-				if embCount==None:
-					signal.emit(currPerc)
-				else:
-					signal.emit(currPerc,embCount)
+	Returns: 
+		tuple: Key.
+	"""
+	
+	return (getattr(simulation.mesh,'fnMesh',""),simulation.mesh.getNNodes(),len(simulation.tvecSim),
+		tuple(np.round(simulation.tvecSim,8)),simulation.D,simulation.prod,simulation.degr)
+
+def groupBatchSimulations(simulations):
+	
+	"""Groups simulations that can be run together by :py:func:`simulateReactDiffBatch`, keeping their order.
+	
+	Axisymmetric simulations (see :py:func:`useAxisymmetric`) always form their own group.
+	
+	Args: 
+		simulations (list): List of simulation objects.
 		
-	return simulation	
+	Returns: 
+		list: List of lists of simulation objects.
+	"""
+	
+	groups=[]
+	keys=[]
+	
+	for sim in simulations:
+		key=None if useAxisymmetric(sim) else getBatchKey(sim)
+		if key!=None and key in keys:
+			groups[keys.index(key)].append(sim)
+		else:
+			keys.append(key)
+			groups.append([sim])
 	
+	return groups
 
-def applyROIBasedICs(phi,simulation):
+def checkBatchCompatible(simulations):
 	
-	"""Applies ROI-based initial conditions.
+	"""Checks if simulations can be run together by :py:func:`simulateReactDiffBatch`.
 	
-	First sets concentration on all mesh nodes equal to `simulation.embryo.analysis.concRim`.
-	Afterwards, mesh nodes get assigned the value of the first entry ``dataVec`` of 
-	the ROI covering them. Note: If a mesh node is covered by two ROIs, will assign the value
-	of the ROI that is last in embryo's ``ROIs`` list. See also 
-	:py:func:`pyfrp.subclasses.pyfrp_simulation.setICMode`.
+	That is, if they have the same key (see :py:func:`getBatchKey`), are not axisymmetric and their meshes have 
+	identical cell centers.
 	
-	Args:
-		phi (fipy.CellVariable): PDE solution variable.
-		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+	Args: 
+		simulations (list): List of simulation objects.
+		
+	Returns: 
+		bool: True if compatible.
+	"""
 	
-	Returns:
-		fipy.CellVariable: Updated solution variable.	
+	first=simulations[0]
+	
+	for sim in simulations:
+		if sim.mesh.mesh==None:
+			printWarning("Mesh of embryo "+sim.embryo.name+" has not been generated yet.")
+			return False
+		if useAxisymmetric(sim):
+			printWarning("Simulation of embryo "+sim.embryo.name+" is axisymmetric and cannot be batched.")
+			return False
+		if getBatchKey(sim)!=getBatchKey(first):
+			printWarning("Mesh, time vector or parameters of embryo "+sim.embryo.name+" differ from embryo "+first.embryo.name+".")
+			return False
+	
+	centers=np.array(first.mesh.getCellCenters())
+	for sim in simulations[1:]:
+		if sim.mesh.mesh is not first.mesh.mesh and not np.allclose(np.array(sim.mesh.getCellCenters()),centers):
+			printWarning("Cell centers of embryo "+sim.embryo.name+" differ from embryo "+first.embryo.name+".")
+			return False
+	
+	return True
+
+def assembleDiffusionMatrix(cellIDs0,cellIDs1,geomCoeffs,nCells):
+	
+	r"""Assembles finite volume matrix :math:`L` of :math:`-\nabla^2` with Neumann boundaries.
 	
+	Each interior face between cells :math:`a` and :math:`b` with geometric coefficient :math:`g` 
+	(face area over cell distance) adds :math:`g(c_a-c_b)` to row :math:`a` and :math:`g(c_b-c_a)` to row :math:`b`,
+	as ``fipy.DiffusionTerm`` does.
+	
+	Args: 
+		cellIDs0 (numpy.ndarray): First cell of each interior face.
+		cellIDs1 (numpy.ndarray): Second cell of each interior face.
+		geomCoeffs (numpy.ndarray): Geometric coefficient of each interior face.
+		nCells (int): Number of cells.
+		
+	Returns: 
+		scipy.sparse.csr_matrix: Matrix.
 	"""
 	
-	phi.setValue(simulation.embryo.analysis.concRim)
+	rows=np.concatenate([cellIDs0,cellIDs1,cellIDs0,cellIDs1])
+	cols=np.concatenate([cellIDs0,cellIDs1,cellIDs1,cellIDs0])
+	data=np.concatenate([geomCoeffs,geomCoeffs,-geomCoeffs,-geomCoeffs])
 	
-	for r in simulation.embryo.ROIs:
-		phi.value[r.meshIdx]=r.dataVec[0]
+	return sparse.csr_matrix((data,(rows,cols)),shape=(nCells,nCells))
+
+def getDiffusionMatrix(mesh):
+	
+	r"""Returns finite volume matrix of :math:`-\nabla^2` on FiPy mesh and its cell volumes.
+	
+	See also :py:func:`assembleDiffusionMatrix`.
+	
+	Args: 
+		mesh (fipy.GmshImporter3D): FiPy mesh.
+		
+	Returns: 
+		tuple: Tuple containing:
 		
+			* L (scipy.sparse.csr_matrix): Matrix.
+			* cvs (numpy.ndarray): Cell volumes.
+	"""
 	
-def applyIdealICs(phi,simulation,bleachedROI=None,valOut=None):
+	ids=np.ma.asarray(mesh.faceCellIDs)
+	interior=~np.ma.getmaskarray(ids[1])
 	
-	"""Applies ideal initial conditions.
+	geomCoeffs=np.asarray(mesh._faceAreas/mesh._cellDistances)[interior]
+	cvs=np.asarray(mesh.cellVolumes,dtype=float)
 	
-	That is, everything falling inside the bleached ROI in 
-	x-y-direction will be set its initial dataVec value,
-	everything else will be set equal to valOut.
+	L=assembleDiffusionMatrix(np.asarray(ids[0])[interior].astype(int),np.asarray(ids[1])[interior].astype(int),geomCoeffs,len(cvs))
 	
-	.. note:: The ``bleachedROI`` and valOut are often stored inside the simulation
-	   object. If those two cannot be found, will try to find a ROI called *Bleached Square*
-	   for the bleached ROI and set valOut to ``concRim``. If this again fails, will return
-	   error.
+	return L,cvs
+
+def getROIWeightMatrix(simulation,cvs):
 	
-	Args:
-		phi (fipy.CellVariable): PDE solution variable.
+	"""Returns sparse matrix computing the average concentration of all ROIs of simulation's embryo, 
+	as :py:meth:`pyfrp.subclasses.pyfrp_ROI.ROI.getSimConc` does.
+	
+	Args: 
 		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		cvs (numpy.ndarray): Cell volumes.
 		
+	Returns: 
+		scipy.sparse.csr_matrix: Matrix of shape ``(len(embryo.ROIs),nCells)``.
+	"""
+	
+	rows=[]
+	cols=[]
+	data=[]
+	
+	for i,r in enumerate(simulation.embryo.ROIs):
+		idx=np.asarray(r.meshIdx,dtype=int)
+		if len(idx)==0:
+			continue
+		rows.append(i*np.ones(len(idx),dtype=int))
+		cols.append(idx)
+		data.append(cvs[idx]/cvs[idx].sum())
+	
+	if len(rows)==0:
+		return sparse.csr_matrix((len(simulation.embryo.ROIs),len(cvs)))
+	
+	return sparse.csr_matrix((np.concatenate(data),(np.concatenate(rows),np.concatenate(cols))),shape=(len(simulation.embryo.ROIs),len(cvs)))
+
+def solveReactDiffBatch(L,cvs,C,tvec,D,prod,degr,onStep=None):
+	
+	r"""Solves reaction diffusion equation for several initial conditions at once.
+	
+	Uses the same implicit Euler scheme as :py:func:`solveReactDiff`, that is in each step 
+	
+	.. math:: (\frac{V}{\Delta t} + D L) c^{n+1} = V (\frac{c^n}{\Delta t} + k_2 - k_1 c^n),
+	
+	with diagonal matrix of cell volumes :math:`V`. Each column of ``C`` is one solution. The matrix is factorized 
+	once per time step size and the factorization is used for all columns.
+	
+	Args: 
+		L (scipy.sparse.csr_matrix): Diffusion matrix, see :py:func:`getDiffusionMatrix`.
+		cvs (numpy.ndarray): Cell volumes.
+		C (numpy.ndarray): Initial conditions of shape ``(nCells,nSolutions)``.
+		tvec (numpy.ndarray): Time vector.
+		D (float): Diffusion coefficient.
+		prod (float): Production rate.
+		degr (float): Degradation rate.
+	
 	Keyword Args:
-		bleachedROI (pyfrp.subclasses.pyfrp_ROI.ROI): Bleached ROI.
-		valOut (float): Value to be assigned outside of bleached ROI.
+		onStep (function): Function called with ``(step,C)`` after each step.
 		
-	Returns:
-		fipy.CellVariable: Updated solution variable.	
+	Returns: 
+		numpy.ndarray: Solutions at ``tvec[-1]``.
+	"""
+	
+	C=np.array(C,dtype=float)
+	V=sparse.diags(cvs,0)
 	
+	lastDt=None
+	for step in range(len(tvec)-1):
+		
+		dt=tvec[step+1]-tvec[step]
+		
+		#Factorize only if step size changed
+		with pyfrp_timer_module.span('sim.factorize'):
+			if lastDt==None or not np.isclose(dt,lastDt,rtol=1E-12,atol=0):
+				lu=spla.splu((V/dt+D*L).tocsc())
+				lastDt=dt
+		
+		with pyfrp_timer_module.span('sim.step'):
+			C=lu.solve(cvs[:,None]*(C/dt+prod-degr*C))
+		
+		if onStep!=None:
+			onStep(step+1,C)
+	
+	return C
+
+@pyfrp_timer_module.timed('sim.run')
+def simulateReactDiffBatch(simulations,signal=None,showProgress=True,debug=False):
+	
+	"""Simulates several embryos sharing mesh, time vector and PDE parameters at once.
+	
+	Applies initial conditions of each simulation as :py:func:`simulateReactDiff` does, then 
+	advances all of them together via :py:func:`solveReactDiffBatch`, that is with one matrix assembly 
+	and one factorization per time step size. Afterwards writes ``simVec`` of all ROIs, saved solutions 
+	and checkpoint of each simulation.
+	
+	.. note:: Uses a direct solver regardless of ``simulation.solver``.
+	
+	Args: 
+		simulations (list): List of simulation objects, see :py:func:`checkBatchCompatible`.
+	
+	Keyword Args:
+		signal (PyQt4.QtCore.pyqtSignal): PyQT signal to send progress to GUI.
+		showProgress (bool): Show simulation progress. 
+		debug (bool): Print debugging messages.
+		
+	Returns: 
+		list: Updated simulation objects.
 	"""
 	
-	if bleachedROI==None:
-		bleachedROI=simulation.embryo.getROIByName("Bleached Square")
-		if bleachedROI==None:
-			printError("No bleachedROI can be found in applyIdealICs.")
-			return phi
+	if not checkBatchCompatible(simulations):
+		printError("Simulations cannot be run as batch.")
+		return simulations
+	
+	print "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~"
+	print "Starting batch simulation of", len(simulations), "embryos"
+	print "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~"
+	
+	startTime=time.clock()
+	
+	first=simulations[0]
+	L,cvs=getMeshOperators(first.mesh.mesh)
+	
+	#Initial conditions
+	phis=[]
+	for sim in simulations:
+		for r in sim.embryo.ROIs:
+			r.resetSimVec()
 		
-	if valOut==None:
-		if simulation.embryo.analysis.concRim!=None:
-			valOut=simulation.embryo.analysis.concRim
-		else:
-			printError("No bleachedROI can be found in applyIdealICs.")
-			return phi
+		phi=fipy.CellVariable(name = "solution variable",mesh = sim.mesh.mesh,value = 0.)
+		phi=applyICs(phi,sim,debug=debug)
+		sim.IC=np.asarray(phi.value).copy()
+		phis.append(phi)
+	
+	C=np.column_stack([sim.IC for sim in simulations])
+	Ws=[getROIWeightMatrix(sim,cvs) for sim in simulations]
+	valsList=[[] for sim in simulations]
+	
+	def record(step,C):
+		with pyfrp_timer_module.span('sim.roiConc'):
+			for j,sim in enumerate(simulations):
+				concs=Ws[j].dot(C[:,j])
+				for i,r in enumerate(sim.embryo.ROIs):
+					r.simVec.append(concs[i])
+				if sim.saveSim:
+					valsList[j].append(C[:,j].copy())
+		
+		if showProgress:
+			currPerc=int(100*step/float(first.stepsSim))
+			if signal==None:
+				sys.stdout.write("\r%d%%" %currPerc)  
+				sys.stdout.flush()
+			else:	
+				signal.emit(currPerc)
 	
-	#Set all values in mesh to valOut
-	phi.setValue(valOut)
+	record(0,C)
+	C=solveReactDiffBatch(L,cvs,C,first.tvecSim,first.D,first.prod,first.degr,onStep=record)
 	
-	#Find indices of all nodes that lie inside bleachedROI in x-y-direction
-	x,y,z=simulation.mesh.getCellCenters()
-	ind=bleachedROI.checkXYInside(np.asarray(x),np.asarray(y))
+	for j,sim in enumerate(simulations):
+		if sim.saveSim:
+			sim.vals=valsList[j]
+		phis[j].setValue(C[:,j])
+		writeCheckpoint(sim,phis[j])
 	
-	#Set these nodes equal to first dataVec entry
-	phi.value[ind]=bleachedROI.dataVec[0]
+	print
+	if debug:
+		print "Batch simulation done after", time.clock()-startTime
 	
-	return phi
-			
-def applyRadialICs(phi,simulation,radSteps=15,debug=False):
+	return simulations
+
+def getReactDiffEq(simulation,phi):
 	
-	"""Applies radially averaged image data to solution variable as IC.
+	r"""Returns reaction diffusion equation 
 	
-	.. note:: Will use ``embryo.geometry.center`` as center circle and the maximum 
-	   distant pixel from the center as maximum radius.
+	.. math::
+	   \partial_t c = D \nabla^2 c - k_1 c + k_2,
+	
+	with parameters of simulation. Boundary conditions are Neumann boundaries by default.
 	
 	Args: 
-		phi (fipy.CellVariable): PDE solution variable.
 		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		phi (fipy.CellVariable): Solution variable.
+		
+	Returns: 
+		fipy.terms.binaryTerm._BinaryTerm: Equation.
+	"""
 	
+	return fipy.TransientTerm() == fipy.DiffusionTerm(coeff=simulation.D)+simulation.prod-simulation.degr*phi
+
+def getSolver(simulation):
 	
-		radSteps (int): Number of radial levels.
-		debug (bool): Print debugging messages.
-		
-	Returns:
-		fipy.CellVariable: Updated solution variable.
+	"""Returns FiPy solver selected in ``simulation.solver``.
 	
-	"""
+	The ``AMG`` solver is not a FiPy solver, see :py:func:`getAMGStepper`. If it is selected, 
+	returns FiPy's ``LinearPCGSolver``, which is used wherever the AMG solver cannot be used.
 	
-	#Adjust center so histogram works for 'quad'
-	if 'quad' in simulation.embryo.analysis.process.keys():
-		center=[0,0]
-	else:
-		center=simulation.ICimg,simulation.embryo.geometry.getCenter()
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		
+	Returns: 
+		fipy.solvers.solver.Solver: Solver.
+	"""
 	
-	#Compute radial histogram of IC image
-	maxR=pyfrp_img_module.dist(center,[simulation.ICimg.shape[0],simulation.ICimg.shape[0]])
-	bins,binsMid,histY,binY=pyfrp_img_module.radialImgHist(simulation.ICimg,nbins=radSteps,byMean=True,maxR=maxR)
+	if simulation.solver=="LU":
+		return fipy.LinearLUSolver(iterations=simulation.iterations, tolerance=simulation.tolerance)
+	elif simulation.solver in ["PCG","AMG"]:
+		return fipy.LinearPCGSolver(tolerance=simulation.tolerance,iterations=simulation.iterations)
+
+def getMeshOperators(mesh):
 	
-	#Set center to actual center of geometry
-	center=simulation.ICimg,simulation.embryo.geometry.getCenter()
+	"""Returns diffusion matrix and cell volumes of FiPy mesh.
 	
-	#Apply value of most outer bin to all nodes
-	phi.setValue(binY[-1])
+	Both are computed once per mesh by :py:func:`getDiffusionMatrix` and cached in :py:data:`meshOperators`,
+	so that all simulations on the same mesh share them.
 	
-	#Loop through all bins and apply values from outside to inside
-	binsY=binsY.reverse()
-	bins=bins.reverse()
-	for i in range(len(binY)):
+	Args: 
+		mesh (fipy.GmshImporter3D): FiPy mesh.
 		
-		phi.setValue(binY[i], where=(x-center[0])**2+(y-center[1])**2 < bins[i]**2)
-			
-		if debug:
-			print "Applied concentration", binY[i], " to all nodes with radius <", bins[i] 
+	Returns: 
+		tuple: Tuple containing:
+		
+			* L (scipy.sparse.csr_matrix): Diffusion matrix.
+			* cvs (numpy.ndarray): Cell volumes.
+	"""
+	
+	if mesh not in meshOperators:
+		L,cvs=getDiffusionMatrix(mesh)
+		meshOperators[mesh]={"L":L,"cvs":cvs,"amg":{}}
+	
+	return meshOperators[mesh]["L"],meshOperators[mesh]["cvs"]
+
+def getAMGShiftKey(shift,binsPerDecade=2):
+	
+	r"""Returns index of logarithmic bin of mass shift, see :py:func:`getAMGHierarchy`.
+	
+	Args: 
+		shift (float): Mass shift :math:`1/(D \Delta t)`.
+	
+	Keyword Args:
+		binsPerDecade (int): Number of bins per decade.
+		
+	Returns: 
+		int: Bin index.
+	"""
+	
+	return int(np.round(np.log10(shift)*binsPerDecade))
+
+def buildAMGHierarchy(L,cvs,shift):
+	
+	"""Builds smoothed aggregation AMG hierarchy of :math:`L+sV`.
+	
+	Args: 
+		L (scipy.sparse.csr_matrix): Diffusion matrix, see :py:func:`getDiffusionMatrix`.
+		cvs (numpy.ndarray): Cell volumes.
+		shift (float): Mass shift :math:`s`.
+		
+	Returns: 
+		pyamg.multilevel.multilevel_solver: AMG hierarchy.
+	"""
+	
+	A=(L+shift*sparse.diags(cvs,0)).tocsr()
+	
+	return pyamg.smoothed_aggregation_solver(A,symmetry='symmetric')
+
+def getAMGHierarchy(mesh,shift,binsPerDecade=2):
+	
+	r"""Returns AMG hierarchy used as preconditioner for time steps with mass shift ``shift``.
+	
+	Each implicit time step solves :math:`D(L+sV)c=b` with :math:`s=1/(D\Delta t)`. Hierarchies are built 
+	for :math:`L+s_kV`, where :math:`s_k` are logarithmically spaced with ``binsPerDecade`` per decade, 
+	and cached in :py:data:`meshOperators`. Each step uses the hierarchy of the closest :math:`s_k`, so that on a 
+	logarithmic time scale only a few hierarchies are built per mesh and they are reused across steps, fits and 
+	embryos sharing the mesh.
+	
+	Args: 
+		mesh (fipy.GmshImporter3D): FiPy mesh.
+		shift (float): Mass shift :math:`s`.
+	
+	Keyword Args:
+		binsPerDecade (int): Number of bins per decade.
+		
+	Returns: 
+		pyamg.multilevel.multilevel_solver: AMG hierarchy.
+	"""
+	
+	L,cvs=getMeshOperators(mesh)
+	
+	key=getAMGShiftKey(shift,binsPerDecade=binsPerDecade)
+	hierarchies=meshOperators[mesh]["amg"]
+	
+	if key not in hierarchies:
+		with pyfrp_timer_module.span('sim.amgSetup'):
+			hierarchies[key]=buildAMGHierarchy(L,cvs,10**(key/float(binsPerDecade)))
+	
+	return hierarchies[key]
+
+def solveCGStep(L,cvs,c,dt,D,prod,degr,tolerance=1E-10,iterations=1000,M=None):
+	
+	"""Performs one implicit Euler step of the reaction diffusion equation with conjugate gradients.
+	
+	Uses the same scheme as :py:func:`solveReactDiffBatch`.
+	
+	Args: 
+		L (scipy.sparse.csr_matrix): Diffusion matrix, see :py:func:`getDiffusionMatrix`.
+		cvs (numpy.ndarray): Cell volumes.
+		c (numpy.ndarray): Solution at start of step.
+		dt (float): Step size.
+		D (float): Diffusion coefficient.
+		prod (float): Production rate.
+		degr (float): Degradation rate.
+	
+	Keyword Args:
+		tolerance (float): Relative residual tolerance.
+		iterations (int): Maximum number of iterations.
+		M (scipy.sparse.linalg.LinearOperator): Preconditioner.
+		
+	Returns: 
+		tuple: Tuple containing:
+		
+			* c (numpy.ndarray): Solution at end of step.
+			* iterations (int): Number of CG iterations.
+			* info (int): Convergence flag of ``scipy.sparse.linalg.cg``, 0 if converged.
+	"""
+	
+	A=(D*L+sparse.diags(cvs/dt,0)).tocsr()
+	b=cvs*(c/dt+prod-degr*c)
+	
+	count=[0]
+	def countIterations(xk):
+		count[0]=count[0]+1
+	
+	x,info=spla.cg(A,b,x0=c,tol=tolerance,maxiter=iterations,M=M,callback=countIterations)
+	
+	return x,count[0],info
+
+def getAMGStepper(simulation,mesh):
+	
+	"""Returns function advancing solution variable by one time step with AMG preconditioned conjugate gradients.
+	
+	See also :py:func:`getAMGHierarchy` and :py:func:`solveCGStep`. Requires `pyamg <https://github.com/pyamg/pyamg>`_.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		mesh (fipy.GmshImporter3D): FiPy mesh.
+		
+	Returns: 
+		function: Function called with ``(phi,dt)``, or ``None`` if pyamg is not available.
+	"""
+	
+	try:
+		pyamg.smoothed_aggregation_solver
+	except ImportError:
+		printWarning("AMG solver requires pyamg, which is not installed. Will use PCG instead.")
+		return None
+	
+	L,cvs=getMeshOperators(mesh)
+	
+	def step(phi,dt):
+		
+		if simulation.D>0:
+			M=getAMGHierarchy(mesh,1./(simulation.D*dt)).aspreconditioner(cycle='V')
+		else:
+			M=None
+		
+		c,iterations,info=solveCGStep(L,cvs,np.asarray(phi.value,dtype=float),dt,simulation.D,simulation.prod,simulation.degr,
+				tolerance=simulation.tolerance,iterations=simulation.iterations,M=M)
+		if info>0:
+			printWarning("AMG solver did not converge within "+str(simulation.iterations)+" iterations.")
+		
+		phi.setValue(c)
+	
+	return step
+	
+def getCalibrationSteps(tvec,nSteps=5):
+	
+	"""Returns indices of time steps used by :py:func:`calibrateSolver`.
+	
+	Steps are spread evenly over the time vector, so that on a logarithmic time scale both the 
+	short, stiff early steps and the long late steps are included.
+	
+	Args: 
+		tvec (numpy.ndarray): Time vector.
+	
+	Keyword Args:
+		nSteps (int): Number of steps.
+		
+	Returns: 
+		numpy.ndarray: Indices of time steps, step ``i`` goes from ``tvec[i]`` to ``tvec[i+1]``.
+	"""
+	
+	return np.unique(np.round(np.linspace(0,len(tvec)-2,nSteps)).astype(int))
+
+def selectSolverConfig(results,accuracy):
+	
+	"""Selects fastest solver configuration meeting accuracy target.
+	
+	If no configuration meets the target, selects the most accurate one.
+	
+	Args: 
+		results (list): List of dictionaries with keys ``solver``, ``tolerance``, ``time`` and ``error``.
+		accuracy (float): Maximum relative error.
+		
+	Returns: 
+		dict: Selected configuration.
+	"""
+	
+	valid=[r for r in results if r['error']<=accuracy]
+	
+	if len(valid)==0:
+		printWarning("No solver configuration reached accuracy "+str(accuracy)+". Will use most accurate one.")
+		return min(results,key=lambda r: r['error'])
+	
+	return min(valid,key=lambda r: r['time'])
+
+def getCalibrationParams(simulation):
+	
+	"""Returns all parameters that a solver calibration depends on.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		
+	Returns: 
+		dict: Parameters.
+	"""
+	
+	return {"D":simulation.D,"prod":simulation.prod,"degr":simulation.degr,"nCells":simulation.mesh.getNCells(),
+		"fnMesh":getattr(simulation.mesh,'fnMesh',""),"stepsSim":len(simulation.tvecSim),"tEnd":float(simulation.tvecSim[-1]),
+		"accuracy":simulation.solverAccuracy}
+
+def checkSolverCalibration(simulation):
+	
+	"""Checks if ``simulation.solverCalibration`` is still valid, that is if it exists and 
+	all parameters of :py:func:`getCalibrationParams` are unchanged.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		
+	Returns: 
+		bool: True if valid.
+	"""
+	
+	calibration=getattr(simulation,'solverCalibration',None)
+	if calibration==None:
+		return False
+	
+	return calibration['params']==getCalibrationParams(simulation)
+
+def calibrateSolver(simulation,solvers=solverNames,tolerances=calibrationTolerances,nSteps=5,debug=False):
+	
+	"""Selects solver and tolerance of simulation from a short calibration run.
+	
+	Performs the time steps given by :py:func:`getCalibrationSteps`, each starting from the initial conditions,
+	with each solver and tolerance. Errors are measured relative to a reference solution computed with a tight 
+	LU solve. The timing of each AMG configuration includes building its hierarchies, see :py:func:`getAMGHierarchy`. Then selects the fastest configuration whose maximum relative error is below ``simulation.solverAccuracy``,
+	see :py:func:`selectSolverConfig`.
+	
+	The decision is set as ``simulation.solver`` and ``simulation.tolerance`` and recorded together with all 
+	measurements in ``simulation.solverCalibration``, so that later runs reuse it as long as 
+	:py:func:`checkSolverCalibration` holds.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+	
+	Keyword Args:
+		solvers (list): Solvers to try.
+		tolerances (list): Tolerances to try.
+		nSteps (int): Number of time steps.
+		debug (bool): Print measurements.
+		
+	Returns: 
+		dict: Calibration.
+	"""
+	
+	if simulation.mesh.mesh==None:
+		printError("Cannot calibrate solver, mesh has not been generated yet.")
+		return None
+	
+	mesh=simulation.mesh.mesh
+	steps=getCalibrationSteps(simulation.tvecSim,nSteps=nSteps)
+	dts=[simulation.tvecSim[i+1]-simulation.tvecSim[i] for i in steps]
+	
+	phi=fipy.CellVariable(name = "solution variable",mesh = mesh,value = 0.)
+	phi=applyICs(phi,simulation)
+	c0=np.asarray(phi.value).copy()
+	eq=getReactDiffEq(simulation,phi)
+	
+	#Reference solution
+	refSolver=fipy.LinearLUSolver(tolerance=1E-15,iterations=10)
+	refs=[]
+	for dt in dts:
+		phi.setValue(c0)
+		eq.solve(var=phi,dt=dt,solver=refSolver)
+		refs.append(np.asarray(phi.value).copy())
+	
+	solver,tolerance=simulation.solver,simulation.tolerance
+	
+	results=[]
+	try:
+		for s in solvers:
+			for tol in tolerances:
+				
+				simulation.solver=s
+				simulation.tolerance=tol
+				
+				mySolver=getSolver(simulation)
+				stepper=None
+				if s=="AMG":
+					stepper=getAMGStepper(simulation,mesh)
+					if stepper==None:
+						break
+					
+					#Hierarchies are cached per mesh, charge their setup to every tolerance
+					meshOperators[mesh]["amg"].clear()
+				
+				error=0.
+				startTime=time.time()
+				for dt,ref in zip(dts,refs):
+					phi.setValue(c0)
+					if stepper!=None:
+						stepper(phi,dt)
+					else:
+						eq.solve(var=phi,dt=dt,solver=mySolver)
+					error=max(error,np.abs(np.asarray(phi.value)-ref).max()/max(np.abs(ref).max(),1E-30))
+				
+				results.append({"solver":s,"tolerance":tol,"time":time.time()-startTime,"error":error})
+				
+				if debug:
+					print "%-4s tol=%.0e time=%.4f error=%.2e" %(s,tol,results[-1]['time'],error)
+	finally:
+		simulation.solver,simulation.tolerance=solver,tolerance
+	
+	if len(results)==0:
+		printError("No solver could be calibrated.")
+		return None
+	
+	best=selectSolverConfig(results,simulation.solverAccuracy)
+	
+	simulation.solver=best['solver']
+	simulation.tolerance=best['tolerance']
+	simulation.solverCalibration={"solver":best['solver'],"tolerance":best['tolerance'],"iterations":simulation.iterations,
+			       "steps":list(steps),"results":results,"params":getCalibrationParams(simulation)}
+	
+	printNote("Selected solver "+best['solver']+" with tolerance "+str(best['tolerance'])+".")
+	
+	return simulation.solverCalibration
+
+def solveReactDiff(simulation,phi,eq,startStep=0,vals=None,signal=None,embCount=None,showProgress=True,onStep=None,roiConc=None,useAMG=False):
+	
+	"""Solves reaction diffusion equation from ``simulation.tvecSim[startStep]`` to the end of ``simulation.tvecSim``.
+	
+	After each step, appends ROI concentrations to their ``simVec``. If ``vals`` is given, also appends
+	solution to it.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		phi (fipy.CellVariable): Solution variable at ``simulation.tvecSim[startStep]``.
+		eq (fipy.terms.binaryTerm._BinaryTerm): Equation to solve.
+	
+	Keyword Args:
+		startStep (int): Index of time point to start from.
+		vals (list): List to append solution values to.
+		signal (PyQt4.QtCore.pyqtSignal): PyQT signal to send progress to GUI.
+		embCount (int): Counter of counter process if multiple datasets are analyzed. 
+		showProgress (bool): Show simulation progress. 
+		onStep (function): Function called with ``(step,phi)`` after each step.
+		roiConc (function): Function called with ``phi`` after each step to append ROI concentrations. 
+			Defaults to :py:meth:`pyfrp.subclasses.pyfrp_ROI.ROI.getSimConc` of all ROIs.
+		useAMG (bool): Use AMG stepper if ``simulation.solver=="AMG"``, see :py:func:`getAMGStepper`. Only valid 
+			if ``eq`` is the equation of :py:func:`getReactDiffEq` on the simulation mesh.
+		
+	Time spent solving and computing ROI concentrations is recorded in the spans ``sim.step`` and ``sim.roiConc``, 
+	see :py:mod:`pyfrp.modules.pyfrp_timer_module`.
+		
+	Returns: 
+		fipy.CellVariable: Solution variable at end of ``simulation.tvecSim``.
+	"""
+	
+	#Choose solver
+	mySolver=getSolver(simulation)
+	
+	#AMG solver only applies to standard reaction diffusion equation on simulation mesh
+	stepper=None
+	if simulation.solver=="AMG" and useAMG:
+		stepper=getAMGStepper(simulation,phi.mesh)
+
+	for step in range(startStep,simulation.stepsSim-1):
+		
+		#Compute timestep duration 
+		timeStepDuration=simulation.tvecSim[step+1]-simulation.tvecSim[step]
+		
+		#Solve PDE in this Step
+		with pyfrp_timer_module.span('sim.step'):
+			if stepper!=None:
+				stepper(phi,timeStepDuration)
+			else:
+				eq.solve(var=phi,dt=timeStepDuration,solver=mySolver)
+				
+		#Compute concentration
+		with pyfrp_timer_module.span('sim.roiConc'):
+			if roiConc!=None:
+				roiConc(phi)
+			else:
+				for r in simulation.embryo.ROIs:
+					r.getSimConc(phi,append=True)
+		
+		#Save simulation array if necessary
+		if vals!=None:
+			vals.append(np.asarray(phi.value).copy())
+		
+		if onStep!=None:
+			onStep(step+1,phi)
+		
+		#Print Progress
+		if showProgress:
+			currPerc=int(100*(step-startStep)/float(simulation.stepsSim-startStep))
+			
+			if signal==None:
+				sys.stdout.write("\r%d%%" %currPerc)  
+				sys.stdout.flush()
+			else:	
+				if embCount==None:
+					signal.emit(currPerc)
+				else:
+					signal.emit(currPerc,embCount)
+	
+	return phi
+
+def getCheckpointParams(simulation):
+	
+	"""Returns all parameters that a simulation checkpoint depends on.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		
+	Returns: 
+		dict: Parameters.
+	"""
+	
+	params={"D":simulation.D,"prod":simulation.prod,"degr":simulation.degr,"ICmode":simulation.ICmode,
+		"solver":simulation.solver,"iterations":simulation.iterations,"tolerance":simulation.tolerance,
+		"nCells":simulation.mesh.getNCells(),"fnMesh":getattr(simulation.mesh,'fnMesh',""),"axisymmetric":False}
+	
+	if useAxisymmetric(simulation):
+		grid=getAxisymmetricGrid(simulation)
+		params.update({"nCells":grid['nr']*grid['nz'],"fnMesh":"","axisymmetric":True,"cellSizePx":simulation.axisymmetricCellSizePx})
+	
+	return params
+
+def writeCheckpoint(simulation,phi):
+	
+	"""Stores final state of simulation in ``simulation.checkpoint``.
+	
+	The checkpoint contains the solution, the time vector up to the last time point, the ``simVec``
+	of each ROI and the parameters returned by :py:func:`getCheckpointParams`. It is used by 
+	:py:func:`extendReactDiff` to continue the simulation.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		phi (fipy.CellVariable): Solution variable at ``simulation.tvecSim[-1]``.
+		
+	Returns: 
+		dict: Checkpoint.
+	"""
+	
+	simulation.checkpoint={"phi":np.asarray(phi.value).copy(),
+			"tvecSim":np.asarray(simulation.tvecSim).copy(),
+			"simVecs":dict([(r.name,list(r.simVec)) for r in simulation.embryo.ROIs]),
+			"params":getCheckpointParams(simulation)}
+	
+	return simulation.checkpoint
+
+def checkCheckpoint(simulation):
+	
+	"""Checks if simulation can be continued from ``simulation.checkpoint``.
+	
+	That is, if there is a checkpoint, all parameters of :py:func:`getCheckpointParams` are unchanged
+	and each ROI has a ``simVec`` in the checkpoint.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		
+	Returns: 
+		bool: True if checkpoint can be used.
+	"""
+	
+	checkpoint=getattr(simulation,'checkpoint',None)
+	
+	if checkpoint==None:
+		printWarning("Simulation has no checkpoint. Run simulation first.")
+		return False
+	
+	params=getCheckpointParams(simulation)
+	for key,val in checkpoint["params"].items():
+		if params[key]!=val:
+			printWarning("Parameter "+key+" changed since checkpoint was written ("+str(val)+" -> "+str(params[key])+").")
+			return False
+	
+	for r in simulation.embryo.ROIs:
+		if r.name not in checkpoint["simVecs"]:
+			printWarning("ROI "+r.name+" was not simulated when checkpoint was written.")
+			return False
+		
+	return True
+
+def extendTvec(tvec,tEnd,spacer=1E-10):
+	
+	"""Extends time vector until ``tEnd`` keeping its time stepping scheme.
+	
+	If ``tvec`` is linear, keeps the step size. If it is logarithmic (see 
+	:py:func:`pyfrp.subclasses.pyfrp_simulation.simulation.toLogTimeScale`), keeps 
+	the ratio between consecutive steps. The last time point of the new time vector 
+	might lie slightly after ``tEnd``.
+	
+	Args: 
+		tvec (numpy.ndarray): Time vector.
+		tEnd (float): New end time point.
+		
+	Keyword Args:
+		spacer (float): Offset used for logarithmic scaling.
+		
+	Returns: 
+		numpy.ndarray: Extended time vector.
+	"""
+	
+	tvec=np.asarray(tvec)
+	
+	if tEnd<=tvec[-1]:
+		return tvec.copy()
+	
+	dt=np.diff(tvec)
+	
+	#Note: We round here to 5 decimals, see simulation.isLogTimeScale.
+	if round(dt[0],5)==round(dt[-1],5):
+		n=int(np.ceil((tEnd-tvec[-1])/dt[-1]-1E-9))
+		tNew=tvec[-1]+dt[-1]*np.arange(1,n+1)
+	else:
+		u=tvec-tvec[0]+spacer
+		ratio=u[-1]/u[-2]
+		n=int(np.ceil(np.log((tEnd-tvec[0]+spacer)/u[-1])/np.log(ratio)-1E-9))
+		tNew=tvec[0]+u[-1]*ratio**np.arange(1,n+1)-spacer
+	
+	return np.concatenate([tvec,tNew])
+
+@pyfrp_timer_module.timed('sim.run')
+def extendReactDiff(simulation,signal=None,embCount=None,showProgress=True,debug=False):
+	
+	"""Continues simulation from ``simulation.checkpoint`` until the end of ``simulation.tvecSim``.
+	
+	Restores ``simVecs`` and solution from checkpoint, then solves for all remaining time points
+	of ``simulation.tvecSim`` with the same solver as :py:func:`simulateReactDiff`. Writes a new 
+	checkpoint afterwards.
+	
+	.. note:: ``simulation.tvecSim`` must start with the time vector of the checkpoint, 
+	   see :py:func:`extendTvec`.
+	
+	.. note:: Does not stream into a .vtu time series.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+	
+	Keyword Args:
+		signal (PyQt4.QtCore.pyqtSignal): PyQT signal to send progress to GUI.
+		embCount (int): Counter of counter process if multiple datasets are analyzed. 
+		debug (bool): Print final debugging messages and show debugging plots.
+		showProgress (bool): Show simulation progress. 
+		
+	Returns: 
+		pyfrp.subclasses.pyfrp_simulation.simulation: Updated simulation object.
+	"""
+	
+	if not checkCheckpoint(simulation):
+		return simulation
+	
+	checkpoint=simulation.checkpoint
+	tvecOld=checkpoint["tvecSim"]
+	startStep=len(tvecOld)-1
+	
+	if len(simulation.tvecSim)<=len(tvecOld) or not np.allclose(simulation.tvecSim[:len(tvecOld)],tvecOld):
+		printWarning("Time vector of simulation does not continue time vector of checkpoint. Will not extend simulation.")
+		return simulation
+	
+	startTime=time.clock()
+	
+	#Restore state of checkpoint
+	for r in simulation.embryo.ROIs:
+		r.setSimVec(list(checkpoint["simVecs"][r.name]))
+	
+	roiConc=None
+	axisymmetric=checkpoint["params"].get("axisymmetric",False)
+	if axisymmetric:
+		grid=getAxisymmetricGrid(simulation)
+		phi=fipy.CellVariable(name = "solution variable",mesh = genAxisymmetricMesh(grid),value = checkpoint["phi"].copy()) 
+		eq=getAxisymmetricReactDiffEq(simulation,phi,grid)
+		roiConc=getAxisymmetricROIConcFunc(simulation,grid)
+	else:
+		phi=fipy.CellVariable(name = "solution variable",mesh = simulation.mesh.mesh,value = checkpoint["phi"].copy()) 
+		eq=getReactDiffEq(simulation,phi)
+	
+	vals=None
+	if simulation.saveSim:
+		if len(simulation.vals)==len(tvecOld):
+			vals=list(simulation.vals)
+		else:
+			printWarning("Saved solutions do not match checkpoint, will not save solutions of extended simulation.")
+	
+	solveReactDiff(simulation,phi,eq,startStep=startStep,vals=vals,signal=signal,embCount=embCount,showProgress=showProgress,roiConc=roiConc,
+				 useAMG=not axisymmetric)
+	
+	if debug:
+		print "Simulation extended from t =", tvecOld[-1], "to t =", simulation.tvecSim[-1], "after", time.clock()-startTime
+	
+	if vals!=None:
+		simulation.vals=vals
+	
+	writeCheckpoint(simulation,phi)
+	
+	return simulation
+
+def rerunReactDiff(simulation,signal=None,embCount=None,showProgress=True,debug=False):
+	
+	"""Reruns simulation by extracting values from ``simulation.vals``.
+	
+	Performs the following steps:
+		
+		* Resets ``simVecs`` of all ROIs.
+		* Extracts values per ROI from ``simulation.vals``.
+	
+	.. note:: Only works if simulation has been run before with ``saveSim`` enabled.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+	
+	Keyword Args:
+		signal (PyQt4.QtCore.pyqtSignal): PyQT signal to send progress to GUI.
+		embCount (int): Counter of counter process if multiple datasets are analyzed. 
+		debug (bool): Print final debugging messages and show debugging plots.
+		showProgress (bool): Show simulation progress. 
+		
+	Returns: 
+		pyfrp.subclasses.pyfrp_simulation.simulation: Updated simulation object.
+	"""
+	
+	#Check if can be rerun
+	if len(simulation.vals)==0:
+		printWarning("Values have not been saved for this simulation. Turn on saveSim to do that. Won't do anything for now.")
+		return simulation
+	
+	#Reset simulation vecs
+	for r in simulation.embryo.ROIs:
+		r.resetSimVec()
+	
+	#Values of axisymmetric simulations live on (r,z) grid
+	roiConc=None
+	checkpoint=getattr(simulation,'checkpoint',None)
+	if checkpoint!=None and checkpoint["params"].get("axisymmetric",False):
+		roiConc=getAxisymmetricROIConcFunc(simulation,getAxisymmetricGrid(simulation))
+	
+	#Loop through vals
+	for i,val in enumerate(simulation.vals):
+		if roiConc!=None:
+			roiConc(val)
+		else:
+			for r in simulation.embryo.ROIs:
+				r.getSimConc(val,append=True)
+		
+		#Print Progress
+		if showProgress:
+			currPerc=int(100*i/float(len(simulation.vals)))
+			
+			if signal==None:
+				sys.stdout.write("\r%d%%" %currPerc)  
+				sys.stdout.flush()
+			else:	
+				if embCount==None:
+					signal.emit(currPerc)
+				else:
+					signal.emit(currPerc,embCount)
+		
+	return simulation	
+	
+
+@pyfrp_timer_module.timed('sim.run')
+def simulateReactDiffAxisymmetric(simulation,signal=None,embCount=None,showProgress=True,debug=False):
+	
+	"""Simulates reaction diffusion equation in cylindrical coordinates (r,z).
+	
+	If geometry and initial conditions are rotationally symmetric around the z-axis through the 
+	geometry's center, the solution is too and the 3D problem reduces to a 2D problem in (r,z). 
+	Does the same as :py:func:`simulateReactDiff`, but 
+	
+		* solves on the structured grid of :py:func:`getAxisymmetricGrid` using ``fipy.CylindricalGrid2D``,
+		  which weights cell volumes by :math:`r`. Cells outside of the geometry are decoupled 
+		  via :py:func:`getAxisymmetricReactDiffEq`.
+		* applies the azimuthal average of the initial conditions, see :py:func:`getAxisymmetricICs`.
+		* computes ROI concentrations via :py:func:`getAxisymmetricROIWeights`.
+		
+	.. note:: If ``saveSim`` is turned on, ``simulation.vals`` contains the values on the (r,z) grid.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+	
+	Keyword Args:
+		signal (PyQt4.QtCore.pyqtSignal): PyQT signal to send progress to GUI.
+		embCount (int): Counter of counter process if multiple datasets are analyzed. 
+		debug (bool): Print final debugging messages.
+		showProgress (bool): Show simulation progress. 
+		
+	Returns: 
+		pyfrp.subclasses.pyfrp_simulation.simulation: Updated simulation object.
+	"""
+	
+	#Reset simulation vecs
+	for r in simulation.embryo.ROIs:
+		r.resetSimVec()
+	
+	print "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~"
+	print "Starting axisymmetric simulation"
+	print "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~"
+	
+	startTimeTotal=time.clock()
+	
+	#Grid in (r,z)
+	grid=getAxisymmetricGrid(simulation)
+	mesh=genAxisymmetricMesh(grid)
+	
+	if debug:
+		print "Grid with", grid['nr'], "x", grid['nz'], "cells,", grid['inside'].sum(), "inside geometry."
+	
+	#Initial conditions
+	with pyfrp_timer_module.span('sim.ICs'):
+		phi=fipy.CellVariable(name = "solution variable",mesh = mesh,value = getAxisymmetricICs(simulation,grid))
+	simulation.IC=np.asarray(phi.value).copy()
+	
+	eq=getAxisymmetricReactDiffEq(simulation,phi,grid)
+	
+	#Initial concentrations
+	roiConc=getAxisymmetricROIConcFunc(simulation,grid)
+	roiConc(phi)
+	
+	vals=[]
+	if simulation.saveSim:
+		vals.append(np.asarray(phi.value).copy())
+	
+	solveReactDiff(simulation,phi,eq,vals=vals if simulation.saveSim else None,signal=signal,embCount=embCount,
+				 showProgress=showProgress,roiConc=roiConc)
+	
+	if debug:
+		print "Simulation done after", time.clock()-startTimeTotal
+	
+	if simulation.saveSim:
+		simulation.vals=list(vals)
+	
+	writeCheckpoint(simulation,phi)
+	
+	return simulation
+
+def useAxisymmetric(simulation,debug=False):
+	
+	"""Decides if simulation is run in (r,z), see :py:func:`simulateReactDiffAxisymmetric`.
+	
+	Depends on ``simulation.axisymmetric``:
+	
+		* ``False``: Never.
+		* ``True``: If geometry is axisymmetric, see :py:meth:`pyfrp.subclasses.pyfrp_geometry.geometry.isAxisymmetric`.
+		  Initial conditions are averaged azimuthally, even if they are not radially symmetric.
+		* ``'auto'``: If geometry is axisymmetric and initial conditions are radially symmetric 
+		  within ``simulation.axisymmetricTol``, see :py:func:`checkRadialSymmetry`.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+	
+	Keyword Args:
+		debug (bool): Print debugging messages.
+	
+	Returns: 
+		bool: True if simulation is run in (r,z).
+	"""
+	
+	mode=getattr(simulation,'axisymmetric',False)
+	
+	if not mode:
+		return False
+	
+	if not simulation.embryo.geometry.isAxisymmetric():
+		if mode!='auto':
+			printWarning("Geometry "+simulation.embryo.geometry.typ+" is not axisymmetric, will simulate in 3D.")
+		return False
+	
+	if mode=='auto':
+		img,concRim=getAxisymmetricICImg(simulation)
+		masterROI=simulation.embryo.getMasterROI()
+		mask=np.zeros(img.shape,dtype=bool)
+		mask[masterROI.imgIdxX,masterROI.imgIdxY]=True
+		
+		center=np.asarray(simulation.embryo.geometry.getCenter(),dtype=float)-1
+		symmetric,dev=checkRadialSymmetry(img,center,mask=mask,tol=simulation.axisymmetricTol)
+		if debug:
+			printNote("Deviation of initial conditions from radial symmetry: "+str(dev))
+		return symmetric
+	
+	return True
+
+def checkRadialSymmetry(img,center,mask=None,tol=0.2):
+	
+	r"""Checks if image is radially symmetric around center.
+	
+	Computes radial profile of image in bins of 1 px and the relative deviation 
+	
+	.. math:: \delta = \sqrt{\frac{\sum (I - \bar{I}(r))^2}{\sum (I - \bar{I})^2}},
+	
+	where :math:`\bar{I}(r)` is the profile and :math:`\bar{I}` the mean over all pixels.
+	
+	Args: 
+		img (numpy.ndarray): Image.
+		center (list): Center.
+	
+	Keyword Args:
+		mask (numpy.ndarray): Only consider pixels where mask is True.
+		tol (float): Maximum relative deviation.
+	
+	Returns: 
+		tuple: Tuple containing:
+		
+			* symmetric (bool): True if ``dev<=tol``.
+			* dev (float): Relative deviation.
+	"""
+	
+	img=np.asarray(img,dtype=float)
+	x,y=pyfrp_img_module.getPxCoordinates(img.shape)
+	
+	if mask is None:
+		mask=np.ones(img.shape,dtype=bool)
+	
+	vals=img[mask]
+	idx=np.floor(pyfrp_img_module.computeRadii(x[mask],y[mask],center)).astype(int)
+	
+	counts=np.bincount(idx)
+	profile=np.bincount(idx,weights=vals)/np.maximum(counts,1)
+	
+	total=((vals-vals.mean())**2).sum()
+	if total==0:
+		return True,0.
+	
+	dev=np.sqrt(((vals-profile[idx])**2).sum()/total)
+	
+	return dev<=tol,dev
+
+def getAxisymmetricGrid(simulation):
+	
+	"""Returns structured grid in (r,z) covering the geometry of simulation.
+	
+	Cells are squares of side length ``simulation.axisymmetricCellSizePx``, slightly adjusted to fit 
+	``geometry.getRZExtend()``. Cells are ordered with r running fastest, as in ``fipy.CylindricalGrid2D``.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+	
+	Returns: 
+		dict: Grid with keys ``nr``, ``nz``, ``dr``, ``dz``, ``zmin``, cell centers ``r`` and ``z``, 
+		radial index ``ir`` of each cell and boolean array ``inside``.
+	"""
+	
+	geometry=simulation.embryo.geometry
+	rmax,zmin,zmax=geometry.getRZExtend()
+	
+	h=float(simulation.axisymmetricCellSizePx)
+	nr=max(int(np.ceil(rmax/h)),1)
+	nz=max(int(np.ceil((zmax-zmin)/h)),1)
+	dr=rmax/float(nr)
+	dz=(zmax-zmin)/float(nz)
+	
+	ir,iz=[a.flatten() for a in np.meshgrid(np.arange(nr),np.arange(nz))]
+	r=(ir+0.5)*dr
+	z=zmin+(iz+0.5)*dz
+	
+	return {'nr':nr,'nz':nz,'dr':dr,'dz':dz,'zmin':zmin,'r':r,'z':z,'ir':ir,'inside':np.asarray(geometry.checkRZInside(r,z),dtype=bool)}
+
+def genAxisymmetricMesh(grid):
+	
+	"""Returns ``fipy.CylindricalGrid2D`` of grid, see :py:func:`getAxisymmetricGrid`.
+	
+	Args: 
+		grid (dict): Grid.
+	
+	Returns: 
+		fipy.meshes.cylindricalUniformGrid2D.CylindricalUniformGrid2D: Mesh.
+	"""
+	
+	return fipy.CylindricalGrid2D(dx=grid['dr'],dy=grid['dz'],nx=grid['nr'],ny=grid['nz'])+((0.,),(grid['zmin'],))
+
+def getAxisymmetricReactDiffEq(simulation,phi,grid):
+	
+	"""Returns reaction diffusion equation on (r,z) grid.
+	
+	Same as :py:func:`getReactDiffEq`, but the diffusion coefficient is set to zero on all faces 
+	adjacent to cells outside of the geometry, so that these cells do not exchange with the geometry 
+	and its boundary is a Neumann boundary.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		phi (fipy.CellVariable): Solution variable.
+		grid (dict): Grid, see :py:func:`getAxisymmetricGrid`.
+		
+	Returns: 
+		fipy.terms.binaryTerm._BinaryTerm: Equation.
+	"""
+	
+	inside=fipy.CellVariable(mesh=phi.mesh,value=grid['inside'].astype(float))
+	
+	return fipy.TransientTerm() == fipy.DiffusionTerm(coeff=simulation.D*inside.harmonicFaceValue)+simulation.prod-simulation.degr*phi
+
+def getAxisymmetricICImg(simulation):
+	
+	"""Returns image of initial conditions in x-y-plane that is averaged azimuthally by :py:func:`getAxisymmetricICs`.
+	
+	Depending on ``simulation.ICmode``:
+	
+		* 0: Rim concentration, overwritten by first entry of ``dataVec`` of each ROI.
+		* 4: ``valOut``, overwritten by first entry of ``dataVec`` of ``bleachedROI``, see :py:func:`applyIdealICs`.
+		* Otherwise: ``ICimg`` inside master ROI, rim concentration outside, see :py:func:`applyInterpolatedICs`.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+	
+	Returns: 
+		tuple: Tuple containing:
+		
+			* img (numpy.ndarray): Image.
+			* fillVal (float): Value outside of image.
+	"""
+	
+	emb=simulation.embryo
+	masterROI=emb.getMasterROI()
+	res=emb.dataResPx
+	
+	concRim=getattr(emb.analysis,'concRim',None) if emb.analysis!=None else None
+	if concRim==None:
+		if isinstance(simulation.ICimg,np.ndarray):
+			concRim=pyfrp_img_module.meanConc(simulation.ICimg[masterROI.imgIdxX,masterROI.imgIdxY])
+		else:
+			concRim=0.
+	
+	if simulation.ICmode==0:
+		img=concRim*np.ones((res,res))
+		for r in emb.ROIs:
+			img[r.imgIdxX,r.imgIdxY]=r.dataVec[0]
+		return img,concRim
+	
+	if simulation.ICmode==4:
+		bleachedROI=simulation.bleachedROI
+		if bleachedROI==None:
+			bleachedROI=emb.getROIByName("Bleached Square")
+		valOut=simulation.valOut if simulation.valOut!=None else concRim
+		img=valOut*np.ones((res,res))
+		if bleachedROI!=None:
+			img[bleachedROI.imgIdxX,bleachedROI.imgIdxY]=bleachedROI.dataVec[0]
+		return img,valOut
+	
+	img=concRim*np.ones(simulation.ICimg.shape)
+	img[masterROI.imgIdxX,masterROI.imgIdxY]=simulation.ICimg[masterROI.imgIdxX,masterROI.imgIdxY]
+	
+	return img,concRim
+
+def getAxisymmetricICs(simulation,grid):
+	
+	"""Returns initial conditions on (r,z) grid.
+	
+	Averages :py:func:`getAxisymmetricICImg` over the annulus of each radial cell. Parts of 
+	annuli not covered by the image get the fill value, as cells outside of the image do in 3D.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		grid (dict): Grid, see :py:func:`getAxisymmetricGrid`.
+	
+	Returns: 
+		numpy.ndarray: Initial value of each cell.
+	"""
+	
+	img,fillVal=getAxisymmetricICImg(simulation)
+	
+	#Pixel img[i,j] lies at x=j+1, y=i+1 when interpolating images onto meshes, see applyInterpolatedICs
+	center=np.asarray(simulation.embryo.geometry.getCenter(),dtype=float)-1
+	profile=getAnnulusAverages(img,center,grid['dr'],grid['nr'],fillVal=fillVal)
+	
+	return profile[grid['ir']]
+
+def getAnnulusAverages(img,center,dr,nr,fillVal=0.):
+	
+	"""Averages image over annuli of width ``dr`` around center.
+	
+	Pixels are assigned to annuli by the distance of their coordinates to center, 
+	see :py:func:`pyfrp.modules.pyfrp_img_module.getPxCoordinates`. Pixel positions of annuli lying 
+	outside of the image contribute with ``fillVal``. Annuli without any pixel position get the value 
+	of their neighbors.
+	
+	Args: 
+		img (numpy.ndarray): Image.
+		center (list): Center.
+		dr (float): Width of annuli.
+		nr (int): Number of annuli.
+	
+	Keyword Args:
+		fillVal (float): Value outside of image.
+	
+	Returns: 
+		numpy.ndarray: Average of each annulus.
+	"""
+	
+	img=np.asarray(img,dtype=float)
+	rmax=nr*dr
+	
+	#All pixel positions covered by annuli, inside image or not
+	x,y=np.meshgrid(np.arange(np.floor(center[0]-rmax),np.ceil(center[0]+rmax)+1),np.arange(np.floor(center[1]-rmax),np.ceil(center[1]+rmax)+1))
+	idx=np.floor(pyfrp_img_module.computeRadii(x,y,center)/dr).astype(int)
+	
+	inRange=idx<nr
+	x,y,idx=x[inRange].astype(int),y[inRange].astype(int),idx[inRange]
+	inImg=(x>=0) & (x<img.shape[1]) & (y>=0) & (y<img.shape[0])
+	
+	vals=fillVal*np.ones(len(idx))
+	vals[inImg]=img[y[inImg],x[inImg]]
+	
+	counts=np.bincount(idx,minlength=nr).astype(float)
+	profile=np.bincount(idx,weights=vals,minlength=nr)/np.maximum(counts,1)
+	
+	#Fill empty annuli from neighbors
+	filled=counts>0
+	if not filled.all():
+		profile=np.interp(np.arange(nr),np.arange(nr)[filled],profile[filled])
+	
+	return profile
+
+def getAxisymmetricROIWeights(simulation,grid):
+	
+	"""Returns weights of (r,z) grid cells for the concentration of each ROI.
+	
+	For a radially symmetric solution, the mean over a ROI is the mean over all annuli, weighted by 
+	the area the ROI covers of each annulus and the height of the annulus inside the ROI's z-range. 
+	Areas are counted from image indices and extended pixels of ROIs, so this is exact for 
+	:py:class:`pyfrp.subclasses.pyfrp_ROI.radialROI` and :py:class:`pyfrp.subclasses.pyfrp_ROI.sliceROI` 
+	up to pixelation, and exact for other ROIs as long as the solution is radially symmetric.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		grid (dict): Grid, see :py:func:`getAxisymmetricGrid`.
+	
+	Returns: 
+		numpy.ndarray: Weights of shape ``(len(embryo.ROIs),nCells)``, rows summing up to 1.
+	"""
+	
+	center=simulation.embryo.geometry.getCenter()
+	
+	W=np.zeros((len(simulation.embryo.ROIs),len(grid['r'])))
+	
+	for i,r in enumerate(simulation.embryo.ROIs):
+		
+		x=np.concatenate([np.asarray(r.imgIdxX,dtype=float),np.asarray(getattr(r,'extImgIdxX',[]),dtype=float)])
+		y=np.concatenate([np.asarray(r.imgIdxY,dtype=float),np.asarray(getattr(r,'extImgIdxY',[]),dtype=float)])
+		
+		#Image indices of ROIs are shifted by one against coordinates, see pyfrp_idx_module.getCircleIdxImg
+		idx=np.floor(pyfrp_img_module.computeRadii(x+1,y+1,center)/grid['dr']).astype(int)
+		counts=np.bincount(idx[idx<grid['nr']],minlength=grid['nr'])
+		
+		zInside=(grid['z']>=r.zmin) & (grid['z']<=r.zmax)
+		w=counts[grid['ir']]*grid['inside']*zInside
+		
+		if w.sum()>0:
+			W[i]=w/float(w.sum())
+		else:
+			printWarning("ROI "+r.name+" does not cover any cell of axisymmetric grid.")
+		
+	return W
+
+def getAxisymmetricROIConcFunc(simulation,grid):
+	
+	"""Returns function appending concentrations of all ROIs to their ``simVec``, given a solution on (r,z) grid.
+	
+	See also :py:func:`getAxisymmetricROIWeights` and :py:func:`solveReactDiff`.
+	
+	Args: 
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		grid (dict): Grid, see :py:func:`getAxisymmetricGrid`.
+	
+	Returns: 
+		function: Function taking solution variable or array.
+	"""
+	
+	W=getAxisymmetricROIWeights(simulation,grid)
+	ROIs=simulation.embryo.ROIs
+	
+	def roiConc(phi):
+		concs=W.dot(np.asarray(getattr(phi,'value',phi)))
+		for i,r in enumerate(ROIs):
+			r.simVec.append(concs[i])
+	
+	return roiConc
+
+def applyROIBasedICs(phi,simulation):
+	
+	"""Applies ROI-based initial conditions.
+	
+	First sets concentration on all mesh nodes equal to `simulation.embryo.analysis.concRim`.
+	Afterwards, mesh nodes get assigned the value of the first entry ``dataVec`` of 
+	the ROI covering them. Note: If a mesh node is covered by two ROIs, will assign the value
+	of the ROI that is last in embryo's ``ROIs`` list. See also 
+	:py:func:`pyfrp.subclasses.pyfrp_simulation.setICMode`.
+	
+	Args:
+		phi (fipy.CellVariable): PDE solution variable.
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+	
+	Returns:
+		fipy.CellVariable: Updated solution variable.	
+	
+	"""
+	
+	phi.setValue(simulation.embryo.analysis.concRim)
+	
+	for r in simulation.embryo.ROIs:
+		phi.value[r.meshIdx]=r.dataVec[0]
+		
+	
+def applyIdealICs(phi,simulation,bleachedROI=None,valOut=None):
+	
+	"""Applies ideal initial conditions.
+	
+	That is, everything falling inside the bleached ROI in 
+	x-y-direction will be set its initial dataVec value,
+	everything else will be set equal to valOut.
+	
+	.. note:: The ``bleachedROI`` and valOut are often stored inside the simulation
+	   object. If those two cannot be found, will try to find a ROI called *Bleached Square*
+	   for the bleached ROI and set valOut to ``concRim``. If this again fails, will return
+	   error.
+	
+	Args:
+		phi (fipy.CellVariable): PDE solution variable.
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+		
+	Keyword Args:
+		bleachedROI (pyfrp.subclasses.pyfrp_ROI.ROI): Bleached ROI.
+		valOut (float): Value to be assigned outside of bleached ROI.
+		
+	Returns:
+		fipy.CellVariable: Updated solution variable.	
+	
+	"""
+	
+	if bleachedROI==None:
+		bleachedROI=simulation.embryo.getROIByName("Bleached Square")
+		if bleachedROI==None:
+			printError("No bleachedROI can be found in applyIdealICs.")
+			return phi
+		
+	if valOut==None:
+		if simulation.embryo.analysis.concRim!=None:
+			valOut=simulation.embryo.analysis.concRim
+		else:
+			printError("No bleachedROI can be found in applyIdealICs.")
+			return phi
+	
+	#Set all values in mesh to valOut
+	phi.setValue(valOut)
+	
+	#Find indices of all nodes that lie inside bleachedROI in x-y-direction
+	x,y,z=simulation.mesh.getCellCenters()
+	ind=bleachedROI.checkXYInside(np.asarray(x),np.asarray(y))
+	
+	#Set these nodes equal to first dataVec entry
+	phi.value[ind]=bleachedROI.dataVec[0]
+	
+	return phi
+			
+def applyRadialICs(phi,simulation,radSteps=15,debug=False):
+	
+	"""Applies radially averaged image data to solution variable as IC.
+	
+	Bins ``simulation.ICimg`` radially using :py:func:`pyfrp.modules.pyfrp_img_module.radialImgHist`, then 
+	assigns each cell the average of the bin its center falls into. Cells outside of the maximum radius
+	get the value of the most outer bin.
+	
+	.. note:: Will use ``embryo.geometry.center`` as center circle and the maximum 
+	   distant pixel from the center as maximum radius.
+	
+	Args: 
+		phi (fipy.CellVariable): PDE solution variable.
+		simulation (pyfrp.subclasses.pyfrp_simulation.simulation): Simulation object.
+	
+	Keyword Args:
+		radSteps (int): Number of radial levels.
+		debug (bool): Print debugging messages.
+		
+	Returns:
+		fipy.CellVariable: Updated solution variable.
+	
+	"""
+	
+	center=simulation.embryo.geometry.getCenter()
+	
+	#Adjust center so histogram works for 'quad'
+	if 'quad' in simulation.embryo.analysis.process.keys():
+		imgCenter=[0,0]
+	else:
+		imgCenter=center
+	
+	#Compute radial histogram of IC image up to most distant corner
+	res=simulation.ICimg.shape
+	maxR=max([pyfrp_img_module.dist(imgCenter,corner) for corner in [[0,0],[res[1],0],[0,res[0]],[res[1],res[0]]]])
+	bins,binsMid,histY,binY=pyfrp_img_module.radialImgHist(simulation.ICimg,imgCenter,nbins=radSteps,maxR=maxR)
+	
+	#Fill empty bins from neighboring bins
+	filled=np.isfinite(binY)
+	binY=np.interp(binsMid,binsMid[filled],binY[filled])
+	
+	#Bin cell centers with the same bins, cells outside maxR go into most outer bin
+	x,y,z=simulation.mesh.getCellCenters()
+	idx=pyfrp_img_module.computeBinIdx(pyfrp_img_module.computeRadii(x,y,center),bins)
+	idx=np.minimum(idx,radSteps-1)
+	
+	phi.setValue(binY[idx])
+	
+	if debug:
+		for i in range(radSteps):
+			print "Applied concentration", binY[i], " to all nodes with radius in [", bins[i], ",", bins[i+1], ")"
 	
 	return phi
 		
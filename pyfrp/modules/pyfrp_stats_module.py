@@ -36,6 +36,11 @@ to assess overall measurement statistics.
 import numpy as np
 import scipy
 
+#PyFRAP
+import pyfrp_optimization_module
+
+from pyfrp_term_module import *
+
 #===========================================================================================================================================================================
 #Module Functions
 #===========================================================================================================================================================================
@@ -742,4 +747,373 @@ def shapiroTest(x,printOut=True):
 	
 	
 	
-	
\ No newline at end of file
+	
+
+def getLikelihoodProblem(fit):
+	
+	"""Collects everything needed to evaluate the SSD of a fit without touching the fit, 
+	see :py:func:`computeSSDBatch`.
+	
+	Uses the same data and simulation vectors as :py:func:`pyfrp.modules.pyfrp_fit_module.scaleROIs`.
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit.fit): Fit object.
+	
+	Returns:
+		dict: Likelihood problem.
+	
+	"""
+	
+	sim=fit.embryo.simulation
+	tvecData=np.asarray(fit.embryo.tvecData,dtype=float)
+	tvecSim=np.asarray(sim.tvecSim,dtype=float)
+	
+	if fit.fitPinned:
+		dataVecs=[r.dataVecPinned for r in fit.ROIsFitted]
+		simVecs=[r.simVecPinned for r in fit.ROIsFitted]
+	else:
+		dataVecs=[r.dataVec for r in fit.ROIsFitted]
+		simVecs=[r.simVec for r in fit.ROIsFitted]
+	
+	dataVecs=np.array(dataVecs,dtype=float)
+	simVecs=np.array(simVecs,dtype=float)
+	
+	if fit.fitCutOffT:
+		nData=np.where(tvecData<fit.cutOffT)[0].max()
+		nSim=np.where(tvecSim<fit.cutOffT)[0].max()
+		tvecData,dataVecs=tvecData[:nData],dataVecs[:,:nData]
+		tvecSim,simVecs=tvecSim[:nSim],simVecs[:,:nSim]
+	
+	return {"tvecData":tvecData,"tvecSim":tvecSim,"D":float(sim.D),"dataVecs":dataVecs,"simVecs":simVecs,
+		"fitProd":fit.fitProd,"fitDegr":fit.fitDegr,"equOn":fit.equOn,"x0":list(fit.x0),"kineticTimeScale":float(fit.kineticTimeScale)}
+
+def computeSSDBatch(problem,X):
+	
+	"""Computes SSD of many parameter vectors at once.
+	
+	Evaluates the same model as :py:func:`pyfrp.modules.pyfrp_fit_module.FRAPObjFunc`, that is rescaling of 
+	the simulation time by :math:`D/D_{new}`, reaction kinetics and equalization, but vectorized over parameter 
+	vectors and without side effects. Rescaling time by :math:`D/D_{new}` is equivalent to interpolating the 
+	simulation at data times scaled by :math:`D_{new}/D`.
+	
+	Args:
+		problem (dict): Likelihood problem, see :py:func:`getLikelihoodProblem`.
+		X (numpy.ndarray): Parameter vectors of shape ``(n,k)``, ordered as in 
+			:py:func:`pyfrp.modules.pyfrp_fit_module.assignInputVariables`.
+	
+	Returns:
+		numpy.ndarray: SSDs, ``inf`` where parameters are negative or the scaled simulation does not cover the data.
+	
+	"""
+	
+	X=np.atleast_2d(np.asarray(X,dtype=float))
+	n=X.shape[0]
+	
+	Dnew=X[:,0]
+	k=1
+	if problem['fitProd']:
+		prod=X[:,k]
+		k=k+1
+	else:
+		prod=problem['x0'][1]*np.ones(n)
+	if problem['fitDegr']:
+		degr=X[:,k]
+		k=k+1
+	else:
+		degr=problem['x0'][2]*np.ones(n)
+	
+	prod=prod/problem['kineticTimeScale']
+	degr=degr/problem['kineticTimeScale']
+	
+	tvecData=problem['tvecData']
+	tvecSim=problem['tvecSim']
+	
+	#Data times in unscaled simulation time
+	T=np.outer(Dnew/problem['D'],tvecData)
+	
+	valid=(X.min(axis=1)>=0)&(Dnew>0)
+	valid=valid&(T[:,0]>=tvecSim[0])&(T[:,-1]<=tvecSim[-1])
+	
+	#Reaction kinetics as in addKineticsToSolution
+	t=tvecData[None,:]
+	P=prod[:,None]
+	G=degr[:,None]
+	with np.errstate(divide='ignore',invalid='ignore'):
+		decay=np.where(G>0,np.exp(-G*t),1.)
+		offset=np.where((P>0)&(G>0),(P/G)*(1-np.exp(-G*t)),np.where(P>0,P*t,0.))
+	
+	SSD=np.zeros(n)
+	for i in range(len(problem['dataVecs'])):
+		sim=np.interp(T,tvecSim,problem['simVecs'][i])*decay+offset
+		if problem['equOn']:
+			with np.errstate(divide='ignore',invalid='ignore'):
+				sim=sim/X[:,k+i][:,None]
+		SSD=SSD+((problem['dataVecs'][i][None,:]-sim)**2).sum(axis=1)
+	
+	SSD[~valid]=np.inf
+	SSD[np.isnan(SSD)]=np.inf
+	
+	return SSD
+
+def computeLogPosteriorBatch(problem,X,LBs,UBs,sigma):
+	
+	r"""Computes unnormalized log-posterior of many parameter vectors at once.
+	
+	Assumes normally distributed residuals with standard deviation :math:`\sigma`, see :py:func:`computeLogLikelihood`,
+	and a uniform prior within the bounds, that is
+	
+	.. math:: \log p(x|d) = -\frac{SSD(x)}{2\sigma^2} + \mathrm{const.} \quad \mathrm{for} \quad LB \leq x \leq UB.
+	
+	Args:
+		problem (dict): Likelihood problem, see :py:func:`getLikelihoodProblem`.
+		X (numpy.ndarray): Parameter vectors of shape ``(n,k)``.
+		LBs (list): Lower bounds.
+		UBs (list): Upper bounds.
+		sigma (float): Standard deviation of residuals.
+	
+	Returns:
+		numpy.ndarray: Log-posterior, ``-inf`` outside of bounds.
+	
+	"""
+	
+	X=np.atleast_2d(np.asarray(X,dtype=float))
+	
+	logP=-computeSSDBatch(problem,X)/(2*sigma**2)
+	inside=np.all((X>=np.asarray(LBs,dtype=float))&(X<=np.asarray(UBs,dtype=float)),axis=1)
+	logP[~inside]=-np.inf
+	
+	return logP
+
+def sampleEnsemble(logProbBatch,p0,nSteps,a=2.,thin=1,seed=None,debug=False):
+	
+	r"""Samples distribution with the affine invariant ensemble sampler of Goodman and Weare (stretch move).
+	
+	Walkers are split into two halves. Each half is moved at once, using the other half as partners, so all 
+	proposals of a half are evaluated in a single call of ``logProbBatch``.
+	
+	Args:
+		logProbBatch (function): Function mapping array of shape ``(n,k)`` to ``n`` unnormalized log-probabilities.
+		p0 (numpy.ndarray): Initial walker positions of shape ``(nWalkers,k)``, with ``nWalkers`` even and at least ``2k``.
+		nSteps (int): Number of steps.
+	
+	Keyword Args:
+		a (float): Scale of stretch move.
+		thin (int): Only store every ``thin``-th step.
+		seed (int): Seed of random number generator.
+		debug (bool): Print progress.
+	
+	Returns:
+		tuple: Tuple containing:
+		
+			* chain (numpy.ndarray): Walker positions of shape ``(nSteps/thin,nWalkers,k)``.
+			* logProb (numpy.ndarray): Log-probabilities of shape ``(nSteps/thin,nWalkers)``.
+			* acceptance (float): Fraction of accepted proposals.
+	
+	"""
+	
+	rng=np.random.RandomState(seed)
+	
+	walkers=np.array(p0,dtype=float)
+	nWalkers,k=walkers.shape
+	
+	if nWalkers%2!=0 or nWalkers<2*k:
+		raise ValueError("Number of walkers needs to be even and at least twice the number of parameters.")
+	
+	lp=np.asarray(logProbBatch(walkers),dtype=float)
+	if not np.all(np.isfinite(lp)):
+		printWarning("Some walkers start at zero probability.")
+	
+	chain=np.empty((nSteps/thin,nWalkers,k),dtype=np.float32)
+	logProb=np.empty((nSteps/thin,nWalkers),dtype=np.float32)
+	
+	halves=[np.arange(nWalkers/2),np.arange(nWalkers/2,nWalkers)]
+	accepted=0
+	
+	for step in range(nSteps):
+		for j in range(2):
+			S=halves[j]
+			C=halves[1-j]
+			
+			z=((a-1)*rng.rand(len(S))+1)**2/a
+			partners=walkers[C[rng.randint(len(C),size=len(S))]]
+			proposals=partners+z[:,None]*(walkers[S]-partners)
+			
+			lpProp=np.asarray(logProbBatch(proposals),dtype=float)
+			
+			with np.errstate(invalid='ignore'):
+				logR=(k-1)*np.log(z)+lpProp-lp[S]
+			accept=np.log(rng.rand(len(S)))<logR
+			
+			walkers[S[accept]]=proposals[accept]
+			lp[S[accept]]=lpProp[accept]
+			accepted=accepted+accept.sum()
+		
+		if (step+1)%thin==0 and (step+1)/thin<=len(chain):
+			chain[(step+1)/thin-1]=walkers
+			logProb[(step+1)/thin-1]=lp
+		
+		if debug and (step+1)%max(nSteps/10,1)==0:
+			print "Step", step+1, "of", nSteps, "acceptance", accepted/float(nWalkers*(step+1))
+	
+	return chain,logProb,accepted/float(nWalkers*nSteps)
+
+def evalPoolLogPosterior(X):
+	
+	"""Evaluates log-posterior in worker process of pool returned by :py:func:`pyfrp.modules.pyfrp_optimization_module.getProblemPool`.
+	
+	The pool holds the arguments ``(problem,LBs,UBs,sigma)`` of :py:func:`computeLogPosteriorBatch`.
+	
+	"""
+	
+	problem,LBs,UBs,sigma=pyfrp_optimization_module.poolProblem
+	
+	return computeLogPosteriorBatch(problem,X,LBs,UBs,sigma)
+
+def getFitBoundLists(fit):
+	
+	"""Returns lower and upper bounds of all parameters sampled by :py:func:`computeFitPosterior`.
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit.fit): Fit object.
+	
+	Returns:
+		tuple: Tuple containing:
+		
+			* LBs (list): List of lower bounds.
+			* UBs (list): List of upper bounds.
+	
+	"""
+	
+	nEqu=len(fit.ROIsFitted)*int(fit.equOn)
+	
+	LBs=[fit.LBD]+int(fit.fitProd)*[fit.LBProd]+int(fit.fitDegr)*[fit.LBDegr]+nEqu*[fit.LBEqu]
+	UBs=[fit.UBD]+int(fit.fitProd)*[fit.UBProd]+int(fit.fitDegr)*[fit.UBDegr]+nEqu*[fit.UBEqu]
+	
+	return LBs,UBs
+
+def computeFitPosterior(fit,nWalkers=32,nSteps=2000,burnIn=500,thin=10,sigma=None,processes=1,seed=None,debug=False):
+	
+	r"""Samples posterior of parameters of a fitted fit by ensemble MCMC, see :py:func:`sampleEnsemble`.
+	
+	Walkers start in a small ball around the fitted optimum. The log-posterior is evaluated by 
+	:py:func:`computeLogPosteriorBatch` for a whole half of the walkers at once, split across ``processes`` 
+	worker processes if ``processes>1``. If ``sigma`` is not given, it is estimated from the optimal fit as 
+	:math:`\sqrt{SSD/n}`, with :math:`n` the number of fitted data points.
+	
+	The thinned chain after burn-in is stored as single precision in ``fit.posterior`` together with the 
+	parameter names, log-probabilities, acceptance fraction and settings, see also :py:func:`summarizePosterior`.
+	
+	Args:
+		fit (pyfrp.subclasses.pyfrp_fit.fit): Fit object.
+	
+	Keyword Args:
+		nWalkers (int): Number of walkers.
+		nSteps (int): Number of steps per walker.
+		burnIn (int): Number of steps discarded.
+		thin (int): Only keep every ``thin``-th step.
+		sigma (float): Standard deviation of residuals.
+		processes (int): Number of worker processes.
+		seed (int): Seed of random number generator.
+		debug (bool): Print progress.
+	
+	Returns:
+		dict: Posterior.
+	
+	"""
+	
+	if not fit.isFitted():
+		printError("Fit "+fit.name+" needs to be run before sampling its posterior.")
+		return None
+	
+	problem=getLikelihoodProblem(fit)
+	LBs,UBs=getFitBoundLists(fit)
+	
+	#Optimum in the parametrization of the objective function
+	xOpt=[fit.DOptPx]+int(fit.fitProd)*[fit.prodOpt*fit.kineticTimeScale]+int(fit.fitDegr)*[fit.degrOpt*fit.kineticTimeScale]
+	if fit.equOn:
+		xOpt=xOpt+list(fit.equFacts)
+	xOpt=np.asarray(xOpt,dtype=float)
+	
+	if sigma==None:
+		nData=problem['dataVecs'].size
+		sigma=np.sqrt(max(computeSSDBatch(problem,xOpt[None,:])[0],1E-30)/nData)
+	
+	nWalkers=max(nWalkers+nWalkers%2,2*len(xOpt))
+	rng=np.random.RandomState(seed)
+	p0=xOpt*(1+1E-3*rng.randn(nWalkers,len(xOpt)))
+	p0=np.clip(p0,LBs,UBs)
+	
+	pool=None
+	if processes>1:
+		pool=pyfrp_optimization_module.getProblemPool(processes,problem,LBs,UBs,sigma)
+		logProbBatch=lambda X: np.concatenate(pool.map(evalPoolLogPosterior,np.array_split(X,processes)))
+	else:
+		logProbBatch=lambda X: computeLogPosteriorBatch(problem,X,LBs,UBs,sigma)
+	
+	try:
+		chain,logProb,acceptance=sampleEnsemble(logProbBatch,p0,nSteps,thin=thin,seed=seed,debug=debug)
+	finally:
+		if pool!=None:
+			pool.close()
+			pool.join()
+	
+	start=burnIn/thin
+	
+	names=["DOptPx"]+int(fit.fitProd)*["prodOpt"]+int(fit.fitDegr)*["degrOpt"]
+	if fit.equOn:
+		names=names+[r.name+" equFact" for r in fit.ROIsFitted]
+	
+	fit.posterior={"names":names,"chain":chain[start:],"logProb":logProb[start:],"acceptance":acceptance,"sigma":sigma,
+		"nWalkers":nWalkers,"nSteps":nSteps,"burnIn":burnIn,"thin":thin,"convFact":fit.embryo.convFact,"kineticTimeScale":fit.kineticTimeScale}
+	
+	if acceptance<0.1 or acceptance>0.8:
+		printWarning("Acceptance fraction of "+str(acceptance)+" is unusual, check posterior of fit "+fit.name+".")
+	
+	return fit.posterior
+
+def getPosteriorSamples(posterior,name):
+	
+	"""Returns all samples of parameter from posterior in the units of the fit results.
+	
+	Besides the sampled parameters, ``DOptMu`` is available, converted from ``DOptPx``.
+	Production and degradation rates are converted back by ``kineticTimeScale``.
+	
+	Args:
+		posterior (dict): Posterior, see :py:func:`computeFitPosterior`.
+		name (str): Name of parameter.
+	
+	Returns:
+		numpy.ndarray: Samples.
+	
+	"""
+	
+	if name=="DOptMu":
+		return getPosteriorSamples(posterior,"DOptPx")*posterior['convFact']**2
+	
+	samples=posterior['chain'][:,:,posterior['names'].index(name)].flatten().astype(float)
+	
+	if name in ["prodOpt","degrOpt"]:
+		samples=samples/posterior['kineticTimeScale']
+	
+	return samples
+
+def summarizePosterior(posterior,q=[2.5,50,97.5]):
+	
+	"""Returns percentiles of all parameters of posterior, see :py:func:`getPosteriorSamples`.
+	
+	Args:
+		posterior (dict): Posterior, see :py:func:`computeFitPosterior`.
+	
+	Keyword Args:
+		q (list): Percentiles, by default median and 95% credible interval.
+	
+	Returns:
+		dict: Percentiles by parameter name.
+	
+	"""
+	
+	summary={}
+	for name in ["DOptMu"]+posterior['names']:
+		summary[name]=np.percentile(getPosteriorSamples(posterior,name),q)
+	
+	return summary
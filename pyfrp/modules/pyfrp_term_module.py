@@ -33,10 +33,12 @@ custom output inside a Python/bash terminal.
 #===========================================================================================================================================================================
 
 import colorama
-import PyQt4.QtGui as QtGui
 import numpy as np
 import inspect
 
+#PyQt4 is only needed when running the GUI
+import pyfrp_lazy_module
+QtGui=pyfrp_lazy_module.lazyImport('PyQt4.QtGui')
 #===========================================================================================================================================================================
 #Module Functions
 #===========================================================================================================================================================================
@@ -0,0 +1,445 @@
+#=====================================================================================================================================
+#Copyright
+#=====================================================================================================================================
+
+#Copyright (C) 2014 Alexander Blaessle, Patrick Mueller and the Friedrich Miescher Laboratory of the Max Planck Society
+#This software is distributed under the terms of the GNU General Public License.
+
+#This file is part of PyFRAP.
+
+#PyFRAP is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#This program is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+
+#You should have received a copy of the GNU General Public License
+#along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+#===========================================================================================================================================================================
+#Module Description
+#===========================================================================================================================================================================
+
+"""Timer module for PyFRAP toolbox. 
+
+Collects wall times of named spans and counts of named events across image analysis, simulation and fitting, 
+to find out where an analysis spends its time. Timing is off by default; then spans do nothing 
+and cost only a function call. Switch it on via
+
+>>> pyfrp_timer_module.enable()
+>>> emb.quickAnalysis()
+>>> pyfrp_timer_module.printReport()
+
+Spans can be nested; each span records its total time and its own time, that is the time not spent in any child span.
+Code is instrumented via
+
+>>> with pyfrp_timer_module.span('sim.step'):
+>>> 	eq.solve(...)
+
+or by decorating a function with :py:func:`timed`. Reports can be exported to JSON (:py:func:`exportJSON`), 
+csv (:py:func:`exportCSV`) or to the cProfile/pstats format (:py:func:`exportPstats`), which can be read by 
+``pstats`` and profile viewers such as snakeviz or gprof2dot. If enabled with ``profile=True``, a full 
+cProfile of all Python functions is recorded as well, see :py:func:`exportProfile`.
+
+.. note:: Spans are tracked per thread, but statistics are shared.
+
+"""
+
+#===========================================================================================================================================================================
+#Importing necessary modules
+#===========================================================================================================================================================================
+
+#Misc
+import time
+import json
+import marshal
+import threading
+import functools
+import cProfile
+
+#===========================================================================================================================================================================
+#Module Variables
+#===========================================================================================================================================================================
+
+enabled=False
+"""Flag if timing is switched on."""
+
+spanStats={}
+"""Statistics of spans, as dictionary ``name: [count,total,own,min,max]``."""
+
+callerStats={}
+"""Statistics of nested spans, as dictionary ``(parent,name): [count,total]``."""
+
+counters={}
+"""Event counters, as dictionary ``name: count``."""
+
+profiler=None
+"""``cProfile.Profile`` object if enabled with ``profile=True``."""
+
+threadState=threading.local()
+
+#===========================================================================================================================================================================
+#Class definitions
+#===========================================================================================================================================================================
+
+class timerSpan(object):
+	
+	"""Context manager recording wall time of a named span.
+	
+	Use :py:func:`span` instead of creating spans directly.
+	
+	Args:
+		name (str): Name of span.
+		
+	"""
+	
+	__slots__=['name','start','childTime']
+	
+	def __init__(self,name):
+		self.name=name
+		self.childTime=0.
+		
+	def __enter__(self):
+		getStack().append(self)
+		self.start=time.time()
+		return self
+	
+	def __exit__(self,excType,excValue,tb):
+		
+		elapsed=time.time()-self.start
+		
+		stack=getStack()
+		stack.pop()
+		
+		if self.name in spanStats:
+			stats=spanStats[self.name]
+			stats[0]+=1
+			stats[1]+=elapsed
+			stats[2]+=elapsed-self.childTime
+			stats[3]=min(stats[3],elapsed)
+			stats[4]=max(stats[4],elapsed)
+		else:
+			spanStats[self.name]=[1,elapsed,elapsed-self.childTime,elapsed,elapsed]
+		
+		if len(stack)>0:
+			parent=stack[-1]
+			parent.childTime+=elapsed
+			
+			key=(parent.name,self.name)
+			if key in callerStats:
+				callerStats[key][0]+=1
+				callerStats[key][1]+=elapsed
+			else:
+				callerStats[key]=[1,elapsed]
+				
+		return False
+	
+class nullSpan(object):
+	
+	"""Span doing nothing, returned by :py:func:`span` if timing is switched off."""
+	
+	__slots__=[]
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self,excType,excValue,tb):
+		return False
+	
+noSpan=nullSpan()
+
+#===========================================================================================================================================================================
+#Module Functions
+#===========================================================================================================================================================================
+
+def enable(profile=False):
+	
+	"""Switches timing on.
+	
+	Keyword Args:
+		profile (bool): Also record cProfile of all Python functions.
+		
+	"""
+	
+	global enabled,profiler
+	
+	enabled=True
+	
+	if profile:
+		if profiler==None:
+			profiler=cProfile.Profile()
+		profiler.enable()
+	
+def disable():
+	
+	"""Switches timing off. Recorded statistics are kept."""
+	
+	global enabled
+	
+	enabled=False
+	
+	if profiler!=None:
+		profiler.disable()
+	
+def isEnabled():
+	
+	"""Returns True if timing is switched on."""
+	
+	return enabled
+
+def reset():
+	
+	"""Clears all recorded statistics."""
+	
+	global profiler
+	
+	spanStats.clear()
+	callerStats.clear()
+	counters.clear()
+	
+	if profiler!=None:
+		profiler.disable()
+		if enabled:
+			profiler=cProfile.Profile()
+			profiler.enable()
+		else:
+			profiler=None
+			
+def getStack():
+	
+	"""Returns stack of open spans of current thread."""
+	
+	try:
+		return threadState.stack
+	except AttributeError:
+		threadState.stack=[]
+		return threadState.stack
+	
+def span(name):
+	
+	"""Returns context manager timing a named span.
+	
+	Args:
+		name (str): Name of span, for example ``'sim.step'``.
+		
+	Returns:
+		timerSpan: Span, or :py:class:`nullSpan` if timing is switched off.
+	
+	"""
+	
+	if enabled:
+		return timerSpan(name)
+	return noSpan
+
+def timed(name):
+	
+	"""Decorator timing every call of a function as span.
+	
+	Args:
+		name (str): Name of span.
+	
+	Returns:
+		function: Decorator.
+		
+	"""
+	
+	def decorator(func):
+		
+		@functools.wraps(func)
+		def wrapper(*args,**kwargs):
+			if not enabled:
+				return func(*args,**kwargs)
+			with timerSpan(name):
+				return func(*args,**kwargs)
+		
+		return wrapper
+	
+	return decorator
+
+def timedIter(name,iterable):
+	
+	"""Times fetching each item of an iterable, for example images loaded by a generator.
+	
+	Args:
+		name (str): Name of span.
+		iterable (iterable): Iterable.
+		
+	Returns:
+		iterable: Iterable yielding the same items.
+	
+	"""
+	
+	if not enabled:
+		return iterable
+	return _timedIter(name,iter(iterable))
+
+def _timedIter(name,iterator):
+	
+	while True:
+		with timerSpan(name):
+			try:
+				item=next(iterator)
+			except StopIteration:
+				return
+		yield item
+
+def count(name,n=1):
+	
+	"""Increases named event counter.
+	
+	Args:
+		name (str): Name of counter.
+		
+	Keyword Args:
+		n (int): Increment.
+	
+	"""
+	
+	if enabled:
+		counters[name]=counters.get(name,0)+n
+		
+def getReport(sortBy='total'):
+	
+	"""Returns summary of all recorded spans.
+	
+	Keyword Args:
+		sortBy (str): Key to sort spans by in descending order.
+		
+	Returns:
+		list: List of dictionaries with keys ``name``, ``count``, ``total``, ``own``, ``mean``, ``min`` and ``max``.
+	
+	"""
+	
+	report=[]
+	for name,stats in spanStats.items():
+		report.append({'name':name,'count':stats[0],'total':stats[1],'own':stats[2],'mean':stats[1]/stats[0],'min':stats[3],'max':stats[4]})
+	
+	report.sort(key=lambda entry: entry[sortBy],reverse=sortBy!='name')
+	
+	return report
+
+def printReport(sortBy='total'):
+	
+	"""Prints summary of all recorded spans and counters.
+	
+	Keyword Args:
+		sortBy (str): Key to sort spans by in descending order.
+	
+	"""
+	
+	report=getReport(sortBy=sortBy)
+	
+	print "%-30s %10s %12s %12s %12s" %("span","count","total [s]","own [s]","mean [s]")
+	for entry in report:
+		print "%-30s %10d %12.4f %12.4f %12.6f" %(entry['name'],entry['count'],entry['total'],entry['own'],entry['mean'])
+	
+	if len(counters)>0:
+		print
+		print "%-30s %10s" %("counter","count")
+		for name in sorted(counters.keys()):
+			print "%-30s %10d" %(name,counters[name])
+
+def exportJSON(fn):
+	
+	"""Exports spans, nested spans and counters to JSON file.
+	
+	Args:
+		fn (str): Path to output file.
+		
+	Returns:
+		str: Path to output file.
+	
+	"""
+	
+	callers=[{'parent':key[0],'name':key[1],'count':stats[0],'total':stats[1]} for key,stats in callerStats.items()]
+	
+	with open(fn,'w') as f:
+		json.dump({'spans':getReport(),'callers':callers,'counters':counters},f,indent=1,sort_keys=True)
+		
+	return fn
+
+def exportCSV(fn):
+	
+	"""Exports spans and counters to csv file.
+	
+	Counters are appended as rows with only ``name`` and ``count`` set.
+	
+	Args:
+		fn (str): Path to output file.
+	
+	Returns:
+		str: Path to output file.
+	
+	"""
+	
+	import pyfrp_IO_module
+	
+	header=['name','count','total','own','mean','min','max']
+	table=[[entry[key] for key in header] for entry in getReport()]
+	table=table+[[name,counters[name],'','','','',''] for name in sorted(counters.keys())]
+	
+	pyfrp_IO_module.writeTableToCSV(table,header,fn)
+	
+	return fn
+
+def getPstatsKey(name):
+	
+	"""Returns key of span in pstats format."""
+	
+	return ('pyfrp',0,name)
+
+def exportPstats(fn):
+	
+	"""Exports spans in cProfile/pstats format.
+	
+	Each span shows up as a function ``pyfrp:0(name)``, nested spans as its callees.
+	The file can be read with ``pstats.Stats(fn)``.
+	
+	Args:
+		fn (str): Path to output file.
+	
+	Returns:
+		str: Path to output file.
+	
+	"""
+	
+	callers={}
+	for (parent,name),stats in callerStats.items():
+		callers.setdefault(name,{})[getPstatsKey(parent)]=(stats[0],stats[0],stats[1],stats[1])
+		
+	stats={}
+	for name,entry in spanStats.items():
+		stats[getPstatsKey(name)]=(entry[0],entry[0],entry[2],entry[1],callers.get(name,{}))
+	
+	with open(fn,'wb') as f:
+		marshal.dump(stats,f)
+		
+	return fn
+
+def exportProfile(fn):
+	
+	"""Exports cProfile of all Python functions recorded since :py:func:`enable` was called with ``profile=True``.
+	
+	Args:
+		fn (str): Path to output file.
+	
+	Returns:
+		str: Path to output file, or None if no profile was recorded.
+	
+	"""
+	
+	if profiler==None:
+		return None
+	
+	profiler.dump_stats(fn)
+	
+	#Dumping stops profiler
+	if enabled:
+		profiler.enable()
+	
+	return fn
@@ -39,9 +39,10 @@ www.vtk.org and http://www.vtk.org/Wiki/VTK/Examples/Python .
 import numpy as np
 import scipy.interpolate
 
-#Plotting
-import vtk
-import matplotlib
+#Plotting (imported on first use)
+import pyfrp_lazy_module
+vtk=pyfrp_lazy_module.lazyImport('vtk')
+matplotlib=pyfrp_lazy_module.lazyImport('matplotlib')
 
 #Misc
 import sys
@@ -51,6 +52,7 @@ import os
 import pyfrp_img_module
 from pyfrp_term_module import *
 from pyfrp.modules import pyfrp_idx_module
+import pyfrp_IO_module
 
 #===========================================================================================================================================================================
 #Module Functions
@@ -588,7 +590,9 @@ def meshToUnstructeredGrid(mesh):
 	
 	"""Converts a FiPy mesh structure to a vtkUnstructuredGrid.
 	
-	Works for 2D and 3D meshes.
+	Works for 2D and 3D meshes. Points and cells are passed to VTK as whole 
+	arrays via ``vtk.util.numpy_support``, see also 
+	:py:func:`pyfrp.modules.pyfrp_IO_module.meshToArrays`.
 	
 	Args:
 		mesh (fipy.GmshImporter3D): Some Fipy mesh object.
@@ -597,45 +601,28 @@ def meshToUnstructeredGrid(mesh):
 		vtk.vtkUnstructuredGrid	
 	"""
 	
+	from vtk.util import numpy_support
 	
-	# Get vertex coordinates
-	coords=mesh.vertexCoords
+	points,cells=pyfrp_IO_module.meshToArrays(mesh)
+	nCells,nVert=cells.shape
+	
+	# Insert points
+	vtkPoints = vtk.vtkPoints()
+	vtkPoints.SetData(numpy_support.numpy_to_vtk(points,deep=1))
+	
+	# Insert cells, VTK expects number of vertices in front of each cell
+	cellIds=np.empty((nCells,nVert+1),dtype=np.int64)
+	cellIds[:,0]=nVert
+	cellIds[:,1:]=cells
 	
-	if len(coords)==2:
-		x,y=coords
-		dim=2
-	else:
-		x,y,z=coords
-		dim=3
-		
-	# Insert them as points
-	points = vtk.vtkPoints()
-	for i in range(len(x)):
-		if dim==2:
-			points.InsertNextPoint(x[i], y[i],0)
-		else:	
-			points.InsertNextPoint(x[i], y[i],z[i])
-
-	# Insert tetrahedrons
-	verts=mesh._getOrderedCellVertexIDs().T
-		
 	cellArray = vtk.vtkCellArray()
-	for j,vert in enumerate(verts):
-		
-		if dim==3:
-			tetra = vtk.vtkTetra()
-		else:
-			tetra = vtk.vtkTriangle()
-			
-		for i,v in enumerate(vert):
-			tetra.GetPointIds().SetId(i, v)
-		cellArray.InsertNextCell(tetra)
-
+	cellArray.SetCells(nCells,numpy_support.numpy_to_vtkIdTypeArray(cellIds.ravel().astype(numpy_support.get_numpy_array_type(vtk.VTK_ID_TYPE)),deep=1))
+	
 	# Grid
 	grid = vtk.vtkUnstructuredGrid()
-	grid.SetPoints(points)
+	grid.SetPoints(vtkPoints)
 	
-	if dim==3:
+	if nVert==4:
 		grid.SetCells(vtk.VTK_TETRA, cellArray)
 	else:
 		grid.SetCells(vtk.VTK_TRIANGLE, cellArray)
@@ -39,12 +39,13 @@ that then can be used for a FRAP simulation.
 #Numpy/Scipy
 import numpy as np
 
-#Image processing
-import skimage.measure as skimsr
-import cv2
+#Image processing (imported on first use)
+import pyfrp_lazy_module
+skimsr=pyfrp_lazy_module.lazyImport('skimage.measure')
+cv2=pyfrp_lazy_module.lazyImport('cv2')
 
 #matplotlib
-import matplotlib.pyplot as plt
+plt=pyfrp_lazy_module.lazyImport('matplotlib.pyplot')
 
 #Misc
 import sys
@@ -55,12 +55,15 @@ from pyfrp.modules import pyfrp_fit_module
 from pyfrp.modules import pyfrp_gmsh_geometry
 from pyfrp.modules import pyfrp_gmsh_module
 from pyfrp.modules import pyfrp_openscad_module
+from pyfrp.modules import pyfrp_timer_module
+from pyfrp.modules import pyfrp_meshquality_module
 
 from pyfrp.modules.pyfrp_term_module import *
 
-#Plotting
-import matplotlib.pyplot as plt
-import matplotlib.patches as ptc
+#Plotting (imported on first use)
+from pyfrp.modules import pyfrp_lazy_module
+plt=pyfrp_lazy_module.lazyImport('matplotlib.pyplot')
+ptc=pyfrp_lazy_module.lazyImport('matplotlib.patches')
 
 #Time 
 import time
@@ -71,10 +74,10 @@ import copy
 #OS
 import os
 import shutil
+import tempfile
 
-#Solid/Opescad
-import solid
-import solid.utils
+#Solid/Opescad (imported on first use)
+solid=pyfrp_lazy_module.lazyImport('solid')
 
 #-------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 #Main ROI class
@@ -800,6 +803,7 @@ class ROI(object):
 		return ax
 	
 	
+	@pyfrp_timer_module.timed('roi.computeIdxs')
 	def computeIdxs(self,matchMesh=False,debug=False):
 		
 		"""Computes image and mesh indices of ROI. 
@@ -842,20 +846,23 @@ class ROI(object):
 				printWarning("Idxs of Master ROI have not been computed. Will compute them first.")
 				masterROI.computeIdxs(debug=debug)
 		
-		startIdx=time.clock()
+		startIdx=time.time()
 		
 		if  type(self) is not customROI:
 			
-			self.computeImgIdx(debug=debug)
-			self.matchImgIdx(masterROI)
-			self.computeExtIdx(debug=debug)
+			with pyfrp_timer_module.span('roi.imgIdx'):
+				self.computeImgIdx(debug=debug)
+				self.matchImgIdx(masterROI)
+			with pyfrp_timer_module.span('roi.extIdx'):
+				self.computeExtIdx(debug=debug)
 			
 			if self.embryo.simulation!=None:
 				if self.embryo.simulation.mesh.mesh==None:
 					printWarning("Mesh has not been generated, will not compute meshIdxs")
 				else:
 				
-					self.computeMeshIdx(self.embryo.simulation.mesh)
+					with pyfrp_timer_module.span('roi.meshIdx'):
+						self.computeMeshIdx(self.embryo.simulation.mesh)
 				
 					if matchMesh:
 						if self!=masterROI:
@@ -871,7 +878,7 @@ class ROI(object):
 					self.matchMeshIdx(masterROI)
 		
 		if debug:
-			print 'Compute Idxs: ', startIdx-time.clock()
+			print 'Compute Idxs: ', time.time()-startIdx
 		
 		return self.getAllIdxs()
 	
@@ -894,6 +901,7 @@ class ROI(object):
 		
 		m=self.embryo.getMasterROI()
 		rois=[self,m]
+		
 		[self.extImgIdxX,self.extImgIdxY]=pyfrp_idx_module.getCommonExtendedPixels(rois,self.embryo.dataResPx,debug=debug)
 		self.computeNumExt()
 		return self.extImgIdxX,self.extImgIdxY
@@ -1665,11 +1673,158 @@ class ROI(object):
 			
 		return fnOut
 	
-	def adaptRefineInMeshByField(self,nNodesReq,factor=3.,addZ=15.,zIncrement=1.,fIncrement=1.,nNodesMax='inf',debug=False,ROIReq=None,fnOut=None):
+	def adaptRefineInMeshByField(self,nNodesReq,factor=3.,addZ=15.,zIncrement=1.,fIncrement=1.,nNodesMax='inf',debug=False,ROIReq=None,fnOut=None,
+			      method='predictive',nCandidates=3,maxIter=10,processes=None):
 		
 		"""Refines mesh inside ROI adaptively until a given number of nodes inside ROI 
 		is reached.
 		
+		Two methods are available:
+		
+			* ``predictive``: Generates ``nCandidates`` meshes with refinement factors spread around ``factor`` 
+			  at once, see :py:func:`pyfrp.subclasses.pyfrp_mesh.mesh.genBoxFieldCandidates`. Then fits 
+			  a power law of number of nodes versus ``factor`` to all candidates so far and jumps to the factor 
+			  predicted to hit the node requirement. If no candidate refines the ROI at all, increases ``addZ`` by
+			  ``zIncrement``, doubling the increment every time this happens. Stops as soon as a candidate has 
+			  between ``nNodesReq`` and ``nNodesMax`` nodes, choosing the candidate with the fewest nodes in total, 
+			  see :py:func:`pyfrp.modules.pyfrp_meshquality_module.searchRefinement`. 
+			* ``increment``: Increases ``factor`` and ``addZ`` by fixed increments, 
+			  see :py:func:`adaptRefineInMeshByFieldIncrement`.
+		
+		.. note:: Candidate meshes are written into a temporary folder, which is removed afterwards. Only the selected 
+		   candidate is copied to ``fnOut``, or, if not given, to the same file :py:func:`pyfrp.subclasses.pyfrp_mesh.mesh.addBoxField` would write.
+		
+		.. note:: If ``ROIReq`` is given, will try to refine in ``self`` such that ``ROIReq`` has at least ``nNodesReq``
+		   mesh nodes. If it is not given, ``nNodesReq`` refers to the nodes in ``self``.
+		
+		Args:
+			nNodesReq (int): Desired number of nodes inside ROI.
+		
+		Keyword Args:
+			factor (float): Refinement factor.
+			addZ (float): Number of pixels added above and below ROI for box field.
+			zIncrement (float): Number of pixels addZ is increased per adaptive step.
+			fIncrement (float): Stepsize of refinement factor (only ``method=increment``).
+			nNodesMax (float): Maximum number of nodes allowed in ROI.
+			debug (bool): Print debugging messages.
+			ROIReq (pyfrp.subclasses.pyfrp_ROI.ROI): The ROI object that is referred to with nNodesReq.
+			fnOut (str): Path to output geo file.
+			method (str): Refinement method, either ``predictive`` or ``increment``.
+			nCandidates (int): Number of candidate meshes per step (only ``method=predictive``).
+			maxIter (int): Maximum number of steps (only ``method=predictive``).
+			processes (int): Number of Gmsh processes run at the same time (only ``method=predictive``).
+			
+		Returns:
+			int: Final number of nodes in ROI.
+			
+		"""
+		
+		if method=='increment':
+			return self.adaptRefineInMeshByFieldIncrement(nNodesReq,factor=factor,addZ=addZ,zIncrement=zIncrement,fIncrement=fIncrement,
+						 nNodesMax=nNodesMax,debug=debug,ROIReq=ROIReq,fnOut=fnOut)
+		elif method!='predictive':
+			printError("Unknown refinement method "+str(method)+". Will not refine.")
+			return len(self.meshIdx)
+		
+		#Convert nNodesMax if necessary
+		nNodesMax=pyfrp_misc_module.translateNPFloat(nNodesMax)
+		
+		if ROIReq==None:
+			ROIReq=self
+		
+		mesh=self.embryo.simulation.mesh
+		geometry=self.embryo.geometry
+		
+		#Get current node numbers
+		ROIReq.computeMeshIdx(mesh)
+		nNodes=len(ROIReq.meshIdx)
+		if nNodes>=nNodesReq:
+			return nNodes
+		
+		#Final .geo file, named as in mesh.addBoxField
+		if fnOut!=None:
+			fnFinal=fnOut
+		elif "_box" in os.path.basename(geometry.fnGeo):
+			fnFinal=geometry.fnGeo
+		else:
+			fnFolder=os.path.join(os.path.dirname(geometry.fnGeo),"field","custom")
+			pyfrp_misc_module.mkdir(os.path.join(os.path.dirname(geometry.fnGeo),"field"))
+			pyfrp_misc_module.mkdir(fnFolder)
+			fnFinal=os.path.join(fnFolder,os.path.basename(geometry.fnGeo).replace(".geo","_box_"+self.embryo.name+".geo"))
+		
+		#Candidates are written into temporary folder and removed afterwards
+		fnTemp=tempfile.mkdtemp()
+		fnBase=os.path.join(fnTemp,os.path.basename(fnFinal))
+			
+		xExtend,yExtend,zExtend=self.getEncapsulatingBox()
+		
+		#Importing candidates changes mesh, keep current one to restore it
+		meshOld=mesh.mesh
+		fnMeshOld=mesh.fnMesh
+		
+		def restoreMesh():
+			mesh.mesh=meshOld
+			mesh.fnMesh=fnMeshOld
+			ROIReq.computeMeshIdx(mesh)
+			if ROIReq!=self:
+				self.computeMeshIdx(mesh)
+		
+		def evalCandidates(factors,addZ):
+			
+			rangeZ=[zExtend[0]-addZ,zExtend[1]+addZ]
+			candidates=mesh.genBoxFieldCandidates([mesh.volSizePx/f for f in factors],xExtend,yExtend,len(factors)*[rangeZ],
+						 fnBase=fnBase,comment=self.name+" field",processes=processes,debug=debug)
+			
+			results=[]
+			for fnGeo,fnMsh in candidates:
+				mesh.importMeshFromFile(fnMsh)
+				ROIReq.computeMeshIdx(mesh)
+				results.append((len(ROIReq.meshIdx),mesh.getNNodes(),(fnGeo,fnMsh)))
+			
+			return results
+		
+		try:
+			best,met,history=pyfrp_meshquality_module.searchRefinement(evalCandidates,nNodes,nNodesReq,nNodesMax=nNodesMax,factor=factor,addZ=addZ,
+								zIncrement=zIncrement,nCandidates=nCandidates,maxIter=maxIter,kDefault=geometry.getDim(),debug=debug)
+			
+			if best==None:
+				printWarning("Could not find refinement meeting requirement within "+str(maxIter)+" iterations. Will keep mesh.")
+				restoreMesh()
+				return nNodes
+			
+			if not met:
+				printWarning("Could not find refinement meeting requirement within "+str(maxIter)+" iterations. Will use closest with "+str(best[2])+" nodes.")
+			
+			#Keep selected candidate
+			fnGeo,fnMsh=best[4]
+			shutil.copy(fnGeo,fnFinal)
+			shutil.copy(fnMsh,fnFinal.replace(".geo",".msh"))
+		
+		except:
+			restoreMesh()
+			raise
+			
+		finally:
+			shutil.rmtree(fnTemp,ignore_errors=True)
+		
+		geometry.setFnGeo(fnFinal)
+		mesh.fnMesh=pyfrp_misc_module.fixPath(fnFinal.replace(".geo",".msh"))
+		mesh.importMeshFromFile(mesh.fnMesh)
+		
+		self.computeMeshIdx(mesh)
+		if ROIReq!=self:
+			ROIReq.computeMeshIdx(mesh)
+		
+		if debug:
+			print "Selected factor = ", best[0], " addZ = ", best[1], " after ", len(history), " candidates."
+			
+		return best[2]
+	
+	def adaptRefineInMeshByFieldIncrement(self,nNodesReq,factor=3.,addZ=15.,zIncrement=1.,fIncrement=1.,nNodesMax='inf',debug=False,ROIReq=None,fnOut=None):
+		
+		"""Refines mesh inside ROI adaptively until a given number of nodes inside ROI 
+		is reached, increasing refinement parameters by fixed increments.
+		
 		Does this by:
 			
 			* Refining through :py:func:`refineInMeshByField`.
@@ -1800,7 +1955,7 @@ class ROI(object):
 		single direction.
 		
 		``mode`` can be either ``"normal"`` or ``"hist"``. If ``mode="hist"``, will plot a histogram with ``nbins`` bins using
-		:py:func:`pyfrp.modules.pyfrp_misc_module.simpleHist`.
+		:py:func:`pyfrp.modules.pyfrp_img_module.binnedMean`.
 		
 		.. note:: ``direction`` sets in which direction the profile should be plotted. if ``direction="r"``, then function
 		   will plot a radial profile and uses ``self.embryo.geometry.center`` as center if ROI does not have a center,
@@ -1865,7 +2020,7 @@ class ROI(object):
 				center=self.center
 			else:
 				center=self.embryo.geometry.center
-			x=np.sqrt((self.embryo.simulation.mesh.getCellCenters()[0]-center[0])**2+(self.embryo.simulation.mesh.getCellCenters()[1]-center[1])**2)
+			x=pyfrp_img_module.computeRadii(self.embryo.simulation.mesh.getCellCenters()[0],self.embryo.simulation.mesh.getCellCenters()[1],center)
 		else:
 			printError('Direction '+ direction+ 'unknown. Will not plot.')
 			return ax
@@ -1876,10 +2031,12 @@ class ROI(object):
 		else:
 			v=np.asarray(phi)[self.meshIdx]
 			
-		vSorted,xSorted=pyfrp_misc_module.sortListsWithKey(v,x)
-		
 		if mode=='hist':
-			xSorted,vSorted=pyfrp_misc_module.simpleHist(xSorted,vSorted,bins=nbins)
+			bins=np.linspace(x.min(),x.max(),nbins+1)
+			histY,vSorted=pyfrp_img_module.binnedMean(x,v,bins)
+			xSorted=0.5*(bins[1:]+bins[:-1])
+		else:
+			vSorted,xSorted=pyfrp_misc_module.sortListsWithKey(v,x)
 		
 		pyfrp_plot_module.plotTS(xSorted,vSorted,color=color,label=label,legend=legend,ax=ax)
 		ax.set_xlabel(direction)
@@ -4093,9 +4250,9 @@ class customROI(ROI):
 		b=True
 		for i,r in enumerate(self.ROIsIncluded):
 			if self.procedures[i]==1:
-				b=b and r.checkXYInside(x,y)
+				b=np.logical_and(b,r.checkXYInside(x,y))
 			elif self.procedures[i]==-1:
-				b=b and not r.checkXYInside(x,y)
+				b=np.logical_and(b,np.logical_not(r.checkXYInside(x,y)))
 		return b
 			
 	def computeXYExtend(self):
@@ -42,8 +42,9 @@ from pyfrp.modules import pyfrp_img_module
 from pyfrp.modules import pyfrp_misc_module
 from pyfrp.modules.pyfrp_term_module import *
 
-#matplotlib
-import matplotlib.pyplot as plt
+#matplotlib (imported on first use)
+from pyfrp.modules import pyfrp_lazy_module
+plt=pyfrp_lazy_module.lazyImport('matplotlib.pyplot')
 
 #===========================================================================================================================================================================
 #Module Classes
@@ -151,6 +152,45 @@ class analysis:
 		self=pyfrp_img_module.analyzeDataset(self,signal=signal,embCount=embCount,debug=debug,debugAll=debugAll,showProgress=showProgress)
 		return self
 	
+	def extractROIs(self,ROIs=None,updateIdxs=True,signal=None,debug=False):
+		
+		"""Updates data vectors of ROIs that have been added or edited, without running the complete analysis again.
+		
+		:py:func:`pyfrp.modules.pyfrp_img_module.analyzeDataset` keeps the processed images in a bounded cache 
+		(see :py:data:`pyfrp.modules.pyfrp_img_module.maxCacheMB`), from which concentrations of single ROIs 
+		are read out via :py:func:`pyfrp.modules.pyfrp_img_module.extractROIConcs`. If there is no valid cache, 
+		for example since ``process``, ``dataOffset`` or the data files changed, runs :py:meth:`run` instead.
+		
+		Keyword Args:
+			ROIs (list): ROIs to update. Updates all ROIs if not given.
+			updateIdxs (bool): Recompute indices of ROIs first.
+			signal (PyQt4.QtCore.pyqtSignal): PyQT signal to send progress to GUI.
+			debug (bool): Print debugging messages.
+		
+		Returns:
+			list: Updated ROIs.
+		
+		"""
+		
+		if ROIs==None:
+			ROIs=self.embryo.ROIs
+		
+		if not self.hasProcessedStack():
+			self.run(signal=signal,debug=debug)
+			return self.embryo.ROIs
+		
+		if updateIdxs:
+			for r in ROIs:
+				r.computeIdxs(debug=debug)
+		
+		return pyfrp_img_module.extractROIConcs(self,ROIs=ROIs,debug=debug)
+	
+	def hasProcessedStack(self):
+		
+		"""Returns True if a valid processed stack for :py:meth:`extractROIs` is cached."""
+		
+		return pyfrp_img_module.getProcessedStack(self) is not None
+	
 	def setGaussianSigma(self,s):
 		
 		"""Sets size of gaussian kernel and updates its value
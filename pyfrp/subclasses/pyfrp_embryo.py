@@ -40,7 +40,9 @@ from pyfrp.modules import pyfrp_img_module
 from pyfrp.modules import pyfrp_fit_module 
 from pyfrp.modules import pyfrp_stats_module 
 from pyfrp.modules import pyfrp_IO_module
+from pyfrp.modules import pyfrp_container_module
 from pyfrp.modules import pyfrp_plot_module
+from pyfrp.modules import pyfrp_idx_module
 from pyfrp.modules.pyfrp_term_module import *
 
 #PyFRAP Objects
@@ -50,8 +52,9 @@ import pyfrp_analysis
 import pyfrp_ROI
 import pyfrp_fit
 
-#matplotlib
-import matplotlib.pyplot as plt
+#matplotlib (imported on first use)
+from pyfrp.modules import pyfrp_lazy_module
+plt=pyfrp_lazy_module.lazyImport('matplotlib.pyplot')
 
 #Time 
 import time
@@ -105,6 +108,13 @@ class embryo:
 		self.fileList=[]
 		self.fnDatafolder=""
 		
+		#DataSet stack (used instead of fileList if set)
+		self.fnDataStack=""
+		self.dataSeries=0
+		self.dataChannel=0
+		self.dataZ=0
+		self.corruptFrames=[]
+		
 		#Data time specifics
 		self.frameInterval=10
 		self.nFrames=300
@@ -135,6 +145,9 @@ class embryo:
 		#List of ROIs
 		self.ROIs=[]
 		
+		#Worker processes used for indexing ROIs, see computeROIIdxs
+		self.idxProcesses=1
+		
 		#Master ROI
 		self.masterROIIdx=None
 		
@@ -203,6 +216,9 @@ class embryo:
 		
 		If ``fn=None`` will save to ``self.name.emb``.
 		
+		If ``fn`` ends with ``.pyfrp``, saves into a container file instead, see 
+		:py:mod:`pyfrp.modules.pyfrp_container_module`.
+		
 		Keyword Args:
 			fn (str): Output filename.
 			copyMeshFiles (bool): Copy meshfiles to embryo file destination.
@@ -228,7 +244,10 @@ class embryo:
 			fnNew=os.path.splitext((os.path.split(fn)[-1]))[0]
 			self.renameMeshFiles(fn=fnNew,debug=debug)
 		
-		pyfrp_IO_module.saveToPickle(self,fn=fn)
+		if os.path.splitext(fn)[-1]==".pyfrp":
+			pyfrp_container_module.saveContainer(self,fn)
+		else:
+			pyfrp_IO_module.saveToPickle(self,fn=fn)
 		
 		print "Saved "+  self.name+ " to " + fn
 		return fn
@@ -529,6 +548,9 @@ class embryo:
 		"""Updates time dimensions using information in ``frameInterval``, ``nFrames`` 
 		and ``tStart``.
 		
+		Timepoints of frames of the data stack that could not be read, see :py:func:`getCorruptFrames`,
+		are removed from ``tvecData``, so that ``tvecData`` matches the data vectors of all ROIs.
+		
 		.. note:: If embryo object already possesses simulation object, will update simulation
 		   time dimensions using :py:func:`pyfrp.subclasses.pyfrp_simulation.simulation.toDefaultTvec` .
 		   If you have different settings in simulation vector that you want to preserve, select
@@ -544,6 +566,8 @@ class embryo:
 		
 		self.tEnd=self.tStart+self.frameInterval*(self.nFrames-1)
 		self.tvecData=np.linspace(self.tStart,self.tEnd,self.nFrames)
+		if len(self.getCorruptFrames())>0:
+			self.tvecData=np.delete(self.tvecData,self.getCorruptFrames())
 		if self.simulation!=None:
 			if simUpdate:
 				self.simulation.toDefaultTvec()
@@ -1329,6 +1353,98 @@ class embryo:
 		
 		return self.fileList
 	
+	def setDataStack(self,fn,series=0,channel=0,z=0):
+		
+		"""Sets microscopy stack containing recovery data.
+		
+		If a data stack is set, recovery images are read lazily from the stack 
+		instead of from the files in ``fnDatafolder``. Only the given series, channel
+		and z-slice is read, see also :py:func:`pyfrp.modules.pyfrp_img_module.iterStack`.
+		
+		Will update number of frames to match number of frames in stack.
+		
+		.. note:: Set ``fn=""`` to go back to reading from ``fnDatafolder``.
+		
+		Args:
+			fn (str): Path to stack.
+			
+		Keyword Args:
+			series (int): Image series to be used. 
+			channel (int): Channel to be used.
+			z (int): z-slice to be used.
+		
+		Returns:
+			str: Path to stack.
+		
+		"""
+		
+		self.fnDataStack=fn
+		self.dataSeries=series
+		self.dataChannel=channel
+		self.dataZ=z
+		self.corruptFrames=[]
+		
+		if self.usesDataStack():
+			self.nFrames=pyfrp_img_module.getStackInfo(fn,series=series)['nFrames']
+			self.updateTimeDimensions()
+		
+		return self.fnDataStack
+	
+	def getDataStack(self):
+		
+		"""Returns path to microscopy stack containing recovery data."""
+		
+		return self.fnDataStack
+	
+	def usesDataStack(self):
+		
+		"""Returns ``True`` if recovery data is read from a stack."""
+		
+		return len(self.fnDataStack)>0
+	
+	def getCorruptFrames(self):
+		
+		"""Returns indices of frames of data stack that could not be read during last iteration."""
+		
+		return getattr(self,'corruptFrames',[])
+	
+	def getNDataImgs(self):
+		
+		"""Returns number of recovery data images."""
+		
+		if self.usesDataStack():
+			return self.nFrames
+		return len(self.fileList)
+	
+	def iterDataImgs(self):
+		
+		"""Iterates over recovery data images.
+		
+		If a data stack is set, frames are read one at a time from the stack
+		and frames that cannot be read are skipped and stored in ``corruptFrames``.
+		Call :py:func:`updateTimeDimensions` afterwards to remove their timepoints from ``tvecData``.
+		Otherwise, loads images listed in ``fileList``.
+		
+		Images are cast to ``dataEnc`` and returned as float, just as done
+		by :py:func:`pyfrp.modules.pyfrp_img_module.loadImg`.
+		
+		Returns:
+			generator: Generator yielding images as ``numpy.ndarray``.
+		
+		"""
+		
+		if self.usesDataStack():
+			
+			self.corruptFrames=[]
+			
+			for img in pyfrp_img_module.iterStack(self.fnDataStack,series=self.dataSeries,channel=self.dataChannel,z=self.dataZ,corrupt=self.corruptFrames):
+				yield img.astype(self.dataEnc).real.astype('float')
+		
+		else:
+			
+			for fn in self.fileList:
+				yield pyfrp_img_module.loadImg(str(self.getDataFolder()+'/'+fn),self.dataEnc)
+	
 	def setDataFolder(self,fn):
 		
 		"""Set folder containing recovery data files.
@@ -1365,7 +1481,7 @@ class embryo:
 		
 		return self.geometry
 	
-	def setGeometry2ZebraFishDomeStage(self,center,imagingRadius,radiusScale=1.1):
+	def setGeometry2ZebraFishDomeStage(self,center,imagingRadius,radiusScale=1.1,fnGeo=None):
 		
 		"""Sets embryo's geometry to :py:class:`pyfrp.subclasses.pyfrp_geometry.zebrafishDomeStage`.
 		
@@ -1375,15 +1491,17 @@ class embryo:
 			
 		Keyword Args:
 			radiusScale (float): Scaling factor defining how much bigger outer radius is to inner radius.
+			fnGeo (str): Path of .geo file. If given, the template in ``pyfrp/meshfiles/`` is copied there 
+				and left untouched, see :py:func:`pyfrp.modules.pyfrp_misc_module.getGeoTemplate`.
 			
 		Returns:
 			pyfrp.subclasses.pyfrp_geometry.zebrafishDomeStage: New zebrafish geometry.
 		"""
 		
-		self.geometry=pyfrp_geometry.zebrafishDomeStage(self,center,imagingRadius,radiusScale=radiusScale)
+		self.geometry=pyfrp_geometry.zebrafishDomeStage(self,center,imagingRadius,radiusScale=radiusScale,fnGeo=fnGeo)
 		return self.geometry
 	
-	def setGeometry2Cylinder(self,center,radius,height):
+	def setGeometry2Cylinder(self,center,radius,height,fnGeo=None):
 			
 		"""Sets embryo's geometry to :py:class:`pyfrp.subclasses.pyfrp_geometry.cylinder`.
 		
@@ -1391,16 +1509,20 @@ class embryo:
 			center (list): Center of geometry.
 			radius (float): Radius of cylinder.
 			height (float): Height of cylinder.
+			
+		Keyword Args:
+			fnGeo (str): Path of .geo file. If given, the template in ``pyfrp/meshfiles/`` is copied there 
+				and left untouched, see :py:func:`pyfrp.modules.pyfrp_misc_module.getGeoTemplate`.
 				
 		Returns:
 			pyfrp.subclasses.pyfrp_geometry.cylinder: New cylinder geometry.
 		"""
 		
 		
-		self.geometry=pyfrp_geometry.cylinder(self,center,radius,height)
+		self.geometry=pyfrp_geometry.cylinder(self,center,radius,height,fnGeo=fnGeo)
 		return self.geometry
 	
-	def setGeometry2Cone(self,center,upperRadius,lowerRadius,height):
+	def setGeometry2Cone(self,center,upperRadius,lowerRadius,height,fnGeo=None):
 		
 		"""Sets embryo's geometry to :py:class:`pyfrp.subclasses.pyfrp_geometry.cone`.
 		
@@ -1410,14 +1532,18 @@ class embryo:
 			lowerRadius (float): Radius at lower end of cone.
 			height (float): Height of cylinder.
 			
+		Keyword Args:
+			fnGeo (str): Path of .geo file. If given, the template in ``pyfrp/meshfiles/`` is copied there 
+				and left untouched, see :py:func:`pyfrp.modules.pyfrp_misc_module.getGeoTemplate`.
+			
 		Returns:
 			pyfrp.subclasses.pyfrp_geometry.cone: New cone geometry.
 		"""
 		
-		self.geometry=pyfrp_geometry.cone(self,center,upperRadius,lowerRadius,height)
+		self.geometry=pyfrp_geometry.cone(self,center,upperRadius,lowerRadius,height,fnGeo=fnGeo)
 		return self.geometry
 	
-	def setGeometry2Ball(self,center,imagingRadius):
+	def setGeometry2Ball(self,center,imagingRadius,fnGeo=None):
 		
 		"""Sets embryo's geometry to :py:class:`pyfrp.subclasses.pyfrp_geometry.ball`.
 		
@@ -1425,11 +1551,15 @@ class embryo:
 			center (list): Center of geometry.
 			imagingRadius (float): Radius of embryo in imaging slice.
 			
+		Keyword Args:
+			fnGeo (str): Path of .geo file. If given, the template in ``pyfrp/meshfiles/`` is copied there 
+				and left untouched, see :py:func:`pyfrp.modules.pyfrp_misc_module.getGeoTemplate`.
+			
 		Returns:
 			pyfrp.subclasses.pyfrp_geometry.ball: New ball geometry.
 		"""
 		
-		self.geometry=pyfrp_geometry.xenopusBall(self,center,imagingRadius)
+		self.geometry=pyfrp_geometry.xenopusBall(self,center,imagingRadius,fnGeo=fnGeo)
 		return self.geometry
 	
 	def setGeometry2ZebraFishDomeStageQuad(self,center,imagingRadius,radiusScale=1.1):
@@ -1527,28 +1657,47 @@ class embryo:
 		self.analysis=pyfrp_analysis.analysis(self)
 		return self.analysis
 	
-	def computeROIIdxs(self,signal=None,debug=True):
+	def setIdxProcesses(self,n):
+		
+		"""Sets number of worker processes used for indexing ROIs.
+		
+		Applies to all calls of :py:func:`computeROIIdxs` that do not pass ``processes`` explicitly, 
+		that is also to indexing triggered by running analysis or simulation. Inside worker processes
+		of :py:func:`pyfrp.modules.pyfrp_batch_module.runBatch` ROIs are always indexed serially, since 
+		these cannot start processes themselves.
+		
+		Args:
+			n (int): Number of processes, ``None`` for number of CPUs.
+			
+		Returns:
+			int: Current number of processes.
+			
+		"""
+		
+		self.idxProcesses=n if n==None else max(int(n),1)
+		return self.idxProcesses
+	
+	def computeROIIdxs(self,signal=None,debug=True,processes=None):
 		
 		"""Computes image, extended and mesh indices of all ROIs in embryo's ``ROIs`` list.
 		
+		Indexes the master ROI first, then all other non-custom ROIs and custom ROIs last. 
+		If ``processes>1``, non-custom ROIs are indexed concurrently, see 
+		:py:func:`pyfrp.modules.pyfrp_idx_module.computeROIIdxsConcurrent`.
+		
 		Keyword Args:
 			signal (PyQt4.QtCore.pyqtSignal): PyQT signal to send progress to GUI.
 			debug (bool): Print final debugging messages and show debugging plots.
+			processes (int): Number of worker processes. Defaults to ``idxProcesses``, see :py:func:`setIdxProcesses`.
 		
 		Returns:
 			list: Updated list of ROIs.
 		"""
 		
-		for i,r in enumerate(self.ROIs):
-			startInit=time.clock()
-			r.computeIdxs()
-			
-			if debug:
-				print r.name, time.clock()-startInit
-			if signal:
-				signal.emit(int(100.*i)/float(len(self.ROIs)))
-			
-		return self.ROIs
+		if processes==None:
+			processes=getattr(self,'idxProcesses',1)
+		
+		return pyfrp_idx_module.computeROIIdxsConcurrent(self,processes=processes,signal=signal,debug=debug)
 	
 	def geometry2Quad(self):
 		
@@ -1706,6 +1855,8 @@ class embryo:
 	def loadDataImg(self,idx):
 		
 		"""Loads data image in ``fnDatafolder`` of index ``idx``.
+		
+		If a data stack is set, only reads frame ``idx`` of the stack.
 	
 		Args:
 			idx (int): Index of data image to be loaded.
@@ -1714,6 +1865,10 @@ class embryo:
 			numpy.ndarray: Loaded image.
 		"""
 		
+		if self.usesDataStack():
+			img=pyfrp_img_module.readStackFrame(self.fnDataStack,idx,series=self.dataSeries,channel=self.dataChannel,z=self.dataZ)
+			return img.astype(self.dataEnc).real.astype('float')
+		
 		return pyfrp_img_module.loadImg(self.fnDatafolder+self.fileList[idx],self.dataEnc)
 	
 	def showDataImg(self,ax=None,idx=0):
@@ -2295,17 +2450,26 @@ class embryo:
 			useMin (bool): Use minimum value for background computation.
 			useMax (bool): Use maximum value for norm value computation.
 			sepSim (bool): Use seperate pinning values for simulation vectors.
-			
+		
+		Returns:
+			dict: Wall time in seconds spent in each stage that was run, with keys 
+			``'idxs'``, ``'analysis'``, ``'simulation'``, ``'pin'`` and ``'fit'``.
 			
 		"""
 		
+		timings={}
+		
 		if runIdxs:
+			startTime=time.time()
 			self.computeROIIdxs()
-		
+			timings['idxs']=time.time()-startTime
+			
 		#Image analysis
 		if runAnalysis:
+			startTime=time.time()
 			self.analysis.run(showProgress=True)
-
+			timings['analysis']=time.time()-startTime
+			
 		#Simulation
 		if maxDExpPx!=None:
 			self.simulation.getOptTvecSim(maxDExpPx)
@@ -2314,18 +2478,26 @@ class embryo:
 			self.simulation.toLogTimeScale()
 		
 		if runSimulation:
+			startTime=time.time()
 			self.simulation.run(showProgress=True)
-
+			timings['simulation']=time.time()-startTime
+			
 		#Pin Concentrations
 		if runPin:
+			startTime=time.time()
 			bkgdVal,normVal,bkgdValSim,normValSim=self.computeIdealFRAPPinVals(debug=True,useMin=False,useMax=False,switchThresh=0.95,bkgdName=bkgdName,normName=normName)
 			self.pinAllROIs(bkgdVal=bkgdVal,normVal=normVal,bkgdValSim=bkgdValSim,normValSim=normValSim,debug=False)
-
+			timings['pin']=time.time()-startTime
+			
 		#Run all fits
 		if runFit:
+			startTime=time.time()
 			for fit in self.fits:
 				fit.run(debug=False)
+			timings['fit']=time.time()-startTime
 			
+		return timings
+		
 		
 	def clearAllAttributes(self):
 		
@@ -72,6 +72,7 @@ class fit:
 			* ``fitPinned``, see also :py:func:`getFitPinned`.
 			* ``equOn``, see also :py:func:`getEqu`.
 			* ``fitCutOffT``, see also :py:func:`getFitCutOffT`.
+			* ``fitMode``, see also :py:func:`setFitMode`.
 			
 		* The ROIs to be fitted, see also :py:func:`getROIsFitted`.
 		
@@ -112,6 +113,12 @@ class fit:
 		self.maxfun=1000
 		self.optTol=1e-10
 		
+		#Differential evolution settings
+		self.popSize=15
+		self.DETol=0.01
+		self.optProcesses=1
+		self.optSeed=None
+		
 		#Dataseries selection
 		self.ROIsFitted=[]
 		
@@ -142,6 +149,19 @@ class fit:
 		self.kineticTimeScale=1.
 		self.bruteInitD=False		
 		
+		#Fit ROI averages or pixels
+		self.fitMode='ROI'
+		self.pixelROI=None
+		self.pixelBin=1
+		self.pixelChunk=10
+		
+		#Cache objective function values, see pyfrp_fit_module.getMemoObjFunc
+		self.memoize=False
+		self.memoDigits=10
+		self.memoSize=10000
+		self.memoPersist=False
+		self.objCache=None
+		
 		#Cutting tvec option
 		self.fitCutOffT=False
 		self.cutOffT=150
@@ -173,6 +193,9 @@ class fit:
 		self.MeanRsq=None
 		self.RsqByROI={}
 		
+		#Posterior samples, see pyfrp_stats_module.computeFitPosterior
+		self.posterior=None
+		
 		#Empty result dataseries
 		self.tvecFit=embryo.tvecData
 
@@ -285,6 +308,10 @@ class fit:
 			x0.pop(2)
 			x0.pop(1)
 		
+		#No equalization when fitting pixels
+		if self.fitMode=='pixel':
+			x0=x0[:1+int(self.fitProd)+int(self.fitDegr)]
+		
 		return x0
 	
 	def reset2DefaultX0(self):
@@ -333,7 +360,7 @@ class fit:
 		"""
 	
 		if self.fitProd and self.fitDegr:
-			bnds = [(self.LBD, self.UBD), (self.LBD, self.UBD),(self.LBD,self.UBD)]
+			bnds = [(self.LBD, self.UBD), (self.LBProd, self.UBProd),(self.LBDegr,self.UBDegr)]
 			ranges=[slice(self.LBD,self.UBD,1),slice(self.LBProd,self.UBProd,10),slice(self.LBDegr,self.UBDegr,10)]
 		elif self.fitProd and  not self.fitDegr:	
 			bnds = [(self.LBD, self.UBD), (self.LBProd, self.UBProd)]
@@ -343,10 +370,11 @@ class fit:
 			ranges=[slice(self.LBD,self.UBD,1),slice(self.LBDegr,self.UBDegr,10)]
 		elif not self.fitProd and not self.fitDegr:
 			bnds = [(self.LBD, self.UBD),]
-			ranges=[1,self.UBD]
+			ranges=[slice(self.LBD,self.UBD,1),]
 		
-		bnds=bnds+len(self.ROIsFitted)*[(self.LBEqu,self.UBEqu)]
-		ranges=ranges+len(self.ROIsFitted)*[slice(self.LBEqu,self.UBEqu,0.2)]
+		if self.fitMode!='pixel':
+			bnds=bnds+len(self.ROIsFitted)*[(self.LBEqu,self.UBEqu)]
+			ranges=ranges+len(self.ROIsFitted)*[slice(self.LBEqu,self.UBEqu,0.2)]
 		
 		if self.optMeth=='brute':
 			self.bounds=tuple(ranges)
@@ -650,6 +678,7 @@ class fit:
 			* brute
 			* BFGS
 			* CG
+			* differential evolution, see :py:func:`pyfrp.modules.pyfrp_optimization_module.runDifferentialEvolution`
 		
 		See also http://docs.scipy.org/doc/scipy-0.17.0/reference/generated/scipy.optimize.minimize.html and
 		http://docs.scipy.org/doc/scipy-0.17.0/reference/generated/scipy.optimize.brute.html#scipy.optimize.brute .
@@ -665,6 +694,267 @@ class fit:
 		self.optMeth=m
 		return self.optMeth
 	
+	def setPopSize(self,n):
+		
+		"""Sets population size per fitted parameter of differential evolution.
+		
+		Args:
+			n (int): Population size.
+			
+		Returns:
+			int: Current population size.
+			
+		"""
+		
+		self.popSize=max(int(n),1)
+		return self.popSize
+	
+	def setDETol(self,tol):
+		
+		"""Sets relative tolerance at which differential evolution stops.
+		
+		See also :py:func:`pyfrp.modules.pyfrp_optimization_module.differentialEvolution`.
+		
+		Args:
+			tol (float): Tolerance.
+			
+		Returns:
+			float: Current tolerance.
+			
+		"""
+		
+		self.DETol=tol
+		return self.DETol
+	
+	def getDETol(self):
+		
+		"""Returns relative tolerance at which differential evolution stops.
+		
+		Returns:
+			float: Current tolerance.
+			
+		"""
+		
+		return self.DETol
+	
+	def setOptProcesses(self,n):
+		
+		"""Sets number of worker processes evaluating generations of differential evolution.
+		
+		Args:
+			n (int): Number of processes.
+			
+		Returns:
+			int: Current number of processes.
+			
+		"""
+		
+		self.optProcesses=max(int(n),1)
+		return self.optProcesses
+	
+	def setOptSeed(self,seed):
+		
+		"""Sets seed of differential evolution, making fits reproducible.
+		
+		Args:
+			seed (int): Seed, ``None`` for random seed.
+			
+		Returns:
+			int: Current seed.
+			
+		"""
+		
+		self.optSeed=seed
+		return self.optSeed
+	
+	def setFitMode(self,m):
+		
+		"""Sets fit mode.
+		
+		Available fit modes are:
+		
+			* ``ROI``: Fits mean concentrations of ``ROIsFitted``, see :py:func:`pyfrp.modules.pyfrp_fit_module.FRAPObjFunc`.
+			* ``pixel``: Fits images pixel by pixel within :py:func:`getPixelROI`, optionally binned via :py:func:`setPixelBin`, 
+			  see :py:func:`pyfrp.modules.pyfrp_fit_module.FRAPPixelObjFunc`. Needs the processed images cached by the 
+			  analysis and a simulation run with ``saveSim`` enabled.
+		
+		.. note:: Processed images are only cached within the current session, they are not saved with the embryo. 
+		   If they are missing when fitting, for example after loading the embryo, the analysis is rerun,
+		   see :py:func:`pyfrp.modules.pyfrp_fit_module.getPixelStack`.
+		
+		Args:
+			m (str): New fit mode.
+			
+		Returns:
+			str: Current fit mode.
+			
+		"""
+		
+		if m not in pyfrp_fit_module.fitModes:
+			printError("Unknown fit mode "+str(m)+". Available are "+str(pyfrp_fit_module.fitModes)+".")
+			return self.fitMode
+		
+		self.fitMode=m
+		return self.fitMode
+	
+	def getFitMode(self):
+		
+		"""Returns the current fit mode.
+		
+		Returns:
+			str: Fit mode.
+			
+		"""
+		
+		return self.fitMode
+	
+	def setPixelROI(self,r):
+		
+		"""Sets ROI whose pixels are fitted if ``fitMode=='pixel'``.
+		
+		Args:
+			r (pyfrp.subclasses.pyfrp_ROI.ROI): New ROI. If None, uses master ROI of embryo.
+			
+		Returns:
+			pyfrp.subclasses.pyfrp_ROI.ROI: New ROI.
+			
+		"""
+		
+		self.pixelROI=r
+		return self.pixelROI
+	
+	def getPixelROI(self):
+		
+		"""Returns ROI whose pixels are fitted if ``fitMode=='pixel'``.
+		
+		Returns:
+			pyfrp.subclasses.pyfrp_ROI.ROI: ROI, defaults to master ROI of embryo.
+			
+		"""
+		
+		if self.pixelROI==None:
+			return self.embryo.getMasterROI()
+		return self.pixelROI
+	
+	def setPixelBin(self,b):
+		
+		"""Sets size of pixel blocks averaged before comparison if ``fitMode=='pixel'``.
+		
+		Args:
+			b (int): Block size in px.
+			
+		Returns:
+			int: New block size.
+			
+		"""
+		
+		self.pixelBin=max(int(b),1)
+		return self.pixelBin
+	
+	def getPixelBin(self):
+		
+		"""Returns size of pixel blocks averaged before comparison.
+		
+		Returns:
+			int: Block size in px.
+			
+		"""
+		
+		return self.pixelBin
+	
+	def setPixelChunk(self,n):
+		
+		"""Sets number of frames compared at once if ``fitMode=='pixel'``.
+		
+		Larger chunks are faster, smaller ones need less memory, see also 
+		:py:func:`pyfrp.modules.pyfrp_fit_module.computePixelSSD`.
+		
+		Args:
+			n (int): Number of frames.
+			
+		Returns:
+			int: New number of frames.
+			
+		"""
+		
+		self.pixelChunk=max(int(n),1)
+		return self.pixelChunk
+	
+	def setMemoize(self,b):
+		
+		"""Sets if objective function values are cached.
+		
+		Off by default. Useful if the optimizer revisits parameter vectors, for example when restarting 
+		from different initial guesses. See also :py:func:`pyfrp.modules.pyfrp_fit_module.getMemoObjFunc`.
+		
+		Args:
+			b (bool): Cache values.
+			
+		Returns:
+			bool: Current flag.
+			
+		"""
+		
+		self.memoize=b
+		return self.memoize
+	
+	def setMemoSize(self,n):
+		
+		"""Sets maximum number of cached objective function values.
+		
+		Args:
+			n (int): Maximum number of values.
+			
+		Returns:
+			int: Current maximum.
+			
+		"""
+		
+		self.memoSize=max(int(n),1)
+		return self.memoSize
+	
+	def setMemoPersist(self,b):
+		
+		"""Sets if cached objective function values are saved with the fit.
+		
+		If set, re-running the fit in a later session with unchanged data and settings 
+		reuses all values computed before.
+		
+		Args:
+			b (bool): Save cache.
+			
+		Returns:
+			bool: Current flag.
+			
+		"""
+		
+		self.memoPersist=b
+		if not b:
+			self.objCache=None
+		return self.memoPersist
+	
+	def getMemoStats(self):
+		
+		"""Returns number of cache hits and misses of objective function.
+		
+		Returns:
+			tuple: Tuple containing:
+			
+				* hits (int): Number of hits.
+				* misses (int): Number of misses.
+			
+		"""
+		
+		cache=pyfrp_fit_module.getObjCache(self)
+		return cache['hits'],cache['misses']
+	
+	def clearMemo(self):
+		
+		"""Clears cached objective function values."""
+		
+		self.objCache=None
+		pyfrp_fit_module.objCaches.pop(self,None)
+	
 	def getOptMeth(self):
 		
 		"""Returns the currently used optimization algorithm.
@@ -1286,6 +1576,50 @@ class fit:
 		
 		self=pyfrp_stats_module.computeFitRsq(self)
 		
+	def computePosterior(self,nWalkers=32,nSteps=2000,burnIn=500,thin=10,sigma=None,processes=1,seed=None,debug=False):
+		
+		"""Samples posterior of fitted parameters by ensemble MCMC.
+		
+		See :py:func:`pyfrp.modules.pyfrp_stats_module.computeFitPosterior`.
+		
+		Keyword Args:
+			nWalkers (int): Number of walkers.
+			nSteps (int): Number of steps per walker.
+			burnIn (int): Number of steps discarded.
+			thin (int): Only keep every ``thin``-th step.
+			sigma (float): Standard deviation of residuals, estimated from fit if not given.
+			processes (int): Number of worker processes.
+			seed (int): Seed of random number generator.
+			debug (bool): Print progress.
+		
+		Returns:
+			dict: Posterior.
+		
+		"""
+		
+		return pyfrp_stats_module.computeFitPosterior(self,nWalkers=nWalkers,nSteps=nSteps,burnIn=burnIn,thin=thin,sigma=sigma,
+						       processes=processes,seed=seed,debug=debug)
+	
+	def getCredibleIntervals(self,q=[2.5,50,97.5]):
+		
+		"""Returns percentiles of posterior of all fitted parameters.
+		
+		See :py:func:`pyfrp.modules.pyfrp_stats_module.summarizePosterior`.
+		
+		Keyword Args:
+			q (list): Percentiles, by default median and 95% credible interval.
+		
+		Returns:
+			dict: Percentiles by parameter name, ``None`` if posterior has not been sampled.
+		
+		"""
+		
+		if self.posterior==None:
+			printWarning("Posterior of fit "+self.name+" has not been sampled yet.")
+			return None
+		
+		return pyfrp_stats_module.summarizePosterior(self.posterior,q=q)
+	
 	def printRsqByROI(self):
 		
 		"""Prints out Rsq value per ROI.
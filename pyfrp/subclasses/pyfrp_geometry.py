@@ -67,9 +67,9 @@ from pyfrp.modules.pyfrp_term_module import *
 import os,os.path
 import shutil
 
-#Solid/Opescad
-import solid
-import solid.utils
+#Solid/Opescad (imported on first use)
+from pyfrp.modules import pyfrp_lazy_module
+solid=pyfrp_lazy_module.lazyImport('solid')
 
 #===========================================================================================================================================================================
 #Class definitions
@@ -369,6 +369,20 @@ class geometry(object):
 		
 		return min(z), max(z) 
 	
+	def isAxisymmetric(self):
+		
+		"""Returns True if geometry is rotationally symmetric around the z-axis through ``center``.
+		
+		Axisymmetric geometries implement :py:func:`checkRZInside` and :py:func:`getRZExtend`, 
+		so they can be simulated in (r,z), see :py:func:`pyfrp.modules.pyfrp_sim_module.simulateReactDiffAxisymmetric`.
+		
+		Returns:
+			bool: False for general geometries.
+		
+		"""
+		
+		return False
+	
 	def getXYExtend(self):
 		
 		"""Returns extend in x/y-direction by reading out vertices from 
@@ -536,11 +550,11 @@ class zebrafishDomeStage(geometry):
 
 	"""
 	
-	def __init__(self,embryo,center,imagingRadius,radiusScale=1.1):
+	def __init__(self,embryo,center,imagingRadius,radiusScale=1.1,fnGeo=None):
 		
-		mdir=pyfrp_misc_module.getMeshfilesDir()
+		fnGeo=pyfrp_misc_module.getGeoTemplate("dome.geo",fnGeo=fnGeo)
 		
-		super(zebrafishDomeStage, self).__init__(embryo,"zebrafishDomeStage",mdir+"dome.geo",center)
+		super(zebrafishDomeStage, self).__init__(embryo,"zebrafishDomeStage",fnGeo,center)
 		
 		#How much bigger is the inner radius than the outerRadius
 		self.radiusScale=radiusScale
@@ -720,6 +734,42 @@ class zebrafishDomeStage(geometry):
 		
 		return self.embryo.newRadialSliceROI(name,Id,self.getCenter(),self.getOuterRadius(),0,np.inf,False,color=color,asMaster=asMaster)
 	
+	def isAxisymmetric(self):
+		
+		"""Returns True, except for quadrant version of geometry."""
+		
+		return 'Quad' not in self.typ
+	
+	def checkRZInside(self,r,z):
+		
+		"""Checks if points given in cylindrical coordinates around ``center`` lie inside geometry.
+		
+		Points need to lie inside the outer ball, but not inside the inner ball.
+		
+		Args:
+			r (numpy.ndarray): Radial coordinates.
+			z (numpy.ndarray): z-coordinates.
+		
+		Returns:
+			numpy.ndarray: Boolean array.
+		
+		"""
+		
+		r=np.asarray(r,dtype=float)
+		z=np.asarray(z,dtype=float)
+		
+		insideOuter=r**2+(z+self.outerRadius)**2<=self.outerRadius**2
+		insideInner=r**2+(z+self.outerRadius+self.centerDist)**2<self.innerRadius**2
+		
+		return insideOuter & ~insideInner
+	
+	def getRZExtend(self):
+		
+		"""Returns extend in cylindrical coordinates as ``(rmax,zmin,zmax)``."""
+		
+		zmin,zmax=self.getZExtend()
+		return self.outerRadius,zmin,zmax
+	
 	def getZExtend(self):
 		
 		"""Overwrites :py:func:`pyfrp.subclasses.pyfrp_geometry.geometry.getZExtend`.
@@ -814,9 +864,9 @@ class cylinder(geometry):
 		
 	"""
 	
-	def __init__(self,embryo,center,radius,height):
-		mdir=pyfrp_misc_module.getMeshfilesDir()
-		super(cylinder, self).__init__(embryo,"cylinder",mdir+"cylinder.geo",center)
+	def __init__(self,embryo,center,radius,height,fnGeo=None):
+		fnGeo=pyfrp_misc_module.getGeoTemplate("cylinder.geo",fnGeo=fnGeo)
+		super(cylinder, self).__init__(embryo,"cylinder",fnGeo,center)
 
 		self.radius=radius
 		self.height=height
@@ -902,6 +952,38 @@ class cylinder(geometry):
 		
 		return self.embryo.newRadialSliceROI(name,Id,self.getCenter(),self.getRadius(),0.,np.inf,False,color=color,asMaster=asMaster)
 	
+	def isAxisymmetric(self):
+		
+		"""Returns True, except for quadrant version of geometry."""
+		
+		return 'Quad' not in self.typ
+	
+	def checkRZInside(self,r,z):
+		
+		"""Checks if points given in cylindrical coordinates around ``center`` lie inside geometry.
+		
+		Args:
+			r (numpy.ndarray): Radial coordinates.
+			z (numpy.ndarray): z-coordinates.
+		
+		Returns:
+			numpy.ndarray: Boolean array.
+		
+		"""
+		
+		zmin,zmax=self.getZExtend()
+		r=np.asarray(r,dtype=float)
+		z=np.asarray(z,dtype=float)
+		
+		return (r<=self.radius) & (zmin<=z) & (z<=zmax)
+	
+	def getRZExtend(self):
+		
+		"""Returns extend in cylindrical coordinates as ``(rmax,zmin,zmax)``."""
+		
+		zmin,zmax=self.getZExtend()
+		return self.radius,zmin,zmax
+	
 	def getZExtend(self):
 		
 		"""Overwrites :py:func:`pyfrp.subclasses.pyfrp_geometry.geometry.getZExtend`.
@@ -984,10 +1066,10 @@ class xenopusBall(geometry):
 		
 	"""
 	
-	def __init__(self,embryo,center,imagingRadius):		
+	def __init__(self,embryo,center,imagingRadius,fnGeo=None):		
 		
-		mdir=pyfrp_misc_module.getMeshfilesDir()
-		super(xenopusBall, self).__init__(embryo,"xenopusBall",mdir+"ball.geo",center)
+		fnGeo=pyfrp_misc_module.getGeoTemplate("ball.geo",fnGeo=fnGeo)
+		super(xenopusBall, self).__init__(embryo,"xenopusBall",fnGeo,center)
 		
 		self.imagingRadius=imagingRadius
 		
@@ -1102,6 +1184,38 @@ class xenopusBall(geometry):
 		
 		return self.embryo.newRadialSliceROI(name,Id,self.getCenter(),self.getRadius(),0.,np.inf,False,color=color,asMaster=asMaster)
 	
+	def isAxisymmetric(self):
+		
+		"""Returns True, except for quadrant version of geometry."""
+		
+		return 'Quad' not in self.typ
+	
+	def checkRZInside(self,r,z):
+		
+		"""Checks if points given in cylindrical coordinates around ``center`` lie inside geometry.
+		
+		As in the .geo file, the center of the ball lies at ``z=-radius``.
+		
+		Args:
+			r (numpy.ndarray): Radial coordinates.
+			z (numpy.ndarray): z-coordinates.
+		
+		Returns:
+			numpy.ndarray: Boolean array.
+		
+		"""
+		
+		r=np.asarray(r,dtype=float)
+		z=np.asarray(z,dtype=float)
+		
+		return r**2+(z+self.radius)**2<=self.radius**2
+	
+	def getRZExtend(self):
+		
+		"""Returns extend in cylindrical coordinates as ``(rmax,zmin,zmax)``."""
+		
+		return self.radius,-2*self.radius,0.
+	
 	def getZExtend(self):
 		
 		"""Overwrites :py:func:`pyfrp.subclasses.pyfrp_geometry.geometry.getZExtend`.
@@ -1165,10 +1279,10 @@ class cone(geometry):
 	
 	"""
 	
-	def __init__(self,embryo,center,upperRadius,lowerRadius,height):
+	def __init__(self,embryo,center,upperRadius,lowerRadius,height,fnGeo=None):
 		
-		mdir=pyfrp_misc_module.getMeshfilesDir()
-		super(cone, self).__init__(embryo,"cone",mdir+"cone.geo",center)
+		fnGeo=pyfrp_misc_module.getGeoTemplate("cone.geo",fnGeo=fnGeo)
+		super(cone, self).__init__(embryo,"cone",fnGeo,center)
 
 		self.upperRadius=upperRadius
 		self.lowerRadius=lowerRadius
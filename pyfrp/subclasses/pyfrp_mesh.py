@@ -35,14 +35,18 @@
 #PyFRAP
 from pyfrp.modules import pyfrp_gmsh_module
 from pyfrp.modules import pyfrp_gmsh_IO_module
-from pyfrp.modules import pyfrp_integration_module
 from pyfrp.modules import pyfrp_plot_module
 from pyfrp.modules import pyfrp_misc_module
 from pyfrp.modules import pyfrp_gmsh_geometry
+from pyfrp.modules import pyfrp_meshquality_module
+from pyfrp.modules import pyfrp_IO_module
+from pyfrp.modules import pyfrp_timer_module
+from pyfrp.modules import pyfrp_idx_module
 from pyfrp.modules.pyfrp_term_module import *
 
-#FiPy
-import fipy
+#FiPy (imported on first use)
+from pyfrp.modules import pyfrp_lazy_module
+fipy=pyfrp_lazy_module.lazyImport('fipy')
 
 #Numpy/Scipy
 import numpy as np
@@ -50,7 +54,20 @@ import numpy as np
 #Misc
 import os
 import os.path
+import weakref
+import hashlib
+import collections
 
+#===========================================================================================================================================================================
+#Module variables
+#===========================================================================================================================================================================
+
+#Cell centers of FiPy meshes, see mesh.getCellCenters
+cellCenterCache=weakref.WeakKeyDictionary()
+
+#Projections of FiPy meshes onto images, see mesh.getImgProjection
+projectionCache=weakref.WeakKeyDictionary()
+projectionCacheSize=8
 
 #===========================================================================================================================================================================
 #Class definitions
@@ -77,7 +94,7 @@ class mesh(object):
 	Besides mesh storage and creation, the mesh class contains useful functions such as:
 		
 		* Mesh refinement, see :py:func:`refine`, :py:func:`addBoxField` and :py:func:`forceMinMeshDensityInROI`.
-		* Information output, see :py:func:`printStats`.
+		* Information output, see :py:func:`printStats` and :py:func:`getQuality`.
 		* Plotting, see :py:func:`plotMesh` and :py:func:`plotDensity`.
 	
 	Args:
@@ -91,6 +108,11 @@ class mesh(object):
 		self.simulation=simulation
 		self.mesh=None
 		self.restoreDefaults()
+		
+		#Quality cache
+		self.quality=None
+		self.qualityMesh=None
+		self.qualityBins=None
 	
 	def setVolSizePx(self,v,remesh=True,fnOut=None):
 		
@@ -228,6 +250,7 @@ class mesh(object):
 		
 		return self.mesh
 		
+	@pyfrp_timer_module.timed('mesh.import')
 	def importMeshFromFile(self,fn):
 		
 		"""Imports mesh from a Gmsh .msh file.
@@ -451,12 +474,33 @@ class mesh(object):
 			return 0
 		else:
 			return len(self.mesh.getCellCenters()[0])
+	
+	def getNCells(self):
+		
+		"""Returns number of cells in mesh. 
+		
+		If no mesh has been generated yet, will return 0.
 		
-	def writeVTKFile(self,fn="",sub=False):
+		Returns:
+			int: Number of cells.
+		
+		"""
+		
+		if self.mesh==None:
+			return 0
+		else:
+			return int(self.mesh.numberOfCells)
+		
+	def writeVTKFile(self,fn="",sub=False,useMeshIO=False):
 		
 		"""Writes mesh into vtk file.
 		
-		Uses *meshIO* (https://github.com/nschloe/meshio), to convert the mesh saved
+		By default, writes the mesh directly from its vertex and connectivity arrays, see
+		:py:func:`pyfrp.modules.pyfrp_IO_module.writeLegacyVTKFile` and 
+		:py:func:`pyfrp.modules.pyfrp_IO_module.writeVTUFile`. If ``fn`` ends with *.vtu*,
+		will write a VTK XML file, otherwise a legacy .vtk file.
+		
+		If ``useMeshIO==True``, uses *meshIO* (https://github.com/nschloe/meshio), to convert the mesh saved
 		in ``fnMesh`` to a .vtk file. 
 		
 		If ``sub==True``, will start a seperate subprocess and submit 
@@ -472,19 +516,32 @@ class mesh(object):
 		Keyword Args:
 			fn (str): Optional output path.
 			sub (bool): Subprocess flag.
+			useMeshIO (bool): Convert meshfile using *meshIO*.
 		
 		Returns:
 			str: Used output path.
 		
 		"""
 		
+		if fn=="":
+			fn=self.fnMesh.replace('.msh','.vtk')
+		
+		if not sub and not useMeshIO:
+			
+			if self.mesh==None:
+				printWarning("Mesh has not been generated yet. Cannot write VTK file.")
+				return fn
+			
+			points,cells=pyfrp_IO_module.meshToArrays(self.mesh)
+			
+			if fn.endswith('.vtu'):
+				return pyfrp_IO_module.writeVTUFile(fn,points,cells)
+			else:
+				return pyfrp_IO_module.writeLegacyVTKFile(fn,points,cells)
 		
 		if not os.path.isfile(self.fnMesh):
 			printWarning("Filepath to meshfile has not been specified yet. Cannot write VTK file.")
 		
-		if fn=="":
-			fn=self.fnMesh.replace('.msh','.vtk')
-		
 		if sub:
 			
 			cmd = "python pyfrp_meshIO_script.py "+ self.fnMesh
@@ -688,20 +745,121 @@ class mesh(object):
 				
 		return pyfrp_vtk_module.saveRendererToImg(renderer,fnOut,magnification=magnification)
 	
+	def getCellVertexIDs(self):
+		
+		"""Returns vertex IDs of all cells of mesh.
+		
+		Returns:
+			numpy.ndarray: Array of shape ``(nVert,nCells)``.
+		
+		"""
+		
+		return np.asarray(self.mesh._getOrderedCellVertexIDs())
+	
+	def getQuality(self,recompute=False,bins=100):
+		
+		"""Returns mesh quality measures.
+		
+		Computes cell volumes, edge lengths, aspect ratios, dihedral angles and volume
+		histogram in a single vectorized pass via 
+		:py:func:`pyfrp.modules.pyfrp_meshquality_module.computeMeshQuality`.
+		
+		Results are cached and only recomputed if ``mesh`` has changed since the 
+		last call or ``recompute=True``. If only ``bins`` has changed, only the volume 
+		histogram is recomputed.
+		
+		Keyword Args:
+			recompute (bool): Force recomputation.
+			bins (int): Number of bins used for volume histogram.
+		
+		Returns:
+			dict: Quality measures.
+		
+		"""
+		
+		if self.mesh==None:
+			printWarning("Mesh has not been generated yet, cannot compute quality.")
+			return None
+		
+		if recompute or getattr(self,'qualityMesh',None) is not self.mesh or getattr(self,'quality',None)==None:
+			self.quality=pyfrp_meshquality_module.computeMeshQuality(self.mesh.vertexCoords,self.getCellVertexIDs(),bins=bins)
+			self.qualityMesh=self.mesh
+			self.qualityBins=bins
+		elif getattr(self,'qualityBins',None)!=bins:
+			self.quality['volumeHist']=pyfrp_meshquality_module.computeVolumeHistogram(self.quality['volumes'],bins=bins)
+			self.qualityBins=bins
+			
+		return self.quality
+	
+	def clearQuality(self):
+		
+		"""Clears cached mesh quality measures, see also :py:func:`getQuality`.
+		"""
+		
+		self.quality=None
+		self.qualityMesh=None
+		self.qualityBins=None
+		
+	def getCellVolumes(self):
+		
+		"""Returns volumes of all cells of mesh. 
+		
+		See also :py:func:`getQuality`.
+		
+		Returns:
+			numpy.ndarray: Cell volumes.
+		
+		"""
+		
+		return self.getQuality()['volumes']
+	
+	def getROIDensities(self,rois=None):
+		
+		"""Returns local mesh densities of ROIs.
+		
+		Local density is number of cells inside ROI divided by the volume 
+		of these cells, see also :py:func:`pyfrp.modules.pyfrp_meshquality_module.computeLocalDensity`.
+		
+		.. note:: If ``rois=None``, will use all ROIs of embryo.
+		
+		Keyword Args:
+			rois (list): List of ROIs.
+		
+		Returns:
+			dict: Dictionary with ROI names as keys and densities as values.
+		
+		"""
+		
+		if rois==None:
+			rois=self.simulation.embryo.ROIs
+		
+		volumes=self.getCellVolumes()
+		
+		densities={}
+		for r in rois:
+			densities[r.name]=pyfrp_meshquality_module.computeLocalDensity(r.meshIdx,volumes)
+			
+		return densities
+	
 	def printStats(self,tetLenghts=False):
 		
 		"""Prints out statistics of mesh.
 		
-		Also calculates all tetraheder lengths if ``tetLenghts`` is selected. 
-		This might take some time depending on mesh size.
+		Also prints all tetraheder lengths, aspect ratios and dihedral angles if ``tetLenghts`` is selected. 
+		All values are taken from :py:func:`getQuality`.
 		
 		Keyword Args:
-			tetLenghts (bool): Also calculate and print out tetrahedra sidelengths.
+			tetLenghts (bool): Also print out tetrahedra sidelengths.
 		
 		"""
 	
+		if self.mesh==None:
+			printWarning("Mesh has not been generated yet, cannot print statistics.")
+			return
 		
 		x,y,z = self.getCellCenters()
+		quality=self.getQuality()
+		volumes=quality['volumes']
 		
 		print "-------------------------------------------"
 		print "Mesh Statistics:"
@@ -712,18 +870,21 @@ class mesh(object):
 		print "min x=", min(x), "max x=", max(x)
 		print "min y=", min(y), "max y=", max(y)
 		print "min z=", min(z), "max z=", max(z)
-		print "Maximum cell volume= ", max(self.mesh.getCellVolumes())
-		print "Minimum cell volume= ", min(self.mesh.getCellVolumes())
+		print "Maximum cell volume= ", volumes.max()
+		print "Minimum cell volume= ", volumes.min()
 			
-		print "Maximum cell volume is", max(self.mesh.getCellVolumes()), "in cell number=", np.argmax(self.mesh.getCellVolumes())
-		print "Minimum cell volume is", min(self.mesh.getCellVolumes()), "in cell number=", np.argmin(self.mesh.getCellVolumes())
-		print "Average cell volume is", np.mean(self.mesh.getCellVolumes())
+		print "Maximum cell volume is", volumes.max(), "in cell number=", np.argmax(volumes)
+		print "Minimum cell volume is", volumes.min(), "in cell number=", np.argmin(volumes)
+		print "Average cell volume is", np.mean(volumes)
 
 		if tetLenghts:
-			slsVec=self.calcAllTetSidelenghts()
+			slsVec=quality['edgeLengths']
 			print "Average sidelength of tetrahedron in self.mesh:", np.mean(slsVec)
-			print "Maximum sidelength of tetrahedron in self.mesh:", max(slsVec)
-			print "Minimum sidelength of tetrahedron in self.mesh:", min(slsVec)	
+			print "Maximum sidelength of tetrahedron in self.mesh:", slsVec.max()
+			print "Minimum sidelength of tetrahedron in self.mesh:", slsVec.min()
+			print "Average aspect ratio:", np.mean(quality['aspectRatios']), "maximum aspect ratio:", quality['aspectRatios'].max()
+			if quality['dihedralAngles'] is not None:
+				print "Minimum dihedral angle:", quality['dihedralAngles'].min(), "maximum dihedral angle:", quality['dihedralAngles'].max()
 		
 		print
 		
@@ -733,29 +894,15 @@ class mesh(object):
 		
 		"""Calculates sidelengths of all tetrahedra.
 		
-		See also :py:func:`pyfrp.modules.pyfrp_integration_module.calcTetSidelengths`.
+		Returns for each tetrahedron the three sidelengths starting at its base point, see 
+		also :py:func:`pyfrp.modules.pyfrp_integration_module.calcTetSidelengths`. For 
+		all six edge lengths, see :py:func:`getQuality`.
 		
 		Returns:
-			list: List of all sidelengths.
+			numpy.ndarray: Array of all sidelengths.
 		"""
 		
-		#Calculating sidelengths of tetrahedra
-		slsVec=[]
-		for i in range(np.shape(self.mesh._getOrderedCellVertexIDs())[1]):
-			currVert=self.mesh._getOrderedCellVertexIDs()[:,i]
-			
-			pt1=self.mesh.vertexCoords[:,currVert[0]]
-			pt2=self.mesh.vertexCoords[:,currVert[1]]
-			pt3=self.mesh.vertexCoords[:,currVert[2]]
-			pt4=self.mesh.vertexCoords[:,currVert[3]]
-			
-			sl1,sl2,sl3=pyfrp_integration_module.calcTetSidelengths(pt1,pt2,pt3,pt4)
-			
-			slsVec.append(sl1)
-			slsVec.append(sl2)
-			slsVec.append(sl3)
-			
-		return slsVec
+		return self.getQuality()['edgeLengths'][:3].T.flatten()
 	
 	def plotDensity(self,axes=None,hist=True,bins=100,color='b'):
 		
@@ -780,11 +927,7 @@ class mesh(object):
 			
 		"""
 		
-		x,y,z=self.getCellCenters()
-		
-		volSortedByX,xSorted=pyfrp_misc_module.sortListsWithKey(self.mesh.getCellVolumes(),x)
-		volSortedByY,ySorted=pyfrp_misc_module.sortListsWithKey(self.mesh.getCellVolumes(),y)
-		volSortedByZ,zSorted=pyfrp_misc_module.sortListsWithKey(self.mesh.getCellVolumes(),z)
+		volumes=self.getCellVolumes()
 		
 		if axes==None:
 			fig,axes = pyfrp_plot_module.makeSubplot([1,3],titles=["Density(x)","Density(y)","Density(z)"])
@@ -793,14 +936,17 @@ class mesh(object):
 				printWarning("axes do not have right have, will create new ones.")
 				fig,axes = pyfrp_plot_module.makeSubplot([1,3],titles=["Density(x)","Density(y)","Density(z)"])
 		
-		if hist:
-			xSorted,volSortedByX=pyfrp_misc_module.simpleHist(xSorted,volSortedByX,bins)
-			ySorted,volSortedByY=pyfrp_misc_module.simpleHist(ySorted,volSortedByY,bins)
-			zSorted,volSortedByZ=pyfrp_misc_module.simpleHist(zSorted,volSortedByZ,bins)
+		for i,c in enumerate(self.getCellCenters()):
 			
-		axes[0].plot(xSorted,volSortedByX,color=color)
-		axes[1].plot(ySorted,volSortedByY,color=color)
-		axes[2].plot(zSorted,volSortedByZ,color=color)
+			c=np.asarray(c)
+			
+			if hist:
+				cPlot,volPlot=pyfrp_meshquality_module.computeBinnedAverage(c,volumes,bins=bins)
+			else:
+				idx=np.argsort(c)
+				cPlot,volPlot=c[idx],volumes[idx]
+			
+			axes[i].plot(cPlot,volPlot,color=color)
 		
 		for ax in axes:
 			pyfrp_plot_module.redraw(ax)
@@ -932,6 +1078,127 @@ class mesh(object):
 		
 		return fnOut
 	
+	def getImgProjection(self,res,idx=None,method='linear'):
+		
+		"""Returns sparse matrix projecting values at cell centers onto an image.
+		
+		Cell centers are projected into the x-y-plane and values are interpolated onto 
+		the pixel grid returned by :py:func:`pyfrp.modules.pyfrp_idx_module.getPxGrid`,
+		see also :py:func:`pyfrp.modules.pyfrp_idx_module.getProjectionMatrix`.
+		
+		Projections are cached per mesh, resolution, indices and method, keeping 
+		the ``projectionCacheSize`` most recently used ones per mesh.
+		
+		Args:
+			res (int): Resolution of image.
+			
+		Keyword Args:
+			idx (list): Only project these cells.
+			method (str): Interpolation method.
+			
+		Returns:
+			tuple: Tuple containing:
+		
+				* P (scipy.sparse.csr_matrix): Projection matrix of shape ``(res**2,len(idx))``.
+				* outside (numpy.ndarray): Boolean array of pixels outside of the projected cells.
+			
+			Returns ``(None,None)`` if method is not supported.
+			
+		"""
+		
+		if idx is not None:
+			idx=np.asarray(idx,dtype=int)
+			idxKey=hashlib.md5(idx.tostring()).hexdigest()
+		else:
+			idxKey=None
+		
+		key=(int(res),idxKey,method)
+		
+		try:
+			cache=projectionCache.setdefault(self.mesh,collections.OrderedDict())
+		except TypeError:
+			cache=collections.OrderedDict()
+		
+		if key in cache:
+			cache[key]=cache.pop(key)
+			return cache[key]
+		
+		x,y,z=self.getCellCenters()
+		if idx is not None:
+			x=x[idx]
+			y=y[idx]
+		
+		X,Y=pyfrp_idx_module.getPxGrid(res)
+		projection=pyfrp_idx_module.getProjectionMatrix(x,y,X,Y,method=method)
+		
+		if projection[0] is not None:
+			cache[key]=projection
+			while len(cache)>projectionCacheSize:
+				cache.popitem(last=False)
+		
+		return projection
+	
+	def genBoxFieldCandidates(self,volSizeIns,rangeX,rangeY,rangesZ,fnBase=None,comment="newField",processes=None,debug=False):
+		
+		"""Generates candidate meshes with different box fields concurrently.
+		
+		For each pair of ``volSizeIns`` and ``rangesZ``, adds a box field to the current .geo file
+		of the geometry (see :py:func:`addBoxField`) and writes it into a new candidate .geo file. 
+		Gmsh is then run on all candidates at once, see :py:func:`pyfrp.modules.pyfrp_gmsh_module.runGmshConcurrent`.
+		
+		Candidate files are named by a hash of the original .geo file and the box field parameters.
+		If a candidate mesh already exists, it is reused without running Gmsh again.
+		
+		.. note:: Neither ``fnGeo`` of the geometry nor the current mesh are changed.
+		
+		Args:
+			volSizeIns (list): List of volSizes in px inside the box.
+			rangeX (list): Range of box field in x-direction given as ``[minVal,maxVal]``.
+			rangeY (list): Range of box field in y-direction given as ``[minVal,maxVal]``.
+			rangesZ (list): List of ranges of box field in z-direction.
+			
+		Keyword Args:
+			fnBase (str): Path candidate file names are derived from. Defaults to ``fnGeo`` of geometry.
+			comment (str): Comment in .geo file before definition of box field.
+			processes (int): Number of Gmsh processes run at the same time.
+			debug (bool): Print debugging messages.
+			
+		Returns:
+			list: List of tuples ``(fnGeo,fnMsh)`` of candidates.
+			
+		"""
+		
+		fnGeo=self.simulation.embryo.geometry.fnGeo
+		if fnBase==None:
+			fnBase=fnGeo
+		
+		with open(fnGeo,'r') as f:
+			content=f.read()
+		
+		candidates=[]
+		fns=[]
+		fnOuts=[]
+		
+		for volSizeIn,rangeZ in zip(volSizeIns,rangesZ):
+			
+			key=hashlib.md5(content+str([volSizeIn,self.volSizePx,list(rangeX),list(rangeY),list(rangeZ),comment])).hexdigest()[:12]
+			fnCand=fnBase.replace(".geo","_"+key+".geo")
+			fnMsh=fnCand.replace(".geo",".msh")
+			
+			if os.path.isfile(fnMsh):
+				if debug:
+					print "Reusing mesh file ", fnMsh
+			elif fnCand not in fns:
+				pyfrp_gmsh_IO_module.addBoxField(fnGeo,volSizeIn,self.volSizePx,rangeX,rangeY,rangeZ,comment=comment,fnOut=fnCand)
+				fns.append(fnCand)
+				fnOuts.append(fnMsh)
+			
+			candidates.append((fnCand,fnMsh))
+		
+		pyfrp_gmsh_module.runGmshConcurrent(fns,fnOuts,processes=processes,debug=debug,volSizeMax=self.volSizePx,dim=self.simulation.embryo.geometry.getDim())
+		
+		return candidates
+	
 	def addBoundaryLayerAroundROI(self,roi,fnOut=None,segments=48,simplify=True,iterations=3,triangIterations=2,
 			       fixSurfaces=True,debug=False,volSizePx=None,volSizeLayer=10,thickness=15.,cleanUp=True,
 			       approxBySpline=True,angleThresh=0.95,faces='all',onlyAbs=True):
@@ -1088,19 +1355,43 @@ class mesh(object):
 		Returns:
 			tuple: Tuple containing:
 			
-				* x (list): x-coordinates of cells.
-				* y (list): y-coordinates of cells.
-				* z (list): z-coordinates of cells.
+				* x (numpy.ndarray): x-coordinates of cells.
+				* y (numpy.ndarray): y-coordinates of cells.
+				* z (numpy.ndarray): z-coordinates of cells.
 				
 		"""
 		
 		if self.mesh==None:
 			return [],[],[]
 		
-		if len(self.mesh.getCellCenters())==3:
-			return self.mesh.getCellCenters()
+		#Cell centers are cached per FiPy mesh and read-only, so they are shared between ROIs 
+		#and forked indexing workers.
+		sliceHeightPx=self.simulation.embryo.sliceHeightPx
+		try:
+			cached=cellCenterCache.get(self.mesh)
+		except TypeError:
+			cached=None
+		if cached!=None and (cached[0]==None or cached[0]==sliceHeightPx):
+			return cached[1]
+		
+		centers=np.array(self.mesh.getCellCenters())
+		
+		if len(centers)==3:
+			key=None
+			x,y,z=centers
 		else:
-			z=self.simulation.embryo.sliceHeightPx*np.ones((len(self.mesh.getCellCenters()[0]),))
-			return self.mesh.getCellCenters()[0],self.mesh.getCellCenters()[1],z
+			key=sliceHeightPx
+			x,y=centers
+			z=sliceHeightPx*np.ones((len(x),))
+		
+		for c in [x,y,z]:
+			c.flags.writeable=False
+		
+		try:
+			cellCenterCache[self.mesh]=(key,(x,y,z))
+		except TypeError:
+			pass
+		
+		return x,y,z
 		
 		
\ No newline at end of file
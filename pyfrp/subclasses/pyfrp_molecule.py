@@ -36,7 +36,10 @@ import numpy as np
 #PyFRAP Modules
 from pyfrp.modules import pyfrp_misc_module
 from pyfrp.modules import pyfrp_IO_module
+from pyfrp.modules import pyfrp_container_module
 from pyfrp.modules import pyfrp_stats_module
+from pyfrp.modules import pyfrp_sim_module
+from pyfrp.modules.pyfrp_term_module import *
 
 #PyFRAP Classes
 import pyfrp_embryo
@@ -84,6 +87,11 @@ class molecule:
 		self.prodStErr=None
 		self.degrStErr=None
 		
+		#Credible intervals from posteriors of selected fits, see sumUpResults
+		self.DOptMuCI=None
+		self.prodOptCI=None
+		self.degrOptCI=None
+		
 		self.crucialParameters=["equOn","fitPinned","fitProd","fitDegr","LBD","LBProd","LBDegr","UBD","UBProd","UBDegr"]
 					
 	def addEmbryo(self,embryo):
@@ -168,6 +176,10 @@ class molecule:
 		
 		"""Saves molecule to pickle file.
 		
+		If ``fn`` ends with ``.pyfrp``, saves into a container file instead, see 
+		:py:mod:`pyfrp.modules.pyfrp_container_module`. Container files can be read partially,
+		so there is no need for :py:meth:`saveExtract`.
+		
 		.. note:: If ``fn`` is not specified, will assume ``fn=self.name``.
 		
 		Keyword Args:
@@ -181,7 +193,10 @@ class molecule:
 		if fn==None:
 			fn=self.name+".mol"
 		
-		pyfrp_IO_module.saveToPickle(self,fn=fn)	
+		if os.path.splitext(fn)[-1]==".pyfrp":
+			pyfrp_container_module.saveContainer(self,fn)
+		else:
+			pyfrp_IO_module.saveToPickle(self,fn=fn)	
 		
 		return fn
 	
@@ -416,8 +431,50 @@ class molecule:
 		
 		self.Rsq=np.mean(pyfrp_misc_module.objAttrToList(self.selFits,"Rsq"))
 		self.MeanRsq=np.mean(pyfrp_misc_module.objAttrToList(self.selFits,"MeanRsq"))
+		
+		self.sumUpPosteriors()
 			
 		return	True
+	
+	def sumUpPosteriors(self,q=[2.5,50,97.5]):
+		
+		"""Computes credible intervals of ``DOptMu``, ``prodOpt`` and ``degrOpt`` from posteriors of all fits in ``selFits``.
+		
+		Samples of all fits with a posterior (see :py:meth:`pyfrp.subclasses.pyfrp_fit.fit.computePosterior`) are pooled
+		with equal weight per fit, so intervals cover both the uncertainty within and the variability between embryos.
+		Results are stored in ``DOptMuCI``, ``prodOptCI`` and ``degrOptCI``, which stay ``None`` if no fit sampled 
+		the parameter.
+		
+		Keyword Args:
+			q (list): Percentiles, by default median and 95% credible interval.
+		
+		Returns:
+			dict: Percentiles by parameter name.
+		
+		"""
+		
+		posteriors=[fit.posterior for fit in self.selFits if getattr(fit,'posterior',None)!=None]
+		
+		summary={}
+		for name in ["DOptMu","prodOpt","degrOpt"]:
+			
+			samples=[]
+			for posterior in posteriors:
+				if name=="DOptMu" or name in posterior['names']:
+					samples.append(pyfrp_stats_module.getPosteriorSamples(posterior,name))
+			
+			if len(samples)==0:
+				setattr(self,name+"CI",None)
+				continue
+			
+			#Equal weight per fit
+			n=min([len(x) for x in samples])
+			samples=np.concatenate([x[np.linspace(0,len(x)-1,n).astype(int)] for x in samples])
+			
+			summary[name]=np.percentile(samples,q)
+			setattr(self,name+"CI",summary[name])
+		
+		return summary
 		
 	def printResults(self):
 		
@@ -440,6 +497,10 @@ class molecule:
 		printObjAttr('Rsq',self)
 		printObjAttr('MeanRsq',self)
 		
+		#Molecules saved before credible intervals were added lack them
+		if hasattr(self,'DOptMuCI'):
+			printObjAttr('DOptMuCI',self)
+		
 	def getFitParm(self,parm):
 		
 		"""Collects all values of parameter from all selected fits of molecule.
@@ -473,4 +534,49 @@ class molecule:
 		
 		return self.getFitParm("DOptMu")
 	
-	
\ No newline at end of file
+	
+	
+	def runSimulations(self,batch=True,showProgress=True,debug=False):
+		
+		"""Runs simulations of all embryos of molecule.
+		
+		If ``batch=True``, simulations that share mesh, time vector and PDE parameters are run together 
+		via :py:func:`pyfrp.modules.pyfrp_sim_module.simulateReactDiffBatch`, that is with one matrix
+		assembly and factorization per time step for all of them. All other simulations are run one by one via
+		:py:meth:`pyfrp.subclasses.pyfrp_simulation.simulation.run`.
+		
+		Keyword Args:
+			batch (bool): Batch compatible simulations.
+			showProgress (bool): Print out progress.
+			debug (bool): Print debugging messages.
+		
+		Returns:
+			bool: True if all simulations succeeded, False otherwise.
+			
+		"""
+		
+		success=True
+		
+		simulations=[]
+		for emb in self.embryos:
+			if emb.simulation==None:
+				printWarning("Embryo "+emb.name+" does not have a simulation, will skip.")
+				continue
+			if not emb.simulation.prepareRun():
+				success=False
+				continue
+			simulations.append(emb.simulation)
+		
+		if batch:
+			groups=pyfrp_sim_module.groupBatchSimulations(simulations)
+		else:
+			groups=[[sim] for sim in simulations]
+		
+		for group in groups:
+			if len(group)>1 and pyfrp_sim_module.checkBatchCompatible(group):
+				pyfrp_sim_module.simulateReactDiffBatch(group,showProgress=showProgress,debug=debug)
+			else:
+				for sim in group:
+					success=sim.run(showProgress=showProgress,debug=debug) and success
+		
+		return success
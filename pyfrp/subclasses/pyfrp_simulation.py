@@ -45,10 +45,12 @@ from pyfrp.modules import pyfrp_sim_module
 from pyfrp.modules import pyfrp_img_module
 from pyfrp.modules import pyfrp_idx_module
 from pyfrp.modules import pyfrp_misc_module
+from pyfrp.modules import pyfrp_IO_module
 from pyfrp.modules.pyfrp_term_module import *
 
-#Plotting
-import matplotlib.pyplot as plt
+#Plotting (imported on first use)
+from pyfrp.modules import pyfrp_lazy_module
+plt=pyfrp_lazy_module.lazyImport('matplotlib.pyplot')
 
 #itertools 
 import itertools
@@ -104,10 +106,26 @@ class simulation(object):
 		self.saveSim=False
 		self.vals=[]
 		
+		#Final state of last simulation, see pyfrp_sim_module.writeCheckpoint
+		self.checkpoint=None
+		
+		#Stream simulation to .vtu time series
+		self.fnVTKSeries=""
+		
 		#Solver details
 		self.solver="PCG"
 		self.iterations=1000
 		self.tolerance=1E-10
+		
+		#Select solver automatically, see pyfrp_sim_module.calibrateSolver
+		self.autoSolver=False
+		self.solverAccuracy=1E-6
+		self.solverCalibration=None
+		
+		#Simulate in (r,z) for axisymmetric geometries, see pyfrp_sim_module.useAxisymmetric
+		self.axisymmetric=False
+		self.axisymmetricCellSizePx=5.
+		self.axisymmetricTol=0.2
 	
 	def setSolver(self,solver):
 		
@@ -117,6 +135,8 @@ class simulation(object):
 		
 			* PCG
 			* LU
+			* AMG: Conjugate gradients preconditioned with algebraic multigrid, see 
+			  :py:func:`pyfrp.modules.pyfrp_sim_module.getAMGStepper`. Requires pyamg.
 			
 		Args:
 			solver (str): Solver to use.
@@ -126,7 +146,7 @@ class simulation(object):
 		
 		"""
 		
-		if solver not in ["PCG","LU"]:
+		if solver not in pyfrp_sim_module.solverNames:
 			printWarning("Unknown solver " + solver +". This might lead to problems later")
 		
 		self.solver=solver
@@ -155,7 +175,7 @@ class simulation(object):
 		
 		"""
 	
-		self.tolerance=tolerance
+		self.tolerance=tol
 		return self.tolerance
 	
 	def getTolerance(self):
@@ -182,7 +202,7 @@ class simulation(object):
 		
 		"""
 	
-		self.iterations=iterations
+		self.iterations=tol
 		return self.iterations
 	
 	def getIterations(self):
@@ -196,6 +216,148 @@ class simulation(object):
 		
 		return self.iterations
 	
+	def setAutoSolver(self,b):
+		
+		"""Sets if solver and tolerance are selected automatically before running.
+		
+		If ``True``, :py:meth:`prepareRun` runs :py:meth:`calibrateSolver` unless a 
+		valid calibration exists, see :py:func:`pyfrp.modules.pyfrp_sim_module.checkSolverCalibration`.
+		
+		Args:
+			b (bool): Select automatically.
+		
+		Returns:
+			bool: Current flag.
+		
+		"""
+		
+		self.autoSolver=b
+		return self.autoSolver
+	
+	def getAutoSolver(self):
+		
+		"""Returns if solver is selected automatically.
+		
+		Returns:
+			bool: Current flag.
+		
+		"""
+		
+		return self.autoSolver
+	
+	def setSolverAccuracy(self,acc):
+		
+		"""Sets maximum relative error of automatically selected solver.
+		
+		Args:
+			acc (float): New accuracy.
+		
+		Returns:
+			float: Current accuracy.
+		
+		"""
+		
+		self.solverAccuracy=acc
+		return self.solverAccuracy
+	
+	def calibrateSolver(self,nSteps=5,debug=False):
+		
+		"""Selects solver and tolerance from a short calibration run.
+		
+		See :py:func:`pyfrp.modules.pyfrp_sim_module.calibrateSolver`.
+		
+		Keyword Args:
+			nSteps (int): Number of time steps.
+			debug (bool): Print measurements.
+		
+		Returns:
+			dict: Calibration.
+		
+		"""
+		
+		return pyfrp_sim_module.calibrateSolver(self,nSteps=nSteps,debug=debug)
+	
+	def setAxisymmetric(self,b):
+		
+		"""Sets if simulation is run in cylindrical coordinates (r,z).
+		
+		Cylinder, ball and zebrafish dome geometries are rotationally symmetric. If the initial conditions are too, 
+		the 3D problem reduces to a 2D problem in (r,z), needing orders of magnitudes less cells.
+		Options are:
+		
+			* ``False``: Always simulate in 3D.
+			* ``True``: Simulate in (r,z) if geometry is axisymmetric, averaging initial conditions azimuthally.
+			* ``'auto'``: Simulate in (r,z) if geometry is axisymmetric and initial conditions are radially symmetric,
+			  see :py:func:`setAxisymmetricTol`.
+		
+		See also :py:func:`pyfrp.modules.pyfrp_sim_module.useAxisymmetric` and 
+		:py:func:`pyfrp.modules.pyfrp_sim_module.simulateReactDiffAxisymmetric`.
+		
+		Args:
+			b (bool): New flag value.
+			
+		Returns:
+			bool: New flag value.
+		
+		"""
+		
+		if b not in [True,False,'auto']:
+			printError("Unknown axisymmetric option "+str(b)+". Not going to change it.")
+			return self.axisymmetric
+		
+		self.axisymmetric=b
+		return self.axisymmetric
+	
+	def getAxisymmetric(self):
+		
+		"""Returns if simulation is run in cylindrical coordinates (r,z), see :py:func:`setAxisymmetric`.
+		
+		Returns:
+			bool: Flag value.
+		
+		"""
+		
+		return self.axisymmetric
+	
+	def setAxisymmetricCellSizePx(self,h):
+		
+		"""Sets side length of cells in px when simulating in (r,z).
+		
+		Args:
+			h (float): New side length.
+			
+		Returns:
+			float: New side length.
+		
+		"""
+		
+		self.axisymmetricCellSizePx=h
+		return self.axisymmetricCellSizePx
+	
+	def setAxisymmetricTol(self,tol):
+		
+		"""Sets maximum deviation of initial conditions from radial symmetry if ``axisymmetric='auto'``.
+		
+		See also :py:func:`pyfrp.modules.pyfrp_sim_module.checkRadialSymmetry`.
+		
+		Args:
+			tol (float): New tolerance.
+			
+		Returns:
+			float: New tolerance.
+		
+		"""
+		
+		self.axisymmetricTol=tol
+		return self.axisymmetricTol
+	
+	def isAxisymmetric(self):
+		
+		"""Returns True if simulation will be run in (r,z), see :py:func:`pyfrp.modules.pyfrp_sim_module.useAxisymmetric`."""
+		
+		self.updateVersion()
+		return pyfrp_sim_module.useAxisymmetric(self)
+	
 	def setICMode(self,m):
 		
 		"""Sets the mode of initial conditions.
@@ -288,20 +450,43 @@ class simulation(object):
 		
 		"""
 		
+		if not self.prepareRun():
+			return False
+			
+		pyfrp_sim_module.simulateReactDiff(self,signal=signal,embCount=embCount,showProgress=showProgress,debug=debug)
+		return True
+	
+	def prepareRun(self):
+		
+		"""Prepares simulation for running.
+		
+		Updates version, computes ROI indices if necessary and loads ICimg if it is required by ``ICmode``
+		but not set. If ``autoSolver`` is set, calibrates solver unless a valid calibration exists.
+		
+		Returns:
+			bool: True if success, False otherwise.
+		
+		"""
+		
 		self.updateVersion()
 		
 		if not self.embryo.checkROIIdxs()[1]:
 			self.embryo.computeROIIdxs()
 			
-		if not isinstance(self.ICimg,np.ndarray) and self.ICmode in [2,3]:
+		if not isinstance(self.ICimg,np.ndarray) and self.ICmode in [1,2,3]:
 			printWarning("No ICimg was specified, but it is required for selected ICmode="+str(self.ICmode)+". Will grab first image in "+self.embryo.fnDatafolder)
 			try:
-				self.setICimgByFn(self.embryo.getDataFolder()+'/'+self.embryo.getFileList()[0])
+				if self.embryo.usesDataStack():
+					self.setICimg(self.embryo.loadDataImg(0))
+				else:
+					self.setICimgByFn(self.embryo.getDataFolder()+'/'+self.embryo.getFileList()[0])
 			except:
 				printError("Was not able to set new ICimg. Will abort.")
 				return False
-			
-		pyfrp_sim_module.simulateReactDiff(self,signal=signal,embCount=embCount,showProgress=showProgress,debug=debug)
+		
+		if self.autoSolver and self.mesh.mesh!=None and not pyfrp_sim_module.checkSolverCalibration(self):
+			self.calibrateSolver()
+		
 		return True
 	
 	def setMesh(self,m):
@@ -538,7 +723,9 @@ class simulation(object):
 		
 		"""Interpolates solution back onto 2D image.
 		
-		Uses ``scipy.interpolate.griddata``, see also http://docs.scipy.org/doc/scipy-0.14.0/reference/generated/scipy.interpolate.griddata.html
+		Uses a cached projection matrix from cells to pixels, see :py:func:`pyfrp.subclasses.pyfrp_mesh.mesh.getImgProjection`,
+		so that repeated calls only need a sparse matrix-vector product. Methods not supported by the projection 
+		matrix are passed to ``scipy.interpolate.griddata``, see also http://docs.scipy.org/doc/scipy-0.14.0/reference/generated/scipy.interpolate.griddata.html
 		
 		If ``roi`` is specified, will only interpolate nodes of this ROI. 
 		
@@ -566,27 +753,27 @@ class simulation(object):
 			res=self.ICimg.shape[0]
 		
 		#Build Empty Img
-		X,Y=np.meshgrid(np.arange(res),np.arange(res))
-		
-		#Get cellcenters
-		x,y,z=self.mesh.getCellCenters()
-		##print x
-		##print y
-		##print z
-		##print roi.meshIdx
-		#print max(roi.meshIdx)
-		#print len(x)
+		X,Y=pyfrp_idx_module.getPxGrid(res)
 		
+		idx=None
 		if roi!=None:
-			xInt=x[roi.meshIdx]
-			yInt=y[roi.meshIdx]
-			val=vals[roi.meshIdx]
+			idx=roi.meshIdx
+			val=np.asarray(vals)[idx]
 		else:
-			xInt=x
-			yInt=y
-			val=vals
+			val=np.asarray(vals)
 		
-		interpIC=interp.griddata((xInt,yInt),val,(X,Y),method=method)
+		P,outside=self.mesh.getImgProjection(res,idx=idx,method=method)
+		
+		if P is not None:
+			interpIC=P.dot(val)
+			interpIC[outside]=np.nan
+			interpIC=interpIC.reshape(X.shape)
+		else:
+			x,y,z=self.mesh.getCellCenters()
+			if idx is not None:
+				x=x[idx]
+				y=y[idx]
+			interpIC=interp.griddata((x,y),val,(X,Y),method=method)
 		
 		return X,Y,interpIC
 	
@@ -1174,6 +1361,46 @@ class simulation(object):
 		pyfrp_sim_module.rerunReactDiff(self,signal=signal,embCount=embCount,showProgress=showProgress,debug=debug)
 		return True
 		
+	def extend(self,tEndNew,signal=None,embCount=None,showProgress=True,debug=False):
+		
+		"""Continues last simulation until ``tEndNew``.
+		
+		Extends time vector of the last simulation keeping its time stepping scheme (see 
+		:py:func:`pyfrp.modules.pyfrp_sim_module.extendTvec`) and then continues simulation
+		from its checkpoint via :py:func:`pyfrp.modules.pyfrp_sim_module.extendReactDiff`.
+		
+		.. note:: Only works if simulation parameters and mesh did not change since the last simulation.
+		
+		Args:
+			tEndNew (float): New end time point.
+		
+		Keyword Args:
+			signal (PyQt4.QtCore.pyqtSignal): PyQT signal to send progress to GUI.
+			embCount (int): Counter of counter process if multiple datasets are simulated. 
+			debug (bool): Print debugging messages and show debugging plots.
+			showProgress (bool): Print out progress.
+		
+		Returns:
+			bool: True if success, False otherwise.
+			
+		"""
+		
+		self.updateVersion()
+		
+		if not pyfrp_sim_module.checkCheckpoint(self):
+			return False
+		
+		tvecOld=self.checkpoint["tvecSim"]
+		if tEndNew<=tvecOld[-1]:
+			printWarning("Simulation already reaches t = "+str(tvecOld[-1])+". Will not extend.")
+			return False
+		
+		self.tvecSim=pyfrp_sim_module.extendTvec(tvecOld,tEndNew)
+		self.stepsSim=len(self.tvecSim)
+		
+		pyfrp_sim_module.extendReactDiff(self,signal=signal,embCount=embCount,showProgress=showProgress,debug=debug)
+		return True
+	
 	def updateVersion(self):
 		
 		"""Updates simulation object to current version, making sure that it possesses
@@ -1266,6 +1493,67 @@ class simulation(object):
 		return True
 		
 		
+	def setVTKSeriesFn(self,fn):
+		
+		"""Sets basename of .vtu time series written while simulating.
+		
+		If set, :py:func:`pyfrp.modules.pyfrp_sim_module.simulateReactDiff` writes
+		one .vtu file per timestep plus a .pvd index file that can be opened in ParaView, 
+		independent of ``saveSim``. Set to ``""`` to disable.
+		
+		Args:
+			fn (str): Basename of time series, for example ``out/sim``.
+		
+		Returns:
+			str: Current basename.
+		
+		"""
+		
+		self.fnVTKSeries=fn
+		return self.fnVTKSeries
+	
+	def getVTKSeriesFn(self):
+		
+		"""Returns basename of .vtu time series written while simulating.
+		
+		Returns:
+			str: Current basename.
+		
+		"""
+		
+		return self.fnVTKSeries
+	
+	def writeVTKTimeSeries(self,fnBase="",name="concentration"):
+		
+		"""Writes saved simulation values into a .vtu time series with .pvd index.
+		
+		See also :py:func:`pyfrp.modules.pyfrp_IO_module.writeVTKTimeSeries`.
+		
+		.. note:: Only works if simulation has been run before and saved via ``saveSim``.
+		
+		.. note:: If ``fnBase`` is not given, will write into the current working directory
+		   using the embryo's name.
+		
+		Keyword Args:
+			fnBase (str): Basename of time series.
+			name (str): Name of data array.
+		
+		Returns:
+			str: Path to .pvd file.
+		
+		"""
+		
+		if len(self.vals)==0:
+			printError("Simulation hasn't been saved, will not do anything.")
+			return ""
+		
+		if fnBase=="":
+			fnBase=self.embryo.name+"_sim"
+		
+		points,cells=pyfrp_IO_module.meshToArrays(self.mesh.mesh)
+		
+		return pyfrp_IO_module.writeVTKTimeSeries(fnBase,points,cells,self.vals,self.tvecSim,name=name)
+		
 	def visualize(self,cut=False,app=None):
 		
 		"""Visualizes simulation using VTK.
@@ -0,0 +1,94 @@
+"""This module imports all tests/unittests for the
+pyfrp_IO_module."""
+
+from pyfrp.modules import pyfrp_IO_module
+
+import numpy as np
+import base64
+import xml.etree.ElementTree as ET
+
+def getTwoTetMesh():
+
+	"""Returns points and cells of a mesh consisting of two tetrahedra sharing a face."""
+
+	points=np.array([[0,0,0],[1,0,0],[0,1,0],[0,0,1],[1,1,1]],dtype=float)
+	cells=np.array([[0,1,2,3],[1,2,3,4]],dtype=np.int64)
+
+	return points,cells
+
+def decodeDataArray(el,dtype):
+
+	"""Decodes binary ``DataArray`` element of a .vtu file."""
+
+	raw=base64.b64decode(el.text.strip())
+	nBytes=np.frombuffer(raw[:4],dtype='<u4')[0]
+
+	return np.frombuffer(raw[4:4+nBytes],dtype=dtype)
+
+def test_writeLegacyVTKFile(tmpdir):
+
+	"""Test writeLegacyVTKFile function.
+
+	Writes two tetrahedra with cell data and parses header, counts and
+	binary blocks back."""
+
+	points,cells=getTwoTetMesh()
+	vals=np.array([0.25,0.75])
+
+	fn=pyfrp_IO_module.writeLegacyVTKFile(str(tmpdir.join("mesh.vtk")),points,cells,cellData={"c":vals})
+
+	with open(fn,'rb') as f:
+		data=f.read()
+
+	lines=data.split('\n')
+	assert lines[0]=='# vtk DataFile Version 3.0'
+	assert lines[2]=='BINARY'
+	assert lines[3]=='DATASET UNSTRUCTURED_GRID'
+	assert lines[4]=='POINTS 5 double'
+
+	#Points follow header directly
+	start=data.index('POINTS 5 double\n')+len('POINTS 5 double\n')
+	assert np.allclose(np.frombuffer(data[start:start+points.size*8],dtype='>f8').reshape(points.shape),points)
+
+	header='\nCELLS 2 10\n'
+	start=data.index(header)+len(header)
+	cellArr=np.frombuffer(data[start:start+10*4],dtype='>i4').reshape(2,5)
+	assert np.all(cellArr[:,0]==4)
+	assert np.all(cellArr[:,1:]==cells)
+
+	header='\nCELL_TYPES 2\n'
+	start=data.index(header)+len(header)
+	assert np.all(np.frombuffer(data[start:start+2*4],dtype='>i4')==10)
+
+	header='SCALARS c double 1\nLOOKUP_TABLE default\n'
+	start=data.index(header)+len(header)
+	assert np.allclose(np.frombuffer(data[start:start+2*8],dtype='>f8'),vals)
+
+def test_writeVTKTimeSeries(tmpdir):
+
+	"""Test writeVTKTimeSeries function.
+
+	Writes a time series of two timepoints, then parses .pvd index and
+	point/cell counts, connectivity and values of each .vtu file back."""
+
+	points,cells=getTwoTetMesh()
+	vals=[np.array([1.,2.]),np.array([3.,4.])]
+	times=[0.,1.5]
+
+	fnPVD=pyfrp_IO_module.writeVTKTimeSeries(str(tmpdir.join("sim")),points,cells,iter(vals),times)
+
+	dataSets=ET.parse(fnPVD).getroot().findall('Collection/DataSet')
+	assert [float(d.get('timestep')) for d in dataSets]==times
+
+	for d,val in zip(dataSets,vals):
+
+		piece=ET.parse(str(tmpdir.join(d.get('file')))).getroot().find('UnstructuredGrid/Piece')
+		assert int(piece.get('NumberOfPoints'))==5
+		assert int(piece.get('NumberOfCells'))==2
+
+		arrays=dict((el.get('Name'),el) for el in piece.iter('DataArray'))
+		assert np.allclose(decodeDataArray(arrays['Points'],'<f8').reshape(points.shape),points)
+		assert np.all(decodeDataArray(arrays['connectivity'],'<i8').reshape(cells.shape)==cells)
+		assert np.all(decodeDataArray(arrays['offsets'],'<i8')==[4,8])
+		assert np.all(decodeDataArray(arrays['types'],'u1')==10)
+		assert np.allclose(decodeDataArray(arrays['concentration'],'<f8'),val)
@@ -0,0 +1,89 @@
+"""This module imports all tests/unittests for the
+pyfrp_batch_module."""
+
+from pyfrp.modules import pyfrp_batch_module
+from pyfrp.modules import pyfrp_IO_module
+
+import os
+
+def test_runBatch(tmpdir):
+
+	"""Test running batch on manifest with one broken entry.
+	
+	Checks that failure is recorded in journal and results table, 
+	and that failed datasets are retried when batch is resumed."""
+	
+	fnManifest=str(tmpdir.join("manifest.txt"))
+	with open(fnManifest,'w') as f:
+		f.write("# Embryos\n\nmissing.emb,emb1\n")
+	
+	jobs=pyfrp_batch_module.readManifest(fnManifest)
+	assert len(jobs)==1
+	assert jobs[0]['name']=='emb1'
+	assert jobs[0]['input']==str(tmpdir.join("missing.emb"))
+	
+	fnOut=str(tmpdir.join("out"))
+	records=pyfrp_batch_module.runBatch(fnManifest,fnOut,debug=False)
+	assert records[jobs[0]['input']]['status']=='failed'
+	
+	journal=pyfrp_batch_module.readJournal(os.path.join(fnOut,'journal.jsonl'))
+	assert journal[jobs[0]['input']]['status']=='failed'
+	assert len(pyfrp_batch_module.getPendingJobs(jobs,journal))==1
+	
+	header,rows=pyfrp_IO_module.readCSV(os.path.join(fnOut,'results.csv'))
+	assert rows[0][header.index('status')]=='failed'
+	assert len(rows[0][header.index('error')])>0
+	
+	# Marking dataset as done skips it on resume
+	journal[jobs[0]['input']]['status']='done'
+	pyfrp_batch_module.appendToJournal(os.path.join(fnOut,'journal.jsonl'),journal[jobs[0]['input']])
+	records=pyfrp_batch_module.runBatch(fnManifest,fnOut,debug=False)
+	assert records[jobs[0]['input']]['status']=='done'
+
+def test_runBatchSynthetic(tmpdir):
+
+	"""Test running batch on a synthetic dataset and a dataset that never finishes.
+	
+	The hanging dataset is a named pipe without writer. Checks that it is recorded as failed 
+	after the timeout, and that the synthetic dataset is still analyzed, giving the same 
+	data vectors as analyzing it directly."""
+	
+	from pyfrp.modules import pyfrp_benchmark_module
+	
+	import numpy as np
+	
+	dataset=pyfrp_benchmark_module.genSyntheticDataset(str(tmpdir),res=32,nFrames=3,noise=0.)
+	emb=pyfrp_benchmark_module.buildBenchmarkEmbryo(dataset)
+	emb.save(str(tmpdir.join("synth.pyfrp")),copyMeshFiles=False)
+	
+	os.mkfifo(str(tmpdir.join("hang.emb")))
+	
+	fnManifest=str(tmpdir.join("manifest.txt"))
+	with open(fnManifest,'w') as f:
+		f.write("hang.emb\nsynth.pyfrp\n")
+	
+	fnOut=str(tmpdir.join("out"))
+	analysisKwargs={'timeScale':'lin','runSimulation':False,'runPin':False,'runFit':False}
+	records=pyfrp_batch_module.runBatch(fnManifest,fnOut,timeout=5.,analysisKwargs=analysisKwargs,debug=False)
+	
+	jobs=pyfrp_batch_module.readManifest(fnManifest)
+	assert records[jobs[0]['input']]['status']=='failed'
+	assert 'TimeoutError' in records[jobs[0]['input']]['error']
+	
+	record=records[jobs[1]['input']]
+	assert record['status']=='done'
+	assert record['fnOut']==os.path.join(fnOut,'synth.pyfrp')
+	
+	journal=pyfrp_batch_module.readJournal(os.path.join(fnOut,'journal.jsonl'))
+	assert journal[jobs[1]['input']]['status']=='done'
+	
+	header,rows=pyfrp_IO_module.readCSV(os.path.join(fnOut,'results.csv'))
+	assert [row[header.index('status')] for row in rows]==['failed','done']
+	
+	emb.computeROIIdxs(debug=False)
+	emb.analysis.run(showProgress=False)
+	
+	emb2=pyfrp_IO_module.loadEmbryo(record['fnOut'])
+	assert emb2.name=='synth'
+	for r,r2 in zip(emb.ROIs,emb2.ROIs):
+		assert np.allclose(r.dataVec,r2.dataVec), r.name
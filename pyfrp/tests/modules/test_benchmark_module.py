@@ -0,0 +1,53 @@
+"""This module imports all tests/unittests for the
+pyfrp_benchmark_module."""
+
+from pyfrp.modules import pyfrp_benchmark_module
+from pyfrp.modules import pyfrp_img_module
+
+import numpy as np
+import os
+
+def test_genSyntheticDataset(tmpdir):
+
+	"""Test generating synthetic dataset.
+	
+	Checks that frames are written and that bleached region recovers
+	while total mass inside the slice stays about the same."""
+	
+	dataset=pyfrp_benchmark_module.genSyntheticDataset(str(tmpdir),res=64,nFrames=5,noise=0.)
+	
+	fns=sorted(os.listdir(dataset['fnRecover']))
+	assert len(fns)==5
+	assert len(os.listdir(dataset['fnPre']))==1
+	
+	first=pyfrp_img_module.loadImg(os.path.join(dataset['fnRecover'],fns[0]),'uint16')
+	last=pyfrp_img_module.loadImg(os.path.join(dataset['fnRecover'],fns[-1]),'uint16')
+	
+	c=int(dataset['center'][0])
+	assert abs(first[c,c]-dataset['valIn']*dataset['maxVal'])<1
+	assert last[c,c]>first[c,c]
+	assert abs(last.sum()/first.sum()-1)<0.05
+
+def test_compareSolvers():
+
+	"""Test comparing linear solvers.
+	
+	Checks on a 2D grid that conjugate gradients converge to the LU solution."""
+	
+	from pyfrp.modules import pyfrp_sim_module
+	
+	n=20
+	idx=np.arange(n*n).reshape(n,n)
+	ids0=np.concatenate([idx[:-1,:].flatten(),idx[:,:-1].flatten()])
+	ids1=np.concatenate([idx[1:,:].flatten(),idx[:,1:].flatten()])
+	L=pyfrp_sim_module.assembleDiffusionMatrix(ids0,ids1,np.ones(len(ids0)),n*n)
+	
+	c0=np.zeros(n*n)
+	c0[idx[5:15,5:15].flatten()]=1.
+	tvec=np.logspace(-2,1,10)
+	
+	stats=pyfrp_benchmark_module.compareSolvers(L,np.ones(n*n),c0,tvec,1.,solvers=["LU","PCG"])
+	
+	assert stats["PCG"]["converged"]
+	assert stats["PCG"]["iterations"]>stats["LU"]["iterations"]
+	assert stats["PCG"]["error"]<1E-6
@@ -0,0 +1,82 @@
+"""This module imports all tests/unittests for the
+pyfrp_container_module."""
+
+from pyfrp.modules import pyfrp_container_module
+from pyfrp.modules import pyfrp_IO_module
+from pyfrp.subclasses import pyfrp_embryo
+from pyfrp.subclasses import pyfrp_molecule
+
+import numpy as np
+
+def test_containerRoundTrip(tmpdir):
+
+	"""Test saving molecule into container and loading it again. 
+
+	Checks that arrays, index lists and back references survive, and that
+	excluded attributes are not loaded."""
+	
+	emb=pyfrp_embryo.embryo("emb")
+	emb.newSimulation()
+	r=emb.newRadialROI("r","r",[256,256],100)
+	r.imgIdxX=range(100)
+	r.dataVec=np.linspace(0,1,10)
+	emb.simulation.checkpoint={"phi":np.ones(50),"simVecs":{"r":[1.,0.5]}}
+	
+	mol=pyfrp_molecule.molecule("mol")
+	mol.addEmbryo(emb)
+	mol.DOptMu=12.5
+	
+	fn=mol.save(str(tmpdir.join("mol.pyfrp")))
+	
+	assert pyfrp_container_module.readContainerValue(fn,"root.DOptMu")==12.5
+	
+	mol2=pyfrp_IO_module.loadMolecule(fn)
+	r2=mol2.embryos[0].ROIs[0]
+	
+	assert r2.embryo is mol2.embryos[0]
+	assert r2.imgIdxX==range(100)
+	assert np.allclose(r2.dataVec,r.dataVec)
+	assert np.allclose(mol2.embryos[0].simulation.checkpoint["phi"],1.)
+	
+	mol3=pyfrp_IO_module.loadMolecule(fn,exclude=pyfrp_container_module.getResultsExclude())
+	
+	assert mol3.embryos[0].ROIs[0].imgIdxX==None
+	assert np.allclose(mol3.embryos[0].ROIs[0].dataVec,r.dataVec)
+	assert mol3.embryos[0].simulation.checkpoint==None
+
+def test_loadContainerUpdate(tmpdir):
+
+	"""Test loading a container written before attributes were added.
+	
+	Removes attributes from the object tree of a saved molecule and checks that 
+	loading adds them again with their default values."""
+	
+	import json
+	import zipfile
+	
+	emb=pyfrp_embryo.embryo("emb")
+	mol=pyfrp_molecule.molecule("mol")
+	mol.addEmbryo(emb)
+	
+	fn=mol.save(str(tmpdir.join("mol.pyfrp")))
+	
+	#Rewrite container without attributes
+	with zipfile.ZipFile(fn,'r') as zf:
+		meta=json.loads(zf.read('meta.json'))
+		files=dict([(name,zf.read(name)) for name in zf.namelist() if name!='meta.json'])
+	
+	del meta['root']['__attrs__']['DOptMu']
+	del meta['root']['__attrs__']['embryos'][0]['__attrs__']['idxProcesses']
+	
+	with zipfile.ZipFile(fn,'w') as zf:
+		zf.writestr('meta.json',json.dumps(meta))
+		for name,data in files.items():
+			zf.writestr(name,data)
+	
+	mol2=pyfrp_IO_module.loadMolecule(fn,update=False)
+	assert not hasattr(mol2,'DOptMu')
+	assert not hasattr(mol2.embryos[0],'idxProcesses')
+	
+	mol2=pyfrp_IO_module.loadMolecule(fn)
+	assert mol2.DOptMu==mol.DOptMu
+	assert mol2.embryos[0].idxProcesses==emb.idxProcesses
@@ -0,0 +1,168 @@
+"""This module imports all tests/unittests for the
+pyfrp_fit_module."""
+
+from pyfrp.modules import pyfrp_fit_module
+
+import numpy as np
+import scipy.sparse as sparse
+
+def test_computePixelSSD():
+
+	"""Test chunked pixel SSD.
+	
+	Compares SSD over 2x2 blocks of snapshots interpolated in time with 
+	a direct computation on complete image arrays, for different chunk sizes."""
+	
+	np.random.seed(0)
+	
+	res=8
+	tvecSim=np.linspace(0,10,21)**1.5
+	vals=[np.random.rand(res**2) for t in tvecSim]
+	tvecData=np.linspace(0,20,7)
+	stack=np.random.rand(len(tvecData),res,res).astype('float32')
+	
+	#Block averaging matrix
+	idxX,idxY=[a.flatten() for a in np.meshgrid(np.arange(res),np.arange(res),indexing='ij')]
+	blockIdx=(idxX//2)*(res//2)+idxY//2
+	B=sparse.csr_matrix((0.25*np.ones(res**2),(blockIdx,np.arange(res**2))),shape=(res**2/4,res**2))
+	problem={'A':B,'B':B,'idxX':idxX,'idxY':idxY,'tvecData':tvecData}
+	
+	#Direct computation
+	sims=np.array([[np.interp(t,tvecSim,np.array(vals)[:,i]) for i in range(res**2)] for t in tvecData])
+	sims=sims*np.exp(-0.1*tvecData)[:,None]
+	blocks=lambda imgs: imgs.reshape(len(tvecData),res/2,2,res/2,2).mean(axis=(2,4))
+	ssd=((blocks(sims)-blocks(stack.astype(float).reshape(len(tvecData),-1)))**2).sum()
+	
+	for chunk in [1,3,100]:
+		SSD,ssdByFrame=pyfrp_fit_module.computePixelSSD(problem,stack,vals,tvecSim,0.,0.1,chunk=chunk)
+		assert np.allclose(SSD,ssd)
+		assert len(ssdByFrame)==len(tvecData)
+	
+	try:
+		pyfrp_fit_module.computePixelSSD(problem,stack,vals,tvecSim*0.1,0.,0.)
+		assert False
+	except ValueError:
+		pass
+
+def test_objCache():
+
+	"""Test objective function cache.
+	
+	Checks that near-identical parameter vectors share an entry, that hits and misses 
+	are counted and that the least recently used entry is evicted."""
+	
+	cache=pyfrp_fit_module.newObjCache(maxSize=2)
+	
+	keyA=pyfrp_fit_module.quantizeX([10.,0.5])
+	assert keyA==pyfrp_fit_module.quantizeX([10.+1E-12,0.5])
+	assert keyA!=pyfrp_fit_module.quantizeX([10.+1E-6,0.5])
+	
+	assert pyfrp_fit_module.lookupObjCache(cache,keyA) is None
+	pyfrp_fit_module.storeObjCache(cache,keyA,1.)
+	pyfrp_fit_module.storeObjCache(cache,(20.,),2.)
+	
+	assert pyfrp_fit_module.lookupObjCache(cache,keyA)==1.
+	pyfrp_fit_module.storeObjCache(cache,(30.,),3.)
+	
+	assert pyfrp_fit_module.lookupObjCache(cache,(20.,)) is None
+	assert pyfrp_fit_module.lookupObjCache(cache,keyA)==1.
+	assert (cache['hits'],cache['misses'])==(2,2)
+
+def test_getPixelProblemKey():
+
+	"""Test key of pixel fitting problems.
+	
+	Checks that the key changes if ROI indices, mesh vertices or simulation time vector 
+	are changed in place, but not if only the simulated values are."""
+	
+	class Attrs(object):
+		def __init__(self,**kwargs):
+			self.__dict__.update(kwargs)
+	
+	roi=Attrs(imgIdxX=[0,1,2],imgIdxY=[3,4,5],meshIdx=[0,1])
+	mesh=Attrs(mesh=Attrs(vertexCoords=np.zeros((3,4))))
+	sim=Attrs(mesh=mesh,vals=[np.zeros(2),np.ones(2)],tvecSim=np.array([0.,1.]),D=10.)
+	emb=Attrs(simulation=sim,dataResPx=8,tvecData=np.array([0.,0.5,1.]))
+	fit=Attrs(embryo=emb,pixelBin=2,fitCutOffT=False,cutOffT=100.,getPixelROI=lambda: roi)
+	
+	key=pyfrp_fit_module.getPixelProblemKey(fit)
+	
+	sim.vals[0][:]=3.
+	assert pyfrp_fit_module.getPixelProblemKey(fit)==key
+	
+	roi.imgIdxX[0]=6
+	key2=pyfrp_fit_module.getPixelProblemKey(fit)
+	assert key2!=key
+	
+	mesh.mesh.vertexCoords[0,0]=1.
+	key3=pyfrp_fit_module.getPixelProblemKey(fit)
+	assert key3!=key2
+	
+	sim.tvecSim[1]=2.
+	assert pyfrp_fit_module.getPixelProblemKey(fit)!=key3
+
+def test_getMemoObjFunc():
+
+	"""Test memoized objective function.
+	
+	Checks that initial guesses of fitted parameters do not change the fingerprint, but fixed 
+	rates do, and that cached calls are counted and set the SSD of the fit."""
+	
+	class Attrs(object):
+		def __init__(self,**kwargs):
+			self.__dict__.update(kwargs)
+	
+	sim=Attrs(D=10.,tvecSim=np.linspace(0,1,5),vals=[])
+	emb=Attrs(simulation=sim,tvecData=np.linspace(0,1,3))
+	fit=Attrs(embryo=emb,fitMode='ROI',fitPinned=False,fitCutOffT=False,cutOffT=100.,equOn=False,fitProd=True,
+		fitDegr=False,x0=[10.,0.,0.],kineticTimeScale=1.,ROIsFitted=[],SSD=0.)
+	
+	key=pyfrp_fit_module.getFitFingerprint(fit)
+	fit.x0=[20.,1.,0.]
+	assert pyfrp_fit_module.getFitFingerprint(fit)==key
+	fit.x0=[20.,1.,1.]
+	assert pyfrp_fit_module.getFitFingerprint(fit)!=key
+	
+	calls=[]
+	def objFunc(x,fit,debug,ax,returnFit):
+		calls.append(x)
+		pyfrp_fit_module.iterations=pyfrp_fit_module.iterations+1
+		fit.SSD=sum(x)
+		return fit.SSD
+	
+	memoObjFunc=pyfrp_fit_module.getMemoObjFunc(objFunc)
+	pyfrp_fit_module.iterations=0
+	
+	assert memoObjFunc([1.,2.],fit,False,None,False)==3.
+	assert memoObjFunc([2.,2.],fit,False,None,False)==4.
+	assert memoObjFunc([1.,2.],fit,False,None,False)==3.
+	
+	assert len(calls)==2
+	assert pyfrp_fit_module.iterations==3
+	assert fit.SSD==3.
+
+def test_getPixelStack(tmpdir,monkeypatch):
+
+	"""Test restoring processed images for pixel fitting.
+	
+	Checks that the analysis is rerun if the processed stack is not cached, and
+	that no stack is returned if it does not fit into the cache."""
+	
+	from pyfrp.modules import pyfrp_benchmark_module
+	from pyfrp.modules import pyfrp_img_module
+	
+	dataset=pyfrp_benchmark_module.genSyntheticDataset(str(tmpdir),res=32,nFrames=3,noise=0.)
+	emb=pyfrp_benchmark_module.buildBenchmarkEmbryo(dataset)
+	emb.computeROIIdxs(debug=False)
+	emb.analysis.run(showProgress=False)
+	fit=emb.newFit("fit")
+	
+	stack=np.array(pyfrp_img_module.getProcessedStack(emb.analysis))
+	pyfrp_img_module.clearProcessedCache(emb.analysis)
+	
+	assert pyfrp_fit_module.getPixelStack(fit,rerun=False) is None
+	assert np.allclose(pyfrp_fit_module.getPixelStack(fit),stack)
+	
+	pyfrp_img_module.clearProcessedCache(emb.analysis)
+	monkeypatch.setattr(pyfrp_img_module,'maxCacheMB',0.)
+	assert pyfrp_fit_module.getPixelStack(fit) is None
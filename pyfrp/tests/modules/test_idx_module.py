@@ -0,0 +1,109 @@
+"""This module imports all tests/unittests for the
+pyfrp_idx_module."""
+
+from pyfrp.modules import pyfrp_idx_module
+from pyfrp.modules import pyfrp_benchmark_module
+
+import numpy as np
+import multiprocessing
+
+def computeIdxsInWorker(dataset):
+	
+	"""Indexes ROIs of benchmark embryo with two processes, called inside a daemonic pool worker."""
+	
+	emb=pyfrp_benchmark_module.buildBenchmarkEmbryo(dataset)
+	emb.setIdxProcesses(2)
+	emb.computeROIIdxs(debug=False)
+	
+	return [pyfrp_idx_module.getROIIdxAttributes(r) for r in emb.ROIs]
+
+def test_computeROIIdxsConcurrent(tmpdir):
+
+	"""Test concurrent ROI indexing.
+	
+	Checks that indexing default ROIs with two worker processes gives
+	the same indices as serial indexing, also when called from a daemonic 
+	pool worker, where indexing falls back to serial."""
+	
+	dataset=pyfrp_benchmark_module.genSyntheticDataset(str(tmpdir),res=64,nFrames=2,noise=0.)
+	emb=pyfrp_benchmark_module.buildBenchmarkEmbryo(dataset)
+	
+	emb.computeROIIdxs(debug=False,processes=1)
+	serial=[pyfrp_idx_module.getROIIdxAttributes(r) for r in emb.ROIs]
+	
+	for r in emb.ROIs:
+		r.imgIdxX=[]
+		r.imgIdxY=[]
+	
+	emb.setIdxProcesses(2)
+	emb.computeROIIdxs(debug=False)
+	
+	for r,idxs in zip(emb.ROIs,serial):
+		for name,val in pyfrp_idx_module.getROIIdxAttributes(r).items():
+			assert np.array_equal(np.asarray(val),np.asarray(idxs[name])), r.name+" "+name
+	
+	pool=multiprocessing.Pool(processes=1)
+	try:
+		worker=pool.apply(computeIdxsInWorker,(dataset,))
+	finally:
+		pool.close()
+		pool.join()
+	
+	for idxsWorker,idxs in zip(worker,serial):
+		for name,val in idxsWorker.items():
+			assert np.array_equal(np.asarray(val),np.asarray(idxs[name])), name
+
+def test_getCommonExtendedPixels(tmpdir):
+
+	"""Test extended pixels of ROIs reaching outside the image.
+	
+	Checks extended pixels against a loop over all pixels of the bounding box."""
+	
+	dataset=pyfrp_benchmark_module.genSyntheticDataset(str(tmpdir),res=32,nFrames=2,noise=0.)
+	emb=pyfrp_benchmark_module.buildBenchmarkEmbryo(dataset)
+	res=emb.dataResPx
+	
+	master=emb.getMasterROI()
+	master.setRadius(0.8*res)
+	master.setCenter([0.3*res,0.6*res])
+	
+	for r in emb.ROIs:
+		
+		rois=[r,master]
+		xExtend,yExtend=pyfrp_idx_module.getCommonXYExtend(rois)
+		
+		indX,indY=[],[]
+		for i in np.arange(np.floor(xExtend[0]),np.ceil(xExtend[1])):
+			for j in np.arange(np.floor(yExtend[0]),np.ceil(yExtend[1])):
+				if not pyfrp_idx_module.checkInsideImg(i,j,res) and all([roi.checkXYInside(i,j) for roi in rois]):
+					indX.append(i)
+					indY.append(j)
+		
+		assert pyfrp_idx_module.getCommonExtendedPixels(rois,res)==(indX,indY), r.name
+
+def test_getProjectionMatrix():
+
+	"""Test projection matrix from scattered points onto image.
+	
+	Checks that projecting values gives the same result as ``griddata``
+	for linear and nearest interpolation."""
+	
+	from scipy.interpolate import griddata
+	
+	np.random.seed(0)
+	x=np.random.uniform(5,60,500)
+	y=np.random.uniform(5,60,500)
+	vals=np.sin(x/10.)*y
+	
+	X,Y=pyfrp_idx_module.getPxGrid(64)
+	
+	for method in ['linear','nearest']:
+		
+		P,outside=pyfrp_idx_module.getProjectionMatrix(x,y,X,Y,method=method)
+		img=P.dot(vals)
+		img[outside]=np.nan
+		
+		ref=griddata((x,y),vals,(X,Y),method=method)
+		
+		assert np.array_equal(np.isnan(img),np.isnan(ref.ravel()))
+		assert np.allclose(img[~outside],ref.ravel()[~outside])
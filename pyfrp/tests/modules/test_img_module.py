@@ -0,0 +1,222 @@
+"""This module imports all tests/unittests for the
+pyfrp_img_module."""
+
+from pyfrp.modules import pyfrp_img_module
+
+import numpy as np
+
+def test_otsuMaskStack():
+
+	"""Test otsuMask on image stacks. 
+
+	Creates stack of bimodal images and checks that per-frame thresholds
+	agree with single-image thresholds and separate both modes."""
+	
+	stack=np.ones((3,20,20))
+	stack[:,:5,:]=10.
+	stack[1]=2*stack[1]
+	
+	mask,threshs=pyfrp_img_module.otsuMask(stack)
+	
+	for i in range(stack.shape[0]):
+		assert np.isclose(threshs[i],pyfrp_img_module.computeOtsuThresh(stack[i]))
+		
+	assert mask[:,:5,:].all()
+	assert not mask[:,5:,:].any()
+	
+def test_iterStack(tmpdir):
+
+	"""Test iterStack on a TIFF hyperstack. 
+
+	Writes a stack with two channels and checks that only frames of the requested
+	channel are returned."""
+	
+	tifffile=pyfrp_img_module.importTifffile()
+	
+	stack=np.arange(3*2*8*9,dtype='uint16').reshape(3,2,8,9)
+	fn=str(tmpdir.join("stack.tif"))
+	tifffile.imsave(fn,stack,imagej=True)
+	
+	info=pyfrp_img_module.getStackInfo(fn)
+	assert info['nFrames']==3
+	assert info['nChannels']==2
+	
+	imgs=list(pyfrp_img_module.iterStack(fn,channel=1))
+	
+	assert len(imgs)==3
+	for i,img in enumerate(imgs):
+		assert (img==stack[i,1]).all()
+	
+	assert (pyfrp_img_module.readStackFrame(fn,2,channel=1)==stack[2,1]).all()
+
+def test_extractROIConcs(tmpdir):
+
+	"""Test re-extracting ROI concentrations from cached processed stack.
+	
+	Checks that a newly added ROI gets the same data vector as from a complete
+	analysis, and that changing processing options invalidates the cache."""
+	
+	from pyfrp.modules import pyfrp_benchmark_module
+	
+	dataset=pyfrp_benchmark_module.genSyntheticDataset(str(tmpdir),res=64,nFrames=4)
+	emb=pyfrp_benchmark_module.buildBenchmarkEmbryo(dataset)
+	emb.computeROIIdxs(debug=False)
+	emb.analysis.run(showProgress=False)
+	assert emb.analysis.hasProcessedStack()
+	
+	r=emb.newRadialROI('new',emb.getFreeROIId(),dataset['center'],10.)
+	emb.analysis.extractROIs([r])
+	dataVec=list(r.dataVec)
+	
+	emb.analysis.run(showProgress=False)
+	assert np.allclose(dataVec,r.dataVec,rtol=1e-6)
+	
+	emb.analysis.setDataOffset(2.)
+	assert not emb.analysis.hasProcessedStack()
+
+def test_analyzeCorruptStack(tmpdir):
+
+	"""Test analyzing a data stack with an unreadable frame.
+	
+	Corrupts the compressed data of one frame and checks that the frame is skipped, that its 
+	timepoint is removed from ``tvecData`` and that all other frames keep their timepoints."""
+	
+	from pyfrp.modules import pyfrp_benchmark_module
+	
+	tifffile=pyfrp_img_module.importTifffile()
+	
+	dataset=pyfrp_benchmark_module.genSyntheticDataset(str(tmpdir),res=32,nFrames=4)
+	emb=pyfrp_benchmark_module.buildBenchmarkEmbryo(dataset)
+	emb.computeROIIdxs(debug=False)
+	emb.analysis.run(showProgress=False)
+	
+	tvecData=emb.getTvecData().copy()
+	dataVecs=[list(r.dataVec) for r in emb.ROIs]
+	
+	#Write compressed stack and destroy data of frame 2
+	stack=np.asarray([pyfrp_img_module.loadImg(str(emb.getDataFolder()+'/'+fn),emb.dataEnc) for fn in emb.getFileList()]).astype(emb.dataEnc)
+	fn=str(tmpdir.join("stack.tif"))
+	tifffile.imsave(fn,stack[:,None,None],compress=6,imagej=True)
+	
+	with tifffile.TiffFile(fn) as tif:
+		offset,nBytes=tif.pages[2].dataoffsets[0],tif.pages[2].databytecounts[0]
+	with open(fn,'r+b') as f:
+		f.seek(offset)
+		f.write('\xff'*nBytes)
+	
+	corrupt=[]
+	assert len(list(pyfrp_img_module.iterStack(fn,corrupt=corrupt)))==3
+	assert corrupt==[2]
+	
+	emb.setDataStack(fn)
+	emb.analysis.run(showProgress=False)
+	
+	assert emb.getCorruptFrames()==[2]
+	assert np.allclose(emb.getTvecData(),tvecData[[0,1,3]])
+	for r,dataVec in zip(emb.ROIs,dataVecs):
+		assert np.allclose(r.dataVec,np.asarray(dataVec)[[0,1,3]])
+
+def bruteBinnedMean(x,vals,bins):
+	
+	"""Computes counts and nan-ignoring mean per bin with a loop over bins, last bin includes its right edge."""
+	
+	histY=[]
+	binY=[]
+	for i in range(len(bins)-1):
+		inBin=(x>=bins[i])&((x<bins[i+1]) if i<len(bins)-2 else (x<=bins[i+1]))
+		histY.append(inBin.sum())
+		v=vals[...,inBin]
+		binY.append(np.nanmean(v,axis=-1) if inBin.any() else np.nan*np.ones(v.shape[:-1]))
+		
+	return np.asarray(histY),np.asarray(binY).T
+
+def test_binnedMean():
+
+	"""Test binnedMean and radialHist against a loop over bins.
+	
+	Uses a small stack of random images with ``nan`` values and a bin range not covering 
+	all pixels."""
+	
+	state=np.random.RandomState(0)
+	stack=state.rand(3,12,12)
+	stack[0,2,3]=np.nan
+	
+	x,y=np.meshgrid(np.arange(12),np.arange(12))
+	r=np.hypot(x-5.5,y-4.).ravel()
+	bins=np.linspace(0,6,5)
+	
+	histRef,binRef=bruteBinnedMean(r,stack.reshape(3,-1),bins)
+	
+	histY,binY=pyfrp_img_module.binnedMean(r,stack.reshape(3,-1),bins)
+	assert (histY==histRef).all()
+	assert np.allclose(binY,binRef)
+	
+	histY,binY=pyfrp_img_module.binnedMean(r,stack[1].ravel(),bins)
+	assert np.allclose(binY,binRef[1])
+	
+	rBins,binsMid,histY,binY=pyfrp_img_module.radialImgHist(stack,[5.5,4.],nbins=4)
+	histRef,binRef=bruteBinnedMean(r,stack.reshape(3,-1),np.linspace(0,r.max()+1E-10,5))
+	assert np.allclose(binsMid,0.5*(rBins[1:]+rBins[:-1]))
+	assert (histY==histRef).all()
+	assert np.allclose(binY,binRef)
+
+	#Scattered points, maximum radius not covering all of them
+	px,py=state.rand(2,200)*10
+	vals=state.rand(200)
+	rBins,binsMid,histY,binY=pyfrp_img_module.radialHist(px,py,vals,[3.,6.],maxR=5.,nbins=6)
+	histRef,binRef=bruteBinnedMean(np.hypot(px-3.,py-6.),vals,np.linspace(0,5.,7))
+	assert np.allclose(rBins,np.linspace(0,5.,7))
+	assert (histY==histRef).all()
+	assert np.allclose(binY,binRef,equal_nan=True)
+
+def processImgLoop(img,processDic,flatteningMask,bkgdMask,preMask,dataOffset=1.):
+	
+	"""Processes single image step by step with the single image functions, as done before processImgStack."""
+	
+	if 'quad' in processDic.keys() and 'flipBeforeProcess' in processDic.keys():
+		img=pyfrp_img_module.flipQuad(img)
+	if 'median' in processDic.keys():
+		img=pyfrp_img_module.medianFilter(img,radius=processDic['median'])
+	if 'gaussian' in processDic.keys() and 'norm' not in processDic.keys():
+		img=pyfrp_img_module.gaussianFilter(img,sigma=processDic['gaussian'])
+	if 'flatten' in processDic.keys():
+		img=pyfrp_img_module.flattenImg(img,flatteningMask)
+	if 'bkgd' in processDic.keys():
+		img=pyfrp_img_module.substractBkgd(img,bkgdMask,substractMean=False)
+	if 'norm' in processDic.keys():
+		img=pyfrp_img_module.normImg(img,preMask,dataOffset=dataOffset)
+	if 'quad' in processDic.keys():
+		if 'flipBeforeProcess' in processDic.keys():
+			img=pyfrp_img_module.unflipQuad(img)
+		else:
+			img=pyfrp_img_module.unflipQuad(pyfrp_img_module.flipQuad(img))
+	
+	return img
+
+def test_processImgStack():
+
+	"""Test processImgStack against processing each image step by step.
+	
+	Uses a small random stack with negative pixels and several combinations of 
+	median/gaussian filters, flattening, background substraction, norming and quadrant reduction."""
+	
+	state=np.random.RandomState(2)
+	stack=100*state.rand(5,16,16)-5.
+	flatteningMask=0.5+state.rand(16,16)
+	bkgdMask=state.rand(16,16)
+	preMask=50*state.rand(16,16)
+	
+	processDics=[{'flatten':1,'bkgd':1,'norm':1,'median':3},
+	      {'flatten':1,'bkgd':1,'gaussian':1.5},
+	      {'flatten':1,'bkgd':1,'norm':1,'quad':1},
+	      {'bkgd':1,'gaussian':1.,'quad':1,'flipBeforeProcess':1}]
+	
+	for processDic in processDics:
+		
+		ref=np.asarray([processImgLoop(img,processDic,flatteningMask,bkgdMask,preMask,dataOffset=2.) for img in stack])
+		
+		out=pyfrp_img_module.processImgStack(stack,processDic,flatteningMask,bkgdMask,preMask,dataOffset=2.,chunkSize=2)
+		assert np.allclose(out,ref)
+		
+		img=pyfrp_img_module.processImg(stack[3],processDic,flatteningMask,bkgdMask,preMask,dataOffset=2.)
+		assert np.allclose(img,ref[3])
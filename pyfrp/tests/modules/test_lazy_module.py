@@ -0,0 +1,43 @@
+"""This module imports all tests/unittests for the
+pyfrp_lazy_module."""
+
+from pyfrp.modules import pyfrp_lazy_module
+
+import subprocess
+import sys
+
+#Heavy dependencies that must not be imported by import pyfrp
+heavyModules=['fipy','vtk','skimage','cv2','bioformats','javabridge','matplotlib.pyplot','PyQt4','solid']
+
+def test_lazyImport():
+
+	"""Test lazyImport function. 
+
+	Checks that placeholder only imports module on attribute access and
+	resolves submodules."""
+	
+	dom=pyfrp_lazy_module.lazyModule('xml.dom')
+	assert not dom.isLoaded()
+	
+	assert dom.minidom.parseString("<a/>").documentElement.tagName=="a"
+	assert dom.isLoaded()
+
+def test_importTime():
+
+	"""Benchmark ``import pyfrp`` in a fresh interpreter. 
+
+	Checks that none of the heavy dependencies are imported and prints import time."""
+	
+	script="""
+import sys,time
+t=time.time()
+import pyfrp
+t=time.time()-t
+print(t)
+print('loaded:'+','.join([m for m in %r if m in sys.modules]))
+""" % heavyModules
+	
+	out=subprocess.check_output([sys.executable,"-c",script]).decode().strip().split("\n")
+	
+	print("import pyfrp took "+out[-2]+" s")
+	assert out[-1]=="loaded:"
@@ -0,0 +1,140 @@
+"""This module imports all tests/unittests for the
+pyfrp_meshquality_module."""
+
+from pyfrp.modules import pyfrp_meshquality_module
+from pyfrp.modules import pyfrp_benchmark_module
+
+import numpy as np
+import os
+import pytest
+
+def test_computeMeshQuality():
+
+	"""Test computeMeshQuality function. 
+
+	Computes quality of a single regular tetrahedron and checks
+	volume, edge lengths, aspect ratio and dihedral angles."""
+	
+	vertexCoords=np.array([[1,1,1],[1,-1,-1],[-1,1,-1],[-1,-1,1]],dtype=float).T
+	cellVertexIDs=np.array([[0,1,2,3]]).T
+	
+	quality=pyfrp_meshquality_module.computeMeshQuality(vertexCoords,cellVertexIDs)
+	
+	assert np.allclose(quality['volumes'],8/3.)
+	assert np.allclose(quality['edgeLengths'],np.sqrt(8))
+	assert np.allclose(quality['aspectRatios'],1.)
+	assert np.allclose(quality['dihedralAngles'],np.degrees(np.arccos(1/3.)))
+	
+def test_computeBinnedAverage():
+	
+	"""Test computeBinnedAverage function.
+	
+	Averages a linear function in two bins and checks bin centers 
+	and averages."""
+	
+	xBin,yBin=pyfrp_meshquality_module.computeBinnedAverage([0,1,2,3],[1,2,3,4],bins=2)
+	
+	assert np.allclose(xBin,[0.75,2.25])
+	assert np.allclose(yBin,[1.5,3.5])
+	
+def test_fitNodePowerLaw():
+	
+	"""Test fitNodePowerLaw and predictRefinementFactor functions.
+	
+	Recovers exponent and prefactor of exact power law data and checks that the 
+	predicted factor reaches the target, and that predictions are clipped."""
+	
+	f=np.array([2.,3.,5.])
+	k,a=pyfrp_meshquality_module.fitNodePowerLaw(f,7.*f**2.5)
+	assert np.isclose(k,2.5)
+	assert np.isclose(np.exp(a),7.)
+	
+	k,a=pyfrp_meshquality_module.fitNodePowerLaw([2.],[80.],kDefault=3.)
+	assert k==3. and np.isclose(np.exp(a)*2**3,80.)
+	
+	factor,k=pyfrp_meshquality_module.predictRefinementFactor(f,7.*f**2.5,7.*8.**2.5)
+	assert np.isclose(factor,8.)
+	
+	factor,k=pyfrp_meshquality_module.predictRefinementFactor(f,7.*f**2.5,1E12)
+	assert np.isclose(factor,20.)
+
+def test_searchRefinement():
+	
+	"""Test searchRefinement function with synthetic node counts.
+	
+	Nodes inside ROI follow a power law of the refinement factor, but only once the 
+	box is extended far enough. Checks that the box gets extended, that the selected 
+	candidate meets the requirement with the fewest nodes in total, and the behaviour
+	if the requirement cannot be met."""
+	
+	calls=[]
+	
+	def evalCandidates(factors,addZ):
+		calls.append((list(factors),addZ))
+		if addZ<18:
+			return [(100,1000,None) for f in factors]
+		return [(int(100+5*f**3),int(1000+40*f**3),(f,addZ)) for f in factors]
+	
+	best,met,history=pyfrp_meshquality_module.searchRefinement(evalCandidates,100,2000,nNodesMax=3000,factor=3.,addZ=15.,zIncrement=1.)
+	
+	assert met
+	assert [c[1] for c in calls][:3]==[15.,16.,18.]
+	assert 2000<=best[2]<=3000
+	assert best[3]==min([h[3] for h in history if 2000<=h[2]<=3000])
+	assert len(calls)<10
+	
+	#Requirement range that is never hit returns closest candidate below maximum
+	best,met,history=pyfrp_meshquality_module.searchRefinement(evalCandidates,100,2000,nNodesMax=2001,addZ=20.,maxIter=2,nCandidates=2)
+	assert not met
+	assert best[2]==max([h[2] for h in history if h[2]<=2001])
+	
+	#No candidate adds nodes
+	best,met,history=pyfrp_meshquality_module.searchRefinement(evalCandidates,100,2000,addZ=0.,maxIter=3)
+	assert best==None and not met
+
+def test_adaptRefineInMeshByField(tmpdir,monkeypatch):
+
+	"""Test that failed predictive refinement leaves the mesh untouched.
+	
+	Fakes a refinement search that imports a candidate and then either finds no candidate or fails, 
+	and checks that mesh, mesh file and mesh indices of the ROI are restored."""
+	
+	dataset=pyfrp_benchmark_module.genSyntheticDataset(str(tmpdir),res=32,nFrames=2,noise=0.)
+	emb=pyfrp_benchmark_module.buildBenchmarkEmbryo(dataset)
+	
+	mesh=emb.simulation.mesh
+	meshOld=object()
+	mesh.mesh=meshOld
+	mesh.fnMesh=str(tmpdir.join("cylinder.msh"))
+	
+	roi=emb.getROIByName('Bleached Square')
+	def computeMeshIdx(m):
+		roi.meshIdx=range(10) if m.mesh is meshOld else range(50)
+		return roi.meshIdx
+	roi.computeMeshIdx=computeMeshIdx
+	
+	def importCandidate(fnTemp):
+		mesh.mesh=object()
+		mesh.fnMesh=os.path.join(fnTemp,"candidate.msh")
+		roi.computeMeshIdx(mesh)
+	
+	def searchNone(evalCandidates,nNodes,nNodesReq,**kwargs):
+		importCandidate(str(tmpdir))
+		return None,False,[]
+	
+	monkeypatch.setattr(pyfrp_meshquality_module,'searchRefinement',searchNone)
+	assert roi.adaptRefineInMeshByField(20)==10
+	assert mesh.mesh is meshOld
+	assert mesh.fnMesh==str(tmpdir.join("cylinder.msh"))
+	assert len(roi.meshIdx)==10
+	
+	def searchFail(evalCandidates,nNodes,nNodesReq,**kwargs):
+		importCandidate(str(tmpdir))
+		raise RuntimeError("gmsh failed")
+	
+	monkeypatch.setattr(pyfrp_meshquality_module,'searchRefinement',searchFail)
+	with pytest.raises(RuntimeError):
+		roi.adaptRefineInMeshByField(20)
+	assert mesh.mesh is meshOld
+	assert mesh.fnMesh==str(tmpdir.join("cylinder.msh"))
+	assert len(roi.meshIdx)==10
@@ -0,0 +1,59 @@
+"""This module imports all tests/unittests for the
+pyfrp_optimization_module."""
+
+from pyfrp.modules import pyfrp_optimization_module
+
+import numpy as np
+
+def test_differentialEvolution():
+
+	"""Test differential evolution.
+	
+	Checks that the global minimum of a multimodal function is found with populations
+	evaluated at once, and that minima on the boundary are respected."""
+	
+	def rastrigin(pop):
+		return 10*pop.shape[1]+np.sum(pop**2-10*np.cos(2*np.pi*pop),axis=1)
+	
+	res=pyfrp_optimization_module.differentialEvolution(rastrigin,[(-5.12,5.12),(-5.12,5.12)],maxiter=300,seed=0)
+	assert np.allclose(res.x,0,atol=1E-2)
+	assert res.nfev==30*(res.nit+1)
+	
+	res=pyfrp_optimization_module.differentialEvolution(lambda pop: np.sum(pop,axis=1),[(1.,2.),(-1.,3.)],maxiter=100,seed=0)
+	assert np.allclose(res.x,[1.,-1.])
+
+def test_getProblemPool():
+
+	"""Test worker pools holding a likelihood problem.
+	
+	Checks that SSDs and log-posteriors evaluated on a pool equal serial evaluation, with 
+	invalid parameter vectors getting the penalty of the objective function."""
+	
+	from pyfrp.modules import pyfrp_stats_module
+	
+	tvecSim=np.linspace(0,100,201)
+	tvecData=np.linspace(0,20,11)
+	data=1-np.exp(-2*tvecData/10.)
+	
+	problem={"tvecData":tvecData,"tvecSim":tvecSim,"D":1.,"dataVecs":np.array([data]),"simVecs":np.array([1-np.exp(-tvecSim/10.)]),
+		"fitProd":False,"fitDegr":False,"equOn":False,"x0":[1.,0.,0.],"kineticTimeScale":1.}
+	X=np.array([[0.5],[1.],[2.],[3.],[10.]])
+	
+	SSD=pyfrp_stats_module.computeSSDBatch(problem,X)
+	SSD[np.isinf(SSD)]=100000000
+	
+	pool=pyfrp_optimization_module.getProblemPool(2,problem)
+	try:
+		assert np.allclose(np.concatenate(pool.map(pyfrp_optimization_module.evalPoolSSD,np.array_split(X,2))),SSD)
+	finally:
+		pool.close()
+		pool.join()
+	
+	logProb=pyfrp_stats_module.computeLogPosteriorBatch(problem,X,[0.1],[5.],0.1)
+	
+	pool=pyfrp_optimization_module.getProblemPool(2,problem,[0.1],[5.],0.1)
+	try:
+		assert np.allclose(np.concatenate(pool.map(pyfrp_stats_module.evalPoolLogPosterior,np.array_split(X,2))),logProb)
+	finally:
+		pool.close()
+		pool.join()
@@ -0,0 +1,289 @@
+"""This module imports all tests/unittests for the
+pyfrp_sim_module."""
+
+from pyfrp.modules import pyfrp_sim_module
+
+import numpy as np
+import pytest
+
+def test_extendTvec():
+
+	"""Test extending time vectors.
+	
+	Checks that linear and logarithmic time vectors are continued
+	with the same stepping as a longer time vector of the same scheme."""
+	
+	spacer=1E-10
+	
+	tvec=np.linspace(0,10,11)
+	tvecExt=pyfrp_sim_module.extendTvec(tvec,20.)
+	assert np.allclose(tvecExt,np.linspace(0,20,21))
+	
+	tvecLong=np.logspace(np.log10(spacer),np.log10(1000.),301)-spacer
+	tvecExt=pyfrp_sim_module.extendTvec(tvecLong[:201],1000.)
+	assert len(tvecExt)==len(tvecLong)
+	assert np.allclose(tvecExt,tvecLong,rtol=1E-6)
+
+def test_getAxisymmetricGrid(tmpdir):
+
+	"""Test (r,z) grids of axisymmetric geometries.
+	
+	Checks that the volume of grid cells inside cylinder and ball geometries matches 
+	their analytic volume. Geometries are written into ``tmpdir``."""
+	
+	from pyfrp.subclasses import pyfrp_embryo
+	
+	emb=pyfrp_embryo.embryo("test")
+	emb.newSimulation()
+	emb.simulation.setAxisymmetricCellSizePx(0.5)
+	
+	fnCylinder=str(tmpdir.join("cylinder.geo"))
+	fnBall=str(tmpdir.join("ball.geo"))
+	
+	geometries=[(emb.setGeometry2Cylinder,([256,256],100.,50.),fnCylinder,np.pi*100.**2*50.)]
+	
+	geometry=emb.setGeometry2Ball([256,256],150.,fnGeo=fnBall)
+	geometries.append((emb.setGeometry2Ball,([256,256],150.),fnBall,4/3.*np.pi*geometry.getRadius()**3))
+	
+	for setGeometry,args,fnGeo,volume in geometries:
+		setGeometry(*args,fnGeo=fnGeo)
+		assert emb.geometry.fnGeo==fnGeo
+		assert emb.geometry.isAxisymmetric()
+		
+		grid=pyfrp_sim_module.getAxisymmetricGrid(emb.simulation)
+		V=(2*np.pi*grid['r']*grid['dr']*grid['dz'])[grid['inside']].sum()
+		assert abs(V/volume-1)<0.01
+
+def test_checkRadialSymmetry():
+
+	"""Test radial symmetry check and annulus averages.
+	
+	Checks that a bleached disk is radially symmetric around its center, but not 
+	around a shifted center, and that annulus averages recover the disk profile."""
+	
+	x,y=np.meshgrid(np.arange(128),np.arange(128))
+	r=np.hypot(x-64,y-64)
+	img=np.where(r<30,0.2,1.)
+	
+	assert pyfrp_sim_module.checkRadialSymmetry(img,[64,64])[0]
+	assert not pyfrp_sim_module.checkRadialSymmetry(img,[80,64])[0]
+	
+	profile=pyfrp_sim_module.getAnnulusAverages(img,[64,64],5.,20,fillVal=1.)
+	assert np.allclose(profile[:5],0.2)
+	assert np.allclose(profile[7:],1.)
+
+def test_solveReactDiffBatch():
+
+	"""Test batch solving of reaction diffusion equation.
+	
+	Checks on a 1D chain of cells that solving several initial conditions at once gives 
+	the same result as solving them one by one, and that pure diffusion conserves mass."""
+	
+	n=50
+	L=pyfrp_sim_module.assembleDiffusionMatrix(np.arange(n-1),np.arange(1,n),np.ones(n-1),n)
+	cvs=np.ones(n)
+	tvec=np.concatenate([np.linspace(0,1,11),np.linspace(1.5,5,8)])
+	
+	C0=np.zeros((n,3))
+	C0[:10,0]=1.
+	C0[20:30,1]=1.
+	C0[:,2]=np.linspace(0,1,n)
+	
+	C=pyfrp_sim_module.solveReactDiffBatch(L,cvs,C0,tvec,2.,0.1,0.05)
+	for j in range(C0.shape[1]):
+		c=pyfrp_sim_module.solveReactDiffBatch(L,cvs,C0[:,j:j+1],tvec,2.,0.1,0.05)
+		assert np.allclose(C[:,j],c[:,0])
+	
+	C=pyfrp_sim_module.solveReactDiffBatch(L,cvs,C0,tvec,2.,0.,0.)
+	assert np.allclose(C.sum(axis=0),C0.sum(axis=0))
+	assert np.all(np.diff(C[:,0])<=0) and C[:,0].max()<1.
+
+def test_selectSolverConfig():
+
+	"""Test selection of solver configuration from calibration.
+	
+	Checks that calibration steps span the time vector and that the fastest configuration
+	meeting the accuracy target is selected."""
+	
+	steps=pyfrp_sim_module.getCalibrationSteps(np.logspace(-2,2,100),nSteps=5)
+	assert steps[0]==0 and steps[-1]==98 and len(steps)==5
+	
+	results=[{"solver":"LU","tolerance":1E-10,"time":2.,"error":1E-12},
+		{"solver":"PCG","tolerance":1E-4,"time":0.5,"error":1E-3},
+		{"solver":"PCG","tolerance":1E-8,"time":1.,"error":1E-7}]
+	
+	assert pyfrp_sim_module.selectSolverConfig(results,1E-6)==results[2]
+	assert pyfrp_sim_module.selectSolverConfig(results,1E-14)==results[0]
+
+def test_calibrateSolver(monkeypatch):
+
+	"""Test solver calibration on a 1D FiPy grid.
+	
+	Checks that each AMG tolerance starts with an empty hierarchy cache, and that solver and tolerance 
+	of the simulation are restored if a solver fails during calibration. Skipped if FiPy is not installed."""
+	
+	fipy=pytest.importorskip('fipy')
+	
+	class Attrs(object):
+		def __init__(self,**kwargs):
+			self.__dict__.update(kwargs)
+	
+	mesh=fipy.Grid1D(nx=20,dx=1.)
+	sim=Attrs(mesh=Attrs(mesh=mesh),tvecSim=np.linspace(0,10.,11),D=1.,prod=0.,degr=0.,solver="LU",tolerance=1E-10,
+		iterations=1000,solverAccuracy=1E-6)
+	
+	def applyICs(phi,simulation):
+		phi.setValue(np.linspace(0,1.,20))
+		return phi
+	
+	monkeypatch.setattr(pyfrp_sim_module,'applyICs',applyICs)
+	
+	#Fake AMG stepper recording the cached hierarchies it finds
+	cached=[]
+	def getAMGStepper(simulation,mesh):
+		pyfrp_sim_module.getMeshOperators(mesh)
+		def step(phi,dt):
+			hierarchies=pyfrp_sim_module.meshOperators[mesh]["amg"]
+			cached.append(len(hierarchies))
+			hierarchies[0]=None
+		return step
+	
+	monkeypatch.setattr(pyfrp_sim_module,'getAMGStepper',getAMGStepper)
+	
+	pyfrp_sim_module.calibrateSolver(sim,solvers=["AMG"],tolerances=[1E-4,1E-8],nSteps=1)
+	assert cached==[0,0]
+	
+	def getSolver(simulation):
+		raise RuntimeError("Solver failed")
+	
+	monkeypatch.setattr(pyfrp_sim_module,'getSolver',getSolver)
+	sim.solver,sim.tolerance="LU",1E-10
+	
+	with pytest.raises(RuntimeError):
+		pyfrp_sim_module.calibrateSolver(sim,solvers=["PCG"],tolerances=[1E-4],nSteps=1)
+	
+	assert sim.solver=="LU" and sim.tolerance==1E-10
+	
+	del pyfrp_sim_module.meshOperators[mesh]
+
+def test_applyRadialICs():
+
+	"""Test applying radially binned IC image to cells.
+	
+	Compares the value of each cell with the mean of all pixels falling into the same 
+	radial bin, computed with a loop over bins. Cells outside of the maximum radius get the 
+	value of the outer bin."""
+	
+	class Attrs(object):
+		def __init__(self,**kwargs):
+			self.__dict__.update(kwargs)
+	
+	class Phi(object):
+		def setValue(self,value):
+			self.value=value
+	
+	state=np.random.RandomState(1)
+	ICimg=state.rand(10,10)
+	center=[4.,5.]
+	
+	cellX=np.array([4.,6.5,0.,9.,20.])
+	cellY=np.array([5.,5.,0.,9.,20.])
+	
+	embryo=Attrs(geometry=Attrs(getCenter=lambda: center),analysis=Attrs(process={}))
+	mesh=Attrs(getCellCenters=lambda: (cellX,cellY,np.zeros(5)))
+	simulation=Attrs(embryo=embryo,ICimg=ICimg,mesh=mesh)
+	
+	radSteps=4
+	phi=pyfrp_sim_module.applyRadialICs(Phi(),simulation,radSteps=radSteps)
+	
+	#Brute force reference
+	x,y=np.meshgrid(np.arange(10),np.arange(10))
+	r=np.hypot(x-center[0],y-center[1])
+	maxR=max([np.hypot(cx-center[0],cy-center[1]) for cx,cy in [[0,0],[10,0],[0,10],[10,10]]])
+	bins=np.linspace(0,maxR,radSteps+1)
+	
+	rCells=np.hypot(cellX-center[0],cellY-center[1])
+	for i,rCell in enumerate(rCells):
+		b=min([j for j in range(radSteps) if rCell<bins[j+1]]+[radSteps-1])
+		assert np.isclose(phi.value[i],ICimg[(r>=bins[b])&(r<bins[b+1])].mean())
+
+def solveFiPyStep(mesh,c,dt,D,prod,degr):
+
+	"""Performs one implicit Euler step of the reaction diffusion equation with FiPy's LU solver."""
+	
+	import fipy
+	
+	phi=fipy.CellVariable(mesh=mesh,value=c)
+	eq=fipy.TransientTerm()==fipy.DiffusionTerm(coeff=D)+prod-degr*phi
+	eq.solve(var=phi,dt=dt,solver=fipy.LinearLUSolver(tolerance=1E-14,iterations=100))
+	
+	return np.asarray(phi.value,dtype=float)
+
+def test_solveCGStep():
+
+	"""Test time steps with assembled diffusion matrix.
+	
+	Compares one step of :py:func:`pyfrp.modules.pyfrp_sim_module.solveCGStep` using the matrix of 
+	:py:func:`pyfrp.modules.pyfrp_sim_module.getDiffusionMatrix` with a FiPy solve on a small 
+	non-uniform grid, with and without AMG preconditioner. Skipped if FiPy is not installed,
+	AMG step is skipped if pyamg is not installed."""
+	
+	fipy=pytest.importorskip('fipy')
+	
+	mesh=fipy.Grid2D(dx=[1.,2.,1.,0.5,1.,3.],dy=[2.,1.,1.,0.5,1.])
+	
+	np.random.seed(2)
+	c=np.random.rand(mesh.numberOfCells)
+	dt,D,prod,degr=0.7,3.,0.2,0.1
+	
+	L,cvs=pyfrp_sim_module.getDiffusionMatrix(mesh)
+	assert np.allclose(np.asarray(L.sum(axis=1)).flatten(),0.)
+	
+	ref=solveFiPyStep(mesh,c,dt,D,prod,degr)
+	
+	cNew,iterations,info=pyfrp_sim_module.solveCGStep(L,cvs,c,dt,D,prod,degr,tolerance=1E-12)
+	assert info==0
+	assert np.allclose(cNew,ref)
+	
+	pytest.importorskip('pyamg')
+	
+	M=pyfrp_sim_module.buildAMGHierarchy(L,cvs,1./(D*dt)).aspreconditioner(cycle='V')
+	cNew,iterations,info=pyfrp_sim_module.solveCGStep(L,cvs,c,dt,D,prod,degr,tolerance=1E-12,M=M)
+	assert info==0
+	assert np.allclose(cNew,ref)
+
+def test_extendReactDiff(tmpdir):
+
+	"""Test extending simulations from their checkpoint.
+	
+	Checks on an axisymmetric simulation of a synthetic dataset that running until ``T1`` and extending 
+	until ``T2`` gives the same ROI concentrations as a single run until ``T2``. Skipped if FiPy is not installed."""
+	
+	pytest.importorskip('fipy')
+	
+	from pyfrp.modules import pyfrp_benchmark_module
+	
+	dataset=pyfrp_benchmark_module.genSyntheticDataset(str(tmpdir),res=32,nFrames=2,noise=0.)
+	emb=pyfrp_benchmark_module.buildBenchmarkEmbryo(dataset)
+	emb.computeROIIdxs(debug=False)
+	
+	sim=emb.simulation
+	sim.setAxisymmetric(True)
+	sim.setAxisymmetricCellSizePx(2.)
+	sim.setSolver("LU")
+	
+	sim.tvecSim=np.linspace(0,10.,11)
+	sim.stepsSim=len(sim.tvecSim)
+	assert sim.run(showProgress=False)
+	assert sim.extend(20.,showProgress=False)
+	
+	assert np.allclose(sim.tvecSim,np.linspace(0,20.,21))
+	extended=[np.asarray(r.simVec) for r in emb.ROIs]
+	
+	sim.tvecSim=np.linspace(0,20.,21)
+	sim.stepsSim=len(sim.tvecSim)
+	assert sim.run(showProgress=False)
+	
+	for r,simVec in zip(emb.ROIs,extended):
+		assert len(simVec)==len(sim.tvecSim)
+		assert np.allclose(simVec,r.simVec,rtol=1E-8), r.name
@@ -0,0 +1,90 @@
+"""This module imports all tests/unittests for the
+pyfrp_stats_module."""
+
+from pyfrp.modules import pyfrp_stats_module
+from pyfrp.modules import pyfrp_fit_module
+from pyfrp.modules import pyfrp_benchmark_module
+
+import numpy as np
+
+def test_sampleEnsemble():
+
+	"""Test ensemble MCMC sampler.
+	
+	Checks that samples of a correlated 2D normal distribution recover its mean and covariance."""
+	
+	mean=np.array([1.,-2.])
+	cov=np.array([[1.,0.8],[0.8,2.]])
+	icov=np.linalg.inv(cov)
+	
+	def logProb(X):
+		d=X-mean
+		return -0.5*np.sum(d.dot(icov)*d,axis=1)
+	
+	p0=mean+0.01*np.random.RandomState(1).randn(20,2)
+	chain,logProb,acceptance=pyfrp_stats_module.sampleEnsemble(logProb,p0,3000,thin=5,seed=0)
+	
+	samples=chain[100:].reshape(-1,2)
+	assert chain.shape==(600,20,2)
+	assert 0.2<acceptance<0.9
+	assert np.allclose(samples.mean(axis=0),mean,atol=0.15)
+	assert np.allclose(np.cov(samples.T),cov,atol=0.3)
+
+def test_computeSSDBatch():
+
+	"""Test batch SSD computation.
+	
+	Checks that the SSD vanishes for the parameters the data was generated with, that diffusion rates
+	rescale time and that parameters not covered by the simulation are invalid."""
+	
+	tvecSim=np.linspace(0,100,201)
+	tvecData=np.linspace(0,20,11)
+	simVec=1-np.exp(-tvecSim/10.)
+	
+	#Data generated with D=2*Dsim, production 0.01, equalization 0.5
+	data=(1-np.exp(-2*tvecData/10.)+0.01*tvecData)/0.5
+	
+	problem={"tvecData":tvecData,"tvecSim":tvecSim,"D":1.,"dataVecs":np.array([data]),"simVecs":np.array([simVec]),
+		"fitProd":True,"fitDegr":False,"equOn":True,"x0":[1.,0.,0.],"kineticTimeScale":1.}
+	
+	SSD=pyfrp_stats_module.computeSSDBatch(problem,[[2.,0.01,0.5],[1.,0.01,0.5],[10.,0.01,0.5],[-1.,0.01,0.5]])
+	
+	assert SSD[0]<1E-4
+	assert SSD[1]>1E-2
+	assert np.all(np.isinf(SSD[2:]))
+
+def test_getLikelihoodProblem(tmpdir):
+
+	"""Test batch SSD against objective function of fit.
+	
+	Checks on a small synthetic dataset that :py:func:`pyfrp.modules.pyfrp_stats_module.computeSSDBatch` 
+	of the likelihood problem of a fit equals :py:func:`pyfrp.modules.pyfrp_fit_module.FRAPObjFunc`
+	for all combinations of fitted production, degradation and equalization."""
+	
+	dataset=pyfrp_benchmark_module.genSyntheticDataset(str(tmpdir),res=32,nFrames=10,noise=0.)
+	emb=pyfrp_benchmark_module.buildBenchmarkEmbryo(dataset)
+	emb.computeROIIdxs(debug=False)
+	emb.analysis.run(showProgress=False)
+	pyfrp_benchmark_module.setAnalyticSimulation(emb,dataset)
+	emb.pinAllROIs(*emb.computeIdealFRAPPinVals(),debug=False)
+	
+	fit=emb.fits[0]
+	fit.setX0Prod(0.01)
+	fit.setX0Degr(0.02)
+	
+	pyfrp_fit_module.iterations=0
+	
+	for prod in [False,True]:
+		for degr in [False,True]:
+			for equOn in [False,True]:
+				
+				fit.setFitProd(prod)
+				fit.setFitDegr(degr)
+				fit.setEqu(equOn)
+				
+				x=[0.8*dataset['D']]+prod*[0.005]+degr*[0.01]+equOn*len(fit.ROIsFitted)*[1.1]
+				
+				SSD=pyfrp_fit_module.FRAPObjFunc(x,fit,False,None,False)
+				SSDBatch=pyfrp_stats_module.computeSSDBatch(pyfrp_stats_module.getLikelihoodProblem(fit),[x])
+				
+				assert np.allclose(SSDBatch,SSD,rtol=1E-10), (prod,degr,equOn)
@@ -0,0 +1,41 @@
+"""This module imports all tests/unittests for the
+pyfrp_timer_module."""
+
+from pyfrp.modules import pyfrp_timer_module
+
+import pstats
+import time
+
+def test_spans(tmpdir):
+
+	"""Test recording nested spans and exporting them to pstats format.
+	
+	Checks that nothing is recorded while timing is switched off."""
+	
+	pyfrp_timer_module.reset()
+	
+	with pyfrp_timer_module.span('outer'):
+		pass
+	assert len(pyfrp_timer_module.spanStats)==0
+	
+	pyfrp_timer_module.enable()
+	try:
+		for i in range(3):
+			with pyfrp_timer_module.span('outer'):
+				with pyfrp_timer_module.span('inner'):
+					time.sleep(0.01)
+				pyfrp_timer_module.count('events',2)
+	finally:
+		pyfrp_timer_module.disable()
+	
+	report=dict([(entry['name'],entry) for entry in pyfrp_timer_module.getReport()])
+	assert report['outer']['count']==3
+	assert report['inner']['total']>=0.03
+	assert report['outer']['own']<report['inner']['total']
+	assert pyfrp_timer_module.counters['events']==6
+	assert pyfrp_timer_module.callerStats[('outer','inner')][0]==3
+	
+	stats=pstats.Stats(pyfrp_timer_module.exportPstats(str(tmpdir.join("timers.prof"))))
+	assert stats.total_calls==6
+	
+	pyfrp_timer_module.reset()